@@ -26,7 +26,7 @@ from src.command_parser import execute_flythrough, parse_command
 from src.auto_pet import nomnom
 from src.drop_logger import logging_loop
 # from src.combat_new import Fighter
-from src.stat_viewer import total_stats
+from src.stat_viewer import total_stats, StatViewerUpdates
 from src.world_to_screen import world_to_screen, get_camera_state, project_point
 from src.teleport_math import navmap_tp, calc_Distance
 from src.questing import Quester
@@ -40,6 +40,7 @@ from src import discsdk
 from wizwalker.extensions.wizsprinter.wiz_navigator import toZoneDisplayName, toZone
 from wizwalker.extensions.wizsprinter.sprinty_combat import SprintyCombat
 from src.config_combat import StrCombatConfigProvider, delegate_combat_configs, default_config
+from src.combat_planner import CombatPlanner
 from typing import List
 
 from src import gui as deimosgui
@@ -114,6 +115,7 @@ hitter_client = None
 kill_minions_first = False
 automatic_team_based_combat = False
 discard_duplicate_cards = True
+combat_planner_budget = 0.0
 ignore_pet_level_up = False
 only_play_dance_game = False
 
@@ -146,6 +148,7 @@ only_play_dance_game = _json_settings.get('only_play_dance_game', only_play_danc
 kill_minions_first = _json_settings.get('kill_minions_first', kill_minions_first)
 automatic_team_based_combat = _json_settings.get('automatic_team_based_combat', automatic_team_based_combat)
 discard_duplicate_cards = _json_settings.get('discard_duplicate_cards', discard_duplicate_cards)
+combat_planner_budget = _json_settings.get('combat_planner_budget', combat_planner_budget)
 
 while True:
 	if hasattr(sys, '_MEIPASS'):
@@ -810,6 +813,8 @@ async def main():
 
 						#CONFIG COMBAT
 						battle = SprintyCombat(client, StrCombatConfigProvider(client.combat_config), True)
+						if combat_planner_budget > 0:
+							battle.planner = CombatPlanner(combat_planner_budget)
 						await battle.wait_for_combat()
 
 		await asyncio.gather(*[async_combat(p) for p in walker.clients])
@@ -1411,6 +1416,8 @@ async def main():
 		global highlight_task
 		global entity_stream_task
 		enemy_stats = []
+		# only what changed since the last refresh is sent to the stats tab
+		stat_viewer_updates = StatViewerUpdates()
 		current_pos = None
 		current_rotation = None
 
@@ -1843,6 +1850,7 @@ async def main():
 									await foreground_client.teleport(entity_pos)
 						case deimosgui.GUICommandType.SelectEnemy:
 							if not walker.clients:
+								stat_viewer_updates.reset()
 								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindowValues, ('EnemyInput', [])))
 								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindowValues, ('AllyInput', [])))
 								continue
@@ -1856,18 +1864,13 @@ async def main():
 								result = await total_stats(foreground_client, ally_index, enemy_index, base_damage, school_id, crit_status, force_school_status, swapped=swapped, view_target=view_target)
 								if result is None:
 									continue
-								stat_lines, ally_names, enemy_names, ally_i, enemy_i, school_name, slot_info = result
-								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindow, ('stat_viewer', stat_lines)))
-								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindowValues, ('EnemyInput', enemy_names)))
-								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindowValues, ('AllyInput', ally_names)))
-								if enemy_i < len(enemy_names):
-									gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindow, ('EnemyInput', enemy_names[enemy_i])))
-								if ally_i < len(ally_names):
-									gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindow, ('AllyInput', ally_names[ally_i])))
 								# school_name not sent to dropdown — but sent as calc_school for readout
-								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindow, ('calc_school', school_name)))
-								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindow, ('slot_info', slot_info)))
+								# a stats popup waiting for its rows gets every stat line
+								for window_values, tag, value in stat_viewer_updates.changes(result, swapped, full=view_side is not None):
+									com_type = deimosgui.GUICommandType.UpdateWindowValues if window_values else deimosgui.GUICommandType.UpdateWindow
+									gui_send_queue.put(deimosgui.GUICommand(com_type, (tag, value)))
 							else:
+								stat_viewer_updates.reset()
 								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindowValues, ('EnemyInput', [])))
 								gui_send_queue.put(deimosgui.GUICommand(deimosgui.GUICommandType.UpdateWindowValues, ('AllyInput', [])))
 						case deimosgui.GUICommandType.XYZSync:
@@ -2147,7 +2150,9 @@ async def main():
 												await v.step()
 										except Exception as e:
 											logger.exception(e)
-										v.running = False
+										finally:
+											# also stops the until watchers when the bot task is cancelled
+											v.stop()
 										if v.killed:
 											break
 										await asyncio.sleep(1)
@@ -2389,7 +2394,7 @@ async def main():
 							global buy_potions, use_team_up, client_to_follow, client_to_boost
 							global questing_friend_tp, gear_switching_in_solo_zones, hitter_client
 							global ignore_pet_level_up, only_play_dance_game
-							global kill_minions_first, automatic_team_based_combat, discard_duplicate_cards
+							global kill_minions_first, automatic_team_based_combat, discard_duplicate_cards, combat_planner_budget
 							settings_dict = com.data
 							for key, value in settings_dict.items():
 								match key:
@@ -2410,6 +2415,7 @@ async def main():
 									case 'kill_minions_first': kill_minions_first = value
 									case 'automatic_team_based_combat': automatic_team_based_combat = value
 									case 'discard_duplicate_cards': discard_duplicate_cards = value
+									case 'combat_planner_budget': combat_planner_budget = value
 							logger.debug(f'Settings updated: {list(settings_dict.keys())}')
 
 			except queue.Empty:
@@ -1,6 +1,7 @@
 from typing import *
 
-from lark import Transformer
+from lark import Transformer, Token
+from lark.lark import PostLex
 
 from .combat_api import *
 
@@ -143,6 +144,169 @@ def get_sprinty_grammar():
         """
 
 
+# The grammar above is parsed with Earley, which takes most of a second for a full config and has to build its tables
+# every time. The one below describes the same configs for LALR, which parses in milliseconds and whose tables can be
+# cached. LALR can't take the optional newlines around every token, ConfigNewlines drops those before the parser sees
+# them. Rule names are the same, so TreeToConfig works with either tree. Where the Earley grammar is ambiguous (a line
+# doesn't need a newline before the next one, so "Spirit Blade @ self" can split into two lines) LALR keeps names whole.
+def get_sprinty_lalr_grammar():
+    return r"""
+            ?start: config
+            config: _NL? line (_NL line)* _NL?
+
+            line: round_specifier? move_config (_PIPE move_config)*
+
+            move_config: condition? move (_AT target)? (_AMP move (_AT target)?)*
+
+            condition: _COND_OPEN cond_clause (_cond_and cond_clause)* _RPAR
+            cond_clause: cond_target _DOT cond_attr cond_op cond_value
+            COND_AND: "&&"
+            _cond_and: COND_AND
+
+            cond_target: cond_target_self | cond_target_boss | cond_target_enemy | cond_target_ally | cond_target_enemies | cond_target_allies
+            cond_target_self: "self"
+            cond_target_boss: "boss"
+            cond_target_enemy: "enemy" (_LPAR INT _RPAR)?
+            cond_target_ally: "ally" (_LPAR INT _RPAR)?
+            cond_target_enemies: cond_agg _LPAR "enemies" _RPAR
+            cond_target_allies: cond_agg _LPAR "allies" _RPAR
+            cond_agg: cond_agg_any | cond_agg_all | cond_agg_avg
+            cond_agg_any: "any"
+            cond_agg_all: "all"
+            cond_agg_avg: "avg"
+
+            cond_attr: NAME
+            cond_op: CMP_OP
+            CMP_OP: "<=" | ">=" | "!=" | "==" | "<" | ">"
+
+            cond_value: COND_NUMBER cond_percent?
+            cond_percent: _PERCENT
+            COND_NUMBER: /\d+(\.\d+)?/
+
+            move: move_pass | move_willcast | move_draw | spell (enchant second_enchant?)?
+            move_pass: "pass"
+            move_willcast: "willcast"
+            move_draw: "draw" (_LPAR INT _RPAR)?
+            move_discard: "discard"
+
+            spell: any_spell | words | string
+            enchant: _LSQB (any_spell | words | string) _RSQB
+            second_enchant: _LSQB (any_spell | words | string) _RSQB
+
+            target: target_type | target_select
+            target_type: target_self | target_boss | target_enemy | target_enemies | target_ally | target_allies | target_aoe | target_spell | target_named
+            target_self: "self"
+            target_boss: "boss"
+            target_enemy: "enemy" (_LPAR INT _RPAR)?
+            target_enemies: "enemies"
+            target_ally: "ally" (_LPAR INT _RPAR)?
+            target_allies: "allies"
+            target_aoe: "aoe"
+            target_named: words | string
+            target_spell: "spell" _LPAR (any_spell | words | string) (_COMMA (any_spell | words | string))* _RPAR
+            target_select: "select" _LPAR target_type (_COMMA target_type)* _RPAR | target_type (_COMMA target_type)+
+
+            round_specifier: _LBRACE expression _RBRACE
+
+            auto: "auto"
+
+            any_spell: "any" _LT spell_type (_AMP spell_type)* _GT
+            spell_type: spell_damage | spell_aoe | spell_heal_self | spell_heal_other | spell_heal | spell_blade | spell_charm | spell_ward | spell_trap | spell_enchant | spell_aura | spell_global | spell_polymorph | spell_shadow | spell_shadow_creature | spell_pierce | spell_prism | spell_dispel | spell_inc_damage | spell_out_damage | spell_inc_heal | spell_out_heal | spell_mod_damage | spell_mod_heal | spell_mod_pierce | spell_req_met | spell_gambit | spell_clear | spell_echo | spell_swap
+            spell_damage: "damage"
+            spell_aoe: "aoe"
+            spell_heal: "heal"
+            spell_heal_self: spell_heal "self"
+            spell_heal_other: spell_heal "other"
+            spell_blade: "blade"
+            spell_charm: "charm"
+            spell_ward: "ward"
+            spell_trap: "trap"
+            spell_enchant: "enchant"
+            spell_aura: "aura"
+            spell_global: "global"
+            spell_polymorph: "polymorph"
+            spell_shadow: "shadow"
+            spell_shadow_creature: "shadow_creature"
+            spell_pierce: "pierce"
+            spell_prism: "prism"
+            spell_dispel: "dispel"
+            spell_inc_damage: "inc_damage"
+            spell_out_damage: "out_damage"
+            spell_inc_heal: "inc_heal"
+            spell_out_heal: "out_heal"
+            spell_mod_damage: "mod_damage"
+            spell_mod_heal: "mod_heal"
+            spell_mod_pierce: "mod_pierce"
+            spell_req_met: "req_met"
+            spell_gambit: "gambit" _LPAR hanging_args _RPAR
+            spell_clear:  "clear"  _LPAR hanging_args _RPAR
+            spell_echo:   "echo"   _LPAR hanging_args _RPAR
+            spell_swap:   "swap"   _LPAR hanging_args _RPAR
+            hanging_args: hanging_kw | hanging_kw _COMMA INT
+            hanging_kw: NAME
+
+            expression: INT
+
+            words: word+
+            word: NAME | DIGIT
+            DIGIT: "0".."9"
+            string: ESCAPED_STRING
+
+            // tokens that can't start a line take the newlines in front of them, so a line can go on with them
+            _COND_OPEN: "?("
+            _LPAR.2: /(\r?\n[\t ]*)*\(/
+            _RPAR: ")"
+            _LSQB.2: /(\r?\n[\t ]*)*\[/
+            _RSQB: "]"
+            _LT.2: /(\r?\n[\t ]*)*</
+            _GT: ">"
+            _LBRACE: "{"
+            _RBRACE: "}"
+            _COMMA.2: /(\r?\n[\t ]*)*,/
+            _DOT: "."
+            _PERCENT: "%"
+            _AT.2: /(\r?\n[\t ]*)*@/
+            _PIPE.2: /(\r?\n[\t ]*)*\|/
+            _AMP.2: /(\r?\n[\t ]*)*&(?!&)/
+            _NL: /(\r?\n[\t ]*)+/
+
+            %import common.INT
+            %import common.CNAME -> NAME
+            %import common.WS_INLINE
+            %import common.ESCAPED_STRING
+
+            %ignore WS_INLINE
+        """
+
+
+class ConfigNewlines(PostLex):
+    """
+    Drops the newlines that don't end a line. Like the Earley grammar allows, a newline inside brackets or after a token
+    that needs something after it just continues the line.
+    """
+    always_accept = ("_NL",)
+
+    OPENING = {"_LPAR", "_LSQB", "_LT", "_LBRACE", "_COND_OPEN"}
+    CLOSING = {"_RPAR", "_RSQB", "_GT", "_RBRACE"}
+    CONTINUES = {"_PIPE", "_AMP", "_AT", "_COMMA", "_RBRACE"}
+
+    def process(self, stream: Iterator[Token]) -> Iterator[Token]:
+        depth = 0
+        previous = None
+        for token in stream:
+            if token.type == "_NL":
+                if depth == 0 and (previous is None or previous.type not in self.CONTINUES):
+                    yield token
+                continue
+
+            if token.type in self.OPENING:
+                depth += 1
+            elif token.type in self.CLOSING:
+                depth = max(depth - 1, 0)
+            previous = token
+            yield token
+
+
 class TreeToConfig(Transformer):
     def spell(self, items, enchant: bool = False):
         if type(items[0]) is not str:
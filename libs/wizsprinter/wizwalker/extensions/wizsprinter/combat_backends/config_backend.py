@@ -1,9 +1,8 @@
 from typing import *
 
-from lark import Lark
-
 from .backend_base import BaseCombatBackend
-from .combat_config_parser import CombatConfig, PriorityLine, get_sprinty_grammar, TreeToConfig, Move, MoveConfig
+from .combat_config_parser import CombatConfig, PriorityLine, Move, MoveConfig
+from .config_cache import parse_combat_config
 from ..sprinty_combat import SprintyCombat
 
 
@@ -15,11 +14,7 @@ class CombatConfigProvider(BaseCombatBackend):
             self.config: CombatConfig = self.parse_config(file.read())
 
     def parse_config(self, file_contents) -> CombatConfig:
-        grammar = get_sprinty_grammar()
-
-        parser = Lark(grammar)
-        tree = parser.parse(file_contents)
-        return self._expand_config(TreeToConfig().transform(tree))
+        return self._expand_config(parse_combat_config(file_contents))
 
     async def get_real_round(self, r: int) -> Optional[PriorityLine]:
         if r in self.config.specific_rounds:
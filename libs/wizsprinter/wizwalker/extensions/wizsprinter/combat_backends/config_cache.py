@@ -0,0 +1,95 @@
+import hashlib
+from pathlib import Path
+from typing import *
+
+import lark
+from lark import Lark, Tree
+from lark.exceptions import LarkError
+from loguru import logger
+from wizwalker import utils
+
+from .combat_config_parser import CombatConfig, ConfigNewlines, TreeToConfig, get_sprinty_grammar, get_sprinty_lalr_grammar
+
+
+# Every client used to build an Earley parser for its config and parse it, most of a second each. The LALR parser is
+# built once per process and its tables are kept in the wizwalker cache folder, so later runs only load them. Configs are
+# remembered by their content, so clients running the same config (or reloading an unchanged one) share one parse.
+# Shared configs must be treated as read only.
+
+# configs remembered at once, the oldest is forgotten first
+MAX_CONFIGS = 64
+
+_lalr_parser: Optional[Lark] = None
+_earley_parser: Optional[Lark] = None
+_configs: Dict[bytes, CombatConfig] = {}
+_stats = {"hits": 0, "misses": 0, "fallbacks": 0}
+
+
+def lalr_cache_path() -> Optional[Path]:
+    # lark checks the grammar and its own version against the file too, the hash only keeps old files from being overwritten
+    grammar = get_sprinty_lalr_grammar()
+    digest = hashlib.sha256(f"{lark.__version__}:{grammar}".encode()).hexdigest()
+    try:
+        return utils.get_cache_folder() / f"sprinty_lalr_{digest[:16]}.cache"
+    except OSError as e:
+        logger.warning(f"Unable to use the config parser cache: {e}")
+        return None
+
+
+def build_lalr_parser(cache_path: Optional[Path] = None) -> Lark:
+    '''Builds the LALR config parser, or loads it from cache_path if an earlier build was written there.'''
+    return Lark(
+        get_sprinty_lalr_grammar(),
+        parser="lalr",
+        postlex=ConfigNewlines(),
+        cache=str(cache_path) if cache_path is not None else False,
+    )
+
+
+def get_lalr_parser() -> Lark:
+    global _lalr_parser
+    if _lalr_parser is None:
+        _lalr_parser = build_lalr_parser(lalr_cache_path())
+    return _lalr_parser
+
+
+def get_earley_parser() -> Lark:
+    global _earley_parser
+    if _earley_parser is None:
+        _earley_parser = Lark(get_sprinty_grammar())
+    return _earley_parser
+
+
+def parse_config_tree(file_contents: str) -> Tree:
+    try:
+        return get_lalr_parser().parse(file_contents)
+    except LarkError:
+        # The Earley grammar is looser (lines don't need a newline between them), and its errors are the ones users know
+        _stats["fallbacks"] += 1
+        return get_earley_parser().parse(file_contents)
+
+
+def parse_combat_config(file_contents: str) -> CombatConfig:
+    '''Parses a config, or returns the same CombatConfig as last time if this exact config was parsed before.'''
+    key = hashlib.sha256(file_contents.encode("utf-8", errors="surrogatepass")).digest()
+    config = _configs.get(key)
+    if config is not None:
+        _stats["hits"] += 1
+        return config
+
+    _stats["misses"] += 1
+    config = TreeToConfig().transform(parse_config_tree(file_contents))
+    if len(_configs) >= MAX_CONFIGS:
+        del _configs[next(iter(_configs))]
+    _configs[key] = config
+    return config
+
+
+def config_cache_info() -> Dict[str, int]:
+    return {**_stats, "configs": len(_configs)}
+
+
+def clear_config_cache():
+    _configs.clear()
+    for name in _stats:
+        _stats[name] = 0
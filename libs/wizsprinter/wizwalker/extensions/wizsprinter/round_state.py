@@ -0,0 +1,161 @@
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import *
+
+from wizwalker.combat import CombatMember
+from wizwalker.combat.card import CombatCard
+
+
+# Everything SprintyCombat checks while planning a round (config conditions, card names and effects, member names,
+# health, teams and hanging effects) reads the same memory over and over: once per config line, once per condition and
+# again per requirement check. Nothing of it changes while the round is planned, except the hand after a cast, discard
+# or draw. A RoundState is started when planning starts and remembers every such read until the hand changes, then the
+# cards (and everything read from them) are read fresh, the members stay.
+
+# Awaited reads without arguments that are remembered, everything else goes straight to memory
+CARD_READS = (
+    "name", "display_name", "type_name", "template_id", "spell_id", "accuracy",
+    "is_castable", "is_enchanted", "is_treasure_card", "is_item_card", "is_side_board", "is_cloaked",
+    "is_enchanted_from_item_card", "is_pve_only", "get_graphical_spell", "get_spell_effects",
+)
+MEMBER_READS = (
+    "name", "owner_id", "template_id", "health", "max_health", "mana", "max_mana", "level",
+    "normal_pips", "power_pips", "shadow_pips",
+    "is_dead", "is_client", "is_player", "is_monster", "is_minion", "is_boss", "is_stunned",
+    "get_stats", "get_health_text_window",
+)
+# Participant reads that return effects, the effects are wrapped too so counting them doesn't read their types again
+EFFECT_LIST_READS = {"hanging_effects", "public_hanging_effects", "aura_effects"}
+
+
+class RoundState:
+    def __init__(self):
+        self.cards: Optional[List["RoundCard"]] = None
+        self.members: Optional[List["RoundMember"]] = None
+        # >0 while a cast, discard or draw is in flight, reads are never remembered then since they wait for the hand to change
+        self.changing = 0
+        self.hits = 0
+        self.misses = 0
+        self.hand_refreshes = 0
+        # seconds spent awaiting the reads that missed
+        self.fetch_seconds = 0.0
+
+    @property
+    def remembering(self) -> bool:
+        return self.changing == 0
+
+    async def remember(self, values: dict, name: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if name in values:
+            self.hits += 1
+            return values[name]
+        self.misses += 1
+        started = perf_counter()
+        try:
+            value = await fetch()
+        finally:
+            self.fetch_seconds += perf_counter() - started
+        values[name] = value
+        return value
+
+    def refresh_hand(self):
+        # The old card objects keep their values, only cards read from now on are new
+        self.cards = None
+        self.hand_refreshes += 1
+
+    @asynccontextmanager
+    async def changing_hand(self):
+        self.changing += 1
+        self.cards = None
+        try:
+            yield
+        finally:
+            self.changing -= 1
+            self.refresh_hand()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self) -> str:
+        return f"RoundState(hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.1%}, hand_refreshes={self.hand_refreshes})"
+
+
+class RoundProxy:
+    '''Wraps a memory object (participant, spell effect), its awaited reads without arguments are remembered.'''
+    def __init__(self, obj, state: RoundState):
+        self._obj = obj
+        self._state = state
+        self._values = {}
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._obj, name)
+        if not callable(attr):
+            return attr
+
+        async def read(*args, **kwargs):
+            if args or kwargs:
+                return await attr(*args, **kwargs)
+            return await self._state.remember(self._values, name, lambda: self._read(name, attr))
+
+        return read
+
+    async def _read(self, name: str, attr: Callable[[], Awaitable[Any]]) -> Any:
+        value = await attr()
+        if name in EFFECT_LIST_READS:
+            return [RoundProxy(effect, self._state) for effect in value]
+        return value
+
+
+def _remembered(base: type, name: str):
+    method = getattr(base, name)
+
+    async def read(self):
+        return await self._state.remember(self._values, name, lambda: method(self))
+
+    read.__name__ = name
+    read.__doc__ = method.__doc__
+    return read
+
+
+class RoundCard(CombatCard):
+    '''A CombatCard of the round's hand. Casting or discarding it makes the round state read the hand again.'''
+    def __init__(self, card: CombatCard, state: RoundState):
+        super().__init__(card.combat_handler, card._spell_window)
+        self._state = state
+        self._values = {}
+
+    async def remember_effects(self, name: str, fetch: Callable[[CombatCard], Awaitable[list]]) -> list:
+        '''Remembers the effects fetch(card) returns under name, and the reads of every one of them.'''
+        async def _read():
+            return [RoundProxy(effect, self._state) for effect in await fetch(self)]
+
+        return await self._state.remember(self._values, name, _read)
+
+    async def cast(self, target, *, sleep_time: Optional[float] = 1.0, debug_paint: bool = False):
+        async with self._state.changing_hand():
+            await super().cast(target, sleep_time=sleep_time, debug_paint=debug_paint)
+
+    async def discard(self, *, sleep_time: Optional[float] = 1.0):
+        async with self._state.changing_hand():
+            await super().discard(sleep_time=sleep_time)
+
+
+class RoundMember(CombatMember):
+    '''A CombatMember whose reads are remembered for the whole round.'''
+    def __init__(self, member: CombatMember, state: RoundState):
+        super().__init__(member.combat_handler, member._combatant_control)
+        self._state = state
+        self._values = {}
+
+    async def get_participant(self) -> RoundProxy:
+        async def _read():
+            return RoundProxy(await CombatMember.get_participant(self), self._state)
+
+        return await self._state.remember(self._values, "get_participant", _read)
+
+
+for _name in CARD_READS:
+    setattr(RoundCard, _name, _remembered(CombatCard, _name))
+for _name in MEMBER_READS:
+    setattr(RoundMember, _name, _remembered(CombatMember, _name))
@@ -15,6 +15,7 @@ from .combat_backends.combat_config_parser import TargetType, TargetData, MoveCo
     , GambitSpec, ClearSpec, EchoSpec, SwapSpec, HangingType, HANGING_CATEGORIES, hanging_type_info
 from wizwalker.memory.memory_objects.conditionals import ReqHangingAura
 from .combat_backends.backend_base import BaseCombatBackend
+from .round_state import RoundState, RoundCard, RoundMember
 
 from enum import Enum, auto
 from collections import Counter
@@ -56,13 +57,19 @@ async def _flatten_effect(effect, out: List, depth: int = 0):
     out.append(effect)
 
 
-async def get_inner_card_effects(card: CombatCard) -> List[DynamicSpellEffect]:
+async def _read_inner_card_effects(card: CombatCard) -> List[DynamicSpellEffect]:
     output_effects: List[DynamicSpellEffect] = []
     for effect in await card.get_spell_effects():
         await _flatten_effect(effect, output_effects)
     return output_effects
 
 
+async def get_inner_card_effects(card: CombatCard) -> List[DynamicSpellEffect]:
+    if isinstance(card, RoundCard): # Remembered for the round, along with everything read from the effects
+        return await card.remember_effects("inner_effects", _read_inner_card_effects)
+    return await _read_inner_card_effects(card)
+
+
 async def is_enchantable(card: CombatCard) -> bool:
     return not any((
         await card.is_enchanted(),
@@ -434,6 +441,10 @@ class SprintyCombat(CombatHandler):
         self.had_first_round = False
         self.rel_round_offset = 0
         self.handle_mouseless = handle_mouseless
+        # Optional async callable(combat) -> bool tried before the config each round, True if it took the turn
+        self.planner = None
+        # Reads remembered while a round is planned, None outside of handle_round
+        self.round_state: Optional[RoundState] = None
 
     async def handle_combat(self):
         self.turn_adjust = 0
@@ -483,9 +494,30 @@ class SprintyCombat(CombatHandler):
         self.was_pass = True
         await super().pass_button()
 
+    async def draw_button(self):
+        if self.round_state is None:
+            await super().draw_button()
+            return
+        async with self.round_state.changing_hand():
+            await super().draw_button()
+
+    async def get_members(self) -> List[CombatMember]:
+        state = self.round_state
+        if state is None:
+            return await super().get_members()
+        if state.members is None:
+            state.members = [RoundMember(member, state) for member in await super().get_members()]
+        return state.members
+
     async def get_cards(self) -> List[CombatCard]:  # extended to sort by enchanted
+        state = self.round_state
+        if state is not None and state.remembering and state.cards is not None:
+            return state.cards
+
         async def _inner() -> List[CombatCard]:
             cards = await super(SprintyCombat, self).get_cards()
+            if state is not None and state.remembering:
+                cards = [RoundCard(card, state) for card in cards]
             rese, res = [], []
             for card in cards:
                 if await card.is_enchanted():
@@ -494,9 +526,12 @@ class SprintyCombat(CombatHandler):
                     res.append(card)
             return rese + res
         try:
-            return await wizwalker.utils.maybe_wait_for_any_value_with_timeout(_inner, sleep_time=0.2, timeout=2.0)
+            cards = await wizwalker.utils.maybe_wait_for_any_value_with_timeout(_inner, sleep_time=0.2, timeout=2.0)
         except wizwalker.errors.ExceptionalTimeout:
             return []
+        if state is not None and state.remembering and cards and isinstance(cards[0], RoundCard):
+            state.cards = cards
+        return cards
 
     async def get_num_card_windows(self) -> int:
         hand = (await self.client.root_window.get_windows_with_name("Hand"))[0]
@@ -1776,6 +1811,15 @@ class SprintyCombat(CombatHandler):
         self.turn_adjust -= 1
 
     async def handle_round(self):
+        # Every read made while planning is shared until the hand changes, see round_state.py
+        self.round_state = RoundState()
+        try:
+            await self._plan_round()
+        finally:
+            _dbg(f"[ROUND-STATE] {self.round_state}")
+            self.round_state = None
+
+    async def _plan_round(self):
         # try:
         #     await self.client.mouse_handler.activate_mouseless()
         # except wizwalker.errors.HookAlreadyActivated:
@@ -1814,6 +1858,8 @@ class SprintyCombat(CombatHandler):
             if member is not None:
                 if await member.is_stunned():
                     await self.fail_turn()
+                elif self.planner is not None and await self.planner(self):
+                    pass
                 else:
                     round_config = await self.config.get_real_round(real_round)
                     if round_config is None:
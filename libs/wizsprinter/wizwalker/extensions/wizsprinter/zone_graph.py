@@ -0,0 +1,317 @@
+import hashlib
+import heapq
+import json
+import os
+from dataclasses import dataclass
+from enum import Enum
+from typing import *
+
+from loguru import logger
+from wizwalker import utils
+
+
+traversal_dir = os.path.join(os.path.dirname(__file__), "traversalData")
+
+# if a player recalls to a dungeon, then attempts to return to the hub, they go through two zone changes: once to the hub, second back to the zone they were in before recalling
+# this makes it impossible to account for zone changes without having ridiculously long sleeps or hardcoded zone names
+world_hubs = ['WizardCity/WC_Ravenwood_Teleporter', 'WizardCity/WC_Ravenwood', 'Krokotopia/KT_WorldTeleporter', 'Krokotopia/KT_Hub', 'Marleybone/Interiors/MB_WolfminsterAbbey', 'Marleybone/MB_Hub', 'DragonSpire/DS_Hub_Cathedral', 'MooShu/Interiors/MS_Teleport_Chamber', 'MooShu/MS_Hub', 'Celestia/CL_Hub', 'Wysteria/PA_Hub', 'Grizzleheim/GH_MainHub', 'Zafaria/ZF_Z00_Hub', 'Avalon/AV_Z00_Hub', 'Azteca/AZ_Z00_Zocalo', 'Khrysalis/KR_Z00_Hub', 'Polaris/PL_Z00_Walruskberg', 'Mirage/MR_Z00_Hub', 'Karamelle/KM_Z00_HUB', 'Empyrea/EM_Z00_Aeriel_HUB', 'Lemuria/LM_Z00_Hub']
+
+# bumped whenever the graph building or edge costs change, invalidates the persisted next hop table
+ZONE_GRAPH_VERSION = 2
+
+
+class ZoneEdgeKind(Enum):
+    gate = "gate"  # zone gate / door listed in gates_list.txt
+    world_gate = "world_gate"  # spiral door to another world
+    teleporter = "teleporter"  # interactive teleporter menu (empyrea and later)
+    recall = "recall"  # END key back to the world hub
+    mark = "mark"  # PAGE_UP back to the client's teleport mark, only known per trip so never part of the next hop table
+
+
+edge_costs = {
+    ZoneEdgeKind.gate: 1.0,
+    ZoneEdgeKind.teleporter: 1.5,
+    ZoneEdgeKind.world_gate: 8.0,
+    # recalling is unreliable from dungeons, only take it when walking would be much longer
+    ZoneEdgeKind.recall: 20.0,
+    # a single loading screen, but the recall button has a cooldown so a trip takes it at most once
+    ZoneEdgeKind.mark: 3.0,
+}
+
+# gates that need npc interaction or a ride skip take longer than walking through a door
+gate_interaction_cost = 1.0
+
+
+@dataclass(frozen=True)
+class ZoneEdge:
+    kind: ZoneEdgeKind
+    source: str
+    destination: str
+    cost: float
+    xyz: Optional[Tuple[float, float, float]] = None
+    # gates_list access type for gates, ie. "standard" or "dungeon"
+    access_type: Optional[str] = None
+    # 1-based teleporter menu button for teleporters
+    button: Optional[int] = None
+
+
+def world_of(zone: str) -> str:
+    return zone.split('/', 1)[0]
+
+
+def _read_world_sections(file_name: str) -> Dict[str, List[str]]:
+    # Splits a traversalData file into its "WORLD - name" sections, without the END markers and blank lines
+    sections = {}
+    current = None
+    with open(os.path.join(traversal_dir, file_name), "r") as file:
+        for raw_line in file:
+            line = raw_line.strip()
+            # some sections are missing their END line, the next header closes them too
+            if line.startswith('WORLD - '):
+                current = sections.setdefault(line[len('WORLD - '):].strip(), [])
+                continue
+            if line.startswith('END'):
+                current = None
+                continue
+            if line and current is not None:
+                current.append(line)
+    return sections
+
+
+def _data_hash() -> str:
+    digest = hashlib.sha256(str(ZONE_GRAPH_VERSION).encode())
+    for file_name in ("gates_list.txt", "interactiveTeleporters.txt", "uniqueObjectLocations.txt", "zoneMap.txt"):
+        with open(os.path.join(traversal_dir, file_name), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+class ZoneGraph:
+    """
+    Every known zone and the ways of getting between them, built once from the traversalData files.
+
+    Routes come from an all-pairs next hop table, so planning a multi zone trip is a handful of dict lookups.
+    """
+    def __init__(self, edges: List[ZoneEdge]):
+        self.edges = edges
+        self.zones: Set[str] = set()
+        self.outgoing: Dict[str, List[int]] = {}
+        for index, edge in enumerate(edges):
+            self.zones.add(edge.source)
+            self.zones.add(edge.destination)
+            self.outgoing.setdefault(edge.source, []).append(index)
+
+        # next_hop[source][destination] -> index of the first edge to take
+        self.next_hop: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_traversal_data(cls) -> "ZoneGraph":
+        edges: List[ZoneEdge] = []
+
+        for world, lines in _read_world_sections("gates_list.txt").items():
+            for line in lines:
+                split = [part.strip() for part in line.split(';')]
+                if len(split) < 6:
+                    logger.warning(f"Skipping malformed gate in {world}: {line}")
+                    continue
+                access_type, x, y, z, source, destination = split[:6]
+                cost = edge_costs[ZoneEdgeKind.gate]
+                if access_type != 'standard':
+                    cost += gate_interaction_cost
+                edges.append(ZoneEdge(ZoneEdgeKind.gate, source, destination, cost, (float(x), float(y), float(z)), access_type=access_type))
+
+        for world, lines in _read_world_sections("interactiveTeleporters.txt").items():
+            teleporters = []
+            for line in lines:
+                split = [part.strip() for part in line.split(';')]
+                button = int(split[0].split('_', 1)[1]) + 1
+                teleporters.append((button, (float(split[1]), float(split[2]), float(split[3])), split[4]))
+
+            # every teleporter in a world can reach every other one
+            for _, xyz, source in teleporters:
+                for button, _, destination in teleporters:
+                    if source != destination:
+                        edges.append(ZoneEdge(ZoneEdgeKind.teleporter, source, destination, edge_costs[ZoneEdgeKind.teleporter], xyz, button=button))
+
+        # spiral doors: from the zone holding a world's door to the door zone of every other world
+        zone_doors = {}
+        for world, lines in _read_world_sections("uniqueObjectLocations.txt").items():
+            for line in lines:
+                split = [part.strip() for part in line.split(';')]
+                if split[0] == 'ZONEDOOR':
+                    zone_doors[world] = ((float(split[1]), float(split[2]), float(split[3])), split[4])
+                    break
+
+        for world, (xyz, source) in zone_doors.items():
+            for other_world, (_, destination) in zone_doors.items():
+                if other_world != world:
+                    edges.append(ZoneEdge(ZoneEdgeKind.world_gate, source, destination, edge_costs[ZoneEdgeKind.world_gate], xyz))
+
+        # zoneMap.txt is the tree of zones per world, rooted at the zone a world is entered through.
+        # Its links carry no gate coordinates, so the ones missing from gates_list.txt can't be walked, but their zones can still be recalled out of.
+        known_zones = {edge.source for edge in edges} | {edge.destination for edge in edges}
+        gate_links = {(edge.source, edge.destination) for edge in edges}
+        roots = {}
+        for world, lines in _read_world_sections("zoneMap.txt").items():
+            for line in lines:
+                split = [part.strip() for part in line.split(';')]
+                if split[0] == 'ZONEDOOR':
+                    roots[world] = split[1]
+                    continue
+                known_zones.update(split[:2])
+                if tuple(split[:2]) not in gate_links:
+                    logger.debug(f"No gate or teleporter for zoneMap link {split[0]} -> {split[1]}")
+
+        # recall lands on the root of the world's zone map
+        for zone in sorted(known_zones):
+            hub = roots.get(world_of(zone))
+            if hub is not None and hub != zone:
+                edges.append(ZoneEdge(ZoneEdgeKind.recall, zone, hub, edge_costs[ZoneEdgeKind.recall]))
+
+        return cls(edges)
+
+    def shortest_path(self, source: str, destination: str) -> Optional[List[ZoneEdge]]:
+        """
+        Dijkstra from source to destination over the edge costs, without touching the next hop table
+
+        Returns:
+            The edges to take in order, None if destination can't be reached
+        """
+        if source == destination:
+            return []
+
+        distances = {source: 0.0}
+        previous: Dict[str, int] = {}
+        heap = [(0.0, source)]
+        while heap:
+            distance, zone = heapq.heappop(heap)
+            if zone == destination:
+                break
+            if distance > distances[zone]:
+                continue
+            for index in self.outgoing.get(zone, ()):
+                edge = self.edges[index]
+                new_distance = distance + edge.cost
+                if new_distance < distances.get(edge.destination, float('inf')):
+                    distances[edge.destination] = new_distance
+                    previous[edge.destination] = index
+                    heapq.heappush(heap, (new_distance, edge.destination))
+
+        if destination not in previous:
+            return None
+
+        path = []
+        zone = destination
+        while zone != source:
+            edge = self.edges[previous[zone]]
+            path.append(edge)
+            zone = edge.source
+        path.reverse()
+        return path
+
+    def _next_hops_from(self, source: str) -> Dict[str, int]:
+        # single source dijkstra, remembering the first edge taken towards every reachable zone
+        distances = {source: 0.0}
+        first_edge: Dict[str, int] = {}
+        heap = [(0.0, source, -1)]
+        while heap:
+            distance, zone, first = heapq.heappop(heap)
+            if distance > distances[zone]:
+                continue
+            for index in self.outgoing.get(zone, ()):
+                edge = self.edges[index]
+                new_distance = distance + edge.cost
+                if new_distance < distances.get(edge.destination, float('inf')):
+                    distances[edge.destination] = new_distance
+                    first_edge[edge.destination] = index if first == -1 else first
+                    heapq.heappush(heap, (new_distance, edge.destination, first_edge[edge.destination]))
+        first_edge.pop(source, None)
+        return first_edge
+
+    def build_next_hops(self):
+        self.next_hop = {zone: self._next_hops_from(zone) for zone in self.zones}
+
+    def route(self, source: str, destination: str, mark: Optional[str] = None) -> Optional[List[ZoneEdge]]:
+        """
+        Optimal route from source to destination using the next hop table
+
+        Args:
+            mark: Zone of the client's teleport mark, the route may start by recalling to it
+
+        Returns:
+            The edges to take in order, None if destination can't be reached
+        """
+        source = source.strip()
+        destination = destination.strip()
+        if source == destination:
+            return []
+        if not self.next_hop:
+            self.build_next_hops()
+
+        path = self._table_route(source, destination)
+        if mark is None or mark.strip() == source:
+            return path
+
+        mark = mark.strip()
+        rest = self._table_route(mark, destination) if mark != destination else []
+        if rest is None:
+            return path
+        via_mark = [ZoneEdge(ZoneEdgeKind.mark, source, mark, edge_costs[ZoneEdgeKind.mark])] + rest
+        if path is None or sum(edge.cost for edge in via_mark) < sum(edge.cost for edge in path):
+            return via_mark
+        return path
+
+    def _table_route(self, source: str, destination: str) -> Optional[List[ZoneEdge]]:
+        path = []
+        zone = source
+        while zone != destination:
+            index = self.next_hop.get(zone, {}).get(destination)
+            if index is None:
+                return None
+            edge = self.edges[index]
+            path.append(edge)
+            zone = edge.destination
+        return path
+
+    def load_next_hops(self, data: dict) -> bool:
+        if data.get("edge_count") != len(self.edges):
+            return False
+        self.next_hop = data["next_hop"]
+        return True
+
+    def dump_next_hops(self) -> dict:
+        return {"edge_count": len(self.edges), "next_hop": self.next_hop}
+
+
+_zone_graph: Optional[ZoneGraph] = None
+
+
+def get_zone_graph() -> ZoneGraph:
+    """
+    The process wide zone graph. Its next hop table is persisted in the wizwalker cache folder and reused until the traversal data changes
+    """
+    global _zone_graph
+    if _zone_graph is not None:
+        return _zone_graph
+
+    graph = ZoneGraph.from_traversal_data()
+    data_hash = _data_hash()
+    cache_file = utils.get_cache_folder() / "zone_graph.json"
+
+    try:
+        with open(cache_file, "r") as file:
+            cached = json.load(file)
+        loaded = cached.get("hash") == data_hash and graph.load_next_hops(cached)
+    except (OSError, ValueError, KeyError):
+        loaded = False
+
+    if not loaded:
+        graph.build_next_hops()
+        try:
+            with open(cache_file, "w") as file:
+                json.dump({"hash": data_hash, **graph.dump_next_hops()}, file)
+        except OSError as e:
+            logger.warning(f"Unable to write zone graph cache: {e}")
+
+    _zone_graph = graph
+    return graph
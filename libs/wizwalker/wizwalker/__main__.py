@@ -1,5 +1,6 @@
 import asyncio
 import sys
+import time
 from pathlib import Path
 
 import aiofiles
@@ -156,6 +157,57 @@ def extract(input_wad, file_name):
     asyncio.run(_extract_file())
 
 
+@wad.command(short_help="Benchmark zone.nav parsing across all zone wads")
+@click.option("--repeat", default=3, show_default=True, help="Times each nav file is parsed")
+def bench_nav(repeat):
+    """
+    Benchmark zone.nav parsing across every zone wad in the game data
+
+    Reports the time spent parsing the raw files and loading them from the compiled nav cache
+    """
+    from wizwalker.file_readers.nav import parse_nav, read_nav
+
+    game_data = utils.get_wiz_install() / "Data" / "GameData"
+
+    async def _bench():
+        parse_time = 0.0
+        cached_time = 0.0
+        zones = 0
+        vertices = 0
+        for wad_path in sorted(game_data.glob("*.wad")):
+            wad_file = Wad(wad_path)
+            try:
+                file_data = await wad_file.get_file("zone.nav")
+            except ValueError:
+                wad_file.close()
+                continue
+
+            zones += 1
+            start = time.perf_counter()
+            for _ in range(repeat):
+                zone_vertices, _ = parse_nav(file_data)
+            parse_time += time.perf_counter() - start
+            vertices += len(zone_vertices)
+
+            # first read compiles the cache
+            await read_nav(wad_file)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                await read_nav(wad_file)
+            cached_time += time.perf_counter() - start
+            wad_file.close()
+
+        if zones == 0:
+            click.echo(f"No zone.nav files found in {game_data}")
+            return
+
+        click.echo(f"{zones} zones, {vertices} vertices")
+        click.echo(f"parse:  {parse_time / repeat * 1000:.1f}ms per pass ({parse_time / (zones * repeat) * 1000:.3f}ms per zone)")
+        click.echo(f"cached: {cached_time / repeat * 1000:.1f}ms per pass ({cached_time / (zones * repeat) * 1000:.3f}ms per zone)")
+
+    asyncio.run(_bench())
+
+
 # # TODO: finish
 # @wad.command()
 # def insert():
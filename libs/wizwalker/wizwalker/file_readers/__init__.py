@@ -1,3 +1,4 @@
 from .cache_handler import CacheHandler
+from .nav import parse_nav, read_nav
 from .nif import NifMap
 from .wad import Wad, WadFileInfo
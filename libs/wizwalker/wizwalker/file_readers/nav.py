@@ -0,0 +1,182 @@
+import struct
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import aiofiles
+import numpy as np
+from loguru import logger
+
+from wizwalker import utils
+from .wad import Wad
+
+
+# zone.nav layout:
+#   header: short vertex_count, short vertex_max, short unknown
+#   vertex_max records of: float x, float y, float z, short index
+#   int edge_count
+#   edge_count records of: short start, short stop
+_HEADER = struct.Struct("<hhh")
+_VERTEX = np.dtype([("position", "<f4", (3,)), ("index", "<i2")])
+_EDGE = np.dtype(("<i2", (2,)))
+_EDGE_COUNT = struct.Struct("<i")
+
+# compiled cache layout: magic, version, wad entry crc, vertex count, edge count
+# followed by the packed vertex floats (x, y, z) and the packed edge shorts (start, stop)
+_CACHE_MAGIC = b"WWNV"
+_CACHE_VERSION = 1
+_CACHE_HEADER = struct.Struct("<4sIiII")
+_POSITION = np.dtype(("<f4", (3,)))
+
+NavData = Tuple[List[utils.XYZ], List[Tuple[int, int]]]
+
+
+# implemented from https://github.com/PeechezNCreem/navwiz/
+# this licence covers the below functions
+# Boost Software License - Version 1.0 - August 17th, 2003
+#
+# Permission is hereby granted, free of charge, to any person or organization
+# obtaining a copy of the software and accompanying documentation covered by
+# this license (the "Software") to use, reproduce, display, distribute,
+# execute, and transmit the Software, and to prepare derivative works of the
+# Software, and to permit third-parties to whom the Software is furnished to
+# do so, all subject to the following:
+#
+# The copyright notices in the Software and this entire statement, including
+# the above license grant, this restriction and the following disclaimer,
+# must be included in all copies of the Software, in whole or in part, and
+# all derivative works of the Software, unless such copies or derivative
+# works are solely in the form of machine-executable object code generated by
+# a source language processor.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE, TITLE AND NON-INFRINGEMENT. IN NO EVENT
+# SHALL THE COPYRIGHT HOLDERS OR ANYONE DISTRIBUTING THE SOFTWARE BE LIABLE
+# FOR ANY DAMAGES OR OTHER LIABILITY, WHETHER IN CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+def _decode_nav(file_data: bytes, *, strict: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    view = memoryview(file_data)
+    if len(view) < _HEADER.size:
+        raise ValueError(f"nav data too short for header: {len(view)} bytes")
+
+    _, vertex_max, _ = _HEADER.unpack_from(view, 0)
+    if vertex_max < 0:
+        raise ValueError(f"invalid vertex count {vertex_max}")
+
+    vertex_end = _HEADER.size + vertex_max * _VERTEX.itemsize
+    if len(view) < vertex_end + _EDGE_COUNT.size:
+        raise ValueError(
+            f"nav data truncated: {vertex_max} vertices need {vertex_end + _EDGE_COUNT.size} bytes, got {len(view)}"
+        )
+
+    vertices = np.frombuffer(view, _VERTEX, count=vertex_max, offset=_HEADER.size)
+    indexes = vertices["index"]
+    if np.array_equal(indexes, np.arange(vertex_max)):
+        positions = vertices["position"]
+    else:
+        # records whose index doesn't continue the sequence are dropped
+        keep = []
+        for i, index in enumerate(indexes.tolist()):
+            if index == len(keep):
+                keep.append(i)
+            elif strict:
+                raise RuntimeError(
+                    f"vertex index doesnt match expected: {len(keep)} got: {index}"
+                )
+        positions = vertices["position"][keep]
+
+    edge_count = _EDGE_COUNT.unpack_from(view, vertex_end)[0]
+    edge_start = vertex_end + _EDGE_COUNT.size
+    edge_end = edge_start + edge_count * 4
+    if edge_count < 0 or len(view) < edge_end:
+        raise ValueError(
+            f"nav data truncated: {edge_count} edges need {edge_end} bytes, got {len(view)}"
+        )
+
+    edges = np.frombuffer(view, _EDGE, count=edge_count, offset=edge_start)
+
+    return positions, edges
+
+
+def _to_nav_data(positions: np.ndarray, edges: np.ndarray) -> NavData:
+    vertices = [utils.XYZ(x, y, z) for x, y, z in positions.tolist()]
+    return vertices, list(map(tuple, edges.tolist()))
+
+
+def parse_nav(file_data: bytes, *, strict: bool = False) -> NavData:
+    """
+    Parse a zone.nav file into its vertices and edges
+
+    Args:
+        file_data: raw zone.nav bytes
+        strict: raise instead of skipping vertices with out of sequence indexes
+
+    Returns:
+        list of vertex positions and list of (start, stop) vertex index pairs
+    """
+    return _to_nav_data(*_decode_nav(file_data, strict=strict))
+
+
+def _cache_path(wad_name: str) -> Path:
+    nav_cache = utils.get_cache_folder() / "nav"
+    nav_cache.mkdir(exist_ok=True)
+    return nav_cache / f"{wad_name}.bin"
+
+
+def _load_compiled(data: bytes, crc: int) -> Optional[NavData]:
+    if len(data) < _CACHE_HEADER.size:
+        return None
+
+    magic, version, cached_crc, vertex_count, edge_count = _CACHE_HEADER.unpack_from(data, 0)
+    if magic != _CACHE_MAGIC or version != _CACHE_VERSION or cached_crc != crc:
+        return None
+
+    vertex_end = _CACHE_HEADER.size + vertex_count * _POSITION.itemsize
+    if len(data) != vertex_end + edge_count * _EDGE.itemsize:
+        return None
+
+    positions = np.frombuffer(data, _POSITION, count=vertex_count, offset=_CACHE_HEADER.size)
+    edges = np.frombuffer(data, _EDGE, count=edge_count, offset=vertex_end)
+
+    return _to_nav_data(positions, edges)
+
+
+def _dump_compiled(positions: np.ndarray, edges: np.ndarray, crc: int) -> bytes:
+    header = _CACHE_HEADER.pack(
+        _CACHE_MAGIC, _CACHE_VERSION, crc, len(positions), len(edges)
+    )
+    return header + positions.astype(_POSITION.base).tobytes() + edges.astype(_EDGE.base).tobytes()
+
+
+async def read_nav(wad: Wad, file_name: str = "zone.nav") -> NavData:
+    """
+    Read a nav file from a wad, using the compiled nav cache when the wad entry's crc hasn't changed
+
+    Args:
+        wad: the zone wad to read from
+        file_name: name of the nav file inside the wad
+    """
+    file_info = await wad.get_file_info(file_name)
+    cache_file = _cache_path(wad.name)
+
+    try:
+        async with aiofiles.open(cache_file, "rb") as fp:
+            cached = _load_compiled(await fp.read(), file_info.crc)
+    except OSError:
+        cached = None
+
+    if cached is not None:
+        return cached
+
+    logger.debug(f"Compiling {file_name} of {wad.name}")
+    positions, edges = _decode_nav(await wad.get_file(file_name))
+
+    try:
+        async with aiofiles.open(cache_file, "wb") as fp:
+            await fp.write(_dump_compiled(positions, edges, file_info.crc))
+    except OSError as e:
+        logger.warning(f"Unable to write nav cache for {wad.name}: {e}")
+
+    return _to_nav_data(positions, edges)
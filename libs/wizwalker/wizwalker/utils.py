@@ -759,72 +759,11 @@ def pharse_node_data(file_data: bytes) -> dict:
     return node_data
 
 
-# implemented from https://github.com/PeechezNCreem/navwiz/
-# this licence covers the below function
-# Boost Software License - Version 1.0 - August 17th, 2003
-#
-# Permission is hereby granted, free of charge, to any person or organization
-# obtaining a copy of the software and accompanying documentation covered by
-# this license (the "Software") to use, reproduce, display, distribute,
-# execute, and transmit the Software, and to prepare derivative works of the
-# Software, and to permit third-parties to whom the Software is furnished to
-# do so, all subject to the following:
-#
-# The copyright notices in the Software and this entire statement, including
-# the above license grant, this restriction and the following disclaimer,
-# must be included in all copies of the Software, in whole or in part, and
-# all derivative works of the Software, unless such copies or derivative
-# works are solely in the form of machine-executable object code generated by
-# a source language processor.
-#
-# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
-# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
-# FITNESS FOR A PARTICULAR PURPOSE, TITLE AND NON-INFRINGEMENT. IN NO EVENT
-# SHALL THE COPYRIGHT HOLDERS OR ANYONE DISTRIBUTING THE SOFTWARE BE LIABLE
-# FOR ANY DAMAGES OR OTHER LIABILITY, WHETHER IN CONTRACT, TORT OR OTHERWISE,
-# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
-# DEALINGS IN THE SOFTWARE.
 def pharse_nav_data(file_data: bytes):
-    file_data = file_data[2:]
+    # deferred import, file_readers depends on this module
+    from .file_readers.nav import parse_nav
 
-    vertex_count_bytes = file_data[:4]
-    file_data = file_data[4:]
-
-    vertex_count = struct.unpack("<i", vertex_count_bytes)[0]
-
-    vertices = []
-    for idx in range(vertex_count):
-        position_bytes = file_data[:12]
-        file_data = file_data[12:]
-
-        x, y, z = struct.unpack("<fff", position_bytes)
-        vertices.append(XYZ(x, y, z))
-
-        vertex_index_bytes = file_data[:2]
-        file_data = file_data[2:]
-
-        vertex_index = struct.unpack("<h", vertex_index_bytes)[0]
-
-        if vertex_index != idx:
-            raise RuntimeError(
-                f"vertex index doesnt match expected: {idx} got: {vertex_index}"
-            )
-
-    edge_count_bytes = file_data[:4]
-    file_data = file_data[4:]
-
-    edge_count = struct.unpack("<i", edge_count_bytes)[0]
-
-    edges = []
-    for idx in range(edge_count):
-        start_stop_bytes = file_data[:4]
-        file_data = file_data[4:]
-
-        start, stop = struct.unpack("<hh", start_stop_bytes)
-
-        edges.append((start, stop))
-
-    return vertices, edges
+    return parse_nav(file_data, strict=True)
 
 
 async def send_hotkey(window_handle: int, modifers: List[Keycode], key: Keycode):
@@ -0,0 +1,435 @@
+from copy import deepcopy
+import math
+from typing import Dict, List, Tuple, Sequence, Optional
+
+import numpy as np
+
+from wizwalker.memory.memory_objects.enums import SpellEffects
+
+from src.combat_cache import Cache
+from src.effect_simulation import *
+
+
+# Batch versions of sim_damage and sim_heal: every (effect, target) pair of a round in one pass of array math.
+# Members and effects are encoded once per round (encode_members, encode_effects), after that a whole hand against
+# every enemy costs about as much as a handful of scalar simulations.
+# Hanging effects are stacks of different lengths, so they're padded into (member, slot) arrays and applied slot by slot,
+# each slot vectorised over every pair. Nothing is mutated, unlike the scalar simulators which consume the effects they use.
+
+# Effect kinds per stage. Effects of any other type still clamp damage when their school matches, like the scalar loops do.
+_PAD = -1
+_OTHER = 0
+_MULTIPLY = 1
+_FLAT = 2
+_PIERCE = 3
+_SCHOOL = 4
+_SHIELD = 5
+_ABSORB = 6
+
+_outgoing_damage_kinds = {
+    SpellEffects.modify_outgoing_damage: _MULTIPLY,
+    SpellEffects.modify_outgoing_damage_flat: _FLAT,
+    SpellEffects.modify_outgoing_armor_piercing: _PIERCE,
+    SpellEffects.modify_outgoing_damage_type: _SCHOOL,
+}
+
+_incoming_damage_kinds = {
+    SpellEffects.modify_incoming_damage: _SHIELD,
+    SpellEffects.modify_incoming_damage_flat: _FLAT,
+    SpellEffects.absorb_damage: _ABSORB,
+    SpellEffects.modify_incoming_armor_piercing: _PIERCE,
+    SpellEffects.modify_incoming_damage_type: _SCHOOL,
+}
+
+_outgoing_heal_kinds = {
+    SpellEffects.modify_outgoing_heal: _MULTIPLY,
+    SpellEffects.modify_outgoing_heal_flat: _FLAT,
+}
+
+_incoming_heal_kinds = {
+    SpellEffects.modify_incoming_heal: _MULTIPLY,
+    SpellEffects.modify_incoming_heal_flat: _FLAT,
+    SpellEffects.absorb_heal: _ABSORB,
+}
+
+_school_stat_paths = {
+    "dmg_bonus_percent": dmg_bonus_percent_path,
+    "dmg_bonus_flat": dmg_bonus_flat_path,
+    "dmg_reduce_percent": dmg_reduce_percent_path,
+    "dmg_reduce_flat": dmg_reduce_flat_path,
+    "ap_bonus_percent": ap_bonus_percent_path,
+    "critical_hit_rating_by_school": critical_hit_rating_by_school_path,
+    "block_rating_by_school": block_rating_by_school_path,
+    "heal_bonus_percent": heal_bonus_percent_path,
+    "heal_inc_bonus_percent": heal_inc_bonus_percent_path,
+}
+
+_universal_stat_paths = {
+    "dmg_bonus_percent_all": dmg_bonus_percent_all_path,
+    "dmg_bonus_flat_all": dmg_bonus_flat_all_path,
+    "dmg_reduce_percent_all": dmg_reduce_percent_all_path,
+    "dmg_reduce_flat_all": dmg_reduce_flat_all_path,
+    "ap_bonus_percent_all": ap_bonus_percent_all_path,
+    "critical_hit_rating_all": critical_hit_rating_all_path,
+    "block_rating_all": block_rating_all_path,
+    "heal_bonus_percent_all": heal_bonus_percent_all_path,
+    "heal_inc_bonus_percent_all": heal_inc_bonus_percent_all_path,
+}
+
+# school ids sorted, for turning arrays of ids into stat indices with searchsorted
+_school_ids = np.array(sorted(school_index), dtype=np.int64)
+_school_indices = np.array([school_index[i] for i in sorted(school_index)], dtype=np.int64)
+
+
+def _to_index(school_ids: np.ndarray) -> np.ndarray:
+    return _school_indices[np.searchsorted(_school_ids, school_ids)]
+
+
+class MemberBatch:
+    '''Stats and hanging effect stacks of several member caches, as arrays with one row per member.'''
+    def __init__(self, members: Sequence[Cache]):
+        count = len(members)
+        self.size = count
+        self.owner_id = np.array([m["owner_id"] for m in members], dtype=np.int64)
+        self.level = np.array([m["level"] for m in members], dtype=np.float64)
+        self.is_player = np.array([bool(m["is_player"]) for m in members])
+
+        # stat name -> (member, school index) for per school stats, (member,) for universal ones
+        self.stats: Dict[str, np.ndarray] = {}
+        for name, path in _school_stat_paths.items():
+            rows = [path.get(m) for m in members]
+            width = max((len(row) for row in rows), default=0)
+            table = np.zeros((count, width))
+            for i, row in enumerate(rows):
+                table[i, :len(row)] = row
+            self.stats[name] = table
+
+        for name, path in _universal_stat_paths.items():
+            self.stats[name] = np.array([path.get(m) for m in members], dtype=np.float64)
+
+        # The 4 lists the scalar simulators walk, in the same order
+        stacks = [[e for path in hanging_effect_accessors[:4] for e in (path.get(m) or [])] for m in members]
+        depth = max((len(stack) for stack in stacks), default=0)
+        self.effect_school = np.zeros((count, depth), dtype=np.int64)
+        self.effect_param = np.zeros((count, depth))
+        self.outgoing_damage = np.full((count, depth), _PAD, dtype=np.int64)
+        self.incoming_damage = np.full((count, depth), _PAD, dtype=np.int64)
+        self.outgoing_heal = np.full((count, depth), _PAD, dtype=np.int64)
+        self.incoming_heal = np.full((count, depth), _PAD, dtype=np.int64)
+        for i, stack in enumerate(stacks):
+            for slot, effect in enumerate(stack):
+                effect_type = SpellEffects(effect["effect_type"])
+                self.effect_school[i, slot] = effect["damage_type"]
+                self.effect_param[i, slot] = effect["effect_param"]
+                self.outgoing_damage[i, slot] = _outgoing_damage_kinds.get(effect_type, _OTHER)
+                self.incoming_damage[i, slot] = _incoming_damage_kinds.get(effect_type, _OTHER)
+                self.outgoing_heal[i, slot] = _outgoing_heal_kinds.get(effect_type, _OTHER)
+                self.incoming_heal[i, slot] = _incoming_heal_kinds.get(effect_type, _OTHER)
+                if effect_type in (SpellEffects.modify_outgoing_damage_type, SpellEffects.modify_incoming_damage_type):
+                    school_index[effect["effect_param"]] # unknown schools raise here instead of indexing garbage later
+
+        self.depth = depth
+        # the caster's side is walked per member, (kind, school, param) for every effect of its stack
+        self.outgoing_damage_stacks = self._stacks(self.outgoing_damage)
+        self.outgoing_heal_stacks = self._stacks(self.outgoing_heal)
+        self.incoming_damage_slots = self._slots(self.incoming_damage)
+        self.incoming_heal_slots = self._slots(self.incoming_heal)
+
+    def _stacks(self, kinds: np.ndarray) -> List[List[Tuple[int, int, float]]]:
+        stacks = []
+        for row in range(self.size):
+            stack = []
+            for slot in range(self.depth):
+                kind = int(kinds[row, slot])
+                if kind == _PAD:
+                    break
+
+                stack.append((kind, int(self.effect_school[row, slot]), float(self.effect_param[row, slot])))
+
+            stacks.append(stack)
+
+        return stacks
+
+    def _slots(self, kinds: np.ndarray) -> List["_Slot"]:
+        slots = []
+        for slot in range(self.depth):
+            column = kinds[:, slot]
+            valid = column != _PAD
+            school = self.effect_school[:, slot]
+            present = {k: column == k for k in set(column.tolist()) if k not in (_PAD, _OTHER)}
+            slots.append(_Slot(np.where(valid, school, -1), valid & (school == MagicSchoolID.universal), self.effect_param[:, slot], present))
+
+        return slots
+
+
+class _Slot:
+    '''One position of every member's stack for one stage, with a mask per effect kind that shows up in it.'''
+    def __init__(self, school: np.ndarray, universal: np.ndarray, param: np.ndarray, kinds: Dict[int, np.ndarray]):
+        self.school = school
+        self.universal = universal
+        self.param = param
+        self.kinds = kinds
+
+
+class EffectBatch:
+    '''Damage or heal effect caches (one per card, usually) as arrays.'''
+    def __init__(self, effects: Sequence[Cache]):
+        self.size = len(effects)
+        self.school = np.array([e["damage_type"] for e in effects], dtype=np.int64)
+        self.index = np.array([school_index[e["damage_type"]] for e in effects], dtype=np.int64)
+        self.param = np.array([e["effect_param"] for e in effects], dtype=np.float64)
+        self.no_crit = np.array([SpellEffects(e["effect_type"]) == SpellEffects.damage_no_crit for e in effects])
+
+
+def encode_members(members: Sequence[Cache]) -> MemberBatch:
+    return MemberBatch(members)
+
+
+def encode_effects(effects: Sequence[Cache]) -> EffectBatch:
+    return EffectBatch(effects)
+
+
+def _curve(stat: np.ndarray, l: float, k0: float, n0: float) -> np.ndarray:
+    # curve_stat over an array, k and n only depend on the duel
+    limit = l * 100
+    if k0 != 0:
+        k = math.log(limit / (limit - k0)) / k0
+    else:
+        k = 1 / limit
+
+    n = math.log(1 - (k0 + n0) / limit) + k * (k0 + n0)
+    return np.where(stat > (k0 + n0) / 100, l - l * np.exp(-1 * k * (stat * 100) + n), stat)
+
+
+def _clamp(values: np.ndarray, min_value: float, max_value: float) -> np.ndarray:
+    # clamp() over an array, np.clip has a lot more overhead on arrays this small
+    return np.minimum(np.maximum(values, min_value), max_value)
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    return values.round(2)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    # ratio() over arrays, 0 where the denominator is
+    nonzero = denominator != 0
+    return np.where(nonzero, numerator / np.where(nonzero, denominator, 1), 0.0)
+
+
+def _calc_crit(crit_rating: np.ndarray, block_rating: np.ndarray, caster_level: float, target_level: np.ndarray, is_pvp: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # calc_crit over arrays
+    if is_pvp:
+        m_b = 5 * block_rating
+        crit_multiplier = 2 - _ratio(m_b, crit_rating + m_b)
+        m_c = 12 * crit_rating
+        crit_chance = (caster_level / 185) * _ratio(m_c, m_c + block_rating)
+        block_chance = (target_level / 185) * _ratio(block_rating, block_rating + m_c)
+
+    else:
+        m_b = 3 * block_rating
+        crit_multiplier = 2 - _ratio(m_b, crit_rating + m_b)
+        m_c = 3 * crit_rating
+        crit_chance = _clamp(_ratio(m_c, m_c + block_rating), 0.0, 0.95)
+        block_chance = 0.4 * _ratio(block_rating, block_rating + m_c)
+
+    return crit_multiplier, crit_chance, block_chance
+
+
+def _outgoing_damage(caster: MemberBatch, c: int, school: np.ndarray, damage: np.ndarray, pierce: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # sim_outgoing_dmg_effects, the caster's stack is the same for every pair so this runs over (effect, 1)
+    for kind, effect_school, param in caster.outgoing_damage_stacks[c]:
+        if effect_school == MagicSchoolID.universal:
+            hit = True
+        else:
+            hit = school == effect_school
+
+        damage = np.where(hit, _clamp(damage, 0.0, 2000000.0), damage)
+        if kind == _MULTIPLY:
+            damage = np.where(hit, damage * ((param / 100) + 1), damage)
+
+        elif kind == _FLAT:
+            damage = np.where(hit, damage + param, damage)
+
+        elif kind == _PIERCE:
+            pierce = np.where(hit, _round2(pierce + param / 100), pierce)
+
+        elif kind == _SCHOOL:
+            school = np.where(hit, int(param), school)
+
+    return school, damage, pierce
+
+
+def _incoming_damage(targets: MemberBatch, school: np.ndarray, damage: np.ndarray, pierce: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # sim_incoming_dmg_effects over (effect, target), slot by slot through every target's stack at once
+    for slot in targets.incoming_damage_slots:
+        hit = slot.universal | (slot.school == school)
+        if not hit.any():
+            continue
+
+        damage = np.where(hit, _clamp(damage, 0.0, 2000000.0), damage)
+        param = slot.param
+        for kind, mask in slot.kinds.items():
+            where = hit & mask
+            if kind == _SHIELD: # pierce is used up on shields, like in sim_incoming_dmg_effects
+                shield = where & (param < 0)
+                pierced = np.where(shield, np.minimum(pierce * 100, -param), 0.0)
+                damage = np.where(where, damage * (((param + pierced) / 100) + 1), damage)
+                pierce = np.where(shield, _round2(pierce - pierced / 100), pierce)
+
+            elif kind == _FLAT:
+                damage = np.where(where, damage + param, damage)
+
+            elif kind == _ABSORB:
+                damage = np.where(where, np.where(damage < param, 0.0, damage - param), damage)
+
+            elif kind == _PIERCE:
+                pierce = np.where(where, _round2(pierce + param / 100), pierce)
+
+            elif kind == _SCHOOL:
+                school = np.where(where, param.astype(np.int64), school)
+
+    return school, damage, pierce
+
+
+def batch_damage(duel: Cache, caster: MemberBatch, targets: MemberBatch, effects: EffectBatch, crit_threshold: Optional[float] = 0.8, caster_row: int = 0) -> np.ndarray:
+    '''
+    Damage every effect would deal to every target, as an (effect, target) array. Matches sim_damage pair for pair.
+    Args:
+    - caster (MemberBatch): Batch holding the caster, caster_row picks it.
+    - crit_threshold (float): Same threshold as sim_damage. None gives the expected damage, weighting the crit and non crit outcomes by the chance to land a crit.
+    '''
+    c = caster_row
+    stats = caster.stats
+    target_stats = targets.stats
+    index = effects.index
+    school = effects.school[:, None]
+
+    damage_percent = _round2(stats["dmg_bonus_percent"][c, index] + stats["dmg_bonus_percent_all"][c])
+    if caster.is_player[c]:
+        damage_percent = _curve(damage_percent, duel["damage_limit"], duel["d_k0"], duel["d_n0"])
+    damage = effects.param * (1 + damage_percent)
+    damage = damage + stats["dmg_bonus_flat"][c, index] + stats["dmg_bonus_flat_all"][c]
+    damage = damage[:, None]
+
+    resist = target_stats["dmg_reduce_percent"][:, index].T + target_stats["dmg_reduce_percent_all"]
+    resist = np.where(targets.is_player, _curve(resist, duel["resist_limit"], duel["r_k0"], duel["r_n0"]), resist)
+    resist = _round2(resist)
+
+    pierce = _round2(stats["ap_bonus_percent"][c, index] + stats["ap_bonus_percent_all"][c])[:, None]
+
+    caster_crit = (stats["critical_hit_rating_by_school"][c, index] + stats["critical_hit_rating_all"][c])[:, None]
+    target_block = target_stats["block_rating_by_school"][:, index].T + target_stats["block_rating_all"]
+    is_pvp = duel["pvp"] or duel["raid"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crit_multiplier, crit_chance, block_chance = _calc_crit(caster_crit, target_block, caster.level[c], targets.level, is_pvp)
+
+    can_crit = ~effects.no_crit[:, None]
+    if crit_threshold is None:
+        crit_odds = np.where(can_crit, crit_chance * (1 - block_chance), 0.0)
+        normal = _resolve_damage(caster, c, targets, school, damage, pierce, resist)
+        critical = _resolve_damage(caster, c, targets, school, damage * crit_multiplier, pierce, resist)
+        return normal * (1 - crit_odds) + critical * crit_odds
+
+    crits = can_crit & (crit_chance >= crit_threshold * (1 - block_chance))
+    damage = np.where(crits, damage * crit_multiplier, damage)
+    return _resolve_damage(caster, c, targets, school, damage, pierce, resist)
+
+
+def _resolve_damage(caster: MemberBatch, c: int, targets: MemberBatch, school: np.ndarray, damage: np.ndarray, pierce: np.ndarray, resist: np.ndarray) -> np.ndarray:
+    # Everything in sim_damage after the crit roll
+    school, damage, pierce = _outgoing_damage(caster, c, school, damage, pierce)
+    school, damage, pierce = _incoming_damage(targets, school, damage, pierce)
+
+    index = _to_index(school)
+    columns = np.arange(targets.size)
+    damage = damage - (targets.stats["dmg_reduce_flat"][columns, index] + targets.stats["dmg_reduce_flat_all"])
+    damage = _clamp(damage, 0.0, 2000000.0)
+
+    pierced = resist - pierce
+    multiplier = np.where(resist > 0, np.where(pierced <= 0, 1.0, 1 - pierced), np.abs(resist) + 1)
+    return damage * multiplier
+
+
+def batch_heal(duel: Cache, caster: MemberBatch, targets: MemberBatch, effects: EffectBatch, crit_threshold: Optional[float] = 0.8, caster_row: int = 0) -> np.ndarray:
+    '''Heal every effect would give every target, as an (effect, target) array. Matches sim_heal pair for pair, crit_threshold works like in batch_damage.'''
+    c = caster_row
+    stats = caster.stats
+    target_stats = targets.stats
+    index = effects.index
+    school = effects.school[:, None]
+
+    heal = effects.param * (1 + stats["heal_bonus_percent"][c, index] + stats["heal_bonus_percent_all"][c])
+    heal = heal[:, None]
+
+    caster_crit = (stats["critical_hit_rating_by_school"][c, index] + stats["critical_hit_rating_all"][c])[:, None]
+    target_block = target_stats["block_rating_by_school"][:, index].T + target_stats["block_rating_all"]
+    is_pvp = duel["pvp"] or duel["raid"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crit_multiplier, crit_chance, _ = _calc_crit(caster_crit, target_block, caster.level[c], targets.level, is_pvp)
+
+    if crit_threshold is None:
+        normal = _resolve_heal(caster, c, targets, index, school, heal)
+        critical = _resolve_heal(caster, c, targets, index, school, heal * crit_multiplier)
+        return normal * (1 - crit_chance) + critical * crit_chance
+
+    heal = np.where(crit_chance >= crit_threshold, heal * crit_multiplier, heal)
+    return _resolve_heal(caster, c, targets, index, school, heal)
+
+
+def _resolve_heal(caster: MemberBatch, c: int, targets: MemberBatch, index: np.ndarray, school: np.ndarray, heal: np.ndarray) -> np.ndarray:
+    for kind, effect_school, param in caster.outgoing_heal_stacks[c]:
+        if effect_school == MagicSchoolID.universal:
+            hit = True
+        else:
+            hit = school == effect_school
+
+        heal = np.where(hit, _clamp(heal, 0.0, 2000000.0), heal)
+        if kind == _MULTIPLY:
+            heal = np.where(hit, heal * ((param / 100) + 1), heal)
+
+        elif kind == _FLAT:
+            heal = np.where(hit, heal + param, heal)
+
+    heal = heal * (1 + targets.stats["heal_inc_bonus_percent"][:, index].T + targets.stats["heal_inc_bonus_percent_all"])
+
+    for slot in targets.incoming_heal_slots:
+        hit = slot.universal | (slot.school == school)
+        if not hit.any():
+            continue
+
+        heal = np.where(hit, _clamp(heal, 0.0, 2000000.0), heal)
+        param = slot.param
+        for kind, mask in slot.kinds.items():
+            where = hit & mask
+            if kind == _MULTIPLY:
+                heal = np.where(where, heal * ((param / 100) + 1), heal)
+
+            elif kind == _FLAT:
+                heal = np.where(where, heal + param, heal)
+
+            elif kind == _ABSORB:
+                heal = np.where(where, np.where(heal < param, 0.0, heal - param), heal)
+
+    return heal
+
+
+def best_pair(results: np.ndarray) -> Tuple[int, int, float]:
+    '''The (effect index, target index, value) with the highest value in a batch_damage/batch_heal result.'''
+    effect, target = np.unravel_index(np.argmax(results), results.shape)
+    return int(effect), int(target), float(results[effect, target])
+
+
+def check_against_scalar(duel: Cache, caster: Cache, targets: List[Cache], effects: List[Cache], heal: bool = False, crit_threshold: float = 0.8) -> float:
+    '''Runs both the batch and the scalar simulator on copies of the caches and returns the largest relative difference.'''
+    simulate = sim_heal if heal else sim_damage
+    batch = batch_heal if heal else batch_damage
+    expected = np.zeros((len(effects), len(targets)))
+    for e, effect in enumerate(effects):
+        for t, target in enumerate(targets):
+            caster_copy = deepcopy(caster)
+            # the scalar simulators read a self target's stack from the caster cache
+            target_copy = caster_copy if target["owner_id"] == caster["owner_id"] else deepcopy(target)
+            _, _, expected[e, t] = simulate(duel, caster_copy, target_copy, deepcopy(effect), crit_threshold)
+
+    actual = batch(duel, encode_members([caster]), encode_members(targets), encode_effects(effects), crit_threshold)
+    return float(np.max(np.abs(actual - expected) / np.maximum(np.abs(expected), 1.0), initial=0.0))
@@ -22,6 +22,8 @@ from io import BytesIO
 from pathlib import Path
 from typing import TypeAlias
 from xml.etree import ElementTree as etree
+
+import numpy as np
 from wizwalker import Wad, Client, XYZ
 
 Matrix3x3: TypeAlias = tuple[
@@ -33,6 +35,10 @@ SimpleFace: TypeAlias = tuple[int, int, int]
 SimpleVert: TypeAlias = tuple[float, float, float]
 Vector3D: TypeAlias = tuple[float, float, float]
 
+# a mesh's vertex table is followed by a face table of these records
+_MESH_VERTEX = np.dtype(("<f4", (3,)))
+_MESH_FACE = np.dtype([("face", "<i4", (3,)), ("normal", "<f4", (3,))])
+
 
 class StructIO(BytesIO):
     def read_string(self) -> str:
@@ -320,12 +326,19 @@ class ProxyMesh(ProxyGeometry):
 
     def load(self, stream: StructIO) -> None:
         vertex_count, face_count = stream.unpack("<ii")
-        for _ in range(vertex_count):
-            self.vertices.append(stream.unpack("<fff"))
-
-        for _ in range(face_count):
-            self.faces.append(stream.unpack("<iii"))
-            self.normals.append(stream.unpack("<fff"))
+        buffer = stream.getbuffer()
+        offset = stream.tell()
+        vertices = np.frombuffer(buffer, _MESH_VERTEX, count=vertex_count, offset=offset)
+        offset += vertices.nbytes
+        faces = np.frombuffer(buffer, _MESH_FACE, count=face_count, offset=offset)
+        offset += faces.nbytes
+
+        self.vertices.extend(map(tuple, vertices.tolist()))
+        self.faces.extend(map(tuple, faces["face"].tolist()))
+        self.normals.extend(map(tuple, faces["normal"].tolist()))
+        # the arrays are views of the stream's buffer, which can't be resized while they exist
+        del vertices, faces, buffer
+        stream.seek(offset)
 
         super().load(stream)
 
@@ -1,68 +1,104 @@
-from typing import Dict, Any, Tuple, Iterable, List
+from functools import lru_cache
+from typing import Dict, Any, Tuple, Iterable, List, Callable, Optional
 
 Cache = Dict[str, Any]
 
-def cache_get(cache: Cache, path: str, seperator: str = ".") -> Any:
-    '''Retreives the subcache or value from a path string.'''
-    # attr = cache
-    for p in path.split(seperator):
-        if isinstance(cache, list) and p.isnumeric():
-            cache = cache[int(p)]
-            continue
+class CachePath:
+    '''A path string split once, with a getter, setter and remover that walk the split path. Get these through compile_path.'''
+    __slots__ = ("path", "keys", "get", "set", "remove")
 
-        if not isinstance(cache, dict):
-            break
+    def __init__(self, path: str, seperator: str = "."):
+        self.path = path
+        # (dict key, list index or None for keys that aren't numeric)
+        self.keys: Tuple[Tuple[str, Optional[int]], ...] = tuple((p, int(p) if p.isdecimal() else None) for p in path.split(seperator))
+        self.get: Callable[[Cache], Any] = _compile_getter(self.keys)
+        self.set: Callable[[Cache, Any], None] = _compile_setter(self.keys)
+        self.remove: Callable[[Cache], None] = _compile_remover(self.keys)
 
-        cache = cache.get(p) #TODO: Potential flaw: If we're matching for None with a data structure that might not exist, we will return a correct match regardless, as get() defaults to none.
+    def __repr__(self) -> str:
+        return f"CachePath({self.path!r})"
 
-    return cache
 
+def _compile_getter(keys: Tuple[Tuple[str, Optional[int]], ...]) -> Callable[[Cache], Any]:
+    if all(index is None for _, index in keys):
+        names = tuple(key for key, _ in keys)
+        # Most paths are plain dict keys, which skips the list check
+        def _get_keys(cache: Cache) -> Any:
+            for key in names:
+                if not isinstance(cache, dict):
+                    break
 
-def cache_get_multi(cache: Cache, paths: Iterable[str], seperator: str = ".") -> Iterable[Any]:
-    '''Retreives the subcaches or values from any number of path strings.'''
-    return type(paths)(cache_get(cache, p, seperator) for p in paths)
+                cache = cache.get(key)
 
+            return cache
 
-def cache_remove(cache: Cache, path_str: str, seperator: str = "."):
-    '''Removes an entry from a cache in-place, by a string path.'''
-    split_path = path_str.split(seperator)
-    def _inner_cache_remove(cache: Cache, path: List[str]):
-        if len(path) == 1:
-            end_key = path[0]
-            if isinstance(cache, list) and end_key.isnumeric():
-                end_key = int(end_key)
+        return _get_keys
 
-            del cache[end_key]
+    def _get(cache: Cache) -> Any:
+        for key, index in keys:
+            if index is not None and isinstance(cache, list):
+                cache = cache[index]
+                continue
 
-        else:
-            cur_key = split_path.pop(0)
-            if isinstance(cache, list) and cur_key.isnumeric():
-                cur_key = int(cur_key)
+            if not isinstance(cache, dict):
+                break
 
-            _inner_cache_remove(cache[cur_key], split_path)
+            cache = cache.get(key) #TODO: Potential flaw: If we're matching for None with a data structure that might not exist, we will return a correct match regardless, as get() defaults to none.
 
-    _inner_cache_remove(cache, split_path)
+        return cache
 
+    return _get
 
-def cache_modify(cache: Cache, new_value: Any, path_str: str, seperator: str = "."):
-    '''Modifies an entry in a cache based on a string path.'''
-    split_path = path_str.split(seperator)
-    def _inner_cache_modify(cache: Cache, new_value: Any, path: List[str]):
-        if len(path) == 1:
-            end_key = path[0]
-            if isinstance(cache, list) and end_key.isnumeric():
-                end_key = int(end_key)
 
-            cache[end_key] = new_value
+def _walk_to_parent(cache: Cache, keys: Tuple[Tuple[str, Optional[int]], ...]) -> Tuple[Any, Any]:
+    '''Walks all but the last key, unlike the getter this raises on missing keys. Returns the parent and the key into it.'''
+    for key, index in keys[:-1]:
+        cache = cache[index] if index is not None and isinstance(cache, list) else cache[key]
 
-        else:
-            cur_key = split_path.pop(0)
-            if isinstance(cache, list) and cur_key.isnumeric():
-                cur_key = int(cur_key)
+    key, index = keys[-1]
+    return cache, index if index is not None and isinstance(cache, list) else key
+
+
+def _compile_setter(keys: Tuple[Tuple[str, Optional[int]], ...]) -> Callable[[Cache, Any], None]:
+    def _set(cache: Cache, new_value: Any):
+        parent, key = _walk_to_parent(cache, keys)
+        parent[key] = new_value
+
+    return _set
+
+
+def _compile_remover(keys: Tuple[Tuple[str, Optional[int]], ...]) -> Callable[[Cache], None]:
+    def _remove(cache: Cache):
+        parent, key = _walk_to_parent(cache, keys)
+        del parent[key]
+
+    return _remove
 
-            _inner_cache_modify(cache[cur_key], new_value, split_path)
 
-    _inner_cache_modify(cache, new_value, split_path)
+@lru_cache(maxsize=4096)
+def compile_path(path: str, seperator: str = ".") -> CachePath:
+    '''Splits a path string once and returns its accessors. Hot code should keep the result around instead of passing strings.'''
+    return CachePath(path, seperator)
+
+
+def cache_get(cache: Cache, path: str, seperator: str = ".") -> Any:
+    '''Retreives the subcache or value from a path string.'''
+    return compile_path(path, seperator).get(cache)
+
+
+def cache_get_multi(cache: Cache, paths: Iterable[str], seperator: str = ".") -> Iterable[Any]:
+    '''Retreives the subcaches or values from any number of path strings.'''
+    return type(paths)(compile_path(p, seperator).get(cache) for p in paths)
+
+
+def cache_remove(cache: Cache, path_str: str, seperator: str = "."):
+    '''Removes an entry from a cache in-place, by a string path.'''
+    compile_path(path_str, seperator).remove(cache)
+
+
+def cache_modify(cache: Cache, new_value: Any, path_str: str, seperator: str = "."):
+    '''Modifies an entry in a cache based on a string path.'''
+    compile_path(path_str, seperator).set(cache, new_value)
 
 
 def filter_caches(caches: Iterable[Cache], match: Dict[str, Any], exclusive: bool = False, either_or: bool = False) -> Tuple[List[Cache], List[int]]:
@@ -70,8 +106,10 @@ def filter_caches(caches: Iterable[Cache], match: Dict[str, Any], exclusive: boo
     matches = []
     match_indices = []
 
-    def _cache_match(cache: Cache, m_path: str, m_value: Any) -> bool:
-        matched: bool = cache_get(cache, m_path) == m_value #Retreives the value we want to match against
+    compiled_match = [(compile_path(m_path).get, m_value) for m_path, m_value in match.items()]
+
+    def _cache_match(cache: Cache, getter: Callable[[Cache], Any], m_value: Any) -> bool:
+        matched: bool = getter(cache) == m_value #Retreives the value we want to match against
         return not ((exclusive and matched) or (not exclusive and not matched))
 
     for i, cache in enumerate(caches):
@@ -81,7 +119,7 @@ def filter_caches(caches: Iterable[Cache], match: Dict[str, Any], exclusive: boo
         else:
             match_minimum = all
 
-        if not match_minimum(_cache_match(cache, m_path, m_value) for m_path, m_value in match.items()):
+        if not match_minimum(_cache_match(cache, getter, m_value) for getter, m_value in compiled_match):
             continue
 
         else:
@@ -0,0 +1,119 @@
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from lark import Lark
+from lark.exceptions import LarkError
+from wizwalker.extensions.wizsprinter.combat_backends.combat_config_parser import get_sprinty_grammar
+from wizwalker.extensions.wizsprinter.combat_backends.config_cache import (
+    build_lalr_parser, parse_combat_config, config_cache_info, clear_config_cache,
+)
+
+from src.config_combat import delegate_combat_configs, default_config
+
+
+# Times parsing combat configs the way clients used to (a new Earley parser per client) next to the cached LALR parser,
+# for the config files given, split per client like Deimos does.
+#   python -m src.combat_config_bench combat.txt --clients 4 --repeat 3
+# Without files every client gets the default config.
+
+
+def _timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def _parse_earley(configs: List[str]):
+    for config in configs:
+        Lark(get_sprinty_grammar()).parse(config)
+
+
+def _parse_lalr(parser: Lark, configs: List[str]) -> int:
+    # configs only the earley grammar takes are left out, parse_combat_config falls back to it for them
+    rejected = 0
+    for config in configs:
+        try:
+            parser.parse(config)
+        except LarkError:
+            rejected += 1
+    return rejected
+
+
+def _parse_cached(configs: List[str]):
+    for config in configs:
+        parse_combat_config(config)
+
+
+def bench_configs(configs: List[str], repeat: int, earley: bool = True) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        cache_path = Path(folder) / "sprinty_lalr.cache"
+        build_seconds = _timed(build_lalr_parser)
+        write_seconds = _timed(build_lalr_parser, cache_path)
+        started = time.perf_counter()
+        parser = build_lalr_parser(cache_path)
+        load_seconds = time.perf_counter() - started
+
+    lalr_seconds = min(_timed(_parse_lalr, parser, configs) for _ in range(repeat))
+    rejected = _parse_lalr(parser, configs)
+    earley_seconds = min(_timed(_parse_earley, configs) for _ in range(repeat)) if earley else None
+
+    clear_config_cache()
+    cold_seconds = _timed(_parse_cached, configs)
+    warm_seconds = min(_timed(_parse_cached, configs) for _ in range(repeat))
+
+    return {
+        "clients": len(configs),
+        "lines": sum(config.count("\n") + 1 for config in configs),
+        "build_seconds": build_seconds,
+        "build_and_write_seconds": write_seconds,
+        "load_seconds": load_seconds,
+        "earley_seconds": earley_seconds,
+        "lalr_seconds": lalr_seconds,
+        "lalr_rejected": rejected,
+        "cached_cold_seconds": cold_seconds,
+        "cached_warm_seconds": warm_seconds,
+        **config_cache_info(),
+    }
+
+
+def report(name: str, data: dict) -> str:
+    lines = [
+        f"{name}: {data['clients']} clients, {data['lines']} lines",
+        f"    lalr parser: build {data['build_seconds'] * 1000:.1f}ms, build and write {data['build_and_write_seconds'] * 1000:.1f}ms, "
+        f"load {data['load_seconds'] * 1000:.1f}ms",
+        f"    parse all: lalr {data['lalr_seconds'] * 1000:.1f}ms, cached {data['cached_cold_seconds'] * 1000:.1f}ms cold, "
+        f"{data['cached_warm_seconds'] * 1000:.2f}ms warm, {data['lalr_rejected']} configs left to earley",
+        f"    cache: {data['hits']} hits, {data['misses']} misses, {data['fallbacks']} earley fallbacks",
+    ]
+    if data["earley_seconds"] is not None:
+        speedup = data["earley_seconds"] / max(data["lalr_seconds"], 1e-9)
+        lines.insert(2, f"    parse all: earley {data['earley_seconds'] * 1000:.1f}ms ({speedup:.0f}x the lalr time)")
+    return "\n".join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark combat config parsing")
+    arg_parser.add_argument("configs", type=Path, nargs="*", help="combat config files, ###pX sections are split per client")
+    arg_parser.add_argument("--clients", type=int, default=4, help="clients sharing a config without ###pX sections")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs, the fastest is reported")
+    arg_parser.add_argument("--no-earley", action="store_true", help="skip the (slow) earley parses")
+    arg_parser.add_argument("--json", type=Path, help="also write the results as json")
+    args = arg_parser.parse_args()
+
+    inputs: Dict[str, str] = {str(path): path.read_text() for path in args.configs} or {"default config": default_config}
+    results = {}
+    for name, text in inputs.items():
+        configs = list(delegate_combat_configs(text, args.clients).values())
+        results[name] = bench_configs(configs, args.repeat, not args.no_earley)
+        print(report(name, results[name]))
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
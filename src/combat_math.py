@@ -1,11 +1,12 @@
-from typing import List, Coroutine, Any
+from typing import List, Coroutine, Any, Optional
+import asyncio
 import math
 from wizwalker import Client
 from wizwalker.combat import CombatMember
 from wizwalker.memory.memory_objects.spell_effect import DynamicSpellEffect, SpellEffects, SpellEffect
-from src.combat_objects import get_total_effects, id_to_member, school_list_ids, opposite_school_ids
+from src.combat_objects import Members, get_game_stats, get_total_effects, id_to_member, school_list_ids, opposite_school_ids
 from src.combat_utils import add_universal_stat
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -19,19 +20,75 @@ class EffectAttributes:
 
     @classmethod
     async def from_spell_effect(cls, effect: SpellEffect):
-        return cls(
-            await effect.effect_param(),
-            await effect.effect_type(),
-            await effect.damage_type(),
-            await effect.spell_template_id(),
-            await effect.enchantment_spell_template_id()
+        return cls(*await asyncio.gather(
+            effect.effect_param(),
+            effect.effect_type(),
+            effect.damage_type(),
+            effect.spell_template_id(),
+            effect.enchantment_spell_template_id()
+        ))
+
+
+@dataclass
+class MemberDamageStats:
+    """A non-async cache of the member stats used in dmg calculations, read concurrently"""
+    is_player: bool
+    level: int
+    damages: List[float]
+    flat_damages: List[float]
+    crits: List[float]
+    pierces: List[float]
+    resistances: List[float]
+    flat_resistances: List[float]
+    blocks: List[float]
+    # hanging, aura and shadow effects in the order get_total_effects returns them
+    effects: List[EffectAttributes] = field(default_factory=list)
+
+    @classmethod
+    async def from_id(cls, member_id: int, members: Members, with_effects: bool = True):
+        # Stats only change with gear, without effects the result can be kept for the round
+        member = await id_to_member(member_id, members)
+        stats = await get_game_stats(member_id, members)
+        values = await asyncio.gather(
+            member.is_player(),
+            member.level(),
+            real_stat(stats.dmg_bonus_percent, stats.dmg_bonus_percent_all),
+            real_stat(stats.dmg_bonus_flat, stats.dmg_bonus_flat_all),
+            real_stat(stats.critical_hit_rating_by_school, stats.critical_hit_rating_all),
+            real_stat(stats.ap_bonus_percent, stats.ap_bonus_percent_all),
+            real_stat(stats.dmg_reduce_percent, stats.dmg_reduce_percent_all),
+            real_stat(stats.dmg_reduce_flat, stats.dmg_reduce_flat_all),
+            real_stat(stats.block_rating_by_school, stats.block_rating_all),
         )
+        effects = await read_effect_attributes(member_id, members) if with_effects else []
+        return cls(*values, effects)
+
+
+@dataclass
+class DuelCurves:
+    """A non-async cache of the duel's damage and resist curves, they don't change during a fight"""
+    damage_limit: float
+    d_k0: float
+    d_n0: float
+    resist_limit: float
+    r_k0: float
+    r_n0: float
+
+    @classmethod
+    async def from_client(cls, client: Client):
+        duel = client.duel
+        return cls(*await asyncio.gather(duel.damage_limit(), duel.d_k0(), duel.d_n0(), duel.resist_limit(), duel.r_k0(), duel.r_n0()))
+
+
+async def read_effect_attributes(member_id: int, members: Members) -> List[EffectAttributes]:
+    # Reads every hanging, aura and shadow effect of a member at once
+    effects = await get_total_effects(member_id, members)
+    return list(await asyncio.gather(*(EffectAttributes.from_spell_effect(effect) for effect in effects if effect)))
 
 
 async def real_stat(stat_func: Coroutine[Any, Any, List[float]], uni_func: Coroutine[Any, Any, float]) -> List[float]:
     # Handles adding two stat reading coroutines
-    base_stats = await stat_func()
-    uni_stat = await uni_func()
+    base_stats, uni_stat = await asyncio.gather(stat_func(), uni_func())
 
     return add_universal_stat(base_stats, uni_stat)
 
@@ -95,62 +152,44 @@ def spell_effect_stacking_id(spell_template_id: int, enchantment_spell_template_
     return (spell_template_id, enchantment_spell_template_id)
 
 
-async def base_damage_calculation_from_id(client: Client, members: List[CombatMember], caster_id: int, target_id: int, damage: float, damage_type: int, global_effect: DynamicSpellEffect = None, force_crit: bool = False) -> float:
+async def base_damage_calculation_from_id(client: Client, members: Members, caster_id: int, target_id: int, damage: float, damage_type: int, global_effect: DynamicSpellEffect = None, force_crit: bool = False) -> float:
     # Calculates damage from given base damage value, and is the basis for both exact and damage potential calculation. Works based off of IDs.
+    # Pass a CombatIndex as members when calculating several times in a round, the ids and stats are only read once then.
+    caster, target, curves = await asyncio.gather(
+        MemberDamageStats.from_id(caster_id, members),
+        MemberDamageStats.from_id(target_id, members),
+        DuelCurves.from_client(client),
+    )
+    global_effect_atr = await EffectAttributes.from_spell_effect(global_effect) if global_effect else None
+    return calculate_damage(caster, target, curves, damage, damage_type, global_effect_atr, force_crit)
 
-    # Get base objects from ID arguments
-    caster = await id_to_member(caster_id, members)
-    target = await id_to_member(target_id, members)
 
-    # Caster-specific objects
-    caster_stats = await caster.get_stats()
-    # Charms use FIFO (queue behavior) in game, but the first applied blades show up at the bottom of this list.
-    caster_effects: List[DynamicSpellEffect] = await get_total_effects(caster_id, members)
-    caster_effects.reverse()
+def calculate_damage(caster: MemberDamageStats, target: MemberDamageStats, curves: DuelCurves, damage: float, damage_type: int, global_effect: Optional[EffectAttributes] = None, force_crit: bool = False) -> float:
+    # The calculation behind base_damage_calculation_from_id, from stats that were already read.
 
-    # Target-specific objects
-    target_stats = await target.get_stats()
+    # Charms use FIFO (queue behavior) in game, but the first applied blades show up at the bottom of this list.
+    caster_effect_atrs: List[EffectAttributes] = list(reversed(caster.effects))
     # Traps/Shields use LIFO (stack behavior) in game.
-    target_effects: List[DynamicSpellEffect] = await get_total_effects(target_id, members)
+    target_effect_atrs: List[EffectAttributes] = list(target.effects)
 
     # Global effects
-    caster_effects.append(global_effect)
-    target_effects.append(global_effect)
-
-    # Caster Stats
-    caster_damages = await real_stat(caster_stats.dmg_bonus_percent, caster_stats.dmg_bonus_percent_all)
-    caster_flat_damages = await real_stat(caster_stats.dmg_bonus_flat, caster_stats.dmg_bonus_flat_all)
-    caster_crits = await real_stat(caster_stats.critical_hit_rating_by_school, caster_stats.critical_hit_rating_all)
-    caster_pierces = await real_stat(caster_stats.ap_bonus_percent, caster_stats.ap_bonus_percent_all)
-    caster_level = await caster.level()
-
-    # Target Stats
-    target_resistances = await real_stat(target_stats.dmg_reduce_percent, target_stats.dmg_reduce_percent_all)
-    target_flat_resistances = await real_stat(target_stats.dmg_reduce_flat, target_stats.dmg_reduce_flat_all)
-    target_blocks = await real_stat(target_stats.block_rating_by_school, target_stats.block_rating_all)
-
-    # Break up caster hanging effect objects
-    caster_effect_atrs: List[EffectAttributes] = []
-    for effect in caster_effects:
-        if effect:
-            caster_effect_atrs.append(await EffectAttributes.from_spell_effect(effect))
-
-    target_effect_atrs: List[EffectAttributes] = []
-    for effect in target_effects:
-        if effect:
-            target_effect_atrs.append(await EffectAttributes.from_spell_effect(effect))
+    if global_effect:
+        caster_effect_atrs.append(global_effect)
+        target_effect_atrs.append(global_effect)
+
+    caster_level = caster.level
 
     initial_damage_type = damage_type
     initial_damage_type_index = school_list_ids[damage_type]
 
     # Relevant caster stats for the damage type
-    caster_damage = caster_damages[initial_damage_type_index]
-    caster_flat_damages = caster_flat_damages[initial_damage_type_index]
-    caster_crit = caster_crits[initial_damage_type_index]
-    caster_pierce = caster_pierces[initial_damage_type_index]
+    caster_damage = caster.damages[initial_damage_type_index]
+    caster_flat_damages = caster.flat_damages[initial_damage_type_index]
+    caster_crit = caster.crits[initial_damage_type_index]
+    caster_pierce = caster.pierces[initial_damage_type_index]
 
     # Curve damage stats
-    curved_caster_damage = await curve_damage(client, caster, caster_damage)
+    curved_caster_damage = curve_stat(caster_damage, curves.damage_limit, curves.d_k0, curves.d_n0) if caster.is_player else caster_damage
     curved_caster_damage += 1
 
     # Applying curved damage and flat damage
@@ -224,12 +263,12 @@ async def base_damage_calculation_from_id(client: Client, members: List[CombatMe
     final_damage_type_index = school_list_ids[final_damage_type]
 
     # Relevant target stats for the final damage type
-    target_resist = target_resistances[final_damage_type_index]
-    target_flat_resist = target_flat_resistances[final_damage_type_index]
-    target_block = target_blocks[final_damage_type_index]
+    target_resist = target.resistances[final_damage_type_index]
+    target_flat_resist = target.flat_resistances[final_damage_type_index]
+    target_block = target.blocks[final_damage_type_index]
 
     # Curve the resist stat.
-    curved_target_resist = await curve_resist(client, target, target_resist)
+    curved_target_resist = curve_stat(target_resist, curves.resist_limit, curves.r_k0, curves.r_n0) if target.is_player else target_resist
 
     # calculates critical multiplier and chance
     # This assumes that caster crit uses the initial damage school, but target block applies to the final damage school.
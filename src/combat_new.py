@@ -4,30 +4,14 @@ from wizwalker import Client
 from wizwalker.combat import CombatHandler, CombatCard
 from wizwalker.utils import maybe_wait_for_any_value_with_timeout
 
-from src.utils import class_snapshot
+from src.combat_snapshot import bulk_snapshot, snapshot, COMBAT_MEMBER_SCHEMA, DUEL_SCHEMA
+from src.spell_db import get_spell_db
 from src.combat_cache import cache_get, cache_get_multi, filter_caches, Cache
 
 import pyperclip
 import yaml
 
 
-def member_cache_adv_time_sim(cache: Cache, rounds: int = 1, ppip_threshold: float = 0.85) -> Cache:
-    result_cache = cache
-
-    pip_count = cache_get(cache, "get_participant.pip_count")
-    main_schools = ("balance", "death", "life", "myth", "storm", "fire", "ice")
-    total_spips = sum((pip_count[f"{s}_pips"] for s in main_schools))
-
-
-    total_spips = sum((pip_count[f"{s}_pips"] for s in main_schools))
-    max_ppips = 7 - total_spips
-    max_pips = max_ppips - pip_count["power_pips"]
-
-
-    #TODO: finish unified clamping pips function,
-
-
-
 class Fighter(CombatHandler):
     def __init__(self, client: Client, clients: list[Client]):
         self._spell_check_boxes = None
@@ -45,7 +29,7 @@ class Fighter(CombatHandler):
         self.ally_caches.clear()
         self.enemy_caches.clear()
         members = await self.get_members()
-        member_caches = [await class_snapshot(m) for m in members]
+        member_caches = await bulk_snapshot(members, COMBAT_MEMBER_SCHEMA)
 
         #Get the client's cache, then the team ID
         client_matches, _ = filter_caches(member_caches, {"is_client": True})
@@ -62,14 +46,14 @@ class Fighter(CombatHandler):
     async def update_duel_caches(self):
         '''Updates the local record of the client.duel object.'''
         self.duel_cache.clear()
-        self.duel_cache = await class_snapshot(self.client.duel)
+        self.duel_cache = await snapshot(self.client.duel, DUEL_SCHEMA)
 
 
     async def update_hand_cache(self):
         '''Updates the local record of the list of CombatCards in our hand.'''
         self.hand_cache.clear()
         cards = await self.get_cards()
-        self.hand_cache = [await class_snapshot(card) for card in cards]
+        self.hand_cache = await get_spell_db().snapshot_cards(cards)
 
 
     async def update_combat_caches(self):
@@ -79,6 +63,16 @@ class Fighter(CombatHandler):
         await self.update_hand_cache()
 
 
+    async def record_snapshot(self) -> Cache:
+        '''Refreshes every cache and returns them as one, the shape combat_planner_bench replays.'''
+        await self.update_combat_caches()
+        return {
+            "duel": self.duel_cache,
+            "members": self.ally_caches + self.enemy_caches,
+            "hands": {self.client_member_cache["owner_id"]: self.hand_cache},
+        }
+
+
 
     async def handle_round(self):
         print("Getting snapshot data...")
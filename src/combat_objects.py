@@ -1,7 +1,12 @@
-from typing import List
+import asyncio
+from typing import Dict, List, Union
 from wizwalker.combat import CombatMember, CombatCard
 from wizwalker.memory.memory_objects.spell_effect import DynamicSpellEffect
 from wizwalker.memory.memory_objects.game_stats import DynamicGameStats
+from wizwalker.memory.memory_objects.combat_participant import CombatParticipant
+
+from src.combat_cache import Cache
+from src.spell_db import get_spell_db
 
 
 school_ids = {0: 2343174, 1: 72777, 2: 83375795, 3: 2448141, 4: 2330892, 5: 78318724, 6: 1027491821, 7: 2625203, 8: 78483, 9: 2504141, 10: 663550619, 11: 1429009101, 12: 1488274711, 13: 1760873841, 14: 806477568, 15: 931528087}
@@ -46,49 +51,95 @@ def get_relevant_school_stats(stats: List, excluded_ids: List[int]):
 	return relevant_stats
 
 
-async def get_game_stats(member_id: int, members: List[CombatMember]) -> DynamicGameStats:
-	# Returns the GameStats from a CombatMember
+class CombatIndex:
+	'''Owner ID -> member and spell ID -> card for one round, with every member's participant and game stats read once.
+	The helpers below take it anywhere they take a list of members or cards.'''
+	def __init__(self):
+		self.members: Dict[int, CombatMember] = {}
+		self.participants: Dict[int, CombatParticipant] = {}
+		self.game_stats: Dict[int, DynamicGameStats] = {}
+		self.cards: Dict[int, CombatCard] = {}
+
+	@classmethod
+	async def build(cls, members: List[CombatMember], cards: List[CombatCard] = ()) -> "CombatIndex":
+		# Reads every id, participant and game stats object at once, build it again next round since members and cards change
+		index = cls()
+		member_ids = await asyncio.gather(*(member.owner_id() for member in members))
+		participants = await asyncio.gather(*(member.get_participant() for member in members))
+		game_stats = await asyncio.gather(*(participant.game_stats() for participant in participants))
+		for member_id, member, participant, stats in zip(member_ids, members, participants, game_stats):
+			index.members[member_id] = member
+			index.participants[member_id] = participant
+			index.game_stats[member_id] = stats
+
+		spell_ids = await asyncio.gather(*(card.spell_id() for card in cards))
+		index.cards = dict(zip(spell_ids, cards))
+		return index
+
+
+Members = Union[List[CombatMember], CombatIndex]
+Cards = Union[List[CombatCard], CombatIndex]
+
+
+async def get_participant(member_id: int, members: Members) -> CombatParticipant:
+	# Returns the CombatParticipant of a CombatMember, without reading it again when given an index
+	if isinstance(members, CombatIndex):
+		if member_id not in members.participants:
+			raise ValueError
+		return members.participants[member_id]
+
 	member = await id_to_member(member_id, members)
-	participant = await member.get_participant()
+	return await member.get_participant()
+
+
+async def get_game_stats(member_id: int, members: Members) -> DynamicGameStats:
+	# Returns the GameStats from a CombatMember
+	if isinstance(members, CombatIndex):
+		if member_id not in members.game_stats:
+			raise ValueError
+		return members.game_stats[member_id]
+
+	participant = await get_participant(member_id, members)
 	game_stats = await participant.game_stats()
 	return game_stats
 
 
-async def get_hanging_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def get_hanging_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Returns the Hanging Effects from a CombatMember
-	member = await id_to_member(member_id, members)
-	participant = await member.get_participant()
+	participant = await get_participant(member_id, members)
 	hanging_effects = await participant.hanging_effects()
 	return hanging_effects
 
 
-async def get_aura_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def get_aura_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Returns the Aura Effects from a CombatMember
-	member = await id_to_member(member_id, members)
-	participant = await member.get_participant()
+	participant = await get_participant(member_id, members)
 	aura_effects = await participant.aura_effects()
 	return aura_effects
 
 
-async def get_shadow_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def get_shadow_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Returns the Shadow Form Effects from a CombatMember
-	member = await id_to_member(member_id, members)
-	participant = await member.get_participant()
+	participant = await get_participant(member_id, members)
 	shadow_effects = await participant.shadow_spell_effects()
 	return shadow_effects
 
 
-async def get_total_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def get_total_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Gets all the hanging effects from a CombatMember
+	participant = await get_participant(member_id, members)
 	effects: List[DynamicSpellEffect] = []
-	effects += await get_hanging_effects(member_id, members)
-	effects += await get_aura_effects(member_id, members)
-	effects += await get_shadow_effects(member_id, members)
+	effects += await participant.hanging_effects()
+	effects += await participant.aura_effects()
+	effects += await participant.shadow_spell_effects()
 	return effects
 
 
-async def ids_from_cards(cards: List[CombatCard]) -> List[int]:
+async def ids_from_cards(cards: Cards) -> List[int]:
 	# Returns a list of spell IDs from a list of cards, 1:1
+	if isinstance(cards, CombatIndex):
+		return list(cards.cards.keys())
+
 	spell_ids: List[int] = []
 	for card in cards:
 		spell_id = await card.spell_id()
@@ -97,8 +148,13 @@ async def ids_from_cards(cards: List[CombatCard]) -> List[int]:
 	return spell_ids
 
 
-async def id_to_member(member_id: int, members: List[CombatMember]) -> CombatMember:
+async def id_to_member(member_id: int, members: Members) -> CombatMember:
 	# Returns a CombatMember with a given ID
+	if isinstance(members, CombatIndex):
+		if member_id not in members.members:
+			raise ValueError
+		return members.members[member_id]
+
 	for member in members:
 		if await member.owner_id() == member_id:
 			return member
@@ -106,7 +162,13 @@ async def id_to_member(member_id: int, members: List[CombatMember]) -> CombatMem
 	raise ValueError
 
 
-async def id_to_card(spell_id: int, cards: List[CombatCard]) -> CombatCard:
+async def id_to_card(spell_id: int, cards: Cards) -> CombatCard:
+	# Returns a CombatCard with a given spell ID
+	if isinstance(cards, CombatIndex):
+		if spell_id not in cards.cards:
+			raise ValueError
+		return cards.cards[spell_id]
+
 	for card in cards:
 		if await card.spell_id() == spell_id:
 			return card
@@ -114,65 +176,49 @@ async def id_to_card(spell_id: int, cards: List[CombatCard]) -> CombatCard:
 	raise ValueError
 
 
-async def id_to_hanging_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def id_to_hanging_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Returns the hanging effects from a given CombatMember ID
-	member = await id_to_member(members, member_id)
-
-	effects = await get_hanging_effects(member)
+	return await get_hanging_effects(member_id, members)
 
-	return effects
 
-
-async def id_to_aura_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def id_to_aura_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Returns the aura effects from a given CombatMember ID
-	member = await id_to_member(members, member_id)
+	return await get_aura_effects(member_id, members)
 
-	effects = await get_aura_effects(member)
 
-	return effects
-
-
-async def id_to_shadow_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def id_to_shadow_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Returns the shadow effects from a given CombatMember ID
-	member = await id_to_member(members, member_id)
+	return await get_shadow_effects(member_id, members)
 
-	effects = await get_shadow_effects(member)
-
-	return effects
 
-
-async def id_to_total_effects(member_id: int, members: List[CombatMember]) -> List[DynamicSpellEffect]:
+async def id_to_total_effects(member_id: int, members: Members) -> List[DynamicSpellEffect]:
 	# Returns the total effects from a given CombatMember ID
-	member = await id_to_member(members, member_id)
-
-	effects = await get_total_effects(member)
-
-	return effects
+	return await get_total_effects(member_id, members)
 
 
-async def spell_id_to_effects(spell_id: int, cards: List[CombatCard]) -> List[DynamicSpellEffect]:
-	# Returns the spell effects for a card corresponding to a spell ID.
+async def spell_id_to_effects(spell_id: int, cards: Cards) -> List[Cache]:
+	# Returns the spell effect snapshots for a card corresponding to a spell ID.
+	# They come from the spell store unless the card is enchanted or the store doesn't know it, then they're read from memory.
+	card = await id_to_card(spell_id, cards)
 
-	card = await id_to_card(cards, spell_id)
+	spell = await get_spell_db().card_spell(card)
+	return spell["spell_effects"]
 
-	if card:
-		g_spell = await card.get_graphical_spell()
-		spell_effects = await g_spell.spell_effects()
-		return spell_effects
 
-	raise ValueError
-
-
-async def spell_id_school(spell_id: int, cards: List[CombatCard]) -> int:
+async def spell_id_school(spell_id: int, cards: Cards) -> int:
 	# Returns the school ID for a card corresponding to a spell ID.
-	card = await id_to_card(cards, spell_id)
+	card = await id_to_card(spell_id, cards)
+
+	if not await card.is_enchanted():
+		spell = get_spell_db().get(await card.template_id())
+		if spell is not None:
+			return spell["magic_school_id"]
 
-	if card:
-		g_spell = await card.get_graphical_spell()
-		school_id = await g_spell.magic_school_id()
-		return school_id
+	g_spell = await card.get_graphical_spell()
+	school_id = await g_spell.magic_school_id()
+	return school_id
 
 
-async def spell_id_school_str(spell_id: int, cards: List[CombatCard]) -> str:
-	school_id = await spell_id_school(cards, spell_id)
-	return school_to_str(school_id)
\ No newline at end of file
+async def spell_id_school_str(spell_id: int, cards: Cards) -> str:
+	school_id = await spell_id_school(spell_id, cards)
+	return school_to_str[school_id]
\ No newline at end of file
@@ -0,0 +1,477 @@
+import asyncio
+import heapq
+from time import perf_counter
+from typing import Dict, List, Tuple, Optional, Iterable
+
+from loguru import logger
+from wizwalker.memory.memory_objects.enums import SpellEffects, EffectTarget
+
+from src.combat_cache import Cache, compile_path
+from src.combat_snapshot import bulk_snapshot, snapshot, COMBAT_MEMBER_SCHEMA, DUEL_SCHEMA
+from src.spell_db import get_spell_db
+from src.effect_simulation import sim_effect, sim_spend_pips, member_cache_adv_time_sim, main_schools, pip_count_path
+
+
+# Looks a round or two ahead instead of casting the first config priority that works.
+# Every caster in turn either passes or casts one of their cards on one of its possible targets, simulated with sim_effect on
+# copies of the member caches, and only the beam_width best states after each cast are expanded further. Between rounds
+# everyone gains pips (member_cache_adv_time_sim). Enemies are assumed to pass and nobody draws new cards, neither is known.
+# States reached through different cast orders are only expanded once. The search gives up when it runs out of budget,
+# the caller then goes with the config like it would without a planner.
+
+DEFAULT_BUDGET = 0.5
+DEFAULT_ROUNDS = 2
+DEFAULT_BEAM_WIDTH = 12
+
+# Score weights, health is counted as a fraction of max health
+KILL_BONUS = 1.0
+DEATH_PENALTY = 2.0
+PIP_WEIGHT = 0.01
+
+team_id_path = compile_path("get_participant.team_id")
+school_id_path = compile_path("get_participant.primary_magic_school_id")
+spell_path = compile_path("get_graphical_spell")
+pip_cost_path = compile_path("get_graphical_spell.pip_cost")
+spell_effects_path = compile_path("get_graphical_spell.spell_effects")
+
+# Effect targets the card has to be cast on a chosen member for
+chosen_enemy_targets = {EffectTarget.enemy_single.value, EffectTarget.preselected_enemy_single.value}
+chosen_ally_targets = {EffectTarget.friendly_single.value, EffectTarget.friendly_single_not_me.value}
+all_enemy_targets = {
+    EffectTarget.enemy_team.value,
+    EffectTarget.enemy_team_all_at_once.value,
+    EffectTarget.at_least_one_enemy.value,
+    EffectTarget.multi_target_enemy.value,
+}
+all_ally_targets = {
+    EffectTarget.friendly_team.value,
+    EffectTarget.friendly_team_all_at_once.value,
+    EffectTarget.multi_target_friendly.value,
+}
+# Enchants and the like are cast on other cards, which the search doesn't model
+card_targets = {EffectTarget.spell.value, EffectTarget.specific_spells.value}
+
+
+class Play:
+    '''A card in a member's hand, reduced to what the search needs.'''
+    __slots__ = ("owner_id", "card_index", "name", "effects", "rank", "school_pips", "shadow_pips", "xpip", "school_id", "target_kind")
+
+    def __init__(self, owner_id: int, card_index: int, name: str, effects: List[Cache], rank: int, school_pips: Dict[str, int], shadow_pips: int, xpip: bool, school_id: Optional[int] = None):
+        self.owner_id = owner_id
+        self.card_index = card_index
+        self.name = name
+        self.effects = effects
+        self.rank = rank
+        self.school_pips = school_pips
+        self.shadow_pips = shadow_pips
+        self.xpip = xpip
+        self.school_id = school_id
+        # The effect target the cast target is picked for, None if the card isn't cast on anyone in particular
+        self.target_kind = next((e["effect_target"] for e in effects if e["effect_target"] in chosen_enemy_targets | chosen_ally_targets), None)
+
+    def __repr__(self) -> str:
+        return f"Play({self.name!r})"
+
+
+class Cast:
+    '''One caster's move in a plan, play is None for passing.'''
+    __slots__ = ("caster_id", "play", "target_id")
+
+    def __init__(self, caster_id: int, play: Optional[Play], target_id: Optional[int]):
+        self.caster_id = caster_id
+        self.play = play
+        self.target_id = target_id
+
+    def __repr__(self) -> str:
+        if self.play is None:
+            return f"Cast({self.caster_id}, pass)"
+        return f"Cast({self.caster_id}, {self.play.name!r} -> {self.target_id})"
+
+
+class PlanResult:
+    def __init__(self):
+        # Every cast of the best plan found, in the order they happen
+        self.casts: List[Cast] = []
+        self.score = 0.0
+        # Score of everyone passing, for comparison
+        self.pass_score = 0.0
+        self.nodes = 0
+        self.transpositions = 0
+        self.seconds = 0.0
+        self.timed_out = False
+
+    def next_cast(self, caster_id: int) -> Optional[Cast]:
+        '''The first cast the plan has for a caster, which is what they should do this round.'''
+        return next((cast for cast in self.casts if cast.caster_id == caster_id), None)
+
+
+class _Timeout(Exception):
+    pass
+
+
+class _Node:
+    __slots__ = ("members", "hands", "casts", "score")
+
+    def __init__(self, members: Dict[int, Cache], hands: Tuple[Tuple[int, ...], ...], casts: Tuple[Cast, ...], score: float):
+        # owner id -> member cache, shared with the parent node until a cast changes it
+        self.members = members
+        # per caster, the indexes of the plays they still hold
+        self.hands = hands
+        self.casts = casts
+        self.score = score
+
+
+def play_from_card(card: Cache, owner_id: int, card_index: int) -> Optional[Play]:
+    '''Converts a card cache (COMBAT_CARD_SCHEMA) to a Play, None if the search can't use it.'''
+    if not card.get("is_castable") or not spell_path.get(card):
+        return None
+
+    effects = spell_effects_path.get(card) or []
+    if not effects or any(e["effect_target"] in card_targets for e in effects):
+        return None
+
+    pip_cost = pip_cost_path.get(card) or {}
+    school_pips = {f"{s}_pips": pip_cost.get(f"{s}_pips") or 0 for s in main_schools}
+    school_pips = {pip_type: pip_num for pip_type, pip_num in school_pips.items() if pip_num}
+    return Play(
+        owner_id,
+        card_index,
+        card.get("name") or "",
+        effects,
+        pip_cost.get("spell_rank") or 0,
+        school_pips,
+        pip_cost.get("shadow_pips") or 0,
+        bool(pip_cost.get("is_xpip_spell")),
+        spell_path.get(card).get("magic_school_id"),
+    )
+
+
+def _pip_value(pip_count: Cache, power_value: int = 2) -> int:
+    return pip_count["generic_pips"] + pip_count["power_pips"] * power_value
+
+
+def _power_value(caster: Cache, play: Play) -> int:
+    # A power pip only counts double for spells of the caster's own school
+    return 2 if play.school_id is not None and play.school_id == school_id_path.get(caster) else 1
+
+
+def _resolve_effects(effects: Iterable[Cache], pips_spent: int) -> List[Cache]:
+    '''Replaces effects that hold other effects with the ones that apply, variable effects (tempest) pick by pips spent.'''
+    result = []
+    for effect in effects:
+        subeffects = effect.get("maybe_effect_list")
+        if SpellEffects(effect["effect_type"]) != SpellEffects.invalid_spell_effect or not subeffects:
+            result.append(effect)
+            continue
+
+        pip_nums = [subeffect["pip_num"] or 0 for subeffect in subeffects]
+        if len(set(pip_nums)) > 1:
+            affordable = [i for i, pip_num in enumerate(pip_nums) if pip_num <= pips_spent]
+            index = max(affordable, key=lambda i: pip_nums[i]) if affordable else pip_nums.index(min(pip_nums))
+            result.extend(_resolve_effects([subeffects[index]], pips_spent))
+
+        else: #Random effects can't be rolled ahead of time, go with the first
+            result.extend(_resolve_effects(subeffects[:1], pips_spent))
+
+    return result
+
+
+def _copy_member(member: Cache) -> Cache:
+    # Stats never change during a simulation, only health, pips and the effect lists (and the effects in them) do
+    member = dict(member)
+    participant = member["get_participant"] = dict(member["get_participant"])
+    participant["pip_count"] = dict(participant["pip_count"])
+    for name, value in participant.items():
+        if name.endswith("_effects"):
+            participant[name] = [dict(effect) for effect in value or []]
+
+    return member
+
+
+def _score(members: Dict[int, Cache], ally_team_id: int) -> float:
+    score = 0.0
+    for member in members.values():
+        health_fraction = min(max(member["health"] / (member["max_health"] or 1), 0.0), 1.0)
+        if team_id_path.get(member) == ally_team_id:
+            score += health_fraction + PIP_WEIGHT * _pip_value(pip_count_path.get(member))
+            if member["health"] <= 0:
+                score -= DEATH_PENALTY
+
+        else:
+            score += 1.0 - health_fraction
+            if member["health"] <= 0:
+                score += KILL_BONUS
+
+    return score
+
+
+def _state_key(depth: int, node: _Node) -> tuple:
+    members = []
+    for owner_id, member in node.members.items():
+        participant = member["get_participant"]
+        effects = tuple(
+            (effect["effect_type"], effect["effect_param"], effect["damage_type"])
+            for name in ("hanging_effects", "aura_effects")
+            for effect in participant[name]
+        )
+        members.append((owner_id, round(member["health"], 2), tuple(participant["pip_count"].values()), effects))
+
+    return depth, tuple(members), node.hands
+
+
+def _targets(effect: Cache, caster_id: int, target_id: Optional[int], members: Dict[int, Cache], ally_team_id: int) -> List[int]:
+    kind = effect["effect_target"]
+    if kind in chosen_enemy_targets or kind in chosen_ally_targets:
+        return [target_id]
+
+    if kind in all_enemy_targets or kind in all_ally_targets:
+        allies = kind in all_ally_targets
+        return [
+            owner_id for owner_id, member in members.items()
+            if member["health"] > 0 and (team_id_path.get(member) == ally_team_id) == allies
+        ]
+
+    return [caster_id]
+
+
+def affordable(caster: Cache, play: Play) -> bool:
+    '''If a caster (member cache) can pay for a play with the pips they have.'''
+    pip_count = pip_count_path.get(caster)
+    power_value = _power_value(caster, play)
+    return sim_spend_pips(dict(pip_count), _play_rank(pip_count, play, power_value), play.school_pips, play.shadow_pips, power_value)
+
+
+def _play_rank(pip_count: Cache, play: Play, power_value: int) -> int:
+    if play.xpip: #X pip spells take every pip there is
+        return max(_pip_value(pip_count, power_value), 1)
+    return play.rank
+
+
+def simulate_cast(
+    duel: Cache,
+    members: Dict[int, Cache],
+    caster_id: int,
+    play: Play,
+    target_id: Optional[int],
+    ally_team_id: int,
+    crit_threshold: float = 0.8,
+    copy_on_write: bool = False,
+) -> bool:
+    '''
+    Simulates a play on a dict of owner id -> member cache, False if the caster can't pay for it.\n
+    With copy_on_write, every member the cast changes is replaced by a copy in the dict instead of being changed in place.
+    '''
+    if copy_on_write:
+        members[caster_id] = _copy_member(members[caster_id])
+
+    pip_count = pip_count_path.get(members[caster_id])
+    power_value = _power_value(members[caster_id], play)
+    rank = _play_rank(pip_count, play, power_value)
+    if not sim_spend_pips(pip_count, rank, play.school_pips, play.shadow_pips, power_value):
+        return False
+
+    copied = {caster_id}
+    for effect in _resolve_effects(play.effects, rank):
+        for owner_id in _targets(effect, caster_id, target_id, members, ally_team_id):
+            if copy_on_write and owner_id not in copied:
+                members[owner_id] = _copy_member(members[owner_id])
+                copied.add(owner_id)
+
+            members[caster_id], members[owner_id] = sim_effect(duel, members[caster_id], members[owner_id], effect, crit_threshold)
+
+    return True
+
+
+def _apply(duel: Cache, node: _Node, caster_id: int, play: Play, target_id: Optional[int], ally_team_id: int) -> Optional[Dict[int, Cache]]:
+    members = dict(node.members)
+    if not simulate_cast(duel, members, caster_id, play, target_id, ally_team_id, copy_on_write=True):
+        return None
+
+    return members
+
+
+def _play_targets(play: Play, caster_id: int, members: Dict[int, Cache], ally_team_id: int) -> List[Optional[int]]:
+    kind = play.target_kind
+    if kind is None:
+        return [None]
+
+    allies = kind in chosen_ally_targets
+    return [
+        owner_id for owner_id, member in members.items()
+        if member["health"] > 0
+        and (team_id_path.get(member) == ally_team_id) == allies
+        and not (kind == EffectTarget.friendly_single_not_me.value and owner_id == caster_id)
+    ]
+
+
+def plan(
+    duel: Cache,
+    members: List[Cache],
+    hands: Dict[int, List[Cache]],
+    budget: float = DEFAULT_BUDGET,
+    rounds: int = DEFAULT_ROUNDS,
+    beam_width: int = DEFAULT_BEAM_WIDTH,
+) -> PlanResult:
+    '''
+    Searches the casts of the next rounds for the best outcome.\n
+    Args:
+    - duel (Cache): Duel cache (DUEL_SCHEMA).
+    - members (List[Cache]): Member caches of everyone in the fight (COMBAT_MEMBER_SCHEMA).
+    - hands (Dict[int, List[Cache]]): Owner id of a caster -> card caches of their hand (COMBAT_CARD_SCHEMA), in casting order.
+    - budget (float): Seconds the search may take, past that it gives up and the result is marked timed_out.
+    - rounds (int): How many rounds to look ahead.
+    - beam_width (int): How many of the best states are expanded after each cast.
+    '''
+    started = perf_counter()
+    deadline = started + budget
+    result = PlanResult()
+
+    # Members whose participant couldn't be read can't be simulated
+    by_id = {member["owner_id"]: _copy_member(member) for member in members if pip_count_path.get(member) is not None}
+    caster_ids = [owner_id for owner_id in hands if owner_id in by_id]
+    if not caster_ids:
+        result.seconds = perf_counter() - started
+        return result
+
+    ally_team_id = team_id_path.get(by_id[caster_ids[0]])
+    plays = []
+    for caster_id in caster_ids:
+        caster_plays = (play_from_card(card, caster_id, i) for i, card in enumerate(hands[caster_id]))
+        plays.append([play for play in caster_plays if play is not None])
+
+    root = _Node(by_id, tuple(tuple(range(len(p))) for p in plays), (), 0.0)
+    root.score = result.pass_score = _score(by_id, ally_team_id)
+    beam = [root]
+    seen = set()
+
+    try:
+        for round_index in range(rounds):
+            if round_index:
+                beam = [_advance_round(node, ally_team_id) for node in beam]
+
+            for caster_index, caster_id in enumerate(caster_ids):
+                depth = round_index * len(caster_ids) + caster_index + 1
+                children = []
+                for node in beam:
+                    for child in _expand(duel, node, caster_index, caster_id, plays[caster_index], ally_team_id, deadline):
+                        result.nodes += 1
+                        key = _state_key(depth, child)
+                        if key in seen:
+                            result.transpositions += 1
+                            continue
+
+                        seen.add(key)
+                        children.append(child)
+
+                beam = heapq.nlargest(beam_width, children, key=lambda n: n.score)
+
+    except _Timeout:
+        result.timed_out = True
+        result.seconds = perf_counter() - started
+        return result
+
+    best = max(beam, key=lambda n: n.score)
+    result.casts = list(best.casts)
+    result.score = best.score
+    result.seconds = perf_counter() - started
+    return result
+
+
+def _expand(duel: Cache, node: _Node, caster_index: int, caster_id: int, plays: List[Play], ally_team_id: int, deadline: float) -> Iterable[_Node]:
+    # Passing is always possible, and the only thing left once the caster is dead or every enemy is
+    yield _Node(node.members, node.hands, node.casts + (Cast(caster_id, None, None),), node.score)
+
+    members = node.members
+    if members[caster_id]["health"] <= 0 or not any(m["health"] > 0 and team_id_path.get(m) != ally_team_id for m in members.values()):
+        return
+
+    hand = node.hands[caster_index]
+    for i in hand:
+        play = plays[i]
+        for target_id in _play_targets(play, caster_id, members, ally_team_id):
+            if perf_counter() > deadline:
+                raise _Timeout()
+
+            child_members = _apply(duel, node, caster_id, play, target_id, ally_team_id)
+            if child_members is None: #Can't pay for it
+                break
+
+            hands = node.hands[:caster_index] + (tuple(j for j in hand if j != i),) + node.hands[caster_index + 1:]
+            yield _Node(child_members, hands, node.casts + (Cast(caster_id, play, target_id),), _score(child_members, ally_team_id))
+
+
+def _advance_round(node: _Node, ally_team_id: int) -> _Node:
+    members = {}
+    for owner_id, member in node.members.items():
+        member = _copy_member(member)
+        if member["health"] > 0:
+            member_cache_adv_time_sim(member)
+        members[owner_id] = member
+
+    return _Node(members, node.hands, node.casts, _score(members, ally_team_id))
+
+
+def apply_casts(duel: Cache, members: List[Cache], casts: Iterable[Cast]) -> List[Cache]:
+    '''Simulates a round of casts on copies of the member caches, including the pips everyone gains afterwards.'''
+    casts = list(casts)
+    node = _Node({member["owner_id"]: _copy_member(member) for member in members}, (), (), 0.0)
+    if not casts:
+        return list(_advance_round(node, None).members.values())
+
+    ally_team_id = team_id_path.get(node.members[casts[0].caster_id])
+    for cast in casts:
+        if cast.play is None or node.members[cast.caster_id]["health"] <= 0:
+            continue
+
+        child_members = _apply(duel, node, cast.caster_id, cast.play, cast.target_id, ally_team_id)
+        if child_members is not None:
+            node = _Node(child_members, (), (), 0.0)
+
+    return list(_advance_round(node, ally_team_id).members.values())
+
+
+class CombatPlanner:
+    '''Plugs plan into SprintyCombat.planner. Casts the client's part of the best plan, or leaves the round to the config.'''
+    def __init__(self, budget: float = DEFAULT_BUDGET, rounds: int = DEFAULT_ROUNDS, beam_width: int = DEFAULT_BEAM_WIDTH):
+        self.budget = budget
+        self.rounds = rounds
+        self.beam_width = beam_width
+
+    async def __call__(self, combat) -> bool:
+        # A bug in the simulation (an unknown school, odd stats) shouldn't end the fight, the config gets the round instead
+        try:
+            return await self._cast_planned(combat)
+        except Exception:
+            logger.exception("Combat planner failed, using config")
+            return False
+
+    async def _cast_planned(self, combat) -> bool:
+        cards = await combat.get_cards()
+        members = await combat.get_members()
+        card_caches = await get_spell_db().snapshot_cards(cards)
+        member_caches = await bulk_snapshot(members, COMBAT_MEMBER_SCHEMA)
+        duel_cache = await snapshot(combat.client.duel, DUEL_SCHEMA)
+
+        client_caches = [member for member in member_caches if member["is_client"]]
+        if not client_caches:
+            return False
+
+        owner_id = client_caches[0]["owner_id"]
+        # The search is pure python, a thread keeps the other clients' tasks going meanwhile
+        result = await asyncio.to_thread(plan, duel_cache, member_caches, {owner_id: card_caches}, self.budget, self.rounds, self.beam_width)
+        if result.timed_out:
+            logger.debug(f"Combat planner ran out of its {self.budget}s budget after {result.nodes} states, using config")
+            return False
+
+        cast = result.next_cast(owner_id)
+        # Passing is left to the config too, it knows about enchants and other cards the search skips
+        if cast is None or cast.play is None:
+            return False
+
+        target = None
+        if cast.target_id is not None:
+            target = members[[member["owner_id"] for member in member_caches].index(cast.target_id)]
+
+        logger.debug(f"Combat planner casting {cast.play.name} ({result.nodes} states, {result.transpositions} transpositions, {result.seconds:.3f}s)")
+        await cards[cast.play.card_index].cast(target, sleep_time=combat.config.cast_time * 2)
+        return True
@@ -0,0 +1,113 @@
+import argparse
+import json
+import statistics
+from math import inf
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+from src.combat_cache import Cache
+from src.combat_planner import plan, apply_casts, team_id_path, DEFAULT_BUDGET, DEFAULT_ROUNDS, DEFAULT_BEAM_WIDTH
+
+
+# Runs the combat planner on recorded fights (Fighter.record_snapshot dumped to yaml or json) and reports how long it takes
+# and how many rounds its plans need to clear the fight, next to a greedy one cast lookahead.
+#   python -m src.combat_planner_bench fight.yaml --budget 0.5 --repeat 10
+# The playout has the same blind spots as the planner: enemies never act and nobody draws.
+
+
+def load_snapshot(path: Path) -> Cache:
+    text = path.read_text()
+    data = json.loads(text) if path.suffix == ".json" else yaml.safe_load(text)
+    # json turns the owner id keys into strings
+    data["hands"] = {int(owner_id): hand for owner_id, hand in data["hands"].items()}
+    return data
+
+
+def _enemies_alive(members: List[Cache], ally_team_id: int) -> bool:
+    return any(member["health"] > 0 and team_id_path.get(member) != ally_team_id for member in members)
+
+
+def play_out(data: Cache, max_rounds: int = 20, **plan_kwargs) -> int:
+    '''Plans and simulates round after round, returns how many it took to kill every enemy (max_rounds + 1 if it didn't).'''
+    duel = data["duel"]
+    members = data["members"]
+    hands: Dict[int, List[Cache]] = {owner_id: list(hand) for owner_id, hand in data["hands"].items()}
+    caster = next(member for member in members if member["owner_id"] in hands)
+    ally_team_id = team_id_path.get(caster)
+
+    for round_number in range(1, max_rounds + 1):
+        result = plan(duel, members, hands, **plan_kwargs)
+        if result.timed_out: #What the bot would do here depends on the config, which a snapshot doesn't have
+            result = plan(duel, members, hands, budget=inf, rounds=1, beam_width=1)
+
+        casts = result.casts[:len(hands)]
+        members = apply_casts(duel, members, casts)
+        for cast in casts:
+            if cast.play is not None:
+                hands[cast.caster_id][cast.play.card_index] = None
+
+        hands = {owner_id: [card for card in hand if card is not None] for owner_id, hand in hands.items()}
+        if not _enemies_alive(members, ally_team_id):
+            return round_number
+
+    return max_rounds + 1
+
+
+def bench_snapshot(data: Cache, repeat: int, budget: float, rounds: int, beam_width: int, max_rounds: int) -> dict:
+    seconds = []
+    nodes = []
+    transpositions = []
+    timeouts = 0
+    for _ in range(repeat):
+        result = plan(data["duel"], data["members"], data["hands"], budget, rounds, beam_width)
+        seconds.append(result.seconds)
+        nodes.append(result.nodes)
+        transpositions.append(result.transpositions)
+        timeouts += result.timed_out
+
+    return {
+        "plan_seconds_mean": statistics.fmean(seconds),
+        "plan_seconds_max": max(seconds),
+        "states_mean": statistics.fmean(nodes),
+        "transpositions_mean": statistics.fmean(transpositions),
+        "timeouts": timeouts,
+        "repeat": repeat,
+        "rounds_to_clear": play_out(data, max_rounds, budget=budget, rounds=rounds, beam_width=beam_width),
+        "greedy_rounds_to_clear": play_out(data, max_rounds, budget=inf, rounds=1, beam_width=1),
+    }
+
+
+def report(name: str, data: dict) -> str:
+    return "\n".join([
+        f"{name}:",
+        f"    plan: mean {data['plan_seconds_mean'] * 1000:.1f}ms, max {data['plan_seconds_max'] * 1000:.1f}ms, "
+        f"{data['timeouts']}/{data['repeat']} timed out",
+        f"    states: {data['states_mean']:.0f}, transpositions skipped: {data['transpositions_mean']:.0f}",
+        f"    rounds to clear: planner {data['rounds_to_clear']}, greedy {data['greedy_rounds_to_clear']}",
+    ])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the combat planner on recorded fights")
+    arg_parser.add_argument("snapshots", type=Path, nargs="+")
+    arg_parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds per decision")
+    arg_parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="rounds to look ahead")
+    arg_parser.add_argument("--beam-width", type=int, default=DEFAULT_BEAM_WIDTH)
+    arg_parser.add_argument("--repeat", type=int, default=5, help="timed plans per snapshot")
+    arg_parser.add_argument("--max-rounds", type=int, default=20, help="rounds a playout may take")
+    arg_parser.add_argument("--json", type=Path, help="also write the results as json")
+    args = arg_parser.parse_args()
+
+    results = {}
+    for path in args.snapshots:
+        results[str(path)] = bench_snapshot(load_snapshot(path), args.repeat, args.budget, args.rounds, args.beam_width, args.max_rounds)
+        print(report(str(path), results[str(path)]))
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
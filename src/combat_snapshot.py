@@ -0,0 +1,183 @@
+import asyncio
+from enum import Enum
+from typing import Dict, Any, List, Iterable, Optional
+
+from loguru import logger
+
+from src.combat_cache import Cache
+
+
+# class_snapshot calls every argument-free method of an object and recurses into whatever comes back, one read at a time.
+# For a combat member that is several hundred sequential reads, most of which the simulators never look at.
+# A schema lists the methods to call instead, and bulk_snapshot reads the fields of every object concurrently.
+# The result has the same shape class_snapshot produced: method name -> value, enums as their value, None for failed reads.
+
+DEFAULT_CONCURRENCY = 32
+
+
+class Field:
+    '''A method to call on the object. schema snapshots the object it returns, many=True if it returns a list of them.'''
+    def __init__(self, schema: Optional["Schema"] = None, many: bool = False, **kwargs):
+        self.schema = schema
+        self.many = many
+        self.kwargs = kwargs
+
+
+# method name -> None for plain values, a Field for anything that needs arguments or holds objects
+Schema = Dict[str, Optional[Field]]
+
+
+SPELL_EFFECT_SCHEMA: Schema = {
+    "effect_type": None,
+    "effect_param": None,
+    "disposition": None,
+    "damage_type": None,
+    "heal_modifier": None,
+    "pip_num": None,
+    "effect_target": None,
+    "num_rounds": None,
+    "spell_template_id": None,
+    "enchantment_spell_template_id": None,
+}
+# only effects that hold other effects have a list, check_type makes every other effect read as None instead of garbage
+SPELL_EFFECT_SCHEMA["maybe_effect_list"] = Field(SPELL_EFFECT_SCHEMA, many=True, check_type=True)
+
+GAME_STATS_SCHEMA: Schema = {
+    "dmg_bonus_percent": None,
+    "dmg_bonus_percent_all": None,
+    "dmg_bonus_flat": None,
+    "dmg_bonus_flat_all": None,
+    "dmg_reduce_percent": None,
+    "dmg_reduce_percent_all": None,
+    "dmg_reduce_flat": None,
+    "dmg_reduce_flat_all": None,
+    "ap_bonus_percent": None,
+    "ap_bonus_percent_all": None,
+    "critical_hit_rating_by_school": None,
+    "critical_hit_rating_all": None,
+    "block_rating_by_school": None,
+    "block_rating_all": None,
+    "heal_bonus_percent": None,
+    "heal_bonus_percent_all": None,
+    "heal_inc_bonus_percent": None,
+    "heal_inc_bonus_percent_all": None,
+    "power_pip_base": None,
+    "power_pip_bonus_percent_all": None,
+}
+
+PIP_COUNT_SCHEMA: Schema = {
+    "generic_pips": None,
+    "power_pips": None,
+    "shadow_pips": None,
+    "balance_pips": None,
+    "death_pips": None,
+    "fire_pips": None,
+    "ice_pips": None,
+    "life_pips": None,
+    "myth_pips": None,
+    "storm_pips": None,
+}
+
+COMBAT_PARTICIPANT_SCHEMA: Schema = {
+    "team_id": None,
+    "primary_magic_school_id": None,
+    "pip_count": Field(PIP_COUNT_SCHEMA),
+    "hanging_effects": Field(SPELL_EFFECT_SCHEMA, many=True),
+    "public_hanging_effects": Field(SPELL_EFFECT_SCHEMA, many=True),
+    "aura_effects": Field(SPELL_EFFECT_SCHEMA, many=True),
+    "shadow_spell_effects": Field(SPELL_EFFECT_SCHEMA, many=True),
+    "death_activated_effects": Field(SPELL_EFFECT_SCHEMA, many=True),
+    "delay_cast_effects": Field(SPELL_EFFECT_SCHEMA, many=True),
+}
+
+COMBAT_MEMBER_SCHEMA: Schema = {
+    "name": None,
+    "is_client": None,
+    "is_player": None,
+    "is_boss": None,
+    "owner_id": None,
+    "health": None,
+    "max_health": None,
+    "level": None,
+    "get_stats": Field(GAME_STATS_SCHEMA),
+    "get_participant": Field(COMBAT_PARTICIPANT_SCHEMA),
+}
+
+SPELL_RANK_SCHEMA: Schema = {
+    "spell_rank": None,
+    "shadow_pips": None,
+    "balance_pips": None,
+    "death_pips": None,
+    "fire_pips": None,
+    "ice_pips": None,
+    "life_pips": None,
+    "myth_pips": None,
+    "storm_pips": None,
+    "is_xpip_spell": None,
+}
+
+GRAPHICAL_SPELL_SCHEMA: Schema = {
+    "template_id": None,
+    "magic_school_id": None,
+    "accuracy": None,
+    "pip_cost": Field(SPELL_RANK_SCHEMA),
+    "spell_effects": Field(SPELL_EFFECT_SCHEMA, many=True),
+}
+
+COMBAT_CARD_SCHEMA: Schema = {
+    "name": None,
+    "spell_id": None,
+    "is_castable": None,
+    "is_enchanted": None,
+    "get_graphical_spell": Field(GRAPHICAL_SPELL_SCHEMA),
+}
+
+DUEL_SCHEMA: Schema = {
+    "pvp": None,
+    "raid": None,
+    "damage_limit": None,
+    "d_k0": None,
+    "d_n0": None,
+    "resist_limit": None,
+    "r_k0": None,
+    "r_n0": None,
+}
+
+
+async def _read_field(instance, name: str, field: Optional[Field], limit: asyncio.Semaphore) -> Any:
+    kwargs = field.kwargs if field is not None else {}
+    try:
+        async with limit:
+            output = await getattr(instance, name)(**kwargs)
+
+    except Exception as e:  # A failed read shouldn't lose the rest of the snapshot, same as class_snapshot
+        logger.debug(f"Error calling {name}: {e}")
+        return None
+
+    if isinstance(output, Enum):
+        return output.value
+
+    if field is None or field.schema is None or output is None:
+        return output
+
+    if field.many:
+        return list(await asyncio.gather(*(_snapshot(o, field.schema, limit) for o in output)))
+
+    return await _snapshot(output, field.schema, limit)
+
+
+async def _snapshot(instance, schema: Schema, limit: asyncio.Semaphore) -> Cache:
+    names = list(schema)
+    values = await asyncio.gather(*(_read_field(instance, name, schema[name], limit) for name in names))
+    return dict(zip(names, values))
+
+
+async def snapshot(instance, schema: Schema, concurrency: int = DEFAULT_CONCURRENCY) -> Cache:
+    '''Reads the fields a schema lists from a memory object, at most concurrency reads at a time.'''
+    return await _snapshot(instance, schema, asyncio.Semaphore(concurrency))
+
+
+async def bulk_snapshot(instances: Iterable, schema: Schema, concurrency: int = DEFAULT_CONCURRENCY) -> List[Cache]:
+    '''Reads the fields a schema lists from every object at once, sharing one limit of concurrency reads at a time.'''
+    limit = asyncio.Semaphore(concurrency)
+    return list(await asyncio.gather(*(_snapshot(instance, schema, limit) for instance in instances)))
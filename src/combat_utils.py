@@ -1,8 +1,9 @@
+import asyncio
 from typing import Any, Coroutine, List, Dict, Tuple
 from wizwalker.combat import CombatMember
 from wizwalker.memory.memory_objects.combat_participant import DynamicGameStats
 from wizwalker.memory.memory_objects.spell_effect import SpellEffects
-from src.combat_objects import school_ids, school_names
+from src.combat_objects import school_ids, school_names, school_id_to_names
 from src.utils import index_with_str
 import re
 # UNFINISHED - slack
@@ -21,6 +22,7 @@ symbol_to_effect_type = {
     'Blade': SpellEffects.modify_outgoing_damage
 }
 
+mastery_names = ['Fire', 'Ice', 'Storm', 'Myth', 'Life', 'Death', 'Balance']
 
 
 def generate_mastery_funcs(stats: DynamicGameStats) -> List[Coroutine[Any, Any, int]]:
@@ -92,29 +94,25 @@ def to_seperated_str_stats(input_stats: List[float]) -> Tuple[Dict[str, float],
     return (positives, negatives)
 
 
+async def read_masteries(stats: DynamicGameStats) -> List[int]:
+    # Reads every mastery of a GameStats at once, in the order of mastery_names
+    return list(await asyncio.gather(*(mastery() for mastery in generate_mastery_funcs(stats))))
+
+
 async def get_str_masteries(member: CombatMember) -> List[str]:
     # Returns a list of the masteries a CombatMember has, by name
     stats = await member.get_stats()
+    mastery_values = await read_masteries(stats)
 
-    mastery_funcs = generate_mastery_funcs(stats)
-    mastery_str = ['Fire', 'Ice', 'Storm', 'Myth', 'Life', 'Death', 'Balance']
-    masteries = []
-
-    for mastery, str in zip(mastery_funcs, mastery_str):
-        if await mastery():
-            masteries.append(str)
-
-    return masteries
+    return [name for name, mastery in zip(mastery_names, mastery_values) if mastery]
 
 
 async def get_masteries(member: CombatMember) -> List[int]:
     # Returns a list of the masteries a CombatMember has, by school ID
     stats = await member.get_stats()
+    mastery_values = await read_masteries(stats)
 
-    mastery_funcs = generate_mastery_funcs(stats)
-    masteries = [mastery for mastery in mastery_funcs]
-
-    return masteries
+    return [school_id_to_names[name] for name, mastery in zip(mastery_names, mastery_values) if mastery]
 
 
 async def enemy_type_str(member: CombatMember) -> str:
@@ -5,7 +5,7 @@ from wizwalker.memory.memory_objects.spell_effect import DynamicSpellEffect
 from wizwalker.extensions.wizsprinter import CombatConfigProvider
 from wizwalker.extensions.wizsprinter.combat_backends.backend_base import BaseCombatBackend
 from wizwalker.extensions.wizsprinter.combat_backends.combat_api import CombatConfig, TargetType, SpellType, TemplateSpell
-from wizwalker.extensions.wizsprinter.combat_backends.config_backend import get_sprinty_grammar, Lark, TreeToConfig
+from wizwalker.extensions.wizsprinter.combat_backends.config_cache import parse_combat_config
 from wizwalker.extensions.wizsprinter import SprintyCombat
 from typing import List, Dict, Tuple
 # from wizwalker.client import Client
@@ -29,11 +29,7 @@ class StrCombatConfigProvider(CombatConfigProvider):
         raise RuntimeError("Full config fail! Config might be empty or contains only explicit rounds. Consider adding a pass or something else.")
 
     def parse_config(self, file_contents) -> CombatConfig:
-        grammar = get_sprinty_grammar()
-
-        parser = Lark(grammar)
-        tree = parser.parse(file_contents)
-        return self._expand_config(TreeToConfig().transform(tree))
+        return self._expand_config(parse_combat_config(file_contents))
 
 
 
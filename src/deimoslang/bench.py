@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import json
+import statistics
+from collections import Counter
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from .fakeclient import FakeWorld, FakeLatency, FakeClient
+from .vm import VM
+
+
+# Runs deimoslang scripts on fake clients (fakeclient.py) and reports how fast the VM gets through them.
+#   python -m src.deimoslang.bench bot.txt --clients 4 --vms 2 --duration 10 --read-latency 0.00002
+# Scheduler latency is measured by a probe task that asks the event loop to wake it every millisecond,
+# how late it wakes up is how long VM steps (and blocking reads) keep everything else in the process waiting.
+
+_PROBE_INTERVAL = 0.001
+
+
+class BenchResult:
+    def __init__(self):
+        self.seconds = 0.0
+        self.steps = 0
+        self.finished_vms = 0
+        self.vms = 0
+        self.clients = 0
+        # seconds the probe woke up late
+        self.loop_lag: list[float] = []
+        self.client_reads: Counter[str] = Counter()
+        self.client_commands: Counter[str] = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def steps_per_second(self) -> float:
+        return self.steps / self.seconds if self.seconds else 0.0
+
+    def lag_percentile(self, percent: float) -> float:
+        if not self.loop_lag:
+            return 0.0
+        ordered = sorted(self.loop_lag)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def as_dict(self) -> dict:
+        reads = sum(self.client_reads.values())
+        return {
+            "seconds": self.seconds,
+            "vms": self.vms,
+            "clients": self.clients,
+            "finished_vms": self.finished_vms,
+            "steps": self.steps,
+            "steps_per_second": self.steps_per_second,
+            "loop_lag_mean": statistics.fmean(self.loop_lag) if self.loop_lag else 0.0,
+            "loop_lag_p99": self.lag_percentile(99),
+            "loop_lag_max": max(self.loop_lag, default=0.0),
+            "client_reads": reads,
+            "client_reads_per_step": reads / self.steps if self.steps else 0.0,
+            "client_reads_by_kind": dict(self.client_reads.most_common()),
+            "client_commands": dict(self.client_commands.most_common()),
+            "read_cache_hits": self.cache_hits,
+            "read_cache_misses": self.cache_misses,
+        }
+
+    def report(self) -> str:
+        data = self.as_dict()
+        lines = [
+            f"{data['vms']} vm(s) on {data['clients']} fake client(s) for {data['seconds']:.2f}s, {data['finished_vms']} finished",
+            f"steps: {data['steps']} ({data['steps_per_second']:.0f}/s)",
+            f"loop lag: mean {data['loop_lag_mean'] * 1000:.3f}ms, p99 {data['loop_lag_p99'] * 1000:.3f}ms, max {data['loop_lag_max'] * 1000:.3f}ms",
+            f"client reads: {data['client_reads']} ({data['client_reads_per_step']:.2f}/step), "
+            f"read cache {data['read_cache_hits']} hits / {data['read_cache_misses']} misses",
+        ]
+        for name, count in list(data["client_reads_by_kind"].items())[:10]:
+            lines.append(f"    {name}: {count}")
+        if data["client_commands"]:
+            lines.append("client commands: " + ", ".join(f"{name} {count}" for name, count in data["client_commands"].items()))
+        return "\n".join(lines)
+
+
+async def _probe_loop(lag: list[float], stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + _PROBE_INTERVAL
+        await asyncio.sleep(_PROBE_INTERVAL)
+        lag.append(max(loop.time() - expected, 0.0))
+
+
+async def run_benchmark(
+    code: str,
+    clients: int = 1,
+    vms: int = 1,
+    duration: float = 5.0,
+    latency: FakeLatency | None = None,
+    setup: Callable[[FakeWorld, list[list[FakeClient]]], None] | None = None,
+    profile: bool = False,
+) -> tuple[BenchResult, list[VM]]:
+    # Runs code on `vms` VMs, each with its own `clients` fake clients, until every VM finished or duration ran out.
+    # setup(world, client groups) can script the world before the VMs start.
+    world = FakeWorld(latency)
+    groups = [[world.add_client() for _ in range(clients)] for _ in range(vms)]
+    if setup is not None:
+        setup(world, groups)
+    machines = []
+    for group in groups:
+        machine = VM(group)
+        machine.load_from_text(code)
+        if profile:
+            machine.enable_profiler()
+        machines.append(machine)
+
+    result = BenchResult()
+    result.vms = vms
+    result.clients = clients * vms
+    steps = [0] * vms
+
+    async def drive(index: int):
+        machine = machines[index]
+        machine.running = True
+        try:
+            while machine.running:
+                await machine.step()
+                steps[index] += 1
+        finally:
+            machine.stop()
+
+    stop_probe = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop(result.loop_lag, stop_probe))
+    drivers = [asyncio.create_task(drive(i)) for i in range(vms)]
+    started = perf_counter()
+    try:
+        done, pending = await asyncio.wait(drivers, timeout=duration)
+        result.finished_vms = len(done)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            # surface script errors instead of benchmarking a crash
+            task.result()
+    finally:
+        result.seconds = perf_counter() - started
+        stop_probe.set()
+        await probe
+        world.close()
+
+    result.steps = sum(steps)
+    for client in world.clients:
+        result.client_reads.update(client.reads)
+        result.client_commands.update(client.commands)
+    for machine in machines:
+        result.cache_hits += machine.reads.hits
+        result.cache_misses += machine.reads.misses
+    return result, machines
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark a deimoslang script on fake clients")
+    arg_parser.add_argument("script", type=Path)
+    arg_parser.add_argument("--clients", type=int, default=1, help="fake clients per vm")
+    arg_parser.add_argument("--vms", type=int, default=1, help="vms running the script side by side")
+    arg_parser.add_argument("--duration", type=float, default=5.0, help="seconds to run for at most")
+    arg_parser.add_argument("--read-latency", type=float, default=0.0, help="seconds a memory read blocks for")
+    arg_parser.add_argument("--command-latency", type=float, default=0.0, help="seconds mouse commands take")
+    arg_parser.add_argument("--key-latency", type=float, default=0.0, help="seconds a key press takes at least")
+    arg_parser.add_argument("--teleport-latency", type=float, default=0.0, help="seconds a teleport takes")
+    arg_parser.add_argument("--json", type=Path, help="also write the results as json")
+    arg_parser.add_argument("--profile", type=Path, help="write collapsed stacks of the first vm here")
+    args = arg_parser.parse_args()
+
+    latency = FakeLatency(read=args.read_latency, command=args.command_latency, key=args.key_latency, teleport=args.teleport_latency)
+    code = args.script.read_text()
+    result, machines = asyncio.run(run_benchmark(
+        code, clients=args.clients, vms=args.vms, duration=args.duration, latency=latency, profile=args.profile is not None,
+    ))
+    print(result.report())
+    if args.json is not None:
+        args.json.write_text(json.dumps(result.as_dict(), indent=2))
+    if args.profile is not None:
+        machines[0].profiler.write_collapsed(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import functools
+import hashlib
+import os
+import pickle
+import struct
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+from .ir import Compiler, Instruction
+
+
+# Compiled programs are cached twice: in memory so every VM in the process shares one instruction list,
+# and on disk so restarting a bot (or the whole tool) skips tokenize -> parse -> analyze -> compile.
+# Programs are shared, so the VM must treat them as read only.
+
+# bump whenever the tokenizer, parser, analyzer or compiler change what a script compiles to
+COMPILER_VERSION = 4
+
+# file layout: magic, format version, compiler version, sha256 of the cache key, then the pickled instruction list
+_MAGIC = b"DMLC"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sII32s")
+
+_programs: dict[bytes, list[Instruction]] = {}
+
+
+@functools.cache
+def _cache_dir() -> Path:
+    # next to wizwalker's other caches (nav, spell db), wizwalker only imports on Windows so elsewhere under the home folder
+    try:
+        from wizwalker import utils
+    except (ImportError, AttributeError, OSError):
+        return Path.home() / ".cache" / "deimos" / "compiled"
+    return utils.get_cache_folder() / "compiled"
+
+
+def program_key(code: str) -> bytes:
+    # pickles are only valid for the interpreter that wrote them, so its version is part of the key
+    digest = hashlib.sha256()
+    digest.update(f"{COMPILER_VERSION}:{sys.version_info.major}.{sys.version_info.minor}:".encode())
+    digest.update(code.encode("utf-8", errors="surrogatepass"))
+    return digest.digest()
+
+
+def _load(path: Path, key: bytes) -> list[Instruction] | None:
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, format_version, compiler_version, cached_key = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or format_version != _FORMAT_VERSION or compiler_version != COMPILER_VERSION or cached_key != key:
+        return None
+    try:
+        program = pickle.loads(data[_HEADER.size:])
+    except Exception as e:
+        # classes were renamed or removed since the file was written
+        logger.debug(f"Discarding stale compiled program {path.name}: {e}")
+        return None
+    if not isinstance(program, list):
+        return None
+    return program
+
+
+def _store(path: Path, key: bytes, program: list[Instruction]):
+    try:
+        payload = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, RecursionError, TypeError) as e:
+        logger.debug(f"Compiled program can't be cached: {e}")
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so clients starting the same script at once never read a half written file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(_HEADER.pack(_MAGIC, _FORMAT_VERSION, COMPILER_VERSION, key) + payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Unable to write compiled program cache: {e}")
+
+
+def compile_program(code: str, use_disk: bool = True) -> list[Instruction]:
+    # Returns the compiled (label resolved) program for code, compiling only if neither cache has it
+    key = program_key(code)
+    program = _programs.get(key)
+    if program is not None:
+        return program
+
+    path = _cache_dir() / f"{key.hex()}.bin"
+    if use_disk:
+        program = _load(path, key)
+
+    if program is None:
+        program = Compiler.from_text(code).compile()
+        if use_disk:
+            _store(path, key, program)
+
+    _programs[key] = program
+    return program
+
+
+def clear_program_cache(disk: bool = False):
+    _programs.clear()
+    if not disk:
+        return
+    cache_dir = _cache_dir()
+    if not cache_dir.is_dir():
+        return
+    for path in cache_dir.glob("*.bin"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
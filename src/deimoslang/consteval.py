@@ -0,0 +1,122 @@
+from .tokenizer import TokenKind
+from .types import *
+
+
+# Operator semantics shared by the VM's expression evaluator and the IR optimiser, plus folding of expressions
+# that don't depend on game or VM state. Kept free of wizwalker so scripts can be compiled without it.
+
+
+class VMError(Exception):
+    pass
+
+
+# marks an expression that can't be folded, None is a valid folded value
+NOT_CONSTANT = object()
+
+
+def _unwrap(value):
+    # comparisons look at the first element of a list, ie. the current value of a "current/max" windownum
+    if isinstance(value, list) and len(value) > 0:
+        return value[0]
+    return value
+
+
+def _sub(lhs, rhs):
+    assert(isinstance(lhs, (int, float)))
+    assert(isinstance(rhs, (int, float)))
+    return lhs - rhs
+
+
+def _divide(lhs, rhs):
+    return lhs / rhs
+
+
+def _equivalent(lhs, rhs):
+    return _unwrap(lhs) == _unwrap(rhs)
+
+
+def _greater(lhs, rhs):
+    return _unwrap(lhs) > _unwrap(rhs)
+
+
+def _contains(lhs, rhs):
+    if isinstance(rhs, list):
+        return any(item in lhs for item in rhs)
+    return rhs in lhs
+
+
+def range_bound(range_value, index: int):
+    # index 0 is the minimum of a "min-max" string, 1 the maximum
+    if not isinstance(range_value, str):
+        raise VMError(f"Range expression must evaluate to a string, got {range_value}")
+    try:
+        min_val, max_val = map(float, range_value.split('-'))
+    except ValueError:
+        raise VMError(f"Invalid range format: {range_value}. Expected format like '1-100'")
+    return max_val if index else min_val
+
+
+binary_ops = {
+    SubExpression: _sub,
+    DivideExpression: _divide,
+    EquivalentExpression: _equivalent,
+    GreaterExpression: _greater,
+    ContainsStringExpression: _contains,
+}
+
+
+def fold(expression: Expression):
+    # Value of expression if it can be computed without a VM, NOT_CONSTANT otherwise.
+    # Folding never raises, anything that would fail is left for run time so errors surface when the script gets there.
+    match expression:
+        case NumberExpression():
+            return expression.number
+        case StringExpression():
+            return expression.string
+        case IdentExpression():
+            return expression.ident
+        case StackLocExpression():
+            return expression.offset
+        case UnaryExpression():
+            value = fold(expression.expr)
+            if value is NOT_CONSTANT:
+                return NOT_CONSTANT
+            match expression.operator.kind:
+                case TokenKind.minus if isinstance(value, (int, float)):
+                    return -value
+                case TokenKind.keyword_not:
+                    return not value
+            return NOT_CONSTANT
+        case SubExpression() | DivideExpression() | EquivalentExpression() | GreaterExpression() | ContainsStringExpression():
+            lhs = fold(expression.lhs)
+            rhs = fold(expression.rhs)
+            if lhs is NOT_CONSTANT or rhs is NOT_CONSTANT:
+                return NOT_CONSTANT
+            try:
+                return binary_ops[type(expression)](lhs, rhs)
+            except Exception:
+                return NOT_CONSTANT
+        case StrFormatExpression():
+            values = [fold(value) for value in expression.values]
+            if any(value is NOT_CONSTANT for value in values):
+                return NOT_CONSTANT
+            try:
+                return expression.format_str % tuple(values)
+            except Exception:
+                return NOT_CONSTANT
+        case AndExpression() | OrExpression():
+            values = [fold(expr) for expr in expression.expressions]
+            if any(value is NOT_CONSTANT for value in values):
+                return NOT_CONSTANT
+            if isinstance(expression, AndExpression):
+                return all(values)
+            return any(values)
+        case RangeMinExpression() | RangeMaxExpression():
+            value = fold(expression.range_expr)
+            if value is NOT_CONSTANT:
+                return NOT_CONSTANT
+            try:
+                return range_bound(value, 0 if isinstance(expression, RangeMinExpression) else 1)
+            except Exception:
+                return NOT_CONSTANT
+    return NOT_CONSTANT
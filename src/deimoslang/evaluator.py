@@ -0,0 +1,335 @@
+from typing import Any, Awaitable, Callable
+
+from .game import Client, XYZ, Keycode
+
+from .tokenizer import TokenKind
+from .types import *
+from .consteval import VMError, NOT_CONSTANT, binary_ops, fold, range_bound
+
+
+# Expressions are turned into nested closures the first time the VM evaluates them, so loops and until conditions
+# don't re-dispatch over the node type on every evaluation. Anything that doesn't depend on game state or VM state
+# (literals, arithmetic on literals, key codes, ...) is folded while compiling.
+# Constants ($name) are never folded since they can be redefined while the script runs.
+
+EvalFn = Callable[[Client | None], Awaitable[Any]]
+
+
+# eval kinds that are a single client read, the rest need VM state or error handling and go through VM._eval_expression
+_client_readers: dict[EvalKind, Callable[[Client], Awaitable[Any]]] = {
+    EvalKind.account_level: lambda client: client.stats.reference_level(),
+    EvalKind.health: lambda client: client.stats.current_hitpoints(),
+    EvalKind.max_health: lambda client: client.stats.max_hitpoints(),
+    EvalKind.mana: lambda client: client.stats.current_mana(),
+    EvalKind.max_mana: lambda client: client.stats.max_mana(),
+    EvalKind.energy: lambda client: client.current_energy(),
+    EvalKind.max_energy: lambda client: client.stats.energy_max(),
+    EvalKind.gold: lambda client: client.stats.current_gold(),
+    EvalKind.max_gold: lambda client: client.stats.base_gold_pouch(),
+    EvalKind.potioncount: lambda client: client.stats.potion_charge(),
+    EvalKind.max_potioncount: lambda client: client.stats.potion_max(),
+}
+
+
+class ExpressionCompiler:
+    # Compiles expressions of the program loaded in vm into EvalFn closures, each one once per VM.
+    # The closures read VM state (constants, stack, selected clients) when they run, not when they are built.
+    def __init__(self, vm):
+        self.vm = vm
+        # id(expression) -> (expression, closure), the expression is kept so a recycled id can't hit a stale entry
+        self._compiled: dict[int, tuple[Expression, EvalFn]] = {}
+
+    def clear(self):
+        self._compiled = {}
+
+    def get(self, expression: Expression) -> EvalFn:
+        entry = self._compiled.get(id(expression))
+        if entry is not None and entry[0] is expression:
+            return entry[1]
+        fn = self.compile(expression)
+        self._compiled[id(expression)] = (expression, fn)
+        return fn
+
+    def compile(self, expression: Expression) -> EvalFn:
+        value = fold(expression)
+        if value is not NOT_CONSTANT:
+            return self._constant(value)
+
+        vm = self.vm
+        match expression:
+            case ConstantReferenceExpression():
+                name = expression.name
+                async def constant_reference(client):
+                    constants = vm._constants
+                    if name in constants:
+                        return constants[name]
+                    raise VMError(f"Unknown constant: ${name}")
+                return constant_reference
+
+            case ConstantCheckExpression():
+                name = expression.name
+                if expression.value is None:
+                    async def constant_value(client):
+                        constants = vm._constants
+                        if name in constants:
+                            return constants[name]
+                        raise VMError(f"Unknown constant: {name}")
+                    return constant_value
+
+                expected_fn = self.get(expression.value)
+                async def constant_check(client):
+                    expected_value = await expected_fn(None)
+                    constants = vm._constants
+                    if name in constants:
+                        actual_value = constants[name]
+                        if isinstance(expected_value, bool) and isinstance(actual_value, str):
+                            if actual_value.lower() == "true":
+                                actual_value = True
+                            elif actual_value.lower() == "false":
+                                actual_value = False
+                        return actual_value == expected_value
+                    return False
+                return constant_check
+
+            case RangeMinExpression() | RangeMaxExpression():
+                range_fn = self.get(expression.range_expr)
+                index = 0 if isinstance(expression, RangeMinExpression) else 1
+                async def bound(client):
+                    return range_bound(await range_fn(client), index)
+                return bound
+
+            case IndexAccessExpression():
+                container_fn = self.get(expression.expr)
+                index_fn = self.get(expression.index)
+                async def index_access(client):
+                    container = await container_fn(client)
+                    index = await index_fn(client)
+                    # anything out of bounds or not indexable reads as 0
+                    if isinstance(container, list) and isinstance(index, (int, float)):
+                        index_int = int(index)
+                        if 0 <= index_int < len(container):
+                            return container[index_int]
+                    return 0.0
+                return index_access
+
+            case AndExpression():
+                fns = [self.get(expr) for expr in expression.expressions]
+                async def all_of(client):
+                    for fn in fns:
+                        if not await fn(client):
+                            return False
+                    return True
+                return all_of
+
+            case OrExpression():
+                fns = [self.get(expr) for expr in expression.expressions]
+                async def any_of(client):
+                    for fn in fns:
+                        if await fn(client):
+                            return True
+                    return False
+                return any_of
+
+            case CommandExpression():
+                command = expression.command
+                if type(command.data) is list and not command.data:
+                    return self._constant(False)
+                select = self._selector(command.player_selector)
+                async def command_expression(client):
+                    return await vm._eval_command_expression(expression, select())
+                return command_expression
+
+            case XYZExpression():
+                x_fn = self.get(expression.x)
+                y_fn = self.get(expression.y)
+                z_fn = self.get(expression.z)
+                async def xyz(client):
+                    return XYZ(await x_fn(client), await y_fn(client), await z_fn(client))
+                return xyz
+
+            case UnaryExpression():
+                inner_fn = self.get(expression.expr)
+                match expression.operator.kind:
+                    case TokenKind.minus:
+                        async def negate(client):
+                            return -(await inner_fn(client))
+                        return negate
+                    case TokenKind.keyword_not:
+                        inner = expression.expr
+                        if isinstance(inner, CommandExpression) and inner.command.player_selector.any_player:
+                            async def invert_any(client):
+                                result = await inner_fn(client)
+                                # the clients that didn't match become the new matches
+                                current_matches = vm._any_player_client.copy()
+                                vm._any_player_client = [c for c in vm._clients if c not in current_matches]
+                                return not result
+                            return invert_any
+                        async def invert(client):
+                            return not await inner_fn(client)
+                        return invert
+                return self._error(f"Unimplemented unary expression: {expression}")
+
+            case StrFormatExpression():
+                format_str = expression.format_str
+                fns = [self.get(value) for value in expression.values]
+                async def str_format(client):
+                    values = []
+                    for fn in fns:
+                        values.append(await fn(client))
+                    return format_str % tuple(values)
+                return str_format
+
+            case KeyExpression():
+                if expression.key in Keycode.__members__:
+                    return self._constant(Keycode[expression.key])
+                return self._error(f"Unknown key code: {expression.key}")
+
+            case SubExpression() | DivideExpression() | EquivalentExpression() | GreaterExpression() | ContainsStringExpression():
+                return self._binary(expression, binary_ops[type(expression)])
+
+            case Eval():
+                reads = vm.reads
+                kind = expression.kind
+                reader = _client_readers.get(kind)
+                if reader is not None:
+                    def read_stat(client):
+                        return reads.read(client, kind, reader)
+                    return read_stat
+                match kind:
+                    case EvalKind.bagcount | EvalKind.max_bagcount:
+                        index = 0 if kind == EvalKind.bagcount else 1
+                        async def bagcount(client):
+                            return (await reads.query(client, "backpack_space"))[index]
+                        return bagcount
+                    case EvalKind.playercount:
+                        async def playercount(client):
+                            return len(vm._clients)
+                        return playercount
+                    case EvalKind.windowtext | EvalKind.windownum | EvalKind.duel_round:
+                        # only depend on the client and the window path
+                        args = expression.args
+                        def eval_uncached(client, *_):
+                            return vm._eval_expression(expression, client)
+                        async def eval_cached(client):
+                            return await reads.read(client, kind, eval_uncached, args)
+                        return eval_cached
+                async def eval_kind(client):
+                    return await vm._eval_expression(expression, client)
+                return eval_kind
+
+            case SelectorGroup():
+                expr_fn = self.get(expression.expr)
+                if expression.players.any_player:
+                    async def any_player_group(client):
+                        vm._any_player_client = []
+                        found_any = False
+                        for anyplayer in vm._clients:
+                            if await expr_fn(anyplayer):
+                                vm._any_player_client.append(anyplayer)
+                                found_any = True
+                        return found_any
+                    return any_player_group
+                select = self._selector(expression.players)
+                async def selector_group(client):
+                    for player in select():
+                        if not await expr_fn(player):
+                            return False
+                    return True
+                return selector_group
+
+            case ReadVarExpr():
+                loc = fold(expression.loc)
+                if type(loc) is int:
+                    async def read_var(client):
+                        return vm.current_task.stack[loc]
+                    return read_var
+                loc_fn = self.get(expression.loc)
+                async def read_var_dynamic(client):
+                    loc = await loc_fn(None)
+                    assert(loc != None and type(loc) == int)
+                    return vm.current_task.stack[loc]
+                return read_var_dynamic
+
+            case ListExpression():
+                items = expression.items
+                if isinstance(items, list):
+                    fns = [self.get(item) for item in items]
+                    async def list_items(client):
+                        result = []
+                        for fn in fns:
+                            item = await fn(client)
+                            if isinstance(item, list):
+                                result.extend(item)
+                            else:
+                                result.append(item)
+                        return result
+                    return list_items
+                if isinstance(items, ListExpression):
+                    inner_fn = self.get(items)
+                    async def nested_list(client):
+                        inner_result = await inner_fn(client)
+                        return inner_result if isinstance(inner_result, list) else [inner_result]
+                    return nested_list
+                return self._constant_list()
+
+        return self._error(f"Unimplemented expression type: {expression}")
+
+    def _constant(self, value) -> EvalFn:
+        async def constant(client):
+            return value
+        return constant
+
+    def _constant_list(self) -> EvalFn:
+        # lists are mutable, every evaluation gets its own
+        async def empty_list(client):
+            return []
+        return empty_list
+
+    def _error(self, message: str) -> EvalFn:
+        async def error(client):
+            raise VMError(message)
+        return error
+
+    def _binary(self, expression: BinaryExpression, op: Callable[[Any, Any], Any]) -> EvalFn:
+        # a folded side is captured as a value instead of awaited, ie. `health > 500` only awaits the read
+        lhs = fold(expression.lhs)
+        rhs = fold(expression.rhs)
+        if rhs is not NOT_CONSTANT:
+            lhs_fn = self.get(expression.lhs)
+            async def binary_rhs_constant(client):
+                return op(await lhs_fn(client), rhs)
+            return binary_rhs_constant
+        rhs_fn = self.get(expression.rhs)
+        if lhs is not NOT_CONSTANT:
+            async def binary_lhs_constant(client):
+                return op(lhs, await rhs_fn(client))
+            return binary_lhs_constant
+        lhs_fn = self.get(expression.lhs)
+        async def binary(client):
+            left = await lhs_fn(client)
+            return op(left, await rhs_fn(client))
+        return binary
+
+    def _selector(self, selector: PlayerSelector) -> Callable[[], list]:
+        # resolves which branch of VM._select_players applies once, the client list itself is read on every call
+        vm = self.vm
+        if selector.mass:
+            return lambda: vm._clients
+        if selector.any_player:
+            return lambda: []
+        if selector.same_any:
+            return lambda: vm._any_player_client
+        player_nums = list(selector.player_nums)
+        if selector.inverted:
+            excluded = set(player_nums)
+            def select_inverted():
+                return [vm.player_by_num(i + 1) for i in range(len(vm._clients)) if i + 1 not in excluded]
+            return select_inverted
+        def select_nums():
+            result = []
+            for num in player_nums:
+                client = vm.player_by_num(num)
+                if client:
+                    result.append(client)
+            return result
+        return select_nums
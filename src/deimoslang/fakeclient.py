@@ -0,0 +1,418 @@
+import asyncio
+import math
+from collections import Counter
+from time import perf_counter, sleep
+from typing import Any, Callable
+
+from .game import XYZ, Keycode, SprintyClient
+
+
+# In-memory stand-ins for game clients so deimoslang scripts can run without the game, ie. for benchmarks (bench.py).
+# A FakeWorld owns the clients and scripts what happens to them: zone changes with a loading screen, battles that
+# count up duel rounds, windows that appear, reactions to keys and teleports.
+# Only the client surface the VM touches is implemented, anything else raises like a client without hooks would.
+
+# wizard walking speed in units per second, close enough for goto
+_WALK_SPEED = 580.0
+
+
+class FakeLatency:
+    # Seconds each kind of operation takes. Memory reads block the event loop like the real (synchronous) reads do,
+    # commands, keys and teleports are awaited.
+    def __init__(self, read: float = 0.0, command: float = 0.0, key: float = 0.0, teleport: float = 0.0):
+        self.read = read
+        self.command = command
+        self.key = key
+        self.teleport = teleport
+
+
+def _block(seconds: float):
+    if seconds <= 0:
+        return
+    if seconds >= 0.001:
+        sleep(seconds)
+        return
+    # time.sleep can't do microseconds
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        pass
+
+
+class FakeWindow:
+    def __init__(self, client: "FakeClient", name: str = "", visible: bool = True, text: str = ""):
+        self.client = client
+        self._name = name
+        self._children: list[FakeWindow] = []
+        self.visible = visible
+        self.text = text
+
+    def child(self, name: str, create: bool = True) -> "FakeWindow | None":
+        for child in self._children:
+            if child._name == name:
+                return child
+        if not create:
+            return None
+        child = FakeWindow(self.client, name)
+        self._children.append(child)
+        return child
+
+    def find(self, path: list[str], create: bool = False) -> "FakeWindow | None":
+        window = self
+        for name in path:
+            window = window.child(name, create)
+            if window is None:
+                return None
+        return window
+
+    async def name(self) -> str:
+        return self.client._read("window.name", self._name)
+
+    async def children(self) -> list["FakeWindow"]:
+        return self.client._read("window.children", list(self._children))
+
+    async def is_visible(self) -> bool:
+        return self.client._read("window.is_visible", self.visible)
+
+    async def maybe_text(self) -> str:
+        return self.client._read("window.maybe_text", self.text)
+
+    async def read_wide_string_from_offset(self, offset: int) -> str:
+        return self.client._read("window.read_wide_string", self.text)
+
+    def __repr__(self) -> str:
+        return f"FakeWindow({self._name!r}, visible={self.visible}, {len(self._children)} children)"
+
+
+class FakeBody:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    async def position(self) -> XYZ:
+        return self.client._read("body.position", self.client.position)
+
+    async def yaw(self) -> float:
+        return self.client._read("body.yaw", self.client.yaw)
+
+    async def write_yaw(self, yaw: float):
+        self.client.commands["body.write_yaw"] += 1
+        self.client.yaw = yaw
+
+
+class FakeDuel:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    async def round_num(self) -> int:
+        return self.client._read("duel.round_num", self.client.duel_round)
+
+
+# CurrentGameStats method -> FakeClient attribute
+_STAT_FIELDS = {
+    "reference_level": "level",
+    "current_hitpoints": "health",
+    "max_hitpoints": "max_health",
+    "current_mana": "mana",
+    "max_mana": "max_mana",
+    "energy_max": "max_energy",
+    "current_gold": "gold",
+    "base_gold_pouch": "max_gold",
+    "potion_charge": "potions",
+    "potion_max": "max_potions",
+}
+
+
+class FakeStats:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    def __getattr__(self, name: str):
+        field = _STAT_FIELDS.get(name)
+        if field is None:
+            raise AttributeError(name)
+        async def read_stat():
+            return self.client._read(f"stats.{name}", getattr(self.client, field))
+        return read_stat
+
+
+class FakeQuestPosition:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    async def position(self) -> XYZ:
+        return self.client._read("quest_position.position", self.client.quest_position_xyz)
+
+
+class FakeQuest:
+    def __init__(self, client: "FakeClient", name: str):
+        self.client = client
+        self.name = name
+
+    async def name_lang_key(self) -> str:
+        return self.client._read("quest.name_lang_key", self.name)
+
+
+class FakeQuestManager:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    async def quest_data(self) -> dict[int, FakeQuest]:
+        quests = {quest_id: FakeQuest(self.client, name) for quest_id, name in self.client.quests.items()}
+        return self.client._read("quest_manager.quest_data", quests)
+
+
+class FakeCacheHandler:
+    # lang keys are the names themselves
+    async def get_langcode_name(self, key: str) -> str:
+        return key
+
+
+class FakeMouseHandler:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        return False
+
+    async def _command(self, name: str):
+        self.client.commands[name] += 1
+        await asyncio.sleep(self.client.world.latency.command)
+
+    async def click(self, x: int, y: int, **_):
+        await self._command("mouse.click")
+
+    async def click_window(self, window: FakeWindow, **_):
+        await self._command("mouse.click_window")
+        self.client.world._clicked(self.client, window)
+
+    async def set_mouse_position(self, x: int, y: int, **_):
+        await self._command("mouse.set_mouse_position")
+
+    async def set_mouse_position_to_window(self, window: FakeWindow, **_):
+        await self._command("mouse.set_mouse_position_to_window")
+
+
+class FakeClient(SprintyClient):
+    # Client.__init__ attaches to a game process, a fake only sets up the state the VM reads
+    def __init__(self, world: "FakeWorld", title: str, **state):
+        self.world = world
+        self._title = title
+        # operation name -> number of times it ran
+        self.reads: Counter[str] = Counter()
+        self.commands: Counter[str] = Counter()
+
+        self.zone: str | None = "WizardCity/WC_Hub"
+        self.position = XYZ(0.0, 0.0, 0.0)
+        self.yaw = 0.0
+        self.loading = False
+        self.battle = False
+        self.dialog = False
+        self.duel_round = 0
+        self.level = 50
+        self.health = self.max_health = 3000
+        self.mana = self.max_mana = 500
+        self.energy = self.max_energy = 100
+        self.gold = 10000
+        self.max_gold = 100000
+        self.potions = self.max_potions = 3
+        self.backpack = (20, 100)
+        # quest id -> name, quest_id is the tracked one
+        self.quests: dict[int, str] = {1: "fake quest"}
+        self.tracked_quest = 1
+        self.quest_position_xyz = XYZ(0.0, 0.0, 0.0)
+        for name, value in state.items():
+            if not hasattr(self, name):
+                raise TypeError(f"Unknown fake client state: {name}")
+            setattr(self, name, value)
+
+        self.body = FakeBody(self)
+        self.stats = FakeStats(self)
+        self.duel = FakeDuel(self)
+        self.quest_position = FakeQuestPosition(self)
+        self.root_window = FakeWindow(self)
+        self.mouse_handler = FakeMouseHandler(self)
+        self.cache_handler = FakeCacheHandler()
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @title.setter
+    def title(self, window_title: str):
+        self._title = window_title
+
+    def __repr__(self) -> str:
+        return f"<FakeClient {self._title!r} zone={self.zone!r}>"
+
+    def is_running(self) -> bool:
+        return True
+
+    def _read(self, name: str, value: Any) -> Any:
+        self.reads[name] += 1
+        _block(self.world.latency.read)
+        return value
+
+    async def zone_name(self) -> str | None:
+        return self._read("zone_name", self.zone)
+
+    async def in_battle(self) -> bool:
+        return self._read("in_battle", self.battle)
+
+    async def is_loading(self) -> bool:
+        return self._read("is_loading", self.loading)
+
+    async def is_in_dialog(self) -> bool:
+        return self._read("is_in_dialog", self.dialog)
+
+    async def current_energy(self) -> int:
+        return self._read("current_energy", self.energy)
+
+    async def backpack_space(self) -> tuple[int, int]:
+        return self._read("backpack_space", self.backpack)
+
+    async def quest_id(self) -> int:
+        return self._read("quest_id", self.tracked_quest)
+
+    async def quest_manager(self) -> FakeQuestManager:
+        return FakeQuestManager(self)
+
+    async def get_base_entity_list(self, excluded_ids=None) -> list:
+        return self._read("get_base_entity_list", [])
+
+    async def find_closest_by_name(self, name: str, *args, **kwargs):
+        return None
+
+    async def find_closest_by_vague_name(self, name: str, *args, **kwargs):
+        return None
+
+    async def tp_to_closest_mob(self, *args, **kwargs):
+        return None
+
+    async def send_key(self, key: Keycode, seconds: float = 0):
+        self.commands["send_key"] += 1
+        await asyncio.sleep(max(seconds, self.world.latency.key))
+        self.world._key(self, key)
+
+    async def send_hotkey(self, modifers: list[Keycode], key: Keycode):
+        await self.send_key(key)
+
+    async def goto(self, x: float, y: float):
+        self.commands["goto"] += 1
+        target = XYZ(x, y, self.position.z)
+        distance = math.dist((self.position.x, self.position.y), (x, y))
+        await asyncio.sleep(max(distance / _WALK_SPEED, self.world.latency.command))
+        self.position = target
+        self.world._moved(self)
+
+    async def teleport(self, xyz: XYZ, yaw: float = None, **_):
+        self.commands["teleport"] += 1
+        await asyncio.sleep(self.world.latency.teleport)
+        self.position = xyz
+        if yaw is not None:
+            self.yaw = yaw
+        self.world._moved(self)
+
+    async def use_potion(self):
+        self.commands["use_potion"] += 1
+        if self.potions > 0:
+            self.potions -= 1
+            self.health = self.max_health
+            self.mana = self.max_mana
+
+    async def use_potion_if_needed(self, health_percent: int = 20, mana_percent: int = 5, **_):
+        if self.health * 100 < self.max_health * health_percent or self.mana * 100 < self.max_mana * mana_percent:
+            await self.use_potion()
+
+
+class FakeWorld:
+    def __init__(self, latency: FakeLatency | None = None):
+        self.latency = latency or FakeLatency()
+        self.clients: list[FakeClient] = []
+        self._timers: list[asyncio.TimerHandle] = []
+        self._key_handlers: dict[Keycode, list[Callable[[FakeClient], Any]]] = {}
+        self._move_handlers: list[Callable[[FakeClient], Any]] = []
+        self._click_handlers: list[Callable[[FakeClient, FakeWindow], Any]] = []
+
+    def add_client(self, title: str | None = None, **state) -> FakeClient:
+        client = FakeClient(self, title or f"Fake {len(self.clients) + 1}", **state)
+        self.clients.append(client)
+        return client
+
+    def schedule(self, delay: float, fn: Callable, *args) -> asyncio.TimerHandle:
+        # runs fn(*args) after delay seconds, needs a running event loop
+        timer = asyncio.get_running_loop().call_later(delay, fn, *args)
+        self._timers.append(timer)
+        return timer
+
+    def every(self, interval: float, fn: Callable, *args):
+        # runs fn(*args) every interval seconds until close()
+        def tick():
+            fn(*args)
+            self.schedule(interval, tick)
+        self.schedule(interval, tick)
+
+    def close(self):
+        for timer in self._timers:
+            timer.cancel()
+        self._timers = []
+
+    def on_key(self, key: Keycode, fn: Callable[[FakeClient], Any]):
+        self._key_handlers.setdefault(key, []).append(fn)
+
+    def on_move(self, fn: Callable[[FakeClient], Any]):
+        # after teleports and gotos
+        self._move_handlers.append(fn)
+
+    def on_click(self, fn: Callable[[FakeClient, FakeWindow], Any]):
+        self._click_handlers.append(fn)
+
+    def change_zone(self, client: FakeClient, zone: str, loading_seconds: float = 0.5, position: XYZ | None = None):
+        # a loading screen right away, the new zone once it is over
+        client.loading = True
+        def arrive():
+            client.zone = zone
+            client.loading = False
+            if position is not None:
+                client.position = position
+        self.schedule(loading_seconds, arrive)
+
+    def start_battle(self, clients: list[FakeClient], rounds: int = 3, round_seconds: float = 1.0):
+        for client in clients:
+            client.battle = True
+            client.duel_round = 1
+        def next_round(round_num: int):
+            for client in clients:
+                if round_num > rounds:
+                    client.battle = False
+                    client.duel_round = 0
+                else:
+                    client.duel_round = round_num
+            if round_num <= rounds:
+                self.schedule(round_seconds, next_round, round_num + 1)
+        self.schedule(round_seconds, next_round, 2)
+
+    def show_window(self, client: FakeClient, path: list[str], text: str = "", visible: bool = True) -> FakeWindow:
+        # paths start below the root window like the ones in src/paths.py, ie. ["WorldView", "wndDialogMain"]
+        window = client.root_window.find(path, create=True)
+        window.visible = visible
+        window.text = text
+        return window
+
+    def hide_window(self, client: FakeClient, path: list[str]):
+        window = client.root_window.find(path)
+        if window is not None:
+            window.visible = False
+
+    def _key(self, client: FakeClient, key: Keycode):
+        for fn in self._key_handlers.get(key, []):
+            fn(client)
+
+    def _moved(self, client: FakeClient):
+        for fn in self._move_handlers:
+            fn(client)
+
+    def _clicked(self, client: FakeClient, window: FakeWindow):
+        for fn in self._click_handlers:
+            fn(client, window)
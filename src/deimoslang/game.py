@@ -0,0 +1,142 @@
+import ast
+import importlib.util
+import math
+from pathlib import Path
+from typing import Any
+
+from src.window_utils import get_window_from_path, is_visible_by_path, click_window_by_path, is_free, get_quest_name
+
+# The wizwalker side of the VM: the client classes and the game helpers its commands call.
+# wizwalker only imports on Windows (it loads user32 and kernel32 on import). Everywhere else the VM gets the stand-ins
+# below instead, enough to compile scripts and run them on fake clients (fakeclient.py, bench.py) without the game.
+# The window path helpers (src.window_utils) work on either.
+# Commands that need the real game raise if they are run without it.
+
+try:
+    from wizwalker import AddressOutOfRange, Client, XYZ, Keycode, MemoryReadError, Primitive
+    HAS_WIZWALKER = True
+except (ImportError, AttributeError, OSError):
+    HAS_WIZWALKER = False
+
+
+if HAS_WIZWALKER:
+    from wizwalker.memory import DynamicClientObject
+    from wizwalker.memory.memory_objects.quest_data import QuestData, GoalData
+    from wizwalker.extensions.wizsprinter import SprintyClient
+    from wizwalker.extensions.wizsprinter.wiz_sprinter import upgrade_clients
+    from wizwalker.extensions.wizsprinter.wiz_navigator import toZone
+    from wizwalker.extensions.scripting.deck_builder import DeckBuilder
+    from wizwalker.extensions.scripting.utils import _maybe_get_named_window, _cycle_to_online_friends, _click_on_friend, _friend_list_entry
+    from src.teleport_math import navmap_tp, calc_Distance
+    from src.utils import _cycle_friends_list
+    from src.drop_logger import get_chat, filter_drops, find_new_stuff
+    from src.auto_pet import dancedance
+    from src.dance_game_hook import attempt_activate_dance_hook
+    from src.utils import refill_potions, refill_potions_if_needed, logout_and_in
+    from src.command_parser import teleport_to_friend_from_list
+    from src.config_combat import delegate_combat_configs, default_config
+
+else:
+    def _wizwalker_folder() -> Path:
+        # find_spec only locates the package, it doesn't run its __init__
+        spec = importlib.util.find_spec("wizwalker")
+        if spec is not None and spec.submodule_search_locations:
+            return Path(spec.submodule_search_locations[0])
+        # not installed, the copy this repo vendors
+        return Path(__file__).resolve().parents[2] / "libs" / "wizwalker" / "wizwalker"
+
+    def _load_enums(*names: str) -> dict[str, Any]:
+        # Keycode and Primitive are plain enums, they are taken from wizwalker's constants.py without running the
+        # rest of it (the dll handles)
+        path = _wizwalker_folder() / "constants.py"
+        tree = ast.parse(path.read_text(), str(path))
+        tree.body = [
+            node for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom)) or (isinstance(node, ast.ClassDef) and node.name in names)
+        ]
+        namespace: dict[str, Any] = {}
+        exec(compile(tree, str(path), "exec"), namespace)
+        return {name: namespace[name] for name in names}
+
+    _enums = _load_enums("Keycode", "Primitive")
+    Keycode = _enums["Keycode"]
+    Primitive = _enums["Primitive"]
+
+    class MemoryReadError(Exception):
+        pass
+
+    class AddressOutOfRange(MemoryReadError):
+        pass
+
+    class XYZ:
+        # the parts of wizwalker.utils.XYZ scripts use
+        def __init__(self, x: float, y: float, z: float):
+            self.x = x
+            self.y = y
+            self.z = z
+
+        def __sub__(self, other):
+            return self.distance(other)
+
+        def __str__(self):
+            return f"<XYZ ({self.x}, {self.y}, {self.z})>"
+
+        def __repr__(self):
+            return str(self)
+
+        def __iter__(self):
+            return iter((self.x, self.y, self.z))
+
+        def distance(self, other) -> float:
+            if not isinstance(other, type(self)):
+                raise ValueError(f"Can only calculate distance between instances of {type(self)} not {type(other)}")
+            return math.dist((self.x, self.y), (other.x, other.y))
+
+    class Client:
+        pass
+
+    class SprintyClient(Client):
+        pass
+
+    class DynamicClientObject:
+        pass
+
+    class QuestData:
+        pass
+
+    class GoalData:
+        pass
+
+    def calc_Distance(xyz_1: XYZ, xyz_2: XYZ) -> float:
+        # same as src.teleport_math.calc_Distance
+        return math.dist(tuple(xyz_1), tuple(xyz_2))
+
+    def upgrade_clients(clients: list) -> list:
+        # only fake clients get here, they already have everything the VM calls
+        return clients
+
+    def _needs_game(name: str):
+        def missing(*args, **kwargs):
+            raise RuntimeError(f"{name} needs wizwalker, which only runs on Windows")
+        missing.__name__ = name
+        return missing
+
+    toZone = _needs_game("toZone")
+    DeckBuilder = _needs_game("DeckBuilder")
+    _maybe_get_named_window = _needs_game("_maybe_get_named_window")
+    _cycle_to_online_friends = _needs_game("_cycle_to_online_friends")
+    _click_on_friend = _needs_game("_click_on_friend")
+    _friend_list_entry = _needs_game("_friend_list_entry")
+    navmap_tp = _needs_game("navmap_tp")
+    _cycle_friends_list = _needs_game("_cycle_friends_list")
+    get_chat = _needs_game("get_chat")
+    filter_drops = _needs_game("filter_drops")
+    find_new_stuff = _needs_game("find_new_stuff")
+    dancedance = _needs_game("dancedance")
+    attempt_activate_dance_hook = _needs_game("attempt_activate_dance_hook")
+    refill_potions = _needs_game("refill_potions")
+    refill_potions_if_needed = _needs_game("refill_potions_if_needed")
+    logout_and_in = _needs_game("logout_and_in")
+    teleport_to_friend_from_list = _needs_game("teleport_to_friend_from_list")
+    delegate_combat_configs = _needs_game("delegate_combat_configs")
+    default_config = ""
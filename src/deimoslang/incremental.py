@@ -0,0 +1,249 @@
+import copy
+import hashlib
+from time import perf_counter
+
+from .tokenizer import *
+from .parser import *
+from .sem import *
+from .ir import *
+
+
+# Incremental compilation for the script editor.
+# The source is split into regions, one per top level statement (an if keeps its else/elif lines). Tokens and
+# the parsed statements of a region are reused as long as its text doesn't change, so an edit only re-lexes and
+# re-parses the regions it touches. Analysis and code generation always see the whole program: symbol ids,
+# mixins and label offsets depend on everything before them, and both stages are cheap next to lexing and parsing.
+
+
+class Region:
+    def __init__(self, start: int, end: int, key: bytes, stmts: list[Stmt] | None, error: Exception | None = None,
+                 parsed_at: int | None = None):
+        # [start, end) line indexes into the source
+        self.start = start
+        self.end = end
+        self.key = key
+        # parsed statements, never handed to the analyzer directly since it rewrites them
+        self.stmts = stmts
+        self.error = error
+        # start of the region when stmts were parsed, their lines are off by start - parsed_at
+        self.parsed_at = start if parsed_at is None else parsed_at
+
+    def moved(self, offset: int) -> "Region":
+        return Region(self.start + offset, self.end + offset, self.key, self.stmts, self.error, self.parsed_at)
+
+    def __repr__(self) -> str:
+        return f"Region({self.start}-{self.end}, {len(self.stmts or [])} stmts, error={self.error is not None})"
+
+
+class IncrementalState:
+    def __init__(self, lines: list[str], regions: list[Region]):
+        self.lines = lines
+        self.regions = regions
+        self.program: list[Instruction] | None = None
+        self.error: Exception | None = None
+
+        # seconds spent in each stage by the compile that produced this state
+        self.timings = {"tokenize": 0.0, "parse": 0.0, "analyze": 0.0, "compile": 0.0}
+        self.lines_tokenized = 0
+        self.regions_reused = 0
+        self.regions_parsed = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _region_key(lines: list[str]) -> bytes:
+    return hashlib.blake2b("\n".join(lines).encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+
+
+def _clone_stmt(stmt: Stmt, line_offset: int = 0) -> Stmt:
+    # The analyzer rewrites statement nodes in place but leaves parsed expressions alone,
+    # so only the statement layer is copied and the expressions are shared with the cached region.
+    # line_offset moves the source lines of a region that was parsed somewhere else in the text.
+    match stmt:
+        case StmtList():
+            clone = StmtList([_clone_stmt(inner, line_offset) for inner in stmt.stmts])
+        case IfStmt():
+            clone = IfStmt(stmt.expr, _clone_stmt(stmt.branch_true, line_offset), _clone_stmt(stmt.branch_false, line_offset))
+        case LoopStmt():
+            clone = LoopStmt(_clone_stmt(stmt.body, line_offset))
+        case WhileStmt():
+            clone = WhileStmt(stmt.expr, _clone_stmt(stmt.body, line_offset))
+        case UntilStmt():
+            clone = UntilStmt(stmt.expr, _clone_stmt(stmt.body, line_offset))
+        case TimesStmt():
+            clone = TimesStmt(stmt.num, _clone_stmt(stmt.body, line_offset))
+        case BlockDefStmt():
+            clone = BlockDefStmt(stmt.name, _clone_stmt(stmt.body, line_offset))
+        case _:
+            clone = copy.copy(stmt)
+    if stmt.line is not None:
+        clone.line = stmt.line + line_offset
+    return clone
+
+
+def _split_regions(lines: list[str], start: int, stop: int, state: IncrementalState) -> tuple[list[tuple[int, int, list[Token], Exception | None]], int]:
+    # Lexes lines from start until a region closes at or after stop, or the source runs out.
+    # Returns (start, end, tokens, error) per region and the line the scan stopped at.
+    tokenizer = Tokenizer()
+    regions = []
+    region_start = start
+    tokens: list[Token] = []
+    error: Exception | None = None
+    depth = 0
+
+    def close(end: int):
+        nonlocal region_start, tokens, error
+        regions.append((region_start, end, tokens, error))
+        region_start = end
+        tokens = []
+        error = None
+
+    line_index = start
+    while line_index < len(lines):
+        in_string = tokenizer._in_multiline_string
+        try:
+            line_tokens = tokenizer.tokenize_line(lines[line_index], line_index + 1)
+        except TokenizerError as e:
+            line_tokens = []
+            error = error or e
+        if tokenizer._in_multiline_string:
+            tokenizer._multiline_parts.append("\n")
+        state.lines_tokenized += 1
+
+        # a region can only end between lines, outside of braces and multiline strings
+        if not in_string and depth == 0 and line_index > region_start and len(line_tokens) > 1 \
+                and line_tokens[0].kind not in (TokenKind.keyword_else, TokenKind.keyword_elif):
+            close(line_index)
+            if line_index >= stop:
+                return regions, line_index
+
+        if tokenizer._in_multiline_string or len(line_tokens) > 1:
+            tokens.extend(line_tokens)
+        for tok in line_tokens:
+            if tok.kind == TokenKind.curly_open:
+                depth += 1
+            elif tok.kind == TokenKind.curly_close:
+                depth = max(depth - 1, 0)
+        line_index += 1
+
+    if tokenizer._in_multiline_string:
+        error = error or TokenizerError(f"Unclosed multiline string: {''.join(tokenizer._multiline_parts)} {tokenizer._multiline_start_line_info}")
+    if line_index > region_start:
+        close(line_index)
+    return regions, line_index
+
+
+def _parse_region(tokens: list[Token]) -> list[Stmt]:
+    if not tokens:
+        return []
+    return Parser(tokens).parse()
+
+
+def _continues_if(lines: list[str], index: int) -> bool:
+    # whether the first statement line from index on is an else/elif, which belongs to the region before it
+    tokenizer = Tokenizer()
+    for line_index in range(index, len(lines)):
+        try:
+            line_tokens = tokenizer.tokenize_line(lines[line_index], line_index + 1)
+        except TokenizerError:
+            return False
+        if len(line_tokens) > 1:
+            return line_tokens[0].kind in (TokenKind.keyword_else, TokenKind.keyword_elif)
+        if tokenizer._in_multiline_string:
+            return False
+    return False
+
+
+def compile_incremental(old_state: IncrementalState | None, new_text: str) -> IncrementalState:
+    # Compiles new_text, reusing the regions of old_state that the edit didn't touch.
+    # Pass None for the first compile. Errors are reported through state.error instead of being raised.
+    lines = new_text.splitlines()
+    old_lines = old_state.lines if old_state is not None else []
+    old_regions = old_state.regions if old_state is not None else []
+
+    # lines shared with the previous text at the front and back
+    prefix = 0
+    max_common = min(len(lines), len(old_lines))
+    while prefix < max_common and lines[prefix] == old_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < max_common - prefix and lines[-1 - suffix] == old_lines[-1 - suffix]:
+        suffix += 1
+    offset = len(lines) - len(old_lines)
+
+    # Untouched regions before the edit stay put and the ones after it only move.
+    # Regions with errors are always redone so their messages point at the right lines.
+    head = []
+    for region in old_regions:
+        if region.end > prefix or region.error is not None:
+            break
+        head.append(region)
+    tail = []
+    for region in reversed(old_regions):
+        if region.start < len(old_lines) - suffix or region.error is not None:
+            break
+        tail.append(region.moved(offset))
+    tail.reverse()
+    # an edit that starts with else/elif continues the if of the region before it
+    while head and _continues_if(lines, head[-1].end):
+        head.pop()
+    scan_start = head[-1].end if head else 0
+
+    state = IncrementalState(lines, [])
+    cached = {r.key: r for r in old_regions if r.error is None}
+
+    started = perf_counter()
+    middle: list[tuple[int, int, list[Token], Exception | None]] = []
+    while True:
+        scan_stop = tail[0].start if tail else len(lines)
+        scanned, scan_end = _split_regions(lines, scan_start, scan_stop, state)
+        middle.extend(scanned)
+        # the tail is only reusable if the scan closed a region exactly where it starts
+        tail = [r for r in tail if r.start >= scan_end]
+        if not tail or tail[0].start == scan_end:
+            break
+        scan_start = scan_end
+    state.timings["tokenize"] = perf_counter() - started
+
+    started = perf_counter()
+    regions = list(head)
+    for region_start, region_end, tokens, error in middle:
+        key = _region_key(lines[region_start:region_end])
+        reuse = cached.get(key)
+        if error is None and reuse is not None:
+            regions.append(Region(region_start, region_end, key, reuse.stmts, parsed_at=reuse.parsed_at))
+            state.regions_reused += 1
+            continue
+        stmts = None
+        if error is None:
+            try:
+                stmts = _parse_region(tokens)
+            except Exception as e:
+                error = e
+        regions.append(Region(region_start, region_end, key, stmts, error))
+        state.regions_parsed += 1
+    regions.extend(tail)
+    state.regions_reused += len(head) + len(tail)
+    state.regions = regions
+    state.timings["parse"] = perf_counter() - started
+
+    for region in regions:
+        if region.error is not None:
+            state.error = region.error
+            return state
+
+    try:
+        started = perf_counter()
+        stmts = [_clone_stmt(stmt, region.start - region.parsed_at) for region in regions for stmt in region.stmts]
+        analyzer = Analyzer(stmts)
+        analyzer.analyze_program()
+        state.timings["analyze"] = perf_counter() - started
+
+        started = perf_counter()
+        state.program = Compiler(analyzer).compile()
+        state.timings["compile"] = perf_counter() - started
+    except Exception as e:
+        state.error = e
+    return state
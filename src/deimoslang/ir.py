@@ -1,6 +1,6 @@
 import copy
 from enum import Enum, auto
-from typing import Any
+from typing import Any, Iterable
 
 from .tokenizer import *
 from .parser import *
@@ -51,9 +51,11 @@ class InstructionKind(Enum):
     nop = auto()
 
 class Instruction:
-    def __init__(self, kind: InstructionKind, data: Any | None = None) -> None:
+    def __init__(self, kind: InstructionKind, data: Any | None = None, line: int | None = None) -> None:
         self.kind = kind
         self.data = data
+        # source line of the statement this was compiled from, for the profiler
+        self.line = line
 
     def __repr__(self) -> str:
         if self.data is not None:
@@ -82,10 +84,13 @@ class StackInfo:
 
 
 class Compiler:
-    def __init__(self, analyzer: Analyzer):
+    def __init__(self, analyzer: Analyzer, passes: Iterable[str] | None = None):
         self.analyzer = analyzer
         self._program: list[Instruction] = []
 
+        # optimiser passes to run on the finished program, None runs all of them (see optimizer.OPTIMIZATION_PASSES)
+        self.passes = passes
+
         self._stacks = [StackInfo()]
 
         self._loop_label_stack = []
@@ -93,13 +98,16 @@ class Compiler:
         # until is a bit too special and has dangerous interactions with user specified returns because of it
         self._outermost_until: Optional[int] = None
 
+        # line of the statement being compiled, given to every instruction it emits
+        self._line: Optional[int] = None
+
     @staticmethod
-    def from_text(code: str) -> "Compiler":
+    def from_text(code: str, passes: Iterable[str] | None = None) -> "Compiler":
         tokenizer = Tokenizer()
         parser = Parser(tokenizer.tokenize(code))
         analyzer = Analyzer(parser.parse())
         analyzer.analyze_program()
-        return Compiler(analyzer=analyzer)
+        return Compiler(analyzer=analyzer, passes=passes)
 
     # a branch may clean up variables that must continue to exist in the next segment
     def enter_branch(self):
@@ -119,7 +127,7 @@ class Compiler:
         raise CompilerError(f"Failed to determine the stack location for symbol {sym}")
 
     def emit(self, kind: InstructionKind, data: Any | None = None):
-        self._program.append(Instruction(kind, data))
+        self._program.append(Instruction(kind, data, self._line))
 
     def gen_label(self, name="anonymous") -> Symbol:
         return self.analyzer.gen_label_sym(name)
@@ -365,6 +373,14 @@ class Compiler:
         self.emit(InstructionKind.ret)
 
     def _compile(self, stmt: Stmt):
+        # instructions of statements without a line of their own belong to the enclosing statement
+        outer_line = self._line
+        if stmt.line is not None:
+            self._line = stmt.line
+        self._compile_stmt(stmt)
+        self._line = outer_line
+
+    def _compile_stmt(self, stmt: Stmt):
         match stmt:
             case ConstantDeclStmt():
                 self.prep_expression(stmt.value)
@@ -422,7 +438,11 @@ class Compiler:
 
         for stmt in self.analyzer._stmts:
             self._compile(stmt)
-        return self.process_labels(self._program)
+        program = self.process_labels(self._program)
+
+        # the optimiser works on instructions, importing it at the top would be circular
+        from .optimizer import optimize, OPTIMIZATION_PASSES
+        return optimize(program, OPTIMIZATION_PASSES if self.passes is None else self.passes)
 
 
 if __name__ == "__main__":
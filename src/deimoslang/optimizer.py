@@ -0,0 +1,256 @@
+from typing import Iterable
+
+from .types import *
+from .ir import Instruction, InstructionKind
+from .consteval import fold, NOT_CONSTANT
+
+
+# Optimisation passes over a label resolved program.
+# The program is turned into a list of nodes whose jumps point at other nodes instead of offsets, so passes can drop
+# and rewrite instructions freely. Offsets are recomputed when the nodes are laid out again.
+# Condition expressions must be evaluated exactly as often as before: most of them have side effects on VM state
+# (any player matches, zone/goal/quest change tracking), so only conditions that fold to a constant are removed.
+
+# in the order they run
+OPTIMIZATION_PASSES = ("fold", "dce", "thread", "peephole", "compact")
+
+_MAX_ROUNDS = 8
+
+
+class _Node:
+    def __init__(self, kind: InstructionKind, data=None, target: "_Node | None" = None, line: int | None = None):
+        self.kind = kind
+        self.data = data
+        # jump/call/enter_until destination, the offset inside data is stale until layout
+        self.target = target
+        self.line = line
+
+
+_JUMPS = (InstructionKind.jump, InstructionKind.jump_if, InstructionKind.jump_ifn, InstructionKind.call, InstructionKind.enter_until)
+# instructions that never continue to the next one
+_NO_FALLTHROUGH = (InstructionKind.jump, InstructionKind.ret, InstructionKind.kill, InstructionKind.restart_bot)
+
+
+def _offset(instr: Instruction) -> int:
+    match instr.kind:
+        case InstructionKind.jump | InstructionKind.call:
+            return instr.data
+        case InstructionKind.jump_if | InstructionKind.jump_ifn:
+            return instr.data[1]
+        case InstructionKind.enter_until:
+            return instr.data[2]
+    raise ValueError(f"Not a jump: {instr}")
+
+
+def _to_nodes(program: list[Instruction]) -> tuple[list[_Node], _Node]:
+    # the returned end node stands for "one past the last instruction"
+    nodes = [_Node(instr.kind, instr.data[:] if isinstance(instr.data, list) else instr.data, line=instr.line) for instr in program]
+    end = _Node(InstructionKind.nop)
+    for idx, instr in enumerate(program):
+        if instr.kind in _JUMPS:
+            dest = idx + _offset(instr)
+            nodes[idx].target = nodes[dest] if dest < len(nodes) else end
+    return nodes, end
+
+
+def _layout(nodes: list[_Node], end: _Node) -> list[Instruction]:
+    # jumping to the end needs a real instruction there, an until may exit to it before the VM notices the program is over
+    if any(node.target is end for node in nodes):
+        nodes = nodes + [end]
+    positions = {id(node): idx for idx, node in enumerate(nodes)}
+    program = []
+    for idx, node in enumerate(nodes):
+        data = node.data
+        if node.target is not None:
+            offset = positions[id(node.target)] - idx
+            match node.kind:
+                case InstructionKind.jump | InstructionKind.call:
+                    data = offset
+                case InstructionKind.jump_if | InstructionKind.jump_ifn:
+                    data = [data[0], offset]
+                case InstructionKind.enter_until:
+                    data = [data[0], data[1], offset]
+        program.append(Instruction(node.kind, data, node.line))
+    return program
+
+
+def _remove(nodes: list[_Node], end: _Node, removed: set[int]) -> list[_Node]:
+    # drops the nodes whose ids are in removed, jumps to them land on the next node that stays
+    if not removed:
+        return nodes
+    redirect = {}
+    following = end
+    for node in reversed(nodes):
+        if id(node) in removed:
+            redirect[id(node)] = following
+        else:
+            following = node
+    kept = [node for node in nodes if id(node) not in removed]
+    for node in kept:
+        if node.target is not None and id(node.target) in redirect:
+            node.target = redirect[id(node.target)]
+    return kept
+
+
+def _targets(nodes: list[_Node]) -> set[int]:
+    return {id(node.target) for node in nodes if node.target is not None}
+
+
+def fold_constants(nodes: list[_Node], end: _Node) -> list[_Node]:
+    # Conditions that fold to a constant become unconditional, operands that fold are replaced by their value
+    removed = set()
+    for node in nodes:
+        match node.kind:
+            case InstructionKind.jump_if | InstructionKind.jump_ifn:
+                value = fold(node.data[0])
+                if value is NOT_CONSTANT:
+                    node.data = [_fold_operand(node.data[0]), node.data[1]]
+                    continue
+                if bool(value) == (node.kind == InstructionKind.jump_if):
+                    node.kind = InstructionKind.jump
+                    node.data = None
+                else:
+                    removed.add(id(node))
+            case InstructionKind.sleep:
+                node.data = _fold_operand(node.data)
+            case InstructionKind.write_stack:
+                node.data = [node.data[0], _fold_operand(node.data[1])]
+            case InstructionKind.declare_constant:
+                node.data = [node.data[0], _fold_operand(node.data[1])]
+    return _remove(nodes, end, removed)
+
+
+def _fold_operand(expr: Expression) -> Expression:
+    # Parsed expressions are shared with the editor's incremental compile state, so they are replaced, never modified.
+    # Identifiers stay as they are since logging and constants treat them as names.
+    if isinstance(expr, (NumberExpression, StringExpression, IdentExpression)):
+        return expr
+    value = fold(expr)
+    if isinstance(value, bool) or value is NOT_CONSTANT:
+        return expr
+    if isinstance(value, (int, float)):
+        return NumberExpression(value)
+    if isinstance(value, str):
+        return StringExpression(value)
+    return expr
+
+
+def eliminate_dead_code(nodes: list[_Node], end: _Node) -> list[_Node]:
+    # Drops everything that can't be reached from the start of the program, ie. code after kill and blocks that are never called
+    if not nodes:
+        return nodes
+    next_node = {id(node): nodes[idx + 1] if idx + 1 < len(nodes) else end for idx, node in enumerate(nodes)}
+    reachable = set()
+    pending = [nodes[0]]
+    while pending:
+        node = pending.pop()
+        if node is end or id(node) in reachable:
+            continue
+        reachable.add(id(node))
+        if node.target is not None:
+            pending.append(node.target)
+        if node.kind not in _NO_FALLTHROUGH:
+            pending.append(next_node[id(node)])
+    return _remove(nodes, end, {id(node) for node in nodes if id(node) not in reachable})
+
+
+def _final_target(node: _Node) -> _Node:
+    seen = set()
+    target = node.target
+    while target.kind == InstructionKind.jump and id(target) not in seen:
+        seen.add(id(target))
+        target = target.target
+    return target
+
+
+def thread_jumps(nodes: list[_Node], end: _Node) -> list[_Node]:
+    # Jumps to jumps go straight to the final destination, jumps to ret/kill become that instruction
+    # and jumps to the very next instruction are dropped.
+    positions = {id(node): idx for idx, node in enumerate(nodes)}
+    positions[id(end)] = len(nodes)
+    for idx, node in enumerate(nodes):
+        if node.kind not in (InstructionKind.jump, InstructionKind.jump_if, InstructionKind.jump_ifn, InstructionKind.enter_until):
+            continue
+        target = _final_target(node)
+        if node.kind == InstructionKind.jump_if:
+            # a failing jump_if condition still takes forward jumps and falls through on backward ones (see VM.step),
+            # so the jump may only be threaded if that direction doesn't change
+            if (positions[id(target)] > idx) != (positions[id(node.target)] > idx):
+                continue
+        node.target = target
+        if node.kind == InstructionKind.jump and target.kind in (InstructionKind.ret, InstructionKind.kill):
+            node.kind = target.kind
+            node.data = target.data
+            node.target = None
+
+    removed = set()
+    for idx, node in enumerate(nodes):
+        following = nodes[idx + 1] if idx + 1 < len(nodes) else end
+        if node.kind == InstructionKind.jump and node.target is following:
+            removed.add(id(node))
+    return _remove(nodes, end, removed)
+
+
+def peephole(nodes: list[_Node], end: _Node) -> list[_Node]:
+    # push_stack; pop_stack -> nothing
+    # jump_if c, T; jump A; T: -> jump_ifn c, A; T:  (and the other way around for jump_ifn)
+    targeted = _targets(nodes)
+    positions = {id(node): idx for idx, node in enumerate(nodes)}
+    positions[id(end)] = len(nodes)
+    removed = set()
+    idx = 0
+    while idx + 1 < len(nodes):
+        first = nodes[idx]
+        second = nodes[idx + 1]
+        if id(second) in targeted or id(first) in removed:
+            idx += 1
+            continue
+        if first.kind == InstructionKind.push_stack and second.kind == InstructionKind.pop_stack:
+            removed.add(id(first))
+            removed.add(id(second))
+            idx += 2
+            continue
+        after = nodes[idx + 2] if idx + 2 < len(nodes) else end
+        if first.kind in (InstructionKind.jump_if, InstructionKind.jump_ifn) and second.kind == InstructionKind.jump \
+                and first.target is after and second.target is not after:
+            inverted = InstructionKind.jump_ifn if first.kind == InstructionKind.jump_if else InstructionKind.jump_if
+            # a failing jump_if only jumps forward, the failing jump_ifn this replaces fell through to the jump
+            if inverted == InstructionKind.jump_if and positions[id(second.target)] <= idx + 1:
+                idx += 1
+                continue
+            first.kind = inverted
+            first.target = second.target
+            removed.add(id(second))
+            idx += 2
+            continue
+        idx += 1
+    return _remove(nodes, end, removed)
+
+
+def compact_labels(nodes: list[_Node], end: _Node) -> list[_Node]:
+    # nops are left over from labels at the end of the program, layout adds one back only if something jumps there
+    return _remove(nodes, end, {id(node) for node in nodes if node.kind in (InstructionKind.nop, InstructionKind.label)})
+
+
+_pass_functions = {
+    "fold": fold_constants,
+    "dce": eliminate_dead_code,
+    "thread": thread_jumps,
+    "peephole": peephole,
+    "compact": compact_labels,
+}
+
+
+def optimize(program: list[Instruction], passes: Iterable[str] = OPTIMIZATION_PASSES) -> list[Instruction]:
+    # Runs the given passes (names from OPTIMIZATION_PASSES) until the program stops shrinking. Returns a new program.
+    passes = [name for name in OPTIMIZATION_PASSES if name in set(passes)]
+    if not passes or not program:
+        return program
+    nodes, end = _to_nodes(program)
+    for _ in range(_MAX_ROUNDS):
+        size = len(nodes)
+        for name in passes:
+            nodes = _pass_functions[name](nodes, end)
+        if len(nodes) == size:
+            break
+    return _layout(nodes, end)
@@ -0,0 +1,80 @@
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from .ir import Compiler, Instruction
+from .optimizer import OPTIMIZATION_PASSES
+
+
+# Compiles deimoslang scripts with and without the optimiser passes and reports how many instructions each pass removes.
+#   python -m src.deimoslang.optimizer_bench bot.txt other_bot.txt --repeat 5
+# Every pass is also run on its own, the "all" count is what Compiler builds by default (every pass, until nothing shrinks).
+# Compile times are the fastest of --repeat runs and bypass the program cache (cache.py).
+
+
+def _compile(code: str, passes) -> list[Instruction]:
+    return Compiler.from_text(code, passes=passes).compile()
+
+
+def _timed_compile(code: str, passes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _compile(code, passes)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_script(code: str, repeat: int) -> dict:
+    before = _compile(code, ())
+    after = _compile(code, OPTIMIZATION_PASSES)
+    kinds_before = Counter(instruction.kind.name for instruction in before)
+    kinds_after = Counter(instruction.kind.name for instruction in after)
+    return {
+        "lines": code.count("\n") + 1,
+        "instructions_before": len(before),
+        "instructions_after": len(after),
+        "instructions_per_pass": {name: len(_compile(code, (name,))) for name in OPTIMIZATION_PASSES},
+        # instruction kind -> how many more (or fewer, negative) there are after optimising, threading copies rets and kills
+        "change_by_kind": {kind: kinds_after[kind] - kinds_before[kind] for kind in kinds_before | kinds_after if kinds_before[kind] != kinds_after[kind]},
+        "compile_seconds_before": _timed_compile(code, (), repeat),
+        "compile_seconds_after": _timed_compile(code, OPTIMIZATION_PASSES, repeat),
+    }
+
+
+def report(name: str, data: dict) -> str:
+    before = data["instructions_before"]
+    after = data["instructions_after"]
+    saved = 1 - after / before if before else 0.0
+    lines = [
+        f"{name}: {data['lines']} lines",
+        f"    instructions: {before} -> {after} ({saved:.1%} fewer)",
+        "    alone: " + ", ".join(f"{name} {count}" for name, count in data["instructions_per_pass"].items()),
+        f"    compile: {data['compile_seconds_before'] * 1000:.2f}ms unoptimised, {data['compile_seconds_after'] * 1000:.2f}ms optimised",
+    ]
+    if data["change_by_kind"]:
+        changes = sorted(data["change_by_kind"].items(), key=lambda item: item[1])
+        lines.append("    by kind: " + ", ".join(f"{kind} {count:+d}" for kind, count in changes))
+    return "\n".join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Count the instructions the deimoslang optimiser removes")
+    arg_parser.add_argument("scripts", type=Path, nargs="+")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed compiles, the fastest is reported")
+    arg_parser.add_argument("--json", type=Path, help="also write the results as json")
+    args = arg_parser.parse_args()
+
+    results = {}
+    for path in args.scripts:
+        results[str(path)] = bench_script(path.read_text(), args.repeat)
+        print(report(str(path), results[str(path)]))
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
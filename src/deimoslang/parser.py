@@ -1311,6 +1311,12 @@ class Parser:
         return IdentExpression(result.literal)
 
     def parse_stmt(self) -> Stmt:
+        line = self.tokens[self.i].line_info.line
+        stmt = self._parse_stmt()
+        stmt.line = line
+        return stmt
+
+    def _parse_stmt(self) -> Stmt:
         match self.tokens[self.i].kind:
             case TokenKind.keyword_con:
                 self.i += 1
@@ -0,0 +1,167 @@
+import json
+from time import perf_counter
+
+from .ir import Instruction, InstructionKind
+
+
+# Opt-in instruction profiler for the VM, see VM.enable_profiler.
+# Every instruction the VM runs is timed and charged to its instruction index, its source line and the call stack
+# it ran under. Calls are tracked on a stack of their own since the task stack mixes return addresses with
+# variables: a frame is dropped once the task stack shrinks below the size it had right after the call, which
+# covers ret as well as an until that fires inside a called block.
+# Time spent parked after an instruction (sleep, waiting on an until) is charged to that instruction as wait time.
+
+_COMMAND_KINDS = (InstructionKind.deimos_call, InstructionKind.compound_deimos_call)
+
+
+class LineStats:
+    __slots__ = ("count", "seconds", "command_seconds", "read_seconds", "wait_seconds")
+
+    def __init__(self):
+        self.count = 0
+        # wall time of the instructions themselves, commands and reads included
+        self.seconds = 0.0
+        # part of seconds spent in deimos commands
+        self.command_seconds = 0.0
+        # part of seconds spent awaiting client reads that missed the read cache
+        self.read_seconds = 0.0
+        # time the task stayed parked after the instruction
+        self.wait_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Profiler:
+    def __init__(self, source: str = ""):
+        self.source_lines = source.splitlines()
+        self.clear()
+
+    def clear(self):
+        self.by_ip: dict[int, LineStats] = {}
+        # ip -> the instruction that ran there
+        self.instructions: dict[int, Instruction] = {}
+        self.by_line: dict[int | None, LineStats] = {}
+        # (call site lines..., line) -> stats, this is what the collapsed stacks are made of
+        self.by_stack: dict[tuple, LineStats] = {}
+        self.started = perf_counter()
+
+        # (call site line, task stack size after the call)
+        self._frames: list[tuple[int | None, int]] = []
+        self._ip = 0
+        self._instruction: Instruction | None = None
+        self._stack_key: tuple = ()
+        self._entered = 0.0
+        self._read_seconds = 0.0
+        # stats the next parked time is charged to, and when the task parked
+        self._parked: tuple[list[LineStats], float] | None = None
+
+    def enter(self, vm, instruction: Instruction):
+        now = perf_counter()
+        if self._parked is not None:
+            stats, parked_at = self._parked
+            for entry in stats:
+                entry.wait_seconds += now - parked_at
+            self._parked = None
+        task = vm.current_task
+        frames = self._frames
+        while frames and frames[-1][1] > len(task.stack):
+            frames.pop()
+        self._ip = task.ip
+        self._instruction = instruction
+        self.instructions[task.ip] = instruction
+        self._stack_key = tuple(line for line, _ in frames) + (instruction.line,)
+        self._read_seconds = vm.reads.fetch_seconds
+        self._entered = perf_counter()
+
+    def leave(self, vm):
+        instruction = self._instruction
+        if instruction is None:
+            return
+        elapsed = perf_counter() - self._entered
+        read_seconds = vm.reads.fetch_seconds - self._read_seconds
+        stats = [
+            self._stats(self.by_ip, self._ip),
+            self._stats(self.by_line, instruction.line),
+            self._stats(self.by_stack, self._stack_key),
+        ]
+        is_command = instruction.kind in _COMMAND_KINDS
+        for entry in stats:
+            entry.count += 1
+            entry.seconds += elapsed
+            entry.read_seconds += read_seconds
+            if is_command:
+                entry.command_seconds += elapsed
+        task = vm.current_task
+        if instruction.kind == InstructionKind.call and task.stack:
+            self._frames.append((instruction.line, len(task.stack)))
+        if task.wakeup is not None:
+            self._parked = (stats, perf_counter())
+        self._instruction = None
+
+    @staticmethod
+    def _stats(table: dict, key) -> LineStats:
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = LineStats()
+        return entry
+
+    def line_text(self, line: int | None) -> str:
+        if line is None or not 0 < line <= len(self.source_lines):
+            return "<generated>"
+        return self.source_lines[line - 1].strip()
+
+    def _frame_name(self, line: int | None) -> str:
+        # flamegraph tools split frames on ; and the count on the last space
+        if line is None:
+            return "<generated>"
+        return f"L{line} {self.line_text(line)}".replace(";", ",")
+
+    def collapsed(self, weight: str = "time") -> str:
+        # Collapsed stack format (flamegraph.pl, speedscope, inferno), one `frame;frame;... value` line per stack.
+        # weight is "time" (microseconds spent running), "wait" (microseconds including parked time) or "count".
+        result = []
+        for key, stats in self.by_stack.items():
+            match weight:
+                case "time":
+                    value = round(stats.seconds * 1e6)
+                case "wait":
+                    value = round((stats.seconds + stats.wait_seconds) * 1e6)
+                case "count":
+                    value = stats.count
+                case _:
+                    raise ValueError(f"Unknown weight: {weight}")
+            if value <= 0:
+                continue
+            frames = ";".join(self._frame_name(line) for line in key)
+            result.append(f"script;{frames} {value}")
+        result.sort()
+        return "\n".join(result) + "\n" if result else ""
+
+    def summary(self) -> dict:
+        lines = []
+        for line, stats in self.by_line.items():
+            entry = {"line": line, "source": self.line_text(line)}
+            entry.update(stats.as_dict())
+            lines.append(entry)
+        lines.sort(key=lambda entry: entry["seconds"], reverse=True)
+        instructions = []
+        for ip, stats in sorted(self.by_ip.items()):
+            instruction = self.instructions[ip]
+            entry = {"ip": ip, "kind": instruction.kind.name, "line": instruction.line}
+            entry.update(stats.as_dict())
+            instructions.append(entry)
+        return {
+            "elapsed_seconds": perf_counter() - self.started,
+            "instructions_run": sum(stats.count for stats in self.by_ip.values()),
+            "lines": lines,
+            "instructions": instructions,
+        }
+
+    def write_collapsed(self, path, weight: str = "time"):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed(weight))
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
@@ -0,0 +1,74 @@
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+
+# Client reads made while evaluating expressions are remembered until the VM invalidates them, which it does on every
+# step, before every until watcher poll and after commands that change the game. Within one of those ticks
+# `mass inzone X or mass incombat`, `healthabove 10 and healthbelow 50` and friends read each value once per client.
+
+# reads that are a single client call, shared by the VM and the expression evaluator
+CLIENT_QUERIES: dict[str, Callable[[Any], Awaitable[Any]]] = {
+    "zone_name": lambda client: client.zone_name(),
+    "in_battle": lambda client: client.in_battle(),
+    "is_loading": lambda client: client.is_loading(),
+    "is_in_dialog": lambda client: client.is_in_dialog(),
+    "position": lambda client: client.body.position(),
+    "yaw": lambda client: client.body.yaw(),
+    "backpack_space": lambda client: client.backpack_space(),
+}
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+class ReadCache:
+    def __init__(self):
+        self._values: dict[tuple, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # seconds spent awaiting the reads that missed
+        self.fetch_seconds = 0.0
+
+    def invalidate(self):
+        # a new dict rather than clear(), reads still in flight must not fill the next tick
+        self._values = {}
+        self.invalidations += 1
+
+    async def read(self, client, query, fetch: Callable[..., Awaitable[Any]], *args):
+        # fetch(client, *args) unless (client, query, args) was already read this tick
+        key = (client, query, *[_hashable(arg) for arg in args])
+        values = self._values
+        if key in values:
+            self.hits += 1
+            return values[key]
+        self.misses += 1
+        started = perf_counter()
+        try:
+            value = await fetch(client, *args)
+        finally:
+            self.fetch_seconds += perf_counter() - started
+        # an invalidation while fetching means the value may already be stale
+        if values is self._values:
+            values[key] = value
+        return value
+
+    def query(self, client, name: str) -> Awaitable[Any]:
+        return self.read(client, name, CLIENT_QUERIES[name])
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.fetch_seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"ReadCache(hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.1%}, invalidations={self.invalidations})"
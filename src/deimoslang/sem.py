@@ -207,6 +207,13 @@ class Analyzer:
         return None
 
     def sem_stmt(self, stmt: Stmt) -> Stmt:
+        result = self._sem_stmt(stmt)
+        # statements built here take the line of the one they replace
+        if result is not None and result.line is None:
+            result.line = stmt.line
+        return result
+
+    def _sem_stmt(self, stmt: Stmt) -> Stmt:
         match stmt:
             case TimerStmt():
                 return stmt
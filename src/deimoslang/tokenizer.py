@@ -1,4 +1,6 @@
+import re
 from enum import Enum, auto
+from functools import lru_cache
 from typing import Any
 
 
@@ -176,6 +178,8 @@ class TokenKind(Enum):
     END_FILE = auto()
 
 class LineInfo:
+    __slots__ = ("line", "column", "last_column", "filename", "last_line")
+
     def __init__(self, line: int, column: int, last_column: int, last_line: int | None = None, filename: str | None = None):
         self.line = line
         self.column = column
@@ -189,6 +193,8 @@ class LineInfo:
         return f"{self.line}:{self.column}-{self.last_column}"
 
 class Token:
+    __slots__ = ("kind", "literal", "value", "line_info")
+
     def __init__(self, kind: TokenKind, literal: str, line_info: LineInfo, value: Any | None = None):
         self.kind = kind
         self.literal = literal
@@ -213,414 +219,283 @@ def normalize_ident(dirty: str) -> str:
     return dirty.lower().replace("_", "")
 
 
+# Every token starts with one of these alternatives, tried left to right after skipping whitespace.
+# Words run until whitespace or one of "():[],`", but can't start with a character that has its own rule.
+_MASTER_RE = re.compile(r"""
+    \s*(?:
+        (?P<word>[^\s&:,+\-><=*/()\[\]{}"'`\#][^\s():\[\],`]*)
+      | (?P<op>&&|==|\*\*|//|[:,+\-><=*/()\[\]{}])
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<comment>\#)
+      | (?P<multiline>`)
+      | (?P<unclosed>["'])
+      | (?P<stray>&)
+    )
+""", re.VERBOSE)
+
+_OPERATORS: dict[str, TokenKind] = {
+    "&&": TokenKind.logical_and,
+    ":": TokenKind.colon,
+    ",": TokenKind.comma,
+    "+": TokenKind.plus,
+    "-": TokenKind.minus,
+    ">": TokenKind.greater,
+    "<": TokenKind.less,
+    "==": TokenKind.equals,
+    "=": TokenKind.equals,
+    "**": TokenKind.star_star,
+    "*": TokenKind.star,
+    "//": TokenKind.slash_slash,
+    "/": TokenKind.slash,
+    "(": TokenKind.paren_open,
+    ")": TokenKind.paren_close,
+    "[": TokenKind.square_open,
+    "]": TokenKind.square_close,
+    "{": TokenKind.curly_open,
+    "}": TokenKind.curly_close,
+}
+
+# keyed by normalize_ident of the word
+_WORDS: dict[str, TokenKind] = {
+    # keywords
+    "block": TokenKind.keyword_block,
+    "call": TokenKind.keyword_call,
+    "loop": TokenKind.keyword_loop,
+    "while": TokenKind.keyword_while,
+    "until": TokenKind.keyword_until,
+    "times": TokenKind.keyword_times,
+    "if": TokenKind.keyword_if,
+    "else": TokenKind.keyword_else,
+    "elif": TokenKind.keyword_elif,
+    "except": TokenKind.keyword_except,
+    "mass": TokenKind.keyword_mass,
+    "closestmob": TokenKind.keyword_mob, "mob": TokenKind.keyword_mob,
+    "quest": TokenKind.keyword_quest, "questpos": TokenKind.keyword_quest, "questposition": TokenKind.keyword_quest,
+    "icon": TokenKind.keyword_icon,
+    "ifneeded": TokenKind.keyword_ifneeded,
+    "completion": TokenKind.keyword_completion,
+    "xyz": TokenKind.keyword_xyz,
+    "orient": TokenKind.keyword_orient,
+    "not": TokenKind.keyword_not,
+    "return": TokenKind.keyword_return, "exitblock": TokenKind.keyword_return,
+    "break": TokenKind.keyword_break, "exitloop": TokenKind.keyword_break,
+    "mixin": TokenKind.keyword_mixin,
+    "and": TokenKind.keyword_and,
+    "or": TokenKind.keyword_or,
+    "anyplayer": TokenKind.keyword_any_player, "anyclient": TokenKind.keyword_any_player, "any": TokenKind.keyword_any_player,
+    "createtimer": TokenKind.keyword_settimer, "starttimer": TokenKind.keyword_settimer, "logtimer": TokenKind.keyword_settimer,
+    "endtimer": TokenKind.keyword_endtimer, "canceltimer": TokenKind.keyword_endtimer, "stoptimer": TokenKind.keyword_endtimer,
+    "sameany": TokenKind.keyword_same_any, "sameanyplayer": TokenKind.keyword_same_any, "sameanyclient": TokenKind.keyword_same_any,
+    "isbetween": TokenKind.keyword_isbetween, "between": TokenKind.keyword_isbetween,
+    "from": TokenKind.logical_from,
+    "to": TokenKind.logical_to,
+    "on": TokenKind.logical_on,
+    "off": TokenKind.logical_off,
+    "con": TokenKind.keyword_con, "set": TokenKind.keyword_con, "setvar": TokenKind.keyword_con, "var": TokenKind.keyword_con,
+    "True": TokenKind.boolean_true,
+    "False": TokenKind.boolean_false,
+    "$": TokenKind.keyword_constant_reference,
+    "rerun": TokenKind.command_restart_bot, "restart": TokenKind.command_restart_bot, "restartbot": TokenKind.command_restart_bot,
+    "startcounter": TokenKind.keyword_counter, "counter": TokenKind.keyword_counter, "createcounter": TokenKind.keyword_counter,
+    "endcounter": TokenKind.keyword_reset_counter, "deletecounter": TokenKind.keyword_reset_counter, "resetcounter": TokenKind.keyword_reset_counter,
+    "addone": TokenKind.keyword_addone_counter,
+    "minusone": TokenKind.keyword_minusone_counter,
+
+    # commands
+    "kill": TokenKind.command_kill, "killbot": TokenKind.command_kill, "stop": TokenKind.command_kill, "stopbot": TokenKind.command_kill, "end": TokenKind.command_kill, "exit": TokenKind.command_kill,
+    "sleep": TokenKind.command_sleep, "wait": TokenKind.command_sleep, "delay": TokenKind.command_sleep,
+    "log": TokenKind.command_log, "debug": TokenKind.command_log, "print": TokenKind.command_log,
+    "teleport": TokenKind.command_teleport, "tp": TokenKind.command_teleport, "setpos": TokenKind.command_teleport,
+    "goto": TokenKind.command_goto, "walkto": TokenKind.command_goto,
+    "sendkey": TokenKind.command_sendkey, "press": TokenKind.command_sendkey, "presskey": TokenKind.command_sendkey,
+    "waitfordialog": TokenKind.command_waitfor_dialog, "waitfordialogue": TokenKind.command_waitfor_dialog,
+    "waitforbattle": TokenKind.command_waitfor_battle, "waitforcombat": TokenKind.command_waitfor_battle,
+    "waitforzonechange": TokenKind.command_waitfor_zonechange,
+    "waitforfree": TokenKind.command_waitfor_free,
+    "waitforwindow": TokenKind.command_waitfor_window, "waitforpath": TokenKind.command_waitfor_window,
+    "usepotion": TokenKind.command_usepotion,
+    "buypotions": TokenKind.command_buypotions, "refillpotions": TokenKind.command_buypotions, "buypots": TokenKind.command_buypotions, "refillpots": TokenKind.command_buypotions,
+    "relog": TokenKind.command_relog, "logoutandin": TokenKind.command_relog,
+    "click": TokenKind.command_click,
+    "clickwindow": TokenKind.command_clickwindow,
+    "friendtp": TokenKind.command_friendtp, "friendteleport": TokenKind.command_friendtp,
+    "entitytp": TokenKind.command_entitytp, "entityteleport": TokenKind.command_entitytp,
+    "tozone": TokenKind.command_tozone,
+    "loadplaystyle": TokenKind.command_load_playstyle,
+    "turncam": TokenKind.command_set_yaw, "setcamyaw": TokenKind.command_set_yaw,
+    "nav": TokenKind.command_nav, "navtp": TokenKind.command_nav,
+    "getdeck": TokenKind.command_getdeck,
+    "setdeck": TokenKind.command_setdeck,
+    "selectfriend": TokenKind.command_select_friend, "choosefriend": TokenKind.command_select_friend,
+    "plustp": TokenKind.command_plus_teleport, "plusteleport": TokenKind.command_plus_teleport,
+    "minustp": TokenKind.command_minus_teleport, "minusteleport": TokenKind.command_minus_teleport,
+    "autopet": TokenKind.command_autopet, "toggleautopet": TokenKind.command_autopet,
+    "loggoal": TokenKind.command_set_goal,
+    "logquest": TokenKind.command_set_quest,
+    "logzone": TokenKind.command_set_zone,
+    "togglecombat": TokenKind.command_toggle_combat, "togglecombatmode": TokenKind.command_toggle_combat,
+    "cursor": TokenKind.command_move_cursor, "movecursor": TokenKind.command_move_cursor, "mousexy": TokenKind.command_move_cursor, "movemouse": TokenKind.command_move_cursor,
+    "cursorwindow": TokenKind.command_move_cursor_window, "mousewindow": TokenKind.command_move_cursor_window,
+
+    # expression commands
+    "contains": TokenKind.contains,
+    "windowvisible": TokenKind.command_expr_window_visible,
+    "inzone": TokenKind.command_expr_in_zone,
+    "samezone": TokenKind.command_expr_same_zone,
+    "playercount": TokenKind.command_expr_playercount, "clientcount": TokenKind.command_expr_playercount,
+    "playercountabove": TokenKind.command_expr_playercountabove, "clientcountabove": TokenKind.command_expr_playercountabove,
+    "playercountbelow": TokenKind.command_expr_playercountbelow, "clientcountbelow": TokenKind.command_expr_playercountbelow,
+    "trackingquest": TokenKind.command_expr_tracking_quest,
+    "trackinggoal": TokenKind.command_expr_tracking_goal,
+    "loading": TokenKind.command_expr_loading,
+    "incombat": TokenKind.command_expr_in_combat,
+    "hasdialogue": TokenKind.command_expr_has_dialogue,
+    "hasxyz": TokenKind.command_expr_has_xyz,
+    "healthbelow": TokenKind.command_expr_health_below,
+    "healthabove": TokenKind.command_expr_health_above,
+    "health": TokenKind.command_expr_health,
+    "manabelow": TokenKind.command_expr_mana_below,
+    "manaabove": TokenKind.command_expr_mana_above,
+    "mana": TokenKind.command_expr_mana,
+    "energybelow": TokenKind.command_expr_energy_below,
+    "energyabove": TokenKind.command_expr_energy_above,
+    "energy": TokenKind.command_expr_energy,
+    "bagcount": TokenKind.command_expr_bagcount,
+    "bagcountbelow": TokenKind.command_expr_bagcount_below,
+    "bagcountabove": TokenKind.command_expr_bagcount_above,
+    "gold": TokenKind.command_expr_gold,
+    "goldabove": TokenKind.command_expr_gold_above,
+    "goldbelow": TokenKind.command_expr_gold_below,
+    "windowdisabled": TokenKind.command_expr_window_disabled,
+    "sameplace": TokenKind.command_expr_same_place,
+    "windowtext": TokenKind.command_expr_window_text,
+    "potioncount": TokenKind.command_expr_potion_count,
+    "potioncountabove": TokenKind.command_expr_potion_countabove,
+    "potioncountbelow": TokenKind.command_expr_potion_countbelow,
+    "hasquest": TokenKind.command_expr_has_quest,
+    "inrange": TokenKind.command_expr_in_range,
+    "hasyaw": TokenKind.command_expr_has_yaw,
+    "sameyaw": TokenKind.command_expr_same_yaw,
+    "samexyz": TokenKind.command_expr_same_xyz,
+    "samequest": TokenKind.command_expr_same_quest,
+    "anyplayerlist": TokenKind.command_expr_any_player_list, "anyclientlist": TokenKind.command_expr_any_player_list,
+    "windownum": TokenKind.command_expr_window_num,
+    "itemdropped": TokenKind.command_expr_item_dropped,
+    "combatround": TokenKind.command_expr_duel_round, "duelround": TokenKind.command_expr_duel_round, "fightround": TokenKind.command_expr_duel_round,
+    "questchanged": TokenKind.command_expr_quest_changed,
+    "goalchanged": TokenKind.command_expr_goal_changed,
+    "zonechanged": TokenKind.command_expr_zone_changed,
+    "accountlevel": TokenKind.command_expr_account_level, "level": TokenKind.command_expr_account_level,
+}
+
+# a word is a number when nothing but numeric characters remain after dropping these
+_NUMBER_EXTRAS = str.maketrans("", "", ".e-%")
+
+
+@lru_cache(maxsize=4096)
+def _classify_word(full: str) -> tuple[TokenKind | None, Any]:
+    # (kind, value) of a word, or (None, error message). Scripts repeat the same few hundred words, so this is cached
+    stripped = full.translate(_NUMBER_EXTRAS)
+    if stripped == "" or stripped.isnumeric():
+        if '%' in full:
+            try:
+                return TokenKind.percent, Percent(float(full[:-1])/100)
+            except ValueError:
+                return None, "Unable to convert to percent"
+        try:
+            return TokenKind.number, float(full)
+        except ValueError:
+            return None, "Unable to convert to number"
+    elif "/" in full:
+        if full.endswith("/"):
+            return None, "Invalid path"
+        # the value is split per token so no two tokens share a list
+        return TokenKind.path, None
+    elif full[0].lower() == "p" and full[1:].isnumeric():
+        return TokenKind.player_num, int(full[1:])
+    # TODO: Implement wildcards in all stages
+    #elif full.lower() == "p?":
+    #    return TokenKind.player_wildcard, None
+    return _WORDS.get(normalize_ident(full), TokenKind.identifier), None
+
+
 class Tokenizer:
     def __init__(self):
         self._in_multiline_string = False
-        self._multiline_buffer = ""
+        # pieces of the open multiline string, joined once it closes
+        self._multiline_parts: list[str] = []
         self._multiline_start_line_info = LineInfo(0, 0, 0, 0)
 
-    def tokenize_line(self, l: str, line_num: int, filename: str | None = None) -> list[str]:
-        result = []
-        i = 0
+    def _close_multiline(self, tail: str, last_column: int, line_num: int) -> Token:
+        # tail is the rest of the string on this line, up to and including the closing backtick
+        self._multiline_parts.append(tail)
+        literal = "".join(self._multiline_parts)
+        line_info = self._multiline_start_line_info
+        line_info.last_column = last_column
+        line_info.last_line = line_num + 1
+        self._in_multiline_string = False
+        self._multiline_parts = []
+        return Token(TokenKind.string, literal, line_info, literal[1:-1])
 
-        def put_simple(kind: TokenKind, literal: str, value: Any = None):
-            nonlocal result, line_num, i, filename
-            line_info = LineInfo(line=line_num, column=i+1, last_column=i+len(literal)+1, filename=filename)
-            result.append(Token(kind, literal, line_info, value))
+    def tokenize_line(self, l: str, line_num: int, filename: str | None = None) -> list[Token]:
+        result = []
+        pos = 0
 
         def err(message: str, column_start: int):
             indent_start = " " * column_start
             raise TokenizerError(f"{message}\n{l}\n{indent_start}^\nLine: {line_num} | Column: {column_start+1}")
 
-        while i < len(l):
-            c = l[i]
-
-            if self._in_multiline_string:
-                self._multiline_buffer += c
-                if c == "`":
-                    self._multiline_start_line_info.last_column = i + 1
-                    self._multiline_start_line_info.last_line = line_num + 1
-                    result.append(Token(TokenKind.string, self._multiline_buffer, self._multiline_start_line_info, self._multiline_buffer[1:-1]))
-                    self._in_multiline_string = False
-                    self._multiline_buffer = ""
-                i += 1
+        if self._in_multiline_string:
+            end = l.find("`")
+            if end == -1:
+                self._multiline_parts.append(l)
+                return result
+            result.append(self._close_multiline(l[:end + 1], end + 1, line_num))
+            pos = end + 1
+
+        # END_LINE sits at the comment if there is one, otherwise at the end of the line
+        end_column = len(l)
+        while pos < end_column:
+            m = _MASTER_RE.match(l, pos)
+            if m is None:
+                # only trailing whitespace was left
+                break
+            kind = m.lastgroup
+            literal = m.group(kind)
+            i = m.start(kind)
+            pos = m.end()
+            # tokens are built inline, this loop is the hot path of script loading
+            if kind == "word":
+                token_kind, value = _classify_word(literal)
+                if token_kind is None:
+                    err(value, i)
+                if token_kind is TokenKind.path:
+                    value = literal.split("/")
+                result.append(Token(token_kind, literal, LineInfo(line_num, i+1, pos+1, filename=filename), value))
+            elif kind == "op":
+                result.append(Token(_OPERATORS[literal], literal, LineInfo(line_num, i+1, pos+1, filename=filename)))
+            elif kind == "string":
+                result.append(Token(TokenKind.string, literal, LineInfo(line_num, i+1, pos+1, filename=filename), literal[1:-1]))
+            elif kind == "comment":
+                end_column = i
+                break
+            elif kind == "multiline":
+                self._in_multiline_string = True
+                self._multiline_start_line_info = LineInfo(line=line_num, column=i+1, last_column=i+1, filename=filename)
+                end = l.find("`", pos)
+                if end == -1:
+                    self._multiline_parts = [l[i:]]
+                    # END_LINE is emitted by the line that closes the string
+                    return result
+                self._multiline_parts = []
+                result.append(self._close_multiline(l[i:end + 1], end + 1, line_num))
+                pos = end + 1
+            elif kind == "unclosed":
+                err(f"Unclosed string encountered", i)
             else:
-                match c:
-                    case "&":
-                        if i + 1 < len(l) and l[i + 1] == "&":
-                            put_simple(TokenKind.logical_and, "&&")
-                            i += 2
-                    case ":":
-                        put_simple(TokenKind.colon, c)
-                        i += 1
-                    case ",":
-                        put_simple(TokenKind.comma, c)
-                        i += 1
-                    case "+":
-                        put_simple(TokenKind.plus, c)
-                        i += 1
-                    case "-":
-                        put_simple(TokenKind.minus, c)
-                        i += 1
-                    case ">":
-                        put_simple(TokenKind.greater, c)
-                        i += 1
-                    case "<":
-                        put_simple(TokenKind.less, c)
-                        i += 1
-                    case "=":
-                        if i + 1 < len(l) and l[i + 1] == "=":
-                            put_simple(TokenKind.equals, "==")
-                            i += 2
-                        else:
-                            put_simple(TokenKind.equals, c)
-                            i += 1
-                    case "*":
-                        if i + 1 < len(l) and l[i + 1] == "*":
-                            put_simple(TokenKind.star_star, "**")
-                            i += 2
-                        else:
-                            put_simple(TokenKind.star, c)
-                            i += 1
-                    case "/":
-                        if i + 1 < len(l) and l[i + 1] == "/":
-                            put_simple(TokenKind.slash_slash, "//")
-                            i += 2
-                        else:
-                            put_simple(TokenKind.slash, c)
-                            i += 1
-                    case "(":
-                        put_simple(TokenKind.paren_open, c)
-                        i += 1
-                    case ")":
-                        put_simple(TokenKind.paren_close, c)
-                        i += 1
-                    case "[":
-                        put_simple(TokenKind.square_open, c)
-                        i += 1
-                    case "]":
-                        put_simple(TokenKind.square_close, c)
-                        i += 1
-                    case "{":
-                        put_simple(TokenKind.curly_open, c)
-                        i += 1
-                    case "}":
-                        put_simple(TokenKind.curly_close, c)
-                        i += 1
-
-                    case '"' | "'":
-                        quote_kind = c
-                        str_lit = c
-                        j = i + 1
-                        while j < len(l) and l[j] != quote_kind:
-                            str_lit += l[j]
-                            j += 1
-                        if j >= len(l):
-                            err(f"Unclosed string encountered", i)
-                        str_lit += l[j]
-                        j += 1
-                        put_simple(TokenKind.string, str_lit, str_lit[1:-1])
-                        i = j
-                    case "`":
-                        self._multiline_buffer = c
-                        self._in_multiline_string = True
-                        self._multiline_start_line_info = LineInfo(line=line_num, column=i+1, last_column=i+1, filename=filename)
-                        i += 1
-                    case "#":
-                        break
-
-                    case _:
-                        if c.isspace():
-                            i += 1
-                        else:
-                            full = ""
-                            j = i
-                            while j < len(l) and not (l[j].isspace() or l[j] in "():[],`"):
-                                full += l[j]
-                                j += 1
-
-                            if len(full) == 0:
-                                pass
-                            elif all([x.isnumeric() or x in ".e-%" for x in full]):
-                                if '%' in full:
-                                    try:
-                                        put_simple(TokenKind.percent, full, Percent(float(full[:-1])/100))
-                                    except ValueError:
-                                        err("Unable to convert to percent", i)
-                                else:
-                                    try:
-                                        put_simple(TokenKind.number, full, float(full))
-                                    except ValueError:
-                                        err("Unable to convert to number", i)
-                            elif "/" in full:
-                                if full.endswith("/"):
-                                    err("Invalid path", i)
-                                put_simple(TokenKind.path, full, full.split("/"))
-                            elif full[0].lower() == "p" and full[1:len(full)].isnumeric():
-                                put_simple(TokenKind.player_num, full, int(full[1:len(full)]))
-                            # TODO: Implement wildcards in all stages
-                            #elif full.lower() == "p?":
-                            #    put_simple(TokenKind.player_wildcard, full)
-                            else:
-                                match normalize_ident(full):
-                                    # keywords
-                                    case "block":
-                                        put_simple(TokenKind.keyword_block, full)
-                                    case "call":
-                                        put_simple(TokenKind.keyword_call, full)
-                                    case "loop":
-                                        put_simple(TokenKind.keyword_loop, full)
-                                    case "while":
-                                        put_simple(TokenKind.keyword_while, full)
-                                    case "until":
-                                        put_simple(TokenKind.keyword_until, full)
-                                    case "times":
-                                        put_simple(TokenKind.keyword_times, full)
-                                    case "if":
-                                        put_simple(TokenKind.keyword_if, full)
-                                    case "else":
-                                        put_simple(TokenKind.keyword_else, full)
-                                    case "elif":
-                                        put_simple(TokenKind.keyword_elif, full)
-                                    case "except":
-                                        put_simple(TokenKind.keyword_except, full)
-                                    case "mass":
-                                        put_simple(TokenKind.keyword_mass, full)
-                                    case "closestmob" | "mob":
-                                        put_simple(TokenKind.keyword_mob, full)
-                                    case "quest" | "questpos" | "questposition":
-                                        put_simple(TokenKind.keyword_quest, full)
-                                    case "icon":
-                                        put_simple(TokenKind.keyword_icon, full)
-                                    case "ifneeded":
-                                        put_simple(TokenKind.keyword_ifneeded, full)
-                                    case "completion":
-                                        put_simple(TokenKind.keyword_completion, full)
-                                    case "xyz":
-                                        put_simple(TokenKind.keyword_xyz, full)
-                                    case "orient":
-                                        put_simple(TokenKind.keyword_orient, full)
-                                    case "not":
-                                        put_simple(TokenKind.keyword_not, full)
-                                    case "return" | "exitblock":
-                                        put_simple(TokenKind.keyword_return, full)
-                                    case "break" | "exitloop":
-                                        put_simple(TokenKind.keyword_break, full)
-                                    case "mixin":
-                                        put_simple(TokenKind.keyword_mixin, full)
-                                    case "and":
-                                        put_simple(TokenKind.keyword_and, full)
-                                    case "or":
-                                        put_simple(TokenKind.keyword_or, full)
-                                    case "anyplayer" | "anyclient" | "any":
-                                        put_simple(TokenKind.keyword_any_player, full)
-                                    case "createtimer" | "starttimer" | "logtimer":
-                                        put_simple(TokenKind.keyword_settimer, full)
-                                    case "endtimer" | "canceltimer" | "stoptimer":
-                                        put_simple(TokenKind.keyword_endtimer, full)
-                                    case "sameany" | "sameanyplayer" | "sameanyclient":
-                                        put_simple(TokenKind.keyword_same_any, full)
-                                    case "isbetween" | "between":
-                                        put_simple(TokenKind.keyword_isbetween, full)
-                                    case "from":
-                                        put_simple(TokenKind.logical_from, full)
-                                    case "to":
-                                        put_simple(TokenKind.logical_to, full)
-                                    case "on":
-                                        put_simple(TokenKind.logical_on, full)
-                                    case "off":
-                                        put_simple(TokenKind.logical_off, full)
-                                    case "con" | "set" | "setvar" | "var":
-                                        put_simple(TokenKind.keyword_con, full)
-                                    case "True":
-                                        put_simple(TokenKind.boolean_true, full)
-                                    case "False":
-                                        put_simple(TokenKind.boolean_false, full)
-                                    case "$":
-                                        put_simple(TokenKind.keyword_constant_reference, full)
-                                    case "rerun" | "restart" | "restartbot":
-                                        put_simple(TokenKind.command_restart_bot, full)
-                                    case "startcounter" | "counter" | "createcounter":
-                                        put_simple(TokenKind.keyword_counter, full)
-                                    case "endcounter" | "deletecounter" | "resetcounter":
-                                        put_simple(TokenKind.keyword_reset_counter, full)
-                                    case "addone":
-                                        put_simple(TokenKind.keyword_addone_counter, full)
-                                    case "minusone":
-                                        put_simple(TokenKind.keyword_minusone_counter, full)
-
-                                    # commands
-                                    case "kill" | "killbot" | "stop" | "stopbot" | "end" | "exit":
-                                        put_simple(TokenKind.command_kill, full)
-                                    case "sleep" | "wait" | "delay":
-                                        put_simple(TokenKind.command_sleep, full)
-                                    case "log" | "debug" | "print":
-                                        put_simple(TokenKind.command_log, full)
-                                    case "teleport" | "tp" | "setpos":
-                                        put_simple(TokenKind.command_teleport, full)
-                                    case "goto" | "walkto":
-                                        put_simple(TokenKind.command_goto, full)
-                                    case "sendkey" | "press" | "presskey":
-                                        put_simple(TokenKind.command_sendkey, full)
-                                    case "waitfordialog" | "waitfordialogue":
-                                        put_simple(TokenKind.command_waitfor_dialog, full)
-                                    case "waitforbattle" | "waitforcombat":
-                                        put_simple(TokenKind.command_waitfor_battle, full)
-                                    case "waitforzonechange":
-                                        put_simple(TokenKind.command_waitfor_zonechange, full)
-                                    case "waitforfree":
-                                        put_simple(TokenKind.command_waitfor_free, full)
-                                    case "waitforwindow" | "waitforpath":
-                                        put_simple(TokenKind.command_waitfor_window, full)
-                                    case "usepotion":
-                                        put_simple(TokenKind.command_usepotion, full)
-                                    case "buypotions" | "refillpotions" | "buypots" | "refillpots":
-                                        put_simple(TokenKind.command_buypotions, full)
-                                    case "relog" | "logoutandin":
-                                        put_simple(TokenKind.command_relog, full)
-                                    case "click":
-                                        put_simple(TokenKind.command_click, full)
-                                    case "clickwindow":
-                                        put_simple(TokenKind.command_clickwindow, full)
-                                    case "friendtp" | "friendteleport":
-                                        put_simple(TokenKind.command_friendtp, full)
-                                    case "entitytp" | "entityteleport":
-                                        put_simple(TokenKind.command_entitytp, full)
-                                    case "tozone":
-                                        put_simple(TokenKind.command_tozone, full)
-                                    case "loadplaystyle":
-                                        put_simple(TokenKind.command_load_playstyle, full)
-                                    case "turncam" | "setcamyaw":
-                                        put_simple(TokenKind.command_set_yaw, full)
-                                    case "nav" | "navtp":
-                                        put_simple(TokenKind.command_nav, full) 
-                                    case "getdeck":
-                                        put_simple(TokenKind.command_getdeck, full)
-                                    case "setdeck":
-                                        put_simple(TokenKind.command_setdeck, full) 
-                                    case "selectfriend" | "choosefriend":
-                                        put_simple(TokenKind.command_select_friend, full)
-                                    case "plustp" | "plusteleport":
-                                        put_simple(TokenKind.command_plus_teleport, full)
-                                    case "minustp" | "minusteleport":
-                                        put_simple(TokenKind.command_minus_teleport, full)
-                                    case "autopet" | "toggleautopet":
-                                        put_simple(TokenKind.command_autopet, full)
-                                    case "loggoal":
-                                        put_simple(TokenKind.command_set_goal, full)
-                                    case "logquest":
-                                        put_simple(TokenKind.command_set_quest, full)
-                                    case "logzone":
-                                        put_simple(TokenKind.command_set_zone, full)
-                                    case "togglecombat" | "togglecombatmode":
-                                        put_simple(TokenKind.command_toggle_combat, full)
-                                    case "cursor" | "movecursor" | "mousexy" | "movemouse":
-                                        put_simple(TokenKind.command_move_cursor, full)
-                                    case "cursorwindow" | "mousewindow":
-                                        put_simple(TokenKind.command_move_cursor_window, full) 
-
-                                    # expression commands
-                                    case "contains":
-                                        put_simple(TokenKind.contains, full)
-                                    case "windowvisible":
-                                        put_simple(TokenKind.command_expr_window_visible, full)
-                                    case "inzone":
-                                        put_simple(TokenKind.command_expr_in_zone, full)
-                                    case "samezone":
-                                        put_simple(TokenKind.command_expr_same_zone, full)
-                                    case "playercount" | "clientcount":
-                                        put_simple(TokenKind.command_expr_playercount, full)
-                                    case "playercountabove" | "clientcountabove":
-                                        put_simple(TokenKind.command_expr_playercountabove, full)
-                                    case "playercountbelow" | "clientcountbelow":
-                                        put_simple(TokenKind.command_expr_playercountbelow, full)
-                                    case "trackingquest":
-                                        put_simple(TokenKind.command_expr_tracking_quest, full)
-                                    case "trackinggoal":
-                                        put_simple(TokenKind.command_expr_tracking_goal, full)
-                                    case "loading":
-                                        put_simple(TokenKind.command_expr_loading, full)
-                                    case "incombat":
-                                        put_simple(TokenKind.command_expr_in_combat, full)
-                                    case "hasdialogue":
-                                        put_simple(TokenKind.command_expr_has_dialogue, full)
-                                    case "hasxyz":
-                                        put_simple(TokenKind.command_expr_has_xyz, full)
-                                    case "healthbelow":
-                                        put_simple(TokenKind.command_expr_health_below, full)
-                                    case "healthabove":
-                                        put_simple(TokenKind.command_expr_health_above, full)
-                                    case "health":
-                                        put_simple(TokenKind.command_expr_health, full)
-                                    case "manabelow":
-                                        put_simple(TokenKind.command_expr_mana_below, full)
-                                    case "manaabove":
-                                        put_simple(TokenKind.command_expr_mana_above, full)
-                                    case "mana":
-                                        put_simple(TokenKind.command_expr_mana, full)
-                                    case "energybelow":
-                                        put_simple(TokenKind.command_expr_energy_below, full)
-                                    case "energyabove":
-                                        put_simple(TokenKind.command_expr_energy_above, full)
-                                    case "energy":
-                                        put_simple(TokenKind.command_expr_energy, full)
-                                    case "bagcount":
-                                        put_simple(TokenKind.command_expr_bagcount, full)
-                                    case "bagcountbelow":
-                                        put_simple(TokenKind.command_expr_bagcount_below, full)
-                                    case "bagcountabove":
-                                        put_simple(TokenKind.command_expr_bagcount_above, full)
-                                    case "gold":
-                                        put_simple(TokenKind.command_expr_gold, full)
-                                    case "goldabove":
-                                        put_simple(TokenKind.command_expr_gold_above, full)
-                                    case "goldbelow":
-                                        put_simple(TokenKind.command_expr_gold_below, full)
-                                    case "windowdisabled":
-                                        put_simple(TokenKind.command_expr_window_disabled, full)
-                                    case "sameplace":
-                                        put_simple(TokenKind.command_expr_same_place, full)
-                                    case "windowtext":
-                                        put_simple(TokenKind.command_expr_window_text, full)
-                                    case "potioncount":
-                                        put_simple(TokenKind.command_expr_potion_count, full)
-                                    case "potioncountabove":
-                                        put_simple(TokenKind.command_expr_potion_countabove, full)
-                                    case "potioncountbelow":
-                                        put_simple(TokenKind.command_expr_potion_countbelow, full)
-                                    case "hasquest":
-                                        put_simple(TokenKind.command_expr_has_quest, full)
-                                    case "inrange":
-                                        put_simple(TokenKind.command_expr_in_range, full)
-                                    case "hasyaw":
-                                        put_simple(TokenKind.command_expr_has_yaw, full)
-                                    case "sameyaw":
-                                        put_simple(TokenKind.command_expr_same_yaw, full)
-                                    case "samexyz":
-                                        put_simple(TokenKind.command_expr_same_xyz, full)
-                                    case "samequest":
-                                        put_simple(TokenKind.command_expr_same_quest, full)
-                                    case "anyplayerlist" | "anyclientlist":
-                                        put_simple(TokenKind.command_expr_any_player_list, full)
-                                    case "windownum":
-                                        put_simple(TokenKind.command_expr_window_num, full)
-                                    case "itemdropped":
-                                        put_simple(TokenKind.command_expr_item_dropped, full)
-                                    case "combatround" | "duelround" | "fightround":
-                                        put_simple(TokenKind.command_expr_duel_round, full)
-                                    case "questchanged":
-                                        put_simple(TokenKind.command_expr_quest_changed, full)
-                                    case "goalchanged":
-                                        put_simple(TokenKind.command_expr_goal_changed, full)
-                                    case "zonechanged":
-                                        put_simple(TokenKind.command_expr_zone_changed, full)
-                                    case "accountlevel" | "level":
-                                        put_simple(TokenKind.command_expr_account_level, full)
-                                    case _:
-                                        put_simple(TokenKind.identifier, full)
-                            i = j
-        if not self._in_multiline_string:
-            put_simple(TokenKind.END_LINE, "")
+                err(f"Unexpected character: &", i)
+
+        result.append(Token(TokenKind.END_LINE, "", LineInfo(line_num, end_column+1, end_column+1, filename=filename)))
         return result
 
     def tokenize(self, contents: str, filename: str | None = None) -> list[Token]:
@@ -628,13 +503,13 @@ class Tokenizer:
         for line_num, line in enumerate(contents.splitlines()):
             toks = self.tokenize_line(line, line_num+1, filename=filename)
             if self._in_multiline_string:
-                self._multiline_buffer += "\n"
+                self._multiline_parts.append("\n")
             elif len(toks) == 1:
                 # only end line
                 continue
             result.extend(toks)
         if self._in_multiline_string:
-            raise TokenizerError(f"Unclosed multiline string: {self._multiline_buffer} {self._multiline_start_line_info}")
+            raise TokenizerError(f"Unclosed multiline string: {''.join(self._multiline_parts)} {self._multiline_start_line_info}")
         return result
 
 
@@ -0,0 +1,143 @@
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from .tokenizer import Tokenizer
+
+
+# Times the tokenizer on generated scripts of growing size, lexing should scale linearly with the script.
+#   python -m src.deimoslang.tokenizer_bench --sizes 16 160 1600 --repeat 5
+#   python -m src.deimoslang.tokenizer_bench --write corpus/   (keeps the generated scripts)
+# Scripts are made of the statements real bots use, nested in blocks and loops, plus some multiline strings.
+# The same seed always generates the same corpus.
+
+_STATEMENTS = [
+    'log "{word} {n}"',
+    "sleep {f}",
+    "sendkey {key}, {f}",
+    "p{p} tp xyz({n}, -{f}, {n})",
+    "p{p}:p{q} goto xyz({n}, {f}, 0)",
+    "tozone WizardCity/WC_{word}",
+    "clickwindow [\"WorldView\", \"btn{word}\"]",
+    "usepotion",
+    "call {block}",
+    "starttimer t{n}",
+    "endtimer t{n}",
+    "log health",
+    "# {word} {word} {word}",
+]
+_CONDITIONS = [
+    "healthbelow {n}%",
+    "p{p} inzone WizardCity/WC_{word}",
+    "mass incombat",
+    "not windowvisible [\"WorldView\", \"btn{word}\"]",
+    "any manaabove {n} and goldbelow {n} or not loading",
+    "sameany incombat",
+]
+_WORDS = ["Hub", "Ravenwood", "Ok", "Shopping", "Golem", "Tower", "Unicorn", "Way", "Commons", "Cave"]
+_KEYS = ["W", "A", "S", "D", "X", "SPACEBAR"]
+
+
+def _fill(template: str, rng: random.Random, blocks: list[str]) -> str:
+    return template.format(
+        word=rng.choice(_WORDS),
+        n=rng.randint(0, 5000),
+        f=round(rng.uniform(0, 10), 2),
+        key=rng.choice(_KEYS),
+        p=rng.randint(1, 4),
+        q=rng.randint(1, 4),
+        block=rng.choice(blocks) if blocks else "",
+    )
+
+
+def _body(rng: random.Random, blocks: list[str], depth: int, lines: list[str]):
+    indent = "    " * depth
+    for _ in range(rng.randint(2, 8)):
+        roll = rng.random()
+        if depth < 4 and roll < 0.25:
+            kind = rng.choice(["if", "while", "until", "times", "loop"])
+            if kind == "times":
+                lines.append(f"{indent}times {rng.randint(2, 9)} {{")
+            elif kind == "loop":
+                lines.append(f"{indent}loop {{")
+            else:
+                lines.append(f"{indent}{kind} {_fill(rng.choice(_CONDITIONS), rng, blocks)} {{")
+            _body(rng, blocks, depth + 1, lines)
+            if kind == "if" and rng.random() < 0.5:
+                lines.append(f"{indent}}} else {{")
+                _body(rng, blocks, depth + 1, lines)
+            lines.append(f"{indent}}}")
+        elif roll < 0.27:
+            text = "\n".join(_fill("{word} {n} {f}", rng, blocks) for _ in range(rng.randint(3, 20)))
+            lines.append(f"{indent}log `{text}`")
+        else:
+            # only blocks defined further up can be called
+            statements = _STATEMENTS if blocks else _STATEMENTS[:-5] + _STATEMENTS[-4:]
+            lines.append(indent + _fill(rng.choice(statements), rng, blocks))
+
+
+def generate_script(size: int, seed: int = 0) -> str:
+    # a script of at least size bytes, blocks of statements until it is big enough
+    rng = random.Random(seed)
+    lines = ["# generated by tokenizer_bench"]
+    blocks: list[str] = []
+    length = 0
+    while length < size:
+        name = f"block_{len(blocks)}"
+        start = len(lines)
+        lines.append(f"block {name} {{")
+        _body(rng, blocks, 1, lines)
+        lines.append("}")
+        blocks.append(name)
+        length += sum(len(line) + 1 for line in lines[start:])
+    lines.append(f"call {blocks[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def bench_script(code: str, repeat: int) -> dict:
+    best = float("inf")
+    tokens = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        tokens = len(Tokenizer().tokenize(code))
+        best = min(best, time.perf_counter() - started)
+    return {"bytes": len(code.encode()), "lines": code.count("\n"), "tokens": tokens, "seconds": best}
+
+
+def report(name: str, data: dict) -> str:
+    return (
+        f"{name}: {data['bytes'] / 1000:.0f} kB, {data['lines']} lines, {data['tokens']} tokens: {data['seconds'] * 1000:.1f}ms, "
+        f"{data['bytes'] / data['seconds'] / 1e6:.2f} MB/s"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the deimoslang tokenizer on generated scripts")
+    arg_parser.add_argument("scripts", type=Path, nargs="*", help="scripts to time as well")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[16, 160, 1600], help="generated script sizes in kB")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=5, help="timed runs, the fastest is reported")
+    arg_parser.add_argument("--write", type=Path, help="folder to write the generated scripts to")
+    arg_parser.add_argument("--json", type=Path, help="also write the results as json")
+    args = arg_parser.parse_args()
+
+    inputs = {f"generated {size} kB": generate_script(size * 1000, args.seed) for size in args.sizes}
+    if args.write is not None:
+        args.write.mkdir(parents=True, exist_ok=True)
+        for size, code in zip(args.sizes, inputs.values()):
+            (args.write / f"generated_{size}kb.txt").write_text(code)
+    inputs.update({str(path): path.read_text() for path in args.scripts})
+
+    results = {}
+    for name, code in inputs.items():
+        results[name] = bench_script(code, args.repeat)
+        print(report(name, results[name]))
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -369,6 +369,9 @@ class Eval(Expression):
         return f"Eval({self.kind})"
 
 class Stmt:
+    # source line the statement starts on, None for statements the analyzer made up
+    line: int | None = None
+
     def __init__(self) -> None:
         pass
 
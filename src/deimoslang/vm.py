@@ -1,70 +1,132 @@
 import asyncio
 import re
+from collections import deque
 from asyncio import Task as AsyncTask, TaskGroup
 
-from wizwalker import AddressOutOfRange, Client, XYZ, Keycode, MemoryReadError, Primitive
-from wizwalker.memory import DynamicClientObject
-from wizwalker.memory.memory_objects.quest_data import QuestData, GoalData
-from wizwalker.extensions.wizsprinter import SprintyClient
-from wizwalker.extensions.wizsprinter.wiz_sprinter import Coroutine, upgrade_clients
-from wizwalker.extensions.wizsprinter.wiz_navigator import toZone
-from wizwalker.extensions.scripting.deck_builder import DeckBuilder
-from src.teleport_math import navmap_tp, calc_Distance
-from src.deck_encoder import DeckEncoderDecoder
-
-from wizwalker.extensions.scripting.utils import _maybe_get_named_window, _cycle_to_online_friends, _click_on_friend, _friend_list_entry
-from src.utils import _cycle_friends_list
-
 from .tokenizer import *
 from .parser import *
 from .ir import *
-
-from src.drop_logger import get_chat, filter_drops, find_new_stuff
-from src.auto_pet import dancedance
-from src.dance_game_hook import attempt_activate_dance_hook
-from src.utils import is_visible_by_path, is_free, get_window_from_path, refill_potions, refill_potions_if_needed \
-                    , logout_and_in, click_window_by_path, get_quest_name
-from src.command_parser import teleport_to_friend_from_list
-from src.config_combat import delegate_combat_configs, default_config
+from .cache import compile_program
+from .consteval import VMError
+from .evaluator import ExpressionCompiler
+from .watchers import UntilInfo, UNTIL_POLL_INTERVAL, watch_until, unwatch_until
+from .readcache import ReadCache
+from .profiler import Profiler
+
+from .game import (
+    Client, XYZ, Keycode, MemoryReadError, QuestData, SprintyClient, upgrade_clients, toZone, DeckBuilder,
+    navmap_tp, calc_Distance, _maybe_get_named_window, _cycle_to_online_friends, _click_on_friend, _cycle_friends_list,
+    get_chat, filter_drops, find_new_stuff, dancedance, attempt_activate_dance_hook,
+    is_visible_by_path, is_free, get_window_from_path, refill_potions, refill_potions_if_needed,
+    logout_and_in, click_window_by_path, get_quest_name, teleport_to_friend_from_list,
+    delegate_combat_configs, default_config,
+)
+from src.deck_encoder import DeckEncoderDecoder
 
 from loguru import logger
 
+# instructions a VM runs back to back before it lets the rest of the event loop run
+STEPS_PER_SLICE = 32
+
+
 class Task:
     def __init__(self, stack=None, ip=0):
         self.stack = stack or []
         self.ip = ip
         self.running = True  # Task is active unless marked otherwise
         self.waitfor:AsyncTask|None = None
+        # future the task is parked on, it is out of the ready queue until that resolves
+        self.wakeup: asyncio.Future | None = None
 
 class Scheduler:
+    # Runnable tasks wait in a ready queue and take turns one instruction at a time. A task that blocks (sleep, an
+    # empty loop waiting for its until) is parked on a future instead of being stepped over and over, so a VM whose
+    # tasks are all blocked awaits on the event loop without using any CPU.
     def __init__(self):
         # a task represents a stack
         self.tasks:list[Task] = []
-        self.current_task_index = 0
+        self.ready: deque[Task] = deque()
+        self.steps_per_slice = STEPS_PER_SLICE
+        self._slice_steps = 0
+        self._ready_event = asyncio.Event()
+        self._interrupted = False
 
     def add_task(self, task):
         self.tasks.append(task)
+        self.ready.append(task)
+        self._ready_event.set()
 
     def remove_task(self, task):
+        self.wake(task)
         self.tasks.remove(task)
+        if task in self.ready:
+            self.ready.remove(task)
+
+    def clear(self):
+        for task in self.tasks[:]:
+            self.remove_task(task)
 
     def get_current_task(self):
-        return self.tasks[self.current_task_index]
+        if self.ready:
+            return self.ready[0]
+        return self.tasks[0]
 
     def switch_task(self):
-        self.current_task_index = (self.current_task_index + 1) % len(self.tasks)
+        self.ready.rotate(-1)
+
+    def park(self, task: Task, wakeup: asyncio.Future):
+        task.wakeup = wakeup
+        if task in self.ready:
+            self.ready.remove(task)
+        wakeup.add_done_callback(lambda _: self._resume(task, wakeup))
+
+    def sleep(self, task: Task, seconds: float):
+        # parks task for seconds, the timer is set right away so the time it takes to get back to the task doesn't add up
+        loop = asyncio.get_running_loop()
+        wakeup = loop.create_future()
+        timer = loop.call_later(max(seconds, 0), lambda: wakeup.done() or wakeup.set_result(None))
+        wakeup.add_done_callback(lambda _: timer.cancel())
+        self.park(task, wakeup)
+
+    def wake(self, task: Task):
+        # makes a parked task ready again right away, whatever it was waiting for
+        wakeup = task.wakeup
+        if wakeup is None:
+            return
+        self._resume(task, wakeup)
+        wakeup.cancel()
 
+    def wake_all(self):
+        for task in self.tasks:
+            self.wake(task)
 
-class VMError(Exception):
-    pass
+    def interrupt(self):
+        # lets next_slice return while every task is parked, without waking any of them
+        self._interrupted = True
+        self._ready_event.set()
 
+    def idle(self) -> bool:
+        return not self.ready and any(task.wakeup is not None for task in self.tasks)
 
-class UntilInfo:
-    def __init__(self, expr: Expression, id: int, exit_point: int, stack_size: int):
-        self.expr = expr
-        self.id = id
-        self.exit_point = exit_point
-        self.stack_size = stack_size
+    def _resume(self, task: Task, wakeup: asyncio.Future):
+        if task.wakeup is not wakeup:
+            return
+        task.wakeup = None
+        if task in self.tasks and task not in self.ready:
+            self.ready.append(task)
+        self._ready_event.set()
+
+    async def next_slice(self):
+        # Yields to the event loop every steps_per_slice steps and waits while every task is parked
+        self._slice_steps += 1
+        if self._slice_steps >= self.steps_per_slice:
+            self._slice_steps = 0
+            await asyncio.sleep(0)
+        while self.idle() and not self._interrupted:
+            self._ready_event.clear()
+            await self._ready_event.wait()
+            self._slice_steps = 0
+        self._interrupted = False
 
 
 class VM:
@@ -88,18 +150,30 @@ class VM:
             'False': False,
         } 
 
-        # Every until loop condition must be checked for every vm step.
+        # Until conditions are polled by watchers (see watchers.py) which set _until_fired once one of them holds.
         # Once a condition becomes True, all untils that were entered later must be exited and removed.
         # This means that the stack must be rolled back to the index stored here and the rhs of this list is discarded.
         self._until_infos: list[UntilInfo] = []
+        self._until_fired = False
+        # raised by the watchers of untils that are evaluated on the VM's step (see _check_due_untils)
+        self._until_due = False
+        self.until_poll_interval = UNTIL_POLL_INTERVAL
+
+        self._evaluator = ExpressionCompiler(self)
+        # client reads shared by everything evaluated within one step, exposes hit/miss counters
+        self.reads = ReadCache()
+
+        # set by enable_profiler, every step checks it so it must stay a plain attribute
+        self.profiler: Profiler | None = None
+        self._source = ""
 
     def reset(self):
         self.program = []
-        for _ in self._scheduler.tasks:
-            self._scheduler.tasks.pop()
+        self._evaluator.clear()
+        self._release_untils(0)
+        self._scheduler.clear()
         self._scheduler.add_task(Task())
         self.current_task = self._scheduler.get_current_task()
-        self._until_infos = []
         self._timers = {}
         self._any_player_client = []
         self._constants = {
@@ -115,6 +189,9 @@ class VM:
 
     def stop(self):
         self.running = False
+        self._release_untils(0)
+        # a step waiting on parked tasks returns once they are woken
+        self._scheduler.wake_all()
 
     def kill(self):
         self.stop()
@@ -128,10 +205,22 @@ class VM:
         self._constants[name] = value
 
     def load_from_text(self, code: str):
-        compiler = Compiler.from_text(code)
-        self.program = compiler.compile()
+        # the compiled program is shared with every other VM running the same script, never modify it
+        self.program = compile_program(code)
+        self._source = code
+        self._evaluator.clear()
         #self.program = self.test_program
 
+    def enable_profiler(self) -> Profiler:
+        # profiles everything the VM runs from now on, see profiler.py
+        self.profiler = Profiler(self._source)
+        return self.profiler
+
+    def disable_profiler(self) -> Profiler | None:
+        profiler = self.profiler
+        self.profiler = None
+        return profiler
+
     def player_by_num(self, num: int) -> SprintyClient:
         i = num - 1
         if i >= len(self._clients):
@@ -339,7 +428,7 @@ class VM:
                 logger.error(f"Failed to extract zone name: {e}")
                 return str(data)
 
-    async def _eval_command_expression(self, expression: CommandExpression):
+    async def _eval_command_expression(self, expression: CommandExpression, clients: list[SprintyClient] | None = None):
         assert expression.command.kind == CommandKind.expr
         assert type(expression.command.data) is list
 
@@ -351,7 +440,8 @@ class VM:
 
         selector = expression.command.player_selector
         assert selector is not None
-        clients = self._select_players(selector)
+        if clients is None:
+            clients = self._select_players(selector)
         
         # If no clients match the selector and it's not an any_player selector, return False
         if not clients and not selector.any_player:
@@ -384,7 +474,7 @@ class VM:
                     found_any = False
                     
                     for client in self._clients:
-                        current_zone = await client.zone_name()
+                        current_zone = await self.reads.query(client, "zone_name")
                         last_zone = self.logged_data['zone'].get(client.title, None)
                         
                         if current_zone is None:
@@ -408,7 +498,7 @@ class VM:
                     all_valid = True
                     
                     for client in clients:
-                        current_zone = await client.zone_name()
+                        current_zone = await self.reads.query(client, "zone_name")
                         last_zone = self.logged_data['zone'].get(client.title, None)
                         
                         if current_zone is None:
@@ -448,7 +538,7 @@ class VM:
                     found_any = False
                     
                     for client in self._clients:
-                        current_goal = await self._fetch_tracked_goal_text(client)
+                        current_goal = await self.reads.read(client, "tracked_goal_text", self._fetch_tracked_goal_text)
                         if current_goal is not None:
                             current_goal = current_goal.lower()
                         last_goal = self.logged_data['goal'].get(client.title, None)
@@ -471,7 +561,7 @@ class VM:
                     all_valid = True
                     
                     for client in clients:
-                        current_goal = await self._fetch_tracked_goal_text(client)
+                        current_goal = await self.reads.read(client, "tracked_goal_text", self._fetch_tracked_goal_text)
                         if current_goal is not None:
                             current_goal = current_goal.lower()
                         last_goal = self.logged_data['goal'].get(client.title, None)
@@ -507,7 +597,7 @@ class VM:
                         self._any_player_client = []
                         found_any = False
                         for client in self._clients:
-                            current_quest = await self._fetch_tracked_quest_text(client)
+                            current_quest = await self.reads.read(client, "tracked_quest_text", self._fetch_tracked_quest_text)
                             if current_quest is not None:
                                 current_quest = current_quest.lower()
                             last_quest = self.logged_data['quest'].get(client.title, None)
@@ -520,7 +610,7 @@ class VM:
                     else:
                         all_match = True
                         for client in clients:
-                            current_quest = await self._fetch_tracked_quest_text(client)
+                            current_quest = await self.reads.read(client, "tracked_quest_text", self._fetch_tracked_quest_text)
                             if current_quest is not None:
                                 current_quest = current_quest.lower()
                             last_quest = self.logged_data['quest'].get(client.title, None)
@@ -536,7 +626,7 @@ class VM:
                         self._any_player_client = []
                         found_any = False
                         for client in self._clients:
-                            current_quest = await self._fetch_tracked_quest_text(client)
+                            current_quest = await self.reads.read(client, "tracked_quest_text", self._fetch_tracked_quest_text)
                             if current_quest is not None:
                                 current_quest = current_quest.lower()
                             last_quest = self.logged_data['quest'].get(client.title, None)
@@ -551,7 +641,7 @@ class VM:
                     else:
                         all_changed = True
                         for client in clients:
-                            current_quest = await self._fetch_tracked_quest_text(client)
+                            current_quest = await self.reads.read(client, "tracked_quest_text", self._fetch_tracked_quest_text)
                             if current_quest is not None:
                                 current_quest = current_quest.lower()
                             last_quest = self.logged_data['quest'].get(client.title, None)
@@ -571,14 +661,14 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        current_round = await self._check_duel_round(client)
+                        current_round = await self.reads.read(client, "duel_round", self._check_duel_round)
                         if current_round == expected_round:
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
                 else:
                     for client in clients:
-                        current_round = await self._check_duel_round(client)
+                        current_round = await self.reads.read(client, "duel_round", self._check_duel_round)
                         if current_round != expected_round:
                             return False
                     return True
@@ -607,7 +697,7 @@ class VM:
                     for client in self._clients:
                         if isinstance(path, IdentExpression):
                             path = await self.eval(path)
-                        if await is_visible_by_path(client, path):
+                        if await self.reads.read(client, "window_visible", is_visible_by_path, path):
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
@@ -615,7 +705,7 @@ class VM:
                     for client in clients:
                         if isinstance(path, IdentExpression):
                             path = await self.eval(path)
-                        if not await is_visible_by_path(client, path):
+                        if not await self.reads.read(client, "window_visible", is_visible_by_path, path):
                             return False
                     return True
             case ExprKind.window_disabled:
@@ -701,7 +791,7 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        zone = await client.zone_name()
+                        zone = await self.reads.query(client, "zone_name")
                         expected = await self._extract_data_info(expression.command.data[1])
                         if expected == zone:
                             self._any_player_client.append(client)
@@ -709,7 +799,7 @@ class VM:
                     return found_any
                 else:
                     for client in clients:
-                        zone = await client.zone_name()
+                        zone = await self.reads.query(client, "zone_name")
                         expected = await self._extract_data_info(expression.command.data[1])
                         if expected != zone:
                             return False
@@ -717,27 +807,27 @@ class VM:
             case ExprKind.same_zone:
                 if len(clients) == 0:
                     return True
-                expected_zone = await clients[0].zone_name()
+                expected_zone = await self.reads.query(clients[0], "zone_name")
                 for client in clients[1:]:
-                    if await client.zone_name() != expected_zone:
+                    if await self.reads.query(client, "zone_name") != expected_zone:
                         return False
                 return True
             case ExprKind.same_quest:
                 if len(clients) == 0:
                     return True
-                expected_quest_text = await self._fetch_tracked_quest_text(clients[0])
+                expected_quest_text = await self.reads.read(clients[0], "tracked_quest_text", self._fetch_tracked_quest_text)
                 for client in clients[1:]:
-                    quest_text = await self._fetch_tracked_quest_text(client)
+                    quest_text = await self.reads.read(client, "tracked_quest_text", self._fetch_tracked_quest_text)
                     if expected_quest_text != quest_text:
                         return False
                 return True
             case ExprKind.same_yaw:
                 if len(clients) == 0:
                     return True
-                expected_yaw = await clients[0].body.yaw()
+                expected_yaw = await self.reads.query(clients[0], "yaw")
                 rounded_expected_yaw = round(expected_yaw, 1)
                 for client in clients[1:]:
-                    yaw = await client.body.yaw()
+                    yaw = await self.reads.query(client, "yaw")
                     rounded_client_yaw = round(yaw, 1)
                     if rounded_expected_yaw != rounded_client_yaw:
                         return False
@@ -745,9 +835,9 @@ class VM:
             case ExprKind.same_xyz:
                 if len(clients) == 0:
                     return True
-                expected_pos = await clients[0].body.position()
+                expected_pos = await self.reads.query(clients[0], "position")
                 for client in clients[1:]:
-                    pos = await client.body.position()
+                    pos = await self.reads.query(client, "position")
                     distance = calc_Distance(expected_pos, pos)
                     if distance > 5.0: 
                         return False
@@ -770,14 +860,14 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        name = await self._fetch_tracked_quest_text(client)
+                        name = await self.reads.read(client, "tracked_quest_text", self._fetch_tracked_quest_text)
                         if name == expected_text:
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
                 else:
                     for client in clients:
-                        name = await self._fetch_tracked_quest_text(client)
+                        name = await self.reads.read(client, "tracked_quest_text", self._fetch_tracked_quest_text)
                         if name != expected_text:
                             return False
                     return True
@@ -788,14 +878,14 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        text = await self._fetch_tracked_goal_text(client)
+                        text = await self.reads.read(client, "tracked_goal_text", self._fetch_tracked_goal_text)
                         if text == expected_text:
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
                 else:
                     for client in clients:
-                        text = await self._fetch_tracked_goal_text(client)
+                        text = await self.reads.read(client, "tracked_goal_text", self._fetch_tracked_goal_text)
                         if text != expected_text:
                             return False
                     return True
@@ -804,13 +894,13 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        if await client.is_loading():
+                        if await self.reads.query(client, "is_loading"):
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
                 else:
                     for client in clients:
-                        if not await client.is_loading():
+                        if not await self.reads.query(client, "is_loading"):
                             return False
                     return True
             case ExprKind.in_combat:
@@ -818,13 +908,13 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        if await client.in_battle():
+                        if await self.reads.query(client, "in_battle"):
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
                 else:
                     for client in clients:
-                        if not await client.in_battle():
+                        if not await self.reads.query(client, "in_battle"):
                             return False
                     return True
             case ExprKind.has_quest:
@@ -834,7 +924,7 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        for _, quest in await self._fetch_quests(client):
+                        for _, quest in await self.reads.read(client, "quests", self._fetch_quests):
                             if await self._fetch_quest_text(client, quest) == expected_text:
                                 self._any_player_client.append(client)
                                 found_any = True
@@ -843,7 +933,7 @@ class VM:
                 else:
                     for client in clients:
                         found = False
-                        for _, quest in await self._fetch_quests(client):
+                        for _, quest in await self.reads.read(client, "quests", self._fetch_quests):
                             if await self._fetch_quest_text(client, quest) == expected_text:
                                 found = True
                                 break
@@ -855,13 +945,13 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        if await client.is_in_dialog():
+                        if await self.reads.query(client, "is_in_dialog"):
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
                 else:
                     for client in clients:
-                        if not await client.is_in_dialog():
+                        if not await self.reads.query(client, "is_in_dialog"):
                             return False
                     return True
             case ExprKind.has_xyz:
@@ -873,14 +963,14 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        client_pos = await client.body.position()
+                        client_pos = await self.reads.query(client, "position")
                         if abs(target_pos - client_pos) <= 1:
                             self._any_player_client.append(client)
                             found_any = True
                     return found_any
                 else:
                     for client in clients:
-                        client_pos = await client.body.position()
+                        client_pos = await self.reads.query(client, "position")
                         if abs(target_pos - client_pos) > 1:
                             return False
                     return True
@@ -893,7 +983,7 @@ class VM:
                     self._any_player_client = []
                     found_any = False
                     for client in self._clients:
-                        client_yaw = await client.body.yaw()
+                        client_yaw = await self.reads.query(client, "yaw")
                         # Round both values to the nearest tenth for comparison
                         rounded_client_yaw = round(client_yaw, 1)
                         rounded_target_yaw = round(target_yaw, 1)
@@ -903,7 +993,7 @@ class VM:
                     return found_any
                 else:
                     for client in clients:
-                        client_yaw = await client.body.yaw()
+                        client_yaw = await self.reads.query(client, "yaw")
                         # Round both values to the nearest tenth for comparison
                         rounded_client_yaw = round(client_yaw, 1)
                         rounded_target_yaw = round(target_yaw, 1)
@@ -914,215 +1004,13 @@ class VM:
                 raise VMError(f"Unimplemented expression: {expression}")
 
     async def eval(self, expression: Expression, client: Client | None = None):
-        match expression:
-            case IdentExpression():
-                return expression.ident
-            case ConstantReferenceExpression():
-                if expression.name in self._constants:
-                    return self._constants[expression.name]
-                raise VMError(f"Unknown constant: ${expression.name}")
-            case ConstantCheckExpression():
-                constant_name = expression.name
-
-                if expression.value is None:
-                    if constant_name in self._constants:
-                        return self._constants[constant_name]
-                    raise VMError(f"Unknown constant: {constant_name}")
-
-                expected_value = await self.eval(expression.value)
-
-                if constant_name in self._constants:
-                    actual_value = self._constants[constant_name]
-                    if isinstance(expected_value, bool) and isinstance(actual_value, str):
-                        if actual_value.lower() == "true":
-                            actual_value = True
-                        elif actual_value.lower() == "false":
-                            actual_value = False
-                    
-                    return actual_value == expected_value
-                return False
-            case RangeMinExpression():
-                range_value = await self.eval(expression.range_expr, client)
-                if isinstance(range_value, str):
-                    try:
-                        min_val, _ = map(float, range_value.split('-'))
-                        return min_val
-                    except ValueError:
-                        raise VMError(f"Invalid range format: {range_value}. Expected format like '1-100'")
-                else:
-                    raise VMError(f"Range expression must evaluate to a string, got {range_value}")
-                    
-            case RangeMaxExpression():
-                range_value = await self.eval(expression.range_expr, client)
-                if isinstance(range_value, str):
-                    try:
-                        _, max_val = map(float, range_value.split('-'))
-                        return max_val
-                    except ValueError:
-                        raise VMError(f"Invalid range format: {range_value}. Expected format like '1-100'")
-                else:
-                    raise VMError(f"Range expression must evaluate to a string, got {range_value}")
-            case IndexAccessExpression():
-                container = await self.eval(expression.expr, client)
-                index = await self.eval(expression.index, client)
-                
-                if isinstance(container, list) and isinstance(index, (int, float)):
-                    index_int = int(index)
-                    if 0 <= index_int < len(container):
-                        return container[index_int]
-                    else:
-                        # Return 0 for out of bounds index
-                        return 0.0
-                else:
-                    # If not a list or index is not a number, return 0
-                    return 0.0
-            case AndExpression():
-                for expr in expression.expressions:
-                    if not await self.eval(expr, client):
-                        return False
-                return True
-            case OrExpression():
-                for expr in expression.expressions:
-                    if await self.eval(expr, client):
-                        return True
-                return False
-            case CommandExpression():
-                return await self._eval_command_expression(expression)
-            case NumberExpression():
-                return expression.number
-            case XYZExpression():
-                return XYZ(
-                    await self.eval(expression.x, client), # type: ignore
-                    await self.eval(expression.y, client), # type: ignore
-                    await self.eval(expression.z, client), # type: ignore
-                )
-            case UnaryExpression():
-                match expression.operator.kind:
-                    case TokenKind.minus:
-                        result = await self.eval(expression.expr, client)
-                        return -result # type: ignore
-                    case TokenKind.keyword_not:
-                        # First evaluate the expression to populate _any_player_client
-                        expr_result = await self.eval(expression.expr, client)
-                        
-                        if (isinstance(expression.expr, CommandExpression) and 
-                            expression.expr.command.player_selector.any_player):
-                            # Invert the selection - clients that didn't match become the new matches
-                            current_matches = self._any_player_client.copy()
-                            self._any_player_client = [c for c in self._clients if c not in current_matches]
-                        
-                        # Return negated result
-                        return not expr_result
-                    case _:
-                        raise VMError(f"Unimplemented unary expression: {expression}")
-            case StringExpression():
-                return expression.string
-            case StrFormatExpression():
-                format_str = expression.format_str
-                values = []
-                for eval in expression.values:
-                    result = await self.eval(eval, client)
-                    values.append(result)
-                return format_str % tuple(values)
-            case KeyExpression():
-                key = expression.key
-                if key not in Keycode.__members__:
-                    raise VMError(f"Unknown key code: {key}")
-                return Keycode[expression.key]
-            case EquivalentExpression():
-                left = await self.eval(expression.lhs, client)
-                right = await self.eval(expression.rhs, client)
-
-                if isinstance(left, list) and len(left) > 0:
-                    left = left[0]
-                if isinstance(right, list) and len(right) > 0:
-                    right = right[0]
-                    
-                return left == right
-            case DivideExpression():
-                left = await self.eval(expression.lhs, client)
-                right = await self.eval(expression.rhs, client)
-                return (left / right) # type: ignore
-            case GreaterExpression():
-                left = await self.eval(expression.lhs, client)
-                right = await self.eval(expression.rhs, client)
-                if isinstance(left, list) and len(left) > 0:
-                    left = left[0] 
-                if isinstance(right, list) and len(right) > 0:
-                    right = right[0] 
-                return (left > right)
-            case Eval():
-                return await self._eval_expression(expression, client) #type: ignore
-            case SelectorGroup():
-                players = self._select_players(expression.players)
-                expr = expression.expr
-                if expression.players.any_player:
-                    self._any_player_client = []
-                    found_any = False
-                    for anyplayer in self._clients:
-                        result = await self.eval(expr, anyplayer)
-                        if result:
-                            self._any_player_client.append(anyplayer)
-                            found_any = True
-                    
-                    return found_any
-                else:
-                    for player in players:
-                        if not await self.eval(expr, player):
-                            return False
-                    return True
-            case ReadVarExpr():
-                loc = await self.eval(expression.loc)
-                assert(loc != None and type(loc) == int)
-                test = self.current_task.stack[loc]
-                return test
-            case StackLocExpression():
-                return expression.offset
-            case SubExpression():
-                lhs = await self.eval(expression.lhs, client)
-                rhs = await self.eval(expression.rhs, client)
-                assert(isinstance(lhs, (int, float)))
-                assert(isinstance(rhs, (int, float)))
-                return lhs - rhs
-            
-            case ListExpression():
-                result = []
-                
-                if hasattr(expression, 'items') and isinstance(expression.items, list):
-                    for item in expression.items:
-                        evaluated_item = await self.eval(item, client)
-                        if isinstance(evaluated_item, list):
-                            result.extend(evaluated_item)
-                        else:
-                            result.append(evaluated_item)
-                elif hasattr(expression, 'items') and isinstance(expression.items, ListExpression):
-                    inner_result = await self.eval(expression.items, client)
-                    result = inner_result if isinstance(inner_result, list) else [inner_result]
-                elif hasattr(expression, 'expr') and isinstance(expression.expr, ListExpression):
-                    inner_result = await self.eval(expression.expr, client)
-                    result = inner_result if isinstance(inner_result, list) else [inner_result]
-                elif hasattr(expression, 'expr'):
-                    single_result = await self.eval(expression.expr, client)
-                    result = [single_result]
-                
-                return result
-            case ContainsStringExpression():
-                lhs = await self.eval(expression.lhs, client)
-                rhs = await self.eval(expression.rhs, client)
-                
-                if isinstance(rhs, list):
-                    return any(item in lhs for item in rhs)
-                
-                # Original behavior for single string
-                return (rhs in lhs) #type: ignore
-            case _:
-                raise VMError(f"Unimplemented expression type: {expression}")
+        return await self._evaluator.get(expression)(client)
 
     async def _eval_expression(self, eval: Eval, client: Client):
         kind = eval.kind
         match kind:
             case EvalKind.duel_round:
-                if await client.in_battle():
+                if await self.reads.query(client, "in_battle"):
                     return await client.duel.round_num()
             case EvalKind.account_level:
                 return await client.stats.reference_level()
@@ -1139,9 +1027,9 @@ class VM:
             case EvalKind.max_energy:
                 return await client.stats.energy_max()
             case EvalKind.bagcount:
-                return (await client.backpack_space())[0]
+                return (await self.reads.query(client, "backpack_space"))[0]
             case EvalKind.max_bagcount:
-                return (await client.backpack_space())[1]
+                return (await self.reads.query(client, "backpack_space"))[1]
             case EvalKind.gold:
                 return await client.stats.current_gold()
             case EvalKind.max_gold:
@@ -1440,8 +1328,8 @@ class VM:
                     await waitfor_coro(coro, completion, interval)
 
                 method_map = {
-                    WaitforKind.dialog: Client.is_in_dialog,
-                    WaitforKind.battle: Client.in_battle,
+                    WaitforKind.dialog: lambda client: client.is_in_dialog(),
+                    WaitforKind.battle: lambda client: client.in_battle(),
                     WaitforKind.free: is_free,
                 }
                 if args[0] in method_map:
@@ -1590,16 +1478,40 @@ class VM:
         # Execute all commands in parallel
         await asyncio.gather(*tasks)
 
-    async def _process_untils(self):
+    def _release_untils(self, start: int):
+        # drops the untils from start on and stops their watchers
+        for info in self._until_infos[start:]:
+            unwatch_until(self, info)
+        self._until_infos = self._until_infos[:start]
+        self._until_fired = any(info.fired for info in self._until_infos)
+        self._until_due = any(info.due for info in self._until_infos)
+
+    def _on_until_due(self):
+        self._until_due = True
+        self._scheduler.interrupt()
+
+    async def _check_due_untils(self):
+        # conditions touching VM state are evaluated here, between two instructions, instead of by their watcher
+        self._until_due = False
+        for info in self._until_infos[:]:
+            if info.due:
+                info.due = False
+                if info.watch is not None:
+                    await info.watch.check()
+
+    def _on_until_fired(self):
+        # called by the until watchers, parked tasks have to leave the until now instead of after their wait
+        self._until_fired = True
+        self._scheduler.wake_all()
+
+    def _exit_fired_until(self):
+        # the innermost until whose condition held wins, outer ones get their turn after it was exited
         for i in range(len(self._until_infos) - 1, -1, -1):
             info = self._until_infos[i]
-            try:
-                if await self.eval(info.expr):
-                    self.current_task.ip = info.exit_point
-                    return
-            except VMError:
-                # If evaluation fails (e.g., due to non-existent player), treat as true
-                # This will cause the VM to skip the until block
+            if info.fired:
+                if info.error is not None:
+                    error, info.error = info.error, None
+                    raise error
                 self.current_task.ip = info.exit_point
                 return
 
@@ -1613,13 +1525,31 @@ class VM:
     async def step(self):
         if not self.running:
             return
-        await asyncio.sleep(0)
+        await self._scheduler.next_slice()
+        if not self.running:
+            return
+        self.reads.invalidate()
+        if self._until_due:
+            await self._check_due_untils()
+            if self._scheduler.idle():
+                # every task is still parked, the step only ran to check the untils
+                return
         self.current_task = self._scheduler.get_current_task()
-        await self._process_untils() # must run before the next instruction is fetched
+        if self._until_fired:
+            self._exit_fired_until() # must run before the next instruction is fetched
+        if self.current_task.ip >= len(self.program):
+            # the program ended in a sleep, the task only finishes once it is over
+            self.current_task.running = False
+            if not True in [t.running for t in self._scheduler.tasks]:
+                self.stop()
+                return
         if not self.current_task.running:
             self._scheduler.switch_task()
             return
         instruction = self.program[self.current_task.ip]
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.enter(self, instruction)
 
         match instruction.kind:
             case InstructionKind.restart_bot:
@@ -1663,11 +1593,14 @@ class VM:
                 if isinstance(time, (int, str)):
                     time = float(time)
                 
-                await asyncio.sleep(time)
                 self.current_task.ip += 1
+                self._scheduler.sleep(self.current_task, time)
             case InstructionKind.jump:
                 assert type(instruction.data) == int
                 self.current_task.ip += instruction.data
+                if instruction.data == 0 and not self._until_fired:
+                    # an empty loop (ie. `until ... { loop {} }`) can only be left by an until, nothing else changes
+                    self._scheduler.park(self.current_task, asyncio.get_running_loop().create_future())
             case InstructionKind.jump_if:
                 assert type(instruction.data) == list
                 try:
@@ -1700,18 +1633,20 @@ class VM:
                 self.current_task.ip = self.current_task.stack.pop()
             case InstructionKind.enter_until:
                 assert type(instruction.data) == list
-                self._until_infos.append(UntilInfo(
+                info = UntilInfo(
                     expr=instruction.data[0],
                     id=instruction.data[1],
                     exit_point=self.current_task.ip + instruction.data[2],
                     stack_size=len(self.current_task.stack)
-                ))
+                )
+                self._until_infos.append(info)
+                await watch_until(self, info, self.until_poll_interval)
                 self.current_task.ip += 1
             case InstructionKind.exit_until:
                 for i in range(len(self._until_infos) - 1, -1, -1):
                     info = self._until_infos[i]
                     if info.id == instruction.data:
-                        self._until_infos = self._until_infos[:i]
+                        self._release_untils(i)
                         self.current_task.stack = self.current_task.stack[:info.stack_size]
                         break
                 self.current_task.ip += 1 
@@ -1823,22 +1758,28 @@ class VM:
                     data=[player_selector, command_name, data]
                 )
                 await self.exec_deimos_call(deimos_call_instruction)
+                self.reads.invalidate()
                 self.current_task.ip += 1
             case InstructionKind.compound_deimos_call:
                 # instruction.data contains a list of [player_selector, command_name, command_data] entries
                 await self.exec_compound_deimos_call(instruction.data)
+                self.reads.invalidate()
                 self.current_task.ip += 1  
             case _:
                 raise VMError(f"Unimplemented instruction: {instruction}")
-        if self.current_task.ip >= len(self.program):
+        if profiler is not None:
+            profiler.leave(self)
+        if self.current_task.ip >= len(self.program) and self.current_task.wakeup is None:
             self.current_task.running = False
         if not True in [t.running for t in self._scheduler.tasks] or not self.running:
             self.stop()
         else:
             self._scheduler.switch_task()
-            await asyncio.sleep(0)
 
     async def run(self):
         self.running = True
-        while self.running:
-            await self.step()
+        try:
+            while self.running:
+                await self.step()
+        finally:
+            self.stop()
@@ -0,0 +1,197 @@
+import asyncio
+from typing import Any, Callable, Coroutine
+
+from .types import *
+from .consteval import VMError
+
+
+# Until conditions are polled by background watchers instead of being re-evaluated before every instruction.
+# A watcher latches `fired` on the until it watches and raises the VM's flag, so VM.step only checks a bool.
+# Conditions that only read game state are shared: two VMs on the same clients waiting on the same (shared, compiled)
+# expression are served by one watcher. Anything touching VM state (constants, variables, any player matches,
+# zone/goal/quest change tracking) gets a watcher of its own, which only marks the until due: the VM evaluates it at the
+# start of its next step, so the condition never writes VM state (ie. _any_player_client) while a command is using it.
+
+# seconds between two evaluations of a condition
+UNTIL_POLL_INTERVAL = 0.1
+
+# expression kinds that only read the game and never touch VM state
+_STATELESS_EXPR_KINDS = {
+    ExprKind.window_visible, ExprKind.window_disabled, ExprKind.in_zone, ExprKind.same_zone, ExprKind.playercount,
+    ExprKind.tracking_quest, ExprKind.tracking_goal, ExprKind.loading, ExprKind.in_combat, ExprKind.has_dialogue,
+    ExprKind.has_xyz, ExprKind.has_yaw, ExprKind.has_quest, ExprKind.same_place, ExprKind.in_range,
+    ExprKind.same_quest, ExprKind.same_xyz, ExprKind.same_yaw, ExprKind.duel_round,
+}
+
+
+class UntilInfo:
+    def __init__(self, expr: Expression, id: int, exit_point: int, stack_size: int):
+        self.expr = expr
+        self.id = id
+        self.exit_point = exit_point
+        self.stack_size = stack_size
+        # set by the watcher once the condition held (or failed to evaluate)
+        self.fired = False
+        # non VMError exception raised by the condition, re-raised by the VM like it used to be
+        self.error: Exception | None = None
+        # set by the watcher when the VM has to evaluate the condition on its next step
+        self.due = False
+        self.watch: "_Watch | None" = None
+
+
+def _selector_is_shareable(selector: PlayerSelector | None) -> bool:
+    return selector is None or not (selector.any_player or selector.same_any)
+
+
+def _data_is_shareable(data) -> bool:
+    match data:
+        case list() | tuple():
+            return all(_data_is_shareable(item) for item in data)
+        case str():
+            return not data.startswith('$')
+        # identifiers may name a constant, see VM._extract_data_info
+        case IdentExpression():
+            return False
+        case Expression():
+            return is_shareable(data)
+    return True
+
+
+def is_shareable(expression: Expression) -> bool:
+    # whether evaluating expression depends on nothing but the clients it reads
+    match expression:
+        case NumberExpression() | StringExpression() | KeyExpression():
+            return not (isinstance(expression, StringExpression) and expression.string.startswith('$'))
+        case ConstantReferenceExpression() | ConstantCheckExpression() | ReadVarExpr() | StackLocExpression() | IdentExpression():
+            return False
+        case CommandExpression():
+            command = expression.command
+            if not command.data:
+                return True
+            return command.data[0] in _STATELESS_EXPR_KINDS and _selector_is_shareable(command.player_selector) \
+                and _data_is_shareable(command.data[1:])
+        case SelectorGroup():
+            return _selector_is_shareable(expression.players) and is_shareable(expression.expr)
+        case Eval():
+            return expression.kind != EvalKind.any_player_list
+        case UnaryExpression() | RangeMinExpression() | RangeMaxExpression():
+            inner = expression.range_expr if isinstance(expression, (RangeMinExpression, RangeMaxExpression)) else expression.expr
+            return is_shareable(inner)
+        case BinaryExpression():
+            return is_shareable(expression.lhs) and is_shareable(expression.rhs)
+        case AndExpression() | OrExpression():
+            return all(is_shareable(expr) for expr in expression.expressions)
+        case XYZExpression():
+            return is_shareable(expression.x) and is_shareable(expression.y) and is_shareable(expression.z)
+        case StrFormatExpression():
+            return all(is_shareable(value) for value in expression.values)
+        case IndexAccessExpression():
+            return is_shareable(expression.expr) and is_shareable(expression.index)
+        case ListExpression():
+            return isinstance(expression.items, list) and all(is_shareable(item) for item in expression.items)
+    return False
+
+
+class _Watch:
+    def __init__(self, key, evaluate: Callable[[], Coroutine[Any, Any, Any]], interval: float, on_vm_step: bool = False):
+        self.key = key
+        self.evaluate = evaluate
+        self.interval = interval
+        self.on_vm_step = on_vm_step
+        self.subscribers: list[tuple[Any, UntilInfo]] = []
+        self.task: asyncio.Task | None = None
+
+    def retire(self):
+        # untils entered from now on need a new watch
+        if self.key is not None and _shared_watches.get(self.key) is self:
+            del _shared_watches[self.key]
+
+    def fire(self, error: Exception | None = None):
+        self.retire()
+        for vm, info in self.subscribers:
+            info.fired = True
+            info.error = error
+            info.watch = None
+            vm._on_until_fired()
+        self.subscribers = []
+
+    async def check(self):
+        try:
+            result = await self.evaluate()
+        except VMError:
+            # a condition that can't be evaluated (ie. a player that doesn't exist) exits the until
+            result = True
+        except Exception as e:
+            self.fire(e)
+            return
+        if result:
+            self.fire()
+
+    async def poll(self):
+        try:
+            while self.subscribers:
+                await asyncio.sleep(self.interval)
+                if not self.subscribers:
+                    break
+                if self.on_vm_step:
+                    for vm, info in self.subscribers:
+                        info.due = True
+                        vm._on_until_due()
+                else:
+                    await self.check()
+        finally:
+            self.retire()
+
+
+# (id of the expression, id of the client list) -> watch, the compiled program is shared so VMs running the same
+# script hand in the very same expression objects
+_shared_watches: dict[tuple[int, int], _Watch] = {}
+
+
+async def watch_until(vm, info: UntilInfo, interval: float = UNTIL_POLL_INTERVAL):
+    # Checks the condition right away like entering the until always did, then hands it to a watcher
+    try:
+        if await vm.eval(info.expr):
+            info.fired = True
+    except VMError:
+        info.fired = True
+    if info.fired:
+        vm._on_until_fired()
+        return
+
+    key = None
+    if is_shareable(info.expr):
+        key = (id(info.expr), id(vm._clients))
+        watch = _shared_watches.get(key)
+        if watch is not None:
+            watch.subscribers.append((vm, info))
+            info.watch = watch
+            return
+
+    expr = info.expr
+    if key is not None:
+        async def evaluate():
+            # every poll is a tick of its own, values read during the VM's current step may be old by now
+            vm.reads.invalidate()
+            return await vm.eval(expr)
+    else:
+        async def evaluate():
+            return await vm.eval(expr)
+    watch = _Watch(key, evaluate, interval, on_vm_step=key is None)
+    watch.subscribers.append((vm, info))
+    info.watch = watch
+    if key is not None:
+        _shared_watches[key] = watch
+    watch.task = asyncio.create_task(watch.poll())
+
+
+def unwatch_until(vm, info: UntilInfo):
+    watch = info.watch
+    info.watch = None
+    if watch is None:
+        return
+    watch.subscribers = [(other_vm, other) for other_vm, other in watch.subscribers if other is not info]
+    if not watch.subscribers:
+        watch.retire()
+        if watch.task is not None:
+            watch.task.cancel()
@@ -4,7 +4,7 @@ from typing import Dict, Any, List, Tuple, Union, Set
 from src.combat_cache import *
 from src.combat_math import curve_stat
 
-from enum import Enum
+from enum import IntEnum
 import random
 from math import trunc
 
@@ -13,6 +13,30 @@ Number = Union[int, float]
 main_schools = ("balance", "death", "life", "myth", "storm", "fire", "ice")
 hanging_effect_prefixes = ["hanging", "public_hanging", "aura", "shadow_spell", "death_activated", "delay_cast"]
 hanging_effect_paths = [f"get_participant.{p}_effects" for p in hanging_effect_prefixes]
+hanging_effect_accessors = [compile_path(p) for p in hanging_effect_paths]
+pip_count_path = compile_path("get_participant.pip_count")
+
+# Stats read on every simulated hit or heal, compiled once instead of splitting the path string per lookup
+dmg_bonus_percent_path = compile_path("get_stats.dmg_bonus_percent")
+dmg_bonus_percent_all_path = compile_path("get_stats.dmg_bonus_percent_all")
+dmg_bonus_flat_path = compile_path("get_stats.dmg_bonus_flat")
+dmg_bonus_flat_all_path = compile_path("get_stats.dmg_bonus_flat_all")
+dmg_reduce_percent_path = compile_path("get_stats.dmg_reduce_percent")
+dmg_reduce_percent_all_path = compile_path("get_stats.dmg_reduce_percent_all")
+dmg_reduce_flat_path = compile_path("get_stats.dmg_reduce_flat")
+dmg_reduce_flat_all_path = compile_path("get_stats.dmg_reduce_flat_all")
+ap_bonus_percent_path = compile_path("get_stats.ap_bonus_percent")
+ap_bonus_percent_all_path = compile_path("get_stats.ap_bonus_percent_all")
+critical_hit_rating_by_school_path = compile_path("get_stats.critical_hit_rating_by_school")
+critical_hit_rating_all_path = compile_path("get_stats.critical_hit_rating_all")
+block_rating_by_school_path = compile_path("get_stats.block_rating_by_school")
+block_rating_all_path = compile_path("get_stats.block_rating_all")
+heal_bonus_percent_path = compile_path("get_stats.heal_bonus_percent")
+heal_bonus_percent_all_path = compile_path("get_stats.heal_bonus_percent_all")
+heal_inc_bonus_percent_path = compile_path("get_stats.heal_inc_bonus_percent")
+heal_inc_bonus_percent_all_path = compile_path("get_stats.heal_inc_bonus_percent_all")
+power_pip_base_path = compile_path("get_stats.power_pip_base")
+power_pip_bonus_percent_all_path = compile_path("get_stats.power_pip_bonus_percent_all")
 
 charm_effect_types = {
     SpellEffects.modify_outgoing_damage,
@@ -53,29 +77,30 @@ hot_effect_types = {
 }
 
 
-class MagicSchoolID(MagicSchool):
-    '''WizWalker MagicSchool enum extended for universal schools.'''
-    universal = 80289
-
-
-class MagicSchoolIndex(Enum):
-    '''Converts the name of a magic school to a list index for a list of stats.'''
-    MagicSchool.fire = 0
-    MagicSchool.ice = 1
-    MagicSchool.storm = 2
-    MagicSchool.myth = 3
-    MagicSchool.life = 4
-    MagicSchool.death = 5
-    MagicSchool.balance = 6
-    MagicSchool.star = 7
-    MagicSchool.sun = 8
-    MagicSchool.moon = 9
-    MagicSchool.gardening = 10
-    MagicSchool.shadow = 11
-    MagicSchool.fishing = 12
-    MagicSchool.cantrips = 13
-    MagicSchool.castle_magic = 14
-    MagicSchool.whirly_burly = 15
+# WizWalker MagicSchool enum extended for universal schools. Enums with members can't be subclassed, and caches hold the raw ids,
+# so this is an IntEnum that compares equal to them.
+MagicSchoolID = IntEnum("MagicSchoolID", {**{school.name: school.value for school in MagicSchool}, "universal": 80289})
+
+
+# Converts the id of a magic school to a list index for a list of stats.
+school_index: Dict[int, int] = {
+    MagicSchool.fire.value: 0,
+    MagicSchool.ice.value: 1,
+    MagicSchool.storm.value: 2,
+    MagicSchool.myth.value: 3,
+    MagicSchool.life.value: 4,
+    MagicSchool.death.value: 5,
+    MagicSchool.balance.value: 6,
+    MagicSchool.star.value: 7,
+    MagicSchool.sun.value: 8,
+    MagicSchool.moon.value: 9,
+    MagicSchool.gardening.value: 10,
+    MagicSchool.shadow.value: 11,
+    MagicSchool.fishing.value: 12,
+    MagicSchool.cantrips.value: 13,
+    MagicSchool.castle_magic.value: 14,
+    MagicSchool.whirly_burly.value: 15,
+}
 
 
 # class OppositeMagicSchool(Enum):
@@ -101,6 +126,11 @@ def clamp(num: Number, min_value: Number, max_value: Number) -> Number:
     return max(min(num, max_value), min_value)
 
 
+def ratio(numerator: Number, denominator: Number) -> float:
+    # numerator / denominator, 0 when both stats it is made of are 0
+    return numerator / denominator if denominator else 0.0
+
+
 def collapse_effect(subeffects: List[Cache], type_name: str, caster: Cache, target: Cache) -> Cache:
     effect: Cache = None
 
@@ -136,8 +166,8 @@ def sanitize_effect_list(effects: List[Cache]) -> List[Cache]:
     '''Removes broken/useless effects from a given list of SpellEffects'''
     result_effects = []
     for effect in effects:
-        if effect["effect_type"] == SpellEffects.invalid_spell_effect:
-            if effect["maybe_effect_list"] is None:
+        if SpellEffects(effect["effect_type"]) == SpellEffects.invalid_spell_effect:
+            if not effect.get("maybe_effect_list"):
                 continue
 
                 
@@ -151,34 +181,33 @@ def sanitize_effect_list(effects: List[Cache]) -> List[Cache]:
 def remove_used_effects(cache: Cache, effect_list_index: int, used_effect_indexes: List[int]):
     '''Removes used hanging effects from a cache, as specified by a list of used spell/enchantment template IDs. '''
     #TODO: there's probably a way to simplify this logic -slack
-    index_offset = 0
-    for i in used_effect_indexes:
-        cache_remove(cache, f"{hanging_effect_paths[effect_list_index]}.{i - index_offset}")
-        index_offset += 1
+    effects = hanging_effect_accessors[effect_list_index].get(cache)
+    for index_offset, i in enumerate(used_effect_indexes):
+        del effects[i - index_offset]
 
 
 #TODO: Add global effects
 def sim_outgoing_dmg_effects(cache: Cache, damage_type: int, damage: float, pierce: float) -> Tuple[Cache, int, float, float]:
 
-    member_effects: List[Cache] = cache_get_multi(cache, hanging_effect_paths[:4])
-    result_cache = Cache
+    member_effects: List[Cache] = [path.get(cache) for path in hanging_effect_accessors[:4]]
+    result_cache = cache
 
-    damage_type_index = MagicSchoolIndex[damage_type].value
+    damage_type_index = school_index[damage_type]
 
     #Outgoing effect handling
     for i, m_effects in enumerate(member_effects):
         used_indexes: List[int] = []
         used_ids: List[Tuple[int, int]] = []
         for m_i, m_effect in enumerate(m_effects):
+            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             if (m_effect["damage_type"] != MagicSchoolID.universal and m_effect["damage_type"] != damage_type) or ids in used_ids:
                 continue
 
             damage = clamp(damage, 0.0, 2000000.0)
 
-            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             param = m_effect["effect_param"]
 
-            match m_effect["effect_type"]: #Keep in mind these effects are reused for auras/shadow, they're not strictly charms
+            match SpellEffects(m_effect["effect_type"]): #Keep in mind these effects are reused for auras/shadow, they're not strictly charms
                 case SpellEffects.modify_outgoing_damage: #Normal blades/weakness
                     damage *= (param / 100) + 1
 
@@ -191,7 +220,7 @@ def sim_outgoing_dmg_effects(cache: Cache, damage_type: int, damage: float, pier
 
                 case SpellEffects.modify_outgoing_damage_type: #Prism blade, Old One's Endgame + Lifebane
                     damage_type = param
-                    damage_type_index = MagicSchoolIndex[param].value
+                    damage_type_index = school_index[param]
 
                 case _:
                     continue
@@ -209,22 +238,22 @@ def sim_outgoing_dmg_effects(cache: Cache, damage_type: int, damage: float, pier
 
 
 def sim_outgoing_heal_effects(cache: Cache, heal_type: int, heal: float) -> Tuple[Cache, float]:
-    member_effects: List[Cache] = cache_get_multi(cache, hanging_effect_paths[:4])
-    result_cache = Cache
+    member_effects: List[Cache] = [path.get(cache) for path in hanging_effect_accessors[:4]]
+    result_cache = cache
 
     for i, m_effects in enumerate(member_effects):
         used_indexes: List[int] = []
         used_ids: List[Tuple[int, int]] = []
         for m_i, m_effect in enumerate(m_effects):
+            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             if (m_effect["damage_type"] != MagicSchoolID.universal and m_effect["damage_type"] != heal_type) or ids in used_ids:
                 continue
 
             heal = clamp(heal, 0.0, 2000000.0)
 
-            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             param = m_effect["effect_param"]
 
-            match m_effect["effect_type"]: #Keep in mind these effects are reused for auras/shadow, they're not strictly charms
+            match SpellEffects(m_effect["effect_type"]): #Keep in mind these effects are reused for auras/shadow, they're not strictly charms
                 case SpellEffects.modify_outgoing_heal: #Normal heal charms
                     heal *= (param / 100) + 1
 
@@ -243,36 +272,35 @@ def sim_outgoing_heal_effects(cache: Cache, heal_type: int, heal: float) -> Tupl
 
         remove_used_effects(result_cache, i, used_indexes)
 
+    return result_cache, heal
+
 
 # #TODO: Add global effects
 def sim_incoming_dmg_effects(cache: Cache, damage_type: int, damage: float, pierce: float) -> Tuple[Cache, int, float, float]:
-    member_effects: List[Cache] = cache_get_multi(cache, hanging_effect_paths[:4])
+    member_effects: List[Cache] = [path.get(cache) for path in hanging_effect_accessors[:4]]
     result_cache = cache
 
-    damage_type_index = MagicSchoolIndex[damage_type].value
+    damage_type_index = school_index[damage_type]
 
     #Incoming effect (target) effect handling
     for i, m_effects in enumerate(member_effects):
         used_indexes: List[int] = []
         used_ids: List[Tuple[int, int]] = []
         for m_i, m_effect in enumerate(m_effects):
+            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             if (m_effect["damage_type"] != MagicSchoolID.universal and m_effect["damage_type"] != damage_type) or ids in used_ids:
                 continue
 
             damage = clamp(damage, 0.0, 2000000.0)
 
-            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             param = m_effect["effect_param"]
-            max_pierce = pierce
 
-            match m_effect["effect_type"]:
+            match SpellEffects(m_effect["effect_type"]):
                 case SpellEffects.modify_incoming_damage: #Shields + traps
-                    if param < 0:
-                        param += pierce
-                        pierce += m_effect["effect_param"]
-                        pierce = round(pierce, 2)
-                        clamp(pierce, 0, max_pierce)
-                        clamp(param, m_effect["effect_param"], 0)
+                    if param < 0: #Pierce is used up on shields, whatever is left goes against resist
+                        pierced = min(pierce * 100, -param)
+                        param += pierced
+                        pierce = round(pierce - pierced / 100, 2)
 
                     damage *= (param / 100) + 1
 
@@ -281,11 +309,11 @@ def sim_incoming_dmg_effects(cache: Cache, damage_type: int, damage: float, pier
 
                 case SpellEffects.absorb_damage: #Spirit armor, frozen armor, etc
                     if damage < param:
-                        cache_modify(result_cache, param - damage, f"{hanging_effect_paths[i]}.{m_i}.effect_param") #Modify absorb value if damage isn't enough to remove it
+                        m_effect["effect_param"] = param - damage #Modify absorb value if damage isn't enough to remove it
                         damage = 0
                         continue
 
-                    damage += param
+                    damage -= param
 
                 case SpellEffects.modify_incoming_armor_piercing: #Pierce traps?
                     pierce += param / 100
@@ -293,7 +321,7 @@ def sim_incoming_dmg_effects(cache: Cache, damage_type: int, damage: float, pier
 
                 case SpellEffects.modify_incoming_damage_type: #Prisms
                     damage_type = param
-                    damage_type_index = MagicSchoolIndex[param].value
+                    damage_type_index = school_index[param]
 
                 case _:
                     continue
@@ -312,7 +340,7 @@ def sim_incoming_dmg_effects(cache: Cache, damage_type: int, damage: float, pier
 
 #TODO: Add global effects
 def sim_incoming_heal_effects(cache: Cache, heal_type: float, heal: float) -> Tuple[Cache, float]:
-    member_effects: List[Cache] = cache_get_multi(cache, hanging_effect_paths[:4])
+    member_effects: List[Cache] = [path.get(cache) for path in hanging_effect_accessors[:4]]
     result_cache = cache
 
     #Incoming effect (target) effect handling
@@ -320,15 +348,15 @@ def sim_incoming_heal_effects(cache: Cache, heal_type: float, heal: float) -> Tu
         used_indexes: List[int] = []
         used_ids: List[Tuple[int, int]] = []
         for m_i, m_effect in enumerate(m_effects):
+            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             if (m_effect["damage_type"] != MagicSchoolID.universal and m_effect["damage_type"] != heal_type) or ids in used_ids:
                 continue
 
             heal = clamp(heal, 0.0, 2000000.0)
 
-            ids = (m_i, m_effect["spell_template_id"], m_effect["enchantment_spell_template_id"])
             param = m_effect["effect_param"]
 
-            match m_effect["effect_type"]:
+            match SpellEffects(m_effect["effect_type"]):
                 case SpellEffects.modify_incoming_heal: #Heal traps/shields? (Lord of Night)
                     heal *= (param / 100) + 1
 
@@ -337,11 +365,11 @@ def sim_incoming_heal_effects(cache: Cache, heal_type: float, heal: float) -> Tu
 
                 case SpellEffects.absorb_heal: #Heal absorb? Akin to heal flat resist?
                     if heal < param:
-                        cache_modify(result_cache, param - heal, f"{hanging_effect_paths[i]}.{m_i}.effect_param") #Modify absorb value if heal isn't enough to remove it
+                        m_effect["effect_param"] = param - heal #Modify absorb value if heal isn't enough to remove it
                         heal = 0
                         continue
 
-                    heal += param
+                    heal -= param
 
                 case _:
                     continue
@@ -361,18 +389,18 @@ def sim_incoming_heal_effects(cache: Cache, heal_type: float, heal: float) -> Tu
 def calc_crit(crit_rating: float, block_rating: float, caster_level: int, target_level: int, is_pvp: bool = False) -> Tuple[float]:
     if is_pvp: #PVP specific calculation
         m_b = 5 * block_rating
-        crit_multiplier = 2 - (m_b / (crit_rating + m_b))
+        crit_multiplier = 2 - ratio(m_b, crit_rating + m_b)
         m_c = 12 * crit_rating
-        crit_chance = (caster_level / 185) * (m_c / (m_c + block_rating))
-        block_chance = (target_level / 185) * (block_rating / (block_rating + m_c))
+        crit_chance = (caster_level / 185) * ratio(m_c, m_c + block_rating)
+        block_chance = (target_level / 185) * ratio(block_rating, block_rating + m_c)
 
     else: #PVE calculation
         m_b = 3 * block_rating
-        crit_multiplier = 2 - (m_b / (crit_rating + m_b))
+        crit_multiplier = 2 - ratio(m_b, crit_rating + m_b)
         m_c = 3 * crit_rating
-        crit_chance = m_c / (m_c + block_rating)
+        crit_chance = ratio(m_c, m_c + block_rating)
         crit_chance = clamp(crit_chance, 0.0, 0.95)
-        block_chance = 0.4 * (block_rating / (block_rating + m_c))
+        block_chance = 0.4 * ratio(block_rating, block_rating + m_c)
 
     return crit_multiplier, crit_chance, block_chance
 
@@ -384,42 +412,42 @@ def sim_damage(duel: Cache, caster: Cache, target: Cache, effect: Cache, crit_th
 
     #For easy access of stat lists, as we only want 1 particular stat
     damage_type = effect["damage_type"]
-    damage_type_index = MagicSchoolIndex[damage_type].value
+    damage_type_index = school_index[damage_type]
 
     #Damage, pierce, and resist stats
     #Get and curve damage
     damage = effect["effect_param"]
-    dmg_percent_stat = cache_get(caster, "get_stats.dmg_bonus_percent")[damage_type_index] + cache_get(caster, "get_stats.dmg_bonus_percent_all")
+    dmg_percent_stat = dmg_bonus_percent_path.get(caster)[damage_type_index] + dmg_bonus_percent_all_path.get(caster)
     dmg_percent_stat = round(dmg_percent_stat, 2)
     if caster["is_player"]:
         dmg_percent_stat = curve_stat(dmg_percent_stat, duel["damage_limit"], duel["d_k0"], duel["d_n0"])
     damage *= 1 + dmg_percent_stat
-    damage += cache_get(caster, "get_stats.dmg_bonus_flat")[damage_type_index] + cache_get(caster, "get_stats.dmg_bonus_flat_all")
+    damage += dmg_bonus_flat_path.get(caster)[damage_type_index] + dmg_bonus_flat_all_path.get(caster)
 
     #Get and curve target resist
-    resist = cache_get(target, "get_stats.dmg_reduce_percent")[damage_type_index] + cache_get(target, "get_stats.dmg_reduce_percent_all")
+    resist = dmg_reduce_percent_path.get(target)[damage_type_index] + dmg_reduce_percent_all_path.get(target)
     if target["is_player"]:
         resist = curve_stat(resist, duel["resist_limit"], duel["r_k0"], duel["r_n0"])
     resist = round(resist, 2)
 
     #Get pierce
-    pierce = cache_get(caster, "get_stats.ap_bonus_percent")[damage_type_index] + cache_get(caster, "get_stats.ap_bonus_percent_all")
+    pierce = ap_bonus_percent_path.get(caster)[damage_type_index] + ap_bonus_percent_all_path.get(caster)
     pierce = round(pierce, 2)
 
     #Stats for Critical calculation
     caster_level = caster["level"]
-    caster_crit = cache_get(caster, "get_stats.critical_hit_rating_by_school")[damage_type_index]
-    caster_crit += cache_get(caster, "get_stats.critical_hit_rating_all")
+    caster_crit = critical_hit_rating_by_school_path.get(caster)[damage_type_index]
+    caster_crit += critical_hit_rating_all_path.get(caster)
     target_level = target["level"]
-    target_block = cache_get(target, "get_stat.block_rating_by_school")[damage_type_index]
-    target_block += cache_get(target, "get_stats.block_rating_all")
+    target_block = block_rating_by_school_path.get(target)[damage_type_index]
+    target_block += block_rating_all_path.get(target)
 
     #Critical and block calculation
     is_pvp = duel["pvp"] or duel["raid"]
     crit_damage_multiplier, crit_chance, block_chance = calc_crit(caster_crit, target_block, caster_level, target_level, is_pvp)
 
     #If our crit chance is over threshold, we crit.
-    if effect["effect_type"] == SpellEffects.damage_no_crit: #Handles effect that never crits
+    if SpellEffects(effect["effect_type"]) == SpellEffects.damage_no_crit: #Handles effect that never crits
         pass
 
     elif crit_chance >= crit_threshold * (1 - block_chance):
@@ -435,10 +463,10 @@ def sim_damage(duel: Cache, caster: Cache, target: Cache, effect: Cache, crit_th
     else: #If the target is not ourselves, handle them normally
         target_result, damage_type, damage, pierce = sim_incoming_dmg_effects(target_result, damage_type, damage, pierce)
 
-    damage_type_index = MagicSchoolIndex[damage_type].value
+    damage_type_index = school_index[damage_type]
 
     # Flat resist
-    damage -= cache_get(target, "get_stats.dmg_reduce_flat")[damage_type_index] + cache_get(target, "get_stats.dmg_reduce_flat_all")
+    damage -= dmg_reduce_flat_path.get(target)[damage_type_index] + dmg_reduce_flat_all_path.get(target)
     damage = clamp(damage, 0.0, 2000000.0) #Min/max damage possible in wiz
 
     # Percent resist handling
@@ -466,10 +494,10 @@ def sim_incoming_damage(duel: Cache, target: Cache, damage_type: int, damage: fl
     '''Simulates pure damage on a member cache, only on the target side. Useful for effect handling.'''
     target_result = target
 
-    damage_type_index = MagicSchoolIndex[damage].value
+    damage_type_index = school_index[damage_type]
 
     #Get and curve target resist
-    resist = cache_get(target, "get_stats.dmg_reduce_percent")[damage_type_index] + cache_get(target, "get_stats.dmg_reduce_percent_all")
+    resist = dmg_reduce_percent_path.get(target)[damage_type_index] + dmg_reduce_percent_all_path.get(target)
     if target["is_player"]:
         resist = curve_stat(resist, duel["resist_limit"], duel["r_k0"], duel["r_n0"])
     resist = round(resist, 2)
@@ -477,7 +505,7 @@ def sim_incoming_damage(duel: Cache, target: Cache, damage_type: int, damage: fl
     target_result, damage_type, damage, pierce = sim_incoming_dmg_effects(target_result, damage_type, damage, 0.0)
 
     # Flat resist
-    damage -= cache_get(target, "get_stats.dmg_reduce_flat")[damage_type_index] + cache_get(target, "get_stats.dmg_reduce_flat_all")
+    damage -= dmg_reduce_flat_path.get(target)[damage_type_index] + dmg_reduce_flat_all_path.get(target)
     damage = clamp(damage, 0.0, 2000000.0) #Min/max damage possible in wiz
 
     # Percent resist handling
@@ -506,7 +534,7 @@ def get_multi_effects(effects: Iterable[Cache], valid_types: Set[SpellEffects],
     match_indices = []
 
     for i, effect in enumerate(effects):
-        if effect["effect_type"] not in matches:
+        if SpellEffects(effect["effect_type"]) not in valid_types:
             continue
 
         match disposition:
@@ -533,19 +561,19 @@ def sim_heal(duel: Cache, caster: Cache, target: Cache, effect: Cache, crit_thre
     target_result = target
 
     heal_type = effect["damage_type"]
-    heal_type_index = MagicSchoolIndex[heal_type].value
+    heal_type_index = school_index[heal_type]
 
     heal = effect["effect_param"]
-    heal_percent = cache_get(caster, "get_participant.get_stats.heal_bonus_percent")[heal_type_index] + cache_get(caster, "get_participant.get_stats.heal_bonus_percent_all")
+    heal_percent = heal_bonus_percent_path.get(caster)[heal_type_index] + heal_bonus_percent_all_path.get(caster)
     heal *= 1 + heal_percent
 
     #Stats for Critical calculation
     caster_level = caster["level"]
-    caster_crit = cache_get(caster, "get_stats.critical_hit_rating_by_school")[heal_type_index]
-    caster_crit += cache_get(caster, "get_stats.critical_hit_rating_all")
+    caster_crit = critical_hit_rating_by_school_path.get(caster)[heal_type_index]
+    caster_crit += critical_hit_rating_all_path.get(caster)
     target_level = target["level"]
-    target_block = cache_get(target, "get_stat.block_rating_by_school")[heal_type_index]
-    target_block += cache_get(target, "get_stats.block_rating_all")
+    target_block = block_rating_by_school_path.get(target)[heal_type_index]
+    target_block += block_rating_all_path.get(target)
 
     #Critical and block calculation
     is_pvp = duel["pvp"] or duel["raid"]
@@ -556,10 +584,10 @@ def sim_heal(duel: Cache, caster: Cache, target: Cache, effect: Cache, crit_thre
         heal *= crit_heal_multiplier
 
     # Outgoing damage hanging effects
-    caster_result, damage = sim_outgoing_heal_effects(caster_result, heal_type, damage)
+    caster_result, heal = sim_outgoing_heal_effects(caster_result, heal_type, heal)
 
     #Incoming heal stat application
-    heal_inc_percent = cache_get(caster, "get_participant.get_stats.heal_inc_bonus_percent")[heal_type_index] + cache_get(caster, "get_participant.get_stats.heal_inc_bonus_percent_all")
+    heal_inc_percent = heal_inc_bonus_percent_path.get(target)[heal_type_index] + heal_inc_bonus_percent_all_path.get(target)
     heal *= 1 + heal_inc_percent
 
     #Incoming damage effects and health increase
@@ -574,10 +602,11 @@ def sim_heal(duel: Cache, caster: Cache, target: Cache, effect: Cache, crit_thre
     return caster_result, target_result, heal
 
 
-def sim_effect(duel: Cache, caster: Cache, target: Cache, effect: Cache) -> Cache:
+def sim_effect(duel: Cache, caster: Cache, target: Cache, effect: Cache, crit_threshold: float = 0.8) -> Tuple[Cache, Cache]:
     '''Simulates an effect being applied to a specific member cache.'''
     target_result = target
     caster_result = caster
+    effect = dict(effect) #Some effects scale their param, which shouldn't leak back into the card's cache
 
     def _transfer_hanging_effects(origin: List[Cache], recipient: List[Cache], amount: int, valid_types: List[SpellEffects], disposition: HangingDisposition = HangingDisposition.both):
         _, effect_indices = get_multi_effects(origin, valid_types, disposition)
@@ -593,7 +622,7 @@ def sim_effect(duel: Cache, caster: Cache, target: Cache, effect: Cache) -> Cach
         _, effect_indices = get_multi_effects(origin, valid_types, disposition)
         effects = []
         for i in range(amount):
-            if len(effect_indices) < amount < i:
+            if not effect_indices:
                 break
 
             effect_index = effect_indices.pop(0)
@@ -602,40 +631,42 @@ def sim_effect(duel: Cache, caster: Cache, target: Cache, effect: Cache) -> Cach
 
         return effects
 
-    caster_pips = cache_get(caster_result, "get_participant.pip_count")
+    caster_pips = pip_count_path.get(caster_result)
     caster_total_spips = sum((caster_pips[f"{s}_pips"] for s in main_schools))
-    caster_effects: List[Cache] = cache_get_multi(caster_result, hanging_effect_paths)
-    caster_effects = sanitize_effect_list(caster_effects)
+    caster_effects: List[List[Cache]] = [path.get(caster_result) for path in hanging_effect_accessors]
+    for effects in caster_effects:
+        effects[:] = sanitize_effect_list(effects) #In place, so moving effects around below changes the caches
 
-    target_pips = cache_get(target_result, "get_participant.pip_count")
+    target_pips = pip_count_path.get(target_result)
     target_total_spips = sum((target_pips[f"{s}_pips"] for s in main_schools))
-    target_effects: List[Cache] = cache_get_multi(target_result, hanging_effect_paths)
-    target_effects = sanitize_effect_list(target_effects)
+    target_effects: List[List[Cache]] = [path.get(target_result) for path in hanging_effect_accessors]
+    for effects in target_effects:
+        effects[:] = sanitize_effect_list(effects)
 
     #Simulate the effect of every possible spell effect on the cache.
-    match effect["effect_type"]:
+    match SpellEffects(effect["effect_type"]):
         case SpellEffects.damage: #Regular hits
-            caster_result, target_result, _ = sim_damage(duel, caster_result, target_result, effect)
+            caster_result, target_result, _ = sim_damage(duel, caster_result, target_result, effect, crit_threshold)
 
         case SpellEffects.damage_no_crit: #Incoming
             caster_result, target_result, _ = sim_damage(duel, caster_result, target_result, effect, crit_threshold = 2.0)
 
         case SpellEffects.steal_health:
-            caster_result, target_result, damage = sim_damage(duel, caster_result, target_result, effect)
+            caster_result, target_result, damage = sim_damage(duel, caster_result, target_result, effect, crit_threshold)
             caster_result["health"] += damage * effect["heal_modifier"]
 
         case SpellEffects.damage_per_total_pip_power: #Per ENEMY pips, like mana burn
             target_total_pip_value = (target_total_spips * 2) + (target_pips["power_pips"] * 2) + target_pips["generic_pips"]
             effect["effect_param"] *= target_total_pip_value
-            caster_result, target_result, _ = sim_damage(duel, caster_result, target_result, effect)
+            caster_result, target_result, _ = sim_damage(duel, caster_result, target_result, effect, crit_threshold)
 
         case SpellEffects.heal:
-            caster_result, target_result, _ = sim_heal(duel, caster_result, target_result, effect)
+            caster_result, target_result, _ = sim_heal(duel, caster_result, target_result, effect, crit_threshold)
 
         case SpellEffects.heal_percent: #This might be a tad sussy. -slack
             effect["effect_param"] /= 100
             effect["effect_param"] *= target_result["max_health"]
-            caster_result, target_result, _ = sim_heal(duel, caster_result, target_result, effect)
+            caster_result, target_result, _ = sim_heal(duel, caster_result, target_result, effect, crit_threshold)
 
         case SpellEffects.set_heal_percent: #TODO: Handle this, and find a spell where its used.
             pass
@@ -651,7 +682,7 @@ def sim_effect(duel: Cache, caster: Cache, target: Cache, effect: Cache) -> Cach
             # TODO: Simplify this
             dots = _pop_hanging_effects(target_effects[0], effect["effect_param"], dot_effect_types, effect["disposition"])
             for dot in dots:
-                target_result = sim_incoming_damage(duel, target_result, dot["damage_type"], dot["effect_param"] * effect["heal_modifier"])
+                target_result, _ = sim_incoming_damage(duel, target_result, dot["damage_type"], dot["effect_param"] * effect["heal_modifier"])
 
         case SpellEffects.push_charm:
             _transfer_hanging_effects(caster_effects[0], target_effects[0], effect["effect_param"], charm_effect_types, effect["disposition"])
@@ -672,30 +703,30 @@ def sim_effect(duel: Cache, caster: Cache, target: Cache, effect: Cache) -> Cach
             _transfer_hanging_effects(target_effects[0], caster_effects[0], effect["effect_param"], dot_effect_types, effect["disposition"])
 
         case SpellEffects.swap_all: #Disjunction?
-            caster_temp = caster_effects[0]
-            caster_effects[0] = target_effects[0]
-            target_effects[0] = caster_temp
+            caster_temp = list(caster_effects[0])
+            caster_effects[0][:] = target_effects[0]
+            target_effects[0][:] = caster_temp
 
         case SpellEffects.swap_charm:
             caster_charms = _pop_hanging_effects(caster_effects[0], effect["effect_param"], charm_effect_types, effect["disposition"])
             target_charms = _pop_hanging_effects(target_effects[0], effect["effect_param"], charm_effect_types, effect["disposition"])
 
-            caster_effects[0] = target_charms + caster_effects[0]
-            target_effects[0] = caster_charms + target_effects[0]
+            caster_effects[0][:0] = target_charms
+            target_effects[0][:0] = caster_charms
 
         case SpellEffects.swap_ward:
             caster_wards = _pop_hanging_effects(caster_effects[0], effect["effect_param"], ward_effect_types, effect["disposition"])
             target_wards = _pop_hanging_effects(target_effects[0], effect["effect_param"], ward_effect_types, effect["disposition"])
 
-            caster_effects[0] = target_wards + caster_effects[0]
-            target_effects[0] = caster_wards + target_effects[0]
+            caster_effects[0][:0] = target_wards
+            target_effects[0][:0] = caster_wards
 
         case SpellEffects.swap_over_time:
             caster_dots = _pop_hanging_effects(caster_effects[0], effect["effect_param"], dot_effect_types, effect["disposition"])
             target_dots = _pop_hanging_effects(target_effects[0], effect["effect_param"], dot_effect_types, effect["disposition"])
 
-            caster_effects[0] = target_dots + caster_effects[0]
-            target_effects[0] = caster_dots + target_effects[0]
+            caster_effects[0][:0] = target_dots
+            target_effects[0][:0] = caster_dots
 
         case SpellEffects.clue:
             pass
@@ -731,11 +762,18 @@ def sim_effect(duel: Cache, caster: Cache, target: Cache, effect: Cache) -> Cach
             pass
 
         case SpellEffects.modify_pips:
-            pass #TODO: Make a mod pips function
+            target_pips = sim_modify_pips(target_pips, "generic_pips", effect["effect_param"], effect["damage_type"])
 
-        case _:
-            target_effects.insert(0, effect)
+        case SpellEffects.modify_power_pips:
+            target_pips = sim_modify_pips(target_pips, "power_pips", effect["effect_param"])
+
+        case SpellEffects.modify_shadow_pips:
+            target_pips = sim_modify_pips(target_pips, "shadow_pips", effect["effect_param"])
 
+        case _: #Anything left lingers on the target, charms, wards and over time effects
+            target_effects[0].insert(0, effect)
+
+    return caster_result, target_result
 
 
 spip_order = [
@@ -763,7 +801,7 @@ def generate_pip_list(pip_cache: Cache) -> Tuple[List[str], int]:
     '''
     pip_list = []
     for pip_type in all_pip_order:
-        pip_num = pip_cache["pip_type"]
+        pip_num = pip_cache[pip_type]
         if not pip_num:
             continue
 
@@ -782,6 +820,7 @@ def clamp_pips(pip_cache: Cache, pip_type: str) -> Tuple[Cache, int]:
     '''
 
     pip_cache_result = pip_cache
+    pip_num = pip_cache[pip_type]
     pip_cache_result[pip_type] = 0 #Used for getting minimum pip list
 
     min_pip_list, shadow_pips = generate_pip_list(pip_cache_result)
@@ -791,7 +830,7 @@ def clamp_pips(pip_cache: Cache, pip_type: str) -> Tuple[Cache, int]:
     if max_specific_pips <= 0:
         return pip_cache_result, shadow_pips
 
-    pip_cache_result[pip_type] = clamp(pip_cache[pip_type], 0, max_specific_pips)
+    pip_cache_result[pip_type] = clamp(pip_num, 0, max_specific_pips)
 
     return pip_cache_result, shadow_pips
 
@@ -805,27 +844,87 @@ def sim_add_pips(pip_cache: Cache, pip_type: str, param: int) -> Cache:
 
 def sim_remove_pips(pip_cache: Cache, pip_type: str, param: int) -> Cache:
     pip_cache_result = pip_cache
-    # TODO: THIS ENTIRE FUNCTION
+    pip_cache_result[pip_type] = max(pip_cache_result[pip_type] - param, 0)
+    return pip_cache_result
 
 
 def sim_modify_pips(pip_cache: Cache, pip_type: str, param: int, pip_school: int = MagicSchoolID.universal) -> Cache:
+    '''
+    Adds (positive param) or removes (negative param) pips of a type, as a modify pips effect would.\n
+    Args:
+    - pip_cache (Cache): Cache of the DynamicPipCount object.
+    - pip_type (str): String name of the pip type, as a key of the pip_cache Cache.
+    - param (int): Amount of pips to add or remove.
+    - pip_school (int): School id of the effect, pips of one of the main schools become that school's pips.
+    '''
     pip_cache_result = pip_cache
 
     if pip_type == "shadow_pips":
-        pip_cache_result[pip_type] = clamp(pip_cache[pip_type], 0, 2)
+        pip_cache_result[pip_type] = clamp(pip_cache[pip_type] + param, 0, 2)
         return pip_cache_result
-    
-    # TODO: THIS ENTIRE FUNCTION
 
+    if pip_school in MagicSchoolID._value2member_map_ and MagicSchoolID(pip_school).name in main_schools:
+        pip_type = f"{MagicSchoolID(pip_school).name}_pips"
 
+    if param >= 0:
+        return sim_add_pips(pip_cache_result, pip_type, param)
 
+    return sim_remove_pips(pip_cache_result, pip_type, -param)
 
-    # def _sim_remove_pips(pip_cache: Cache, pip_type: str)
 
-    return pip_cache_result
+def sim_spend_pips(pip_cache: Cache, rank: int, school_pips: Dict[str, int] = None, shadow_pips: int = 0, power_value: int = 2) -> bool:
+    '''
+    Spends the pips a spell costs, power pips first. Returns False and leaves the cache alone if it can't be paid.\n
+    Args:
+    - pip_cache (Cache): Cache of the DynamicPipCount object.
+    - rank (int): Regular pip cost of the spell.
+    - school_pips (Dict[str, int]): School pips the spell needs on top of that, by pip type.
+    - shadow_pips (int): Shadow pips the spell needs.
+    - power_value (int): What a power pip is worth, 2 for spells of the caster's school.
+    '''
+    school_pips = school_pips or {}
+    if pip_cache["shadow_pips"] < shadow_pips:
+        return False
+
+    for pip_type, pip_num in school_pips.items():
+        if pip_cache[pip_type] < pip_num:
+            return False
+
+    power = pip_cache["power_pips"]
+    power_used = min(power, rank // power_value)
+    remaining = rank - power_used * power_value
+    generic_used = min(pip_cache["generic_pips"], remaining)
+    remaining -= generic_used
+
+    #An odd pip left over still takes a whole power pip
+    while remaining > 0 and power_used < power:
+        power_used += 1
+        remaining -= power_value
+
+    if remaining > 0:
+        return False
+
+    sim_remove_pips(pip_cache, "power_pips", power_used)
+    sim_remove_pips(pip_cache, "generic_pips", generic_used)
+    sim_remove_pips(pip_cache, "shadow_pips", shadow_pips)
+    for pip_type, pip_num in school_pips.items():
+        sim_remove_pips(pip_cache, pip_type, pip_num)
+
+    return True
+
+
+def member_cache_adv_time_sim(cache: Cache, rounds: int = 1, ppip_threshold: float = 0.85) -> Cache:
+    '''Simulates the pips a member gains over a number of rounds. New pips are power pips if the power pip chance is at least ppip_threshold.'''
+    result_cache = cache
 
+    pip_count = pip_count_path.get(result_cache)
+    ppip_chance = (power_pip_base_path.get(result_cache) or 0.0) + (power_pip_bonus_percent_all_path.get(result_cache) or 0.0)
+    pip_type = "power_pips" if ppip_chance >= ppip_threshold else "generic_pips"
 
+    for _ in range(rounds):
+        sim_add_pips(pip_count, pip_type, 1)
 
+    return result_cache
 
 
 # Pip -> power pip -> fire pip -> ice pip
@@ -0,0 +1,639 @@
+import argparse
+import asyncio
+import copy
+import json
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional
+
+from wizwalker.combat import CombatMember
+from wizwalker.combat.card import CombatCard
+from wizwalker.memory.memory_objects.enums import SpellEffects, EffectTarget, HangingDisposition, MagicSchool
+from wizwalker.memory.memory_objects.spell_effect import CompoundSpellEffect
+from wizwalker.extensions.wizsprinter import SprintyCombat
+from wizwalker.extensions.wizsprinter.sprinty_combat import damage_effects
+from wizwalker.extensions.wizsprinter.combat_backends.combat_config_parser import NamedSpell
+
+from src.combat_cache import Cache, compile_path
+from src.combat_planner import Play, play_from_card, affordable, simulate_cast, team_id_path, spell_effects_path
+from src.combat_planner_bench import load_snapshot
+from src.config_combat import StrCombatConfigProvider, delegate_combat_configs
+from src.effect_simulation import sim_effect, member_cache_adv_time_sim, pip_count_path
+
+
+# Plays whole fights out from a recorded snapshot (Fighter.record_snapshot) many times over, to see how a combat config holds up.
+# Every trial runs the real SprintyCombat config logic (try_execute_config and everything below it) against stand-ins for
+# members and cards that read from and write to member caches, casts are simulated with combat_planner.simulate_cast.
+# Crits, fizzles, power pips and the order cards are drawn in are rolled from one random.Random per trial, seeded with
+# the seed and the trial number, so a seed gives the same results no matter how the trials are split over processes.
+#   python -m src.fight_simulation fight.yaml --config config.txt --trials 5000 --workers 8
+# The scenario is the snapshot plus optionally:
+#   decks: owner id -> card caches to draw from once the hand runs low, defaults to the recorded hand
+#   enemy_hits: owner id -> {"damage": 500, "school": "fire"}, a hit that enemy lands on a random ally every round
+# Enemies do nothing else, pets never willcast and req_met/gambit/clear/swap filters never match.
+
+HAND_SIZE = 7
+DEFAULT_TRIALS = 1000
+DEFAULT_MAX_ROUNDS = 30
+# Trials a worker gets at a time, a few chunks per worker keeps them busy if some fights run longer
+CHUNKS_PER_WORKER = 4
+
+accuracy_path = compile_path("get_graphical_spell.accuracy")
+
+WIN = "win"
+LOSS = "loss"
+TIMEOUT = "timeout"
+
+
+class TrialResult:
+    __slots__ = ("outcome", "rounds", "casts", "fizzles")
+
+    def __init__(self, outcome: str, rounds: int, casts: Dict[str, int], fizzles: Dict[str, int]):
+        self.outcome = outcome
+        self.rounds = rounds
+        self.casts = casts
+        self.fizzles = fizzles
+
+
+class FightStats:
+    def __init__(self):
+        self.trials = 0
+        self.outcomes: Counter[str] = Counter()
+        # rounds fights took -> how many, won fights only
+        self.win_rounds: Counter[int] = Counter()
+        self.casts: Counter[str] = Counter()
+        self.fizzles: Counter[str] = Counter()
+
+    def add(self, result: TrialResult):
+        self.trials += 1
+        self.outcomes[result.outcome] += 1
+        if result.outcome == WIN:
+            self.win_rounds[result.rounds] += 1
+        self.casts.update(result.casts)
+        self.fizzles.update(result.fizzles)
+
+    @property
+    def win_rate(self) -> float:
+        return self.outcomes[WIN] / self.trials if self.trials else 0.0
+
+    def rounds_percentile(self, percent: float) -> int:
+        ordered = sorted(self.win_rounds.elements())
+        if not ordered:
+            return 0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def as_dict(self) -> dict:
+        return {
+            "trials": self.trials,
+            "wins": self.outcomes[WIN],
+            "losses": self.outcomes[LOSS],
+            "timeouts": self.outcomes[TIMEOUT],
+            "win_rate": self.win_rate,
+            "rounds_to_win": {str(r): n for r, n in sorted(self.win_rounds.items())},
+            "rounds_to_win_median": self.rounds_percentile(50),
+            "rounds_to_win_p90": self.rounds_percentile(90),
+            "casts_per_trial": {name: n / self.trials for name, n in self.casts.most_common()} if self.trials else {},
+            "fizzles": dict(self.fizzles.most_common()),
+        }
+
+    def report(self) -> str:
+        data = self.as_dict()
+        lines = [
+            f"{data['trials']} trials: {data['wins']} won, {data['losses']} lost, {data['timeouts']} timed out ({data['win_rate']:.1%} win rate)",
+            f"rounds to win: median {data['rounds_to_win_median']}, p90 {data['rounds_to_win_p90']}",
+        ]
+        for rounds, count in data["rounds_to_win"].items():
+            lines.append(f"    {rounds:>3}: {count}")
+        lines.append("casts per trial:")
+        for name, count in data["casts_per_trial"].items():
+            fizzled = self.fizzles[name]
+            lines.append(f"    {name}: {count:.2f}" + (f" ({fizzled} fizzled)" if fizzled else ""))
+        return "\n".join(lines)
+
+
+def _enum_or_none(enum, value):
+    return enum(value) if value is not None else None
+
+
+class _SimEffect:
+    # Enough of DynamicSpellEffect for the config matching, read from an effect cache
+    def __init__(self, cache: Cache):
+        self.cache = cache
+
+    async def effect_type(self) -> SpellEffects:
+        return SpellEffects(self.cache["effect_type"])
+
+    async def effect_target(self) -> Optional[EffectTarget]:
+        return _enum_or_none(EffectTarget, self.cache.get("effect_target"))
+
+    async def disposition(self) -> Optional[HangingDisposition]:
+        return _enum_or_none(HangingDisposition, self.cache.get("disposition"))
+
+    async def effect_param(self) -> int:
+        return self.cache["effect_param"]
+
+    async def num_rounds(self) -> int:
+        return self.cache.get("num_rounds") or 0
+
+    async def damage_type(self) -> int:
+        return self.cache["damage_type"]
+
+    async def pip_num(self) -> int:
+        return self.cache.get("pip_num") or 0
+
+
+class _SimCompoundEffect(_SimEffect, CompoundSpellEffect):
+    # A CompoundSpellEffect so _flatten_effect unwraps it
+    def __init__(self, cache: Cache):
+        _SimEffect.__init__(self, cache)
+
+    async def effects_list(self) -> List[_SimEffect]:
+        return [_wrap_effect(effect) for effect in self.cache["maybe_effect_list"]]
+
+
+def _wrap_effect(cache: Cache) -> _SimEffect:
+    if cache.get("maybe_effect_list"):
+        return _SimCompoundEffect(cache)
+    return _SimEffect(cache)
+
+
+class _SimParticipant:
+    def __init__(self, member: "_SimMember"):
+        self.member = member
+
+    async def team_id(self) -> int:
+        return team_id_path.get(self.member.cache)
+
+    async def owner_id_full(self) -> int:
+        return self.member.owner_id_value
+
+    async def hanging_effects(self) -> List[_SimEffect]:
+        return [_wrap_effect(effect) for effect in self.member.cache["get_participant"]["hanging_effects"]]
+
+    async def aura_effects(self) -> List[_SimEffect]:
+        return [_wrap_effect(effect) for effect in self.member.cache["get_participant"]["aura_effects"]]
+
+
+class _SimMember(CombatMember):
+    def __init__(self, fight: "_Fight", owner_id: int):
+        super().__init__(None, None)
+        self.fight = fight
+        self.owner_id_value = owner_id
+
+    @property
+    def cache(self) -> Cache:
+        # Looked up every time, simulated casts replace the caches in fight.members
+        return self.fight.members[self.owner_id_value]
+
+    async def get_participant(self) -> _SimParticipant:
+        return _SimParticipant(self)
+
+    async def name(self) -> str:
+        return self.cache.get("name") or ""
+
+    async def owner_id(self) -> int:
+        return self.owner_id_value
+
+    async def is_client(self) -> bool:
+        return bool(self.cache.get("is_client"))
+
+    async def is_player(self) -> bool:
+        return bool(self.cache.get("is_player"))
+
+    async def is_boss(self) -> bool:
+        return bool(self.cache.get("is_boss"))
+
+    async def is_dead(self) -> bool:
+        return self.cache["health"] <= 0
+
+    async def is_stunned(self) -> bool:
+        return False
+
+    async def health(self) -> int:
+        return self.cache["health"]
+
+    async def max_health(self) -> int:
+        return self.cache["max_health"]
+
+    async def level(self) -> int:
+        return self.cache.get("level") or 0
+
+    async def normal_pips(self) -> int:
+        return pip_count_path.get(self.cache)["generic_pips"]
+
+    async def power_pips(self) -> int:
+        return pip_count_path.get(self.cache)["power_pips"]
+
+    async def shadow_pips(self) -> int:
+        return pip_count_path.get(self.cache)["shadow_pips"]
+
+
+class _HandCard:
+    '''A card in a simulated hand. The cache is shared with the deck until an enchant copies it.'''
+    __slots__ = ("cache", "owner_id", "enchanted", "accuracy", "play", "effects")
+
+    def __init__(self, cache: Cache, owner_id: int):
+        self.cache = cache
+        self.owner_id = owner_id
+        self.enchanted = bool(cache.get("is_enchanted"))
+        self.accuracy = accuracy_path.get(cache)
+        self.play: Optional[Play] = None
+        self.effects: List[_SimEffect] = []
+        self.refresh()
+
+    def refresh(self):
+        # Cards the search skips (enchants, cards cast on cards) have no play, casting them on a member does nothing
+        self.play = play_from_card({**self.cache, "is_castable": True}, self.owner_id, 0)
+        self.effects = [_wrap_effect(effect) for effect in spell_effects_path.get(self.cache) or []]
+
+
+class _SimCard(CombatCard):
+    def __init__(self, fight: "_Fight", card: _HandCard):
+        super().__init__(None, None)
+        self.fight = fight
+        self.card = card
+
+    async def name(self) -> str:
+        return self.card.cache.get("name") or ""
+
+    async def is_castable(self) -> bool:
+        return self.fight.is_castable(self.card)
+
+    async def is_enchanted(self) -> bool:
+        return self.card.enchanted
+
+    async def is_enchanted_from_item_card(self) -> bool:
+        return False
+
+    async def is_treasure_card(self) -> bool:
+        return False
+
+    async def is_item_card(self) -> bool:
+        return False
+
+    async def is_cloaked(self) -> bool:
+        return False
+
+    async def get_spell_effects(self) -> List[_SimEffect]:
+        return self.card.effects
+
+    async def discard(self, *, sleep_time: Optional[float] = 1.0):
+        self.fight.discard(self.card)
+
+    async def cast(self, target, *, sleep_time: Optional[float] = 1.0, debug_paint: bool = False):
+        if isinstance(target, _SimCard):
+            self.fight.enchant(self.card, target.card)
+            return
+
+        if isinstance(target, list): #Multi target, the simulation hits everyone the effect targets
+            target = target[0] if target else None
+        self.fight.cast(self.card, target.owner_id_value if target is not None else None)
+
+
+class _Windowless:
+    async def get_windows_with_name(self, name: str) -> list:
+        return []
+
+    async def get_windows_with_type(self, type_name: str) -> list:
+        return []
+
+
+class _SimClient:
+    def __init__(self):
+        self.root_window = _Windowless()
+
+
+class SimulatedCombat(SprintyCombat):
+    '''SprintyCombat for one caster in a simulated fight, what it reads and clicks goes to the fight's caches instead of the game.'''
+    def __init__(self, fight: "_Fight", owner_id: int, config: StrCombatConfigProvider):
+        super().__init__(_SimClient(), config)
+        self.fight = fight
+        self.owner_id = owner_id
+        self.fizzled = False
+
+    async def get_members(self) -> List[_SimMember]:
+        # Dead members leave the fight
+        return [member for member in self.fight.sim_members if member.cache["health"] > 0]
+
+    async def get_client_member(self, *, retries: int = 5, sleep_time: float = 0.5) -> _SimMember:
+        return self.fight.sim_members_by_id[self.owner_id]
+
+    async def get_member_named(self, name: str) -> Optional[_SimMember]:
+        for member in await self.get_members():
+            if name == await member.name():
+                return member
+        return None
+
+    async def get_member_vaguely_named(self, name: str) -> Optional[_SimMember]:
+        for member in await self.get_members():
+            if name.lower() in (await member.name()).lower():
+                return member
+        return None
+
+    async def get_cards(self) -> List[_SimCard]:
+        cards = [_SimCard(self.fight, card) for card in self.fight.hands[self.owner_id]]
+        return [card for card in cards if card.card.enchanted] + [card for card in cards if not card.card.enchanted]
+
+    async def get_num_card_windows(self) -> int:
+        return len(self.fight.hands[self.owner_id])
+
+    async def get_card_counts(self) -> Tuple[int, int]:
+        return len(self.fight.decks[self.owner_id]), len(self.fight.decks[self.owner_id])
+
+    async def disc_on_target(self, targ: _SimCard):
+        await targ.discard()
+        self.cur_card_count -= 1
+
+    async def pass_button(self):
+        self.was_pass = True
+
+    async def card_requirements_met(self, card, target_member) -> bool:
+        return False
+
+    async def card_matches_gambit_or_clear(self, card, target_member, spec) -> bool:
+        return False
+
+    async def card_matches_swap(self, card, spec) -> bool:
+        return False
+
+    async def try_execute_config(self, move_config, willcasted: bool = False):
+        move = move_config.move
+        if not isinstance(move, list) and isinstance(move.card, NamedSpell) and move.card.name == "willcast":
+            # Pets aren't simulated, this is what the real one does when the pet card is grayed out
+            return move_config.condition is None or await self.evaluate_condition(move_config.condition)
+        return await super().try_execute_config(move_config, willcasted)
+
+    async def simulate_round(self, real_round: int):
+        '''The config part of SprintyCombat.handle_round.'''
+        self.config.attach_combat(self)
+        if self.had_first_round and self.fizzled:
+            await self.on_fizzle()
+        self.fizzled = False
+        self.was_pass = False
+        current_round = real_round - 1 + self.turn_adjust + self.rel_round_offset
+
+        round_config = await self.config.get_real_round(real_round)
+        if round_config is None:
+            round_config = await self.config.get_relative_round(current_round)
+        else:
+            self.rel_round_offset -= 1
+
+        if round_config is not None:
+            for p in round_config.priorities:
+                if await self.try_execute_config(p):
+                    break
+            else:
+                await self.pass_button()
+
+        self.had_first_round = True
+
+
+class _Fight:
+    def __init__(self, scenario: Cache, rng: random.Random):
+        self.rng = rng
+        self.duel = scenario["duel"]
+        members = copy.deepcopy(scenario["members"])
+        # Members whose participant couldn't be read can't be simulated
+        self.members: Dict[int, Cache] = {m["owner_id"]: m for m in members if pip_count_path.get(m) is not None}
+        self.sim_members = [_SimMember(self, owner_id) for owner_id in self.members]
+        self.sim_members_by_id = {member.owner_id_value: member for member in self.sim_members}
+
+        caster_ids = [owner_id for owner_id in scenario["hands"] if owner_id in self.members]
+        self.ally_team_id = team_id_path.get(self.members[caster_ids[0]]) if caster_ids else None
+        self.hands: Dict[int, List[_HandCard]] = {}
+        self.decks: Dict[int, List[Cache]] = {}
+        decks = scenario.get("decks") or {}
+        for owner_id in caster_ids:
+            self.hands[owner_id] = [_HandCard(card, owner_id) for card in scenario["hands"][owner_id]]
+            deck = list(decks.get(owner_id, scenario["hands"][owner_id]))
+            rng.shuffle(deck)
+            self.decks[owner_id] = deck
+
+        self.enemy_hits: Dict[int, Cache] = scenario.get("enemy_hits") or {}
+        self.combats: Dict[int, SimulatedCombat] = {}
+        self.acted = set()
+        self.casts: Counter[str] = Counter()
+        self.fizzles: Counter[str] = Counter()
+
+    def alive(self, owner_id: int) -> bool:
+        return self.members[owner_id]["health"] > 0
+
+    def team_alive(self, allies: bool) -> bool:
+        return any(
+            m["health"] > 0 and (team_id_path.get(m) == self.ally_team_id) == allies
+            for m in self.members.values()
+        )
+
+    def is_castable(self, card: _HandCard) -> bool:
+        if card.owner_id in self.acted or not self.alive(card.owner_id):
+            return False
+        return card.play is None or affordable(self.members[card.owner_id], card.play)
+
+    def discard(self, card: _HandCard):
+        self.hands[card.owner_id].remove(card)
+
+    def enchant(self, enchant: _HandCard, target: _HandCard):
+        self.hands[enchant.owner_id].remove(enchant)
+        self.casts[enchant.cache.get("name") or ""] += 1
+        target.cache = copy.deepcopy(target.cache)
+        effects = spell_effects_path.get(target.cache) or []
+        for enchant_effect in spell_effects_path.get(enchant.cache) or []:
+            match SpellEffects(enchant_effect["effect_type"]):
+                case SpellEffects.modify_card_damage:
+                    _add_damage(effects, enchant_effect["effect_param"])
+                case SpellEffects.modify_card_accuracy:
+                    target.accuracy = (target.accuracy or 0) + enchant_effect["effect_param"]
+
+        target.enchanted = True
+        target.refresh()
+
+    def cast(self, card: _HandCard, target_id: Optional[int]):
+        caster_id = card.owner_id
+        self.hands[caster_id].remove(card)
+        self.acted.add(caster_id)
+        name = card.cache.get("name") or ""
+        if card.play is None:
+            return
+
+        if card.accuracy is not None and self.rng.random() * 100 >= card.accuracy:
+            # Fizzles cost the card but no pips
+            self.fizzles[name] += 1
+            self.combats[caster_id].fizzled = True
+            return
+
+        self.casts[name] += 1
+        if card.play.target_kind is not None and (target_id is None or not self.alive(target_id)):
+            target_id = self._default_target(caster_id, card.play)
+        simulate_cast(self.duel, self.members, caster_id, card.play, target_id, self.ally_team_id, crit_threshold=self.rng.random())
+
+    def _default_target(self, caster_id: int, play: Play) -> Optional[int]:
+        allies = play.target_kind in {EffectTarget.friendly_single.value, EffectTarget.friendly_single_not_me.value}
+        for owner_id, member in self.members.items():
+            if member["health"] > 0 and (team_id_path.get(member) == self.ally_team_id) == allies and owner_id != caster_id:
+                return owner_id
+        return caster_id
+
+    def enemies_act(self):
+        allies = [owner_id for owner_id, m in self.members.items() if m["health"] > 0 and team_id_path.get(m) == self.ally_team_id]
+        for owner_id, hit in self.enemy_hits.items():
+            if not allies or owner_id not in self.members or not self.alive(owner_id):
+                continue
+
+            target_id = self.rng.choice(allies)
+            effect = {
+                "effect_type": SpellEffects.damage.value,
+                "effect_param": hit["damage"],
+                "damage_type": MagicSchool[hit["school"]].value,
+                "effect_target": EffectTarget.enemy_single.value,
+                "disposition": HangingDisposition.harmful.value,
+            }
+            self.members[owner_id], self.members[target_id] = sim_effect(
+                self.duel, self.members[owner_id], self.members[target_id], effect, self.rng.random()
+            )
+            allies = [a for a in allies if self.alive(a)]
+
+    def next_round(self):
+        for member in self.members.values():
+            if member["health"] > 0:
+                member_cache_adv_time_sim(member, ppip_threshold=self.rng.random())
+
+        for owner_id, hand in self.hands.items():
+            deck = self.decks[owner_id]
+            while len(hand) < HAND_SIZE and deck:
+                hand.append(_HandCard(deck.pop(), owner_id))
+        self.acted.clear()
+
+    async def run(self, configs: Dict[int, StrCombatConfigProvider], max_rounds: int) -> TrialResult:
+        self.combats = {owner_id: SimulatedCombat(self, owner_id, config) for owner_id, config in configs.items() if owner_id in self.hands}
+        for round_number in range(1, max_rounds + 1):
+            for owner_id, combat in self.combats.items():
+                if not self.alive(owner_id):
+                    continue
+                try:
+                    await combat.simulate_round(round_number)
+                except RuntimeError: #No config line for this round, same as passing here
+                    pass
+
+                if not self.team_alive(allies=False):
+                    return self._result(WIN, round_number)
+
+            self.enemies_act()
+            if not self.team_alive(allies=True):
+                return self._result(LOSS, round_number)
+
+            self.next_round()
+
+        return self._result(TIMEOUT, max_rounds)
+
+    def _result(self, outcome: str, rounds: int) -> TrialResult:
+        return TrialResult(outcome, rounds, dict(self.casts), dict(self.fizzles))
+
+
+def _add_damage(effects: List[Cache], amount: int):
+    for effect in effects:
+        if effect.get("maybe_effect_list"):
+            _add_damage(effect["maybe_effect_list"], amount)
+        elif SpellEffects(effect["effect_type"]) in damage_effects:
+            effect["effect_param"] += amount
+
+
+class FightSimulator:
+    '''Runs trials of one scenario, each caster (owner id in the scenario hands) uses the config at its index.'''
+    def __init__(self, scenario: Cache, configs: List[str], max_rounds: int = DEFAULT_MAX_ROUNDS):
+        self.scenario = scenario
+        self.max_rounds = max_rounds
+        caster_ids = list(scenario["hands"])
+        # Parsed once per distinct config, every trial attaches its own combat
+        providers = {config: StrCombatConfigProvider(config, cast_time=0.0) for config in set(configs)}
+        self.configs = {caster_ids[i]: providers[config] for i, config in enumerate(configs[:len(caster_ids)])}
+
+    async def _run_trials(self, seed: int, start: int, stop: int) -> List[TrialResult]:
+        results = []
+        for trial in range(start, stop):
+            fight = _Fight(self.scenario, random.Random(f"{seed}:{trial}"))
+            results.append(await fight.run(self.configs, self.max_rounds))
+        return results
+
+    def run_trials(self, seed: int, start: int, stop: int) -> List[TrialResult]:
+        return asyncio.run(self._run_trials(seed, start, stop))
+
+
+_worker_simulator: Optional[FightSimulator] = None
+
+
+def _init_worker(scenario: Cache, configs: List[str], max_rounds: int):
+    global _worker_simulator
+    _worker_simulator = FightSimulator(scenario, configs, max_rounds)
+
+
+def _run_chunk(seed: int, start: int, stop: int) -> List[TrialResult]:
+    return _worker_simulator.run_trials(seed, start, stop)
+
+
+def simulate_fights(
+    scenario: Cache,
+    configs: List[str],
+    trials: int = DEFAULT_TRIALS,
+    seed: int = 0,
+    workers: int = 1,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+) -> FightStats:
+    '''
+    Plays a scenario out trials times and collects the outcomes.\n
+    Args:
+    - scenario (Cache): Fighter.record_snapshot output, plus optional decks and enemy_hits.
+    - configs (List[str]): Combat config per caster, in the order of the scenario hands.
+    - trials (int): How many fights to play.
+    - seed (int): Same seed, same results, for any number of workers.
+    - workers (int): Processes to run trials in, 1 runs them in this one.
+    - max_rounds (int): Rounds after which a fight counts as timed out.
+    '''
+    stats = FightStats()
+    if workers <= 1:
+        for result in FightSimulator(scenario, configs, max_rounds).run_trials(seed, 0, trials):
+            stats.add(result)
+        return stats
+
+    chunk_size = max(1, ceil(trials / (workers * CHUNKS_PER_WORKER)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scenario, configs, max_rounds)) as pool:
+        chunks = [pool.submit(_run_chunk, seed, start, min(start + chunk_size, trials)) for start in range(0, trials, chunk_size)]
+        for chunk in chunks:
+            for result in chunk.result():
+                stats.add(result)
+    return stats
+
+
+def load_scenario(path: Path) -> Cache:
+    scenario = load_snapshot(path)
+    # json turns the owner id keys into strings
+    for key in ("decks", "enemy_hits"):
+        if key in scenario:
+            scenario[key] = {int(owner_id): value for owner_id, value in scenario[key].items()}
+    return scenario
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Play a combat config through a recorded fight many times")
+    arg_parser.add_argument("scenario", type=Path)
+    arg_parser.add_argument("--config", type=Path, required=True, help="combat config, ###pX lines split it per client")
+    arg_parser.add_argument("--trials", type=int, default=DEFAULT_TRIALS)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--workers", type=int, default=1, help="processes to run trials in")
+    arg_parser.add_argument("--max-rounds", type=int, default=DEFAULT_MAX_ROUNDS, help="rounds before a fight counts as timed out")
+    arg_parser.add_argument("--json", type=Path, help="also write the results as json")
+    args = arg_parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    client_configs = delegate_combat_configs(args.config.read_text(), len(scenario["hands"]))
+    configs = [client_configs[i] for i in sorted(client_configs)]
+    stats = simulate_fights(scenario, configs, args.trials, args.seed, args.workers, args.max_rounds)
+    print(stats.report())
+    if args.json is not None:
+        args.json.write_text(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -528,6 +528,16 @@ def manage_gui(send_queue: queue.Queue, recv_queue: queue.Queue, theme_dict, too
     _last_hooked_data = launcher.get('last_hooked_data', {})
     account_list = launcher.get('account_list')
 
+    def _swap_slot_info(slot_info):
+        swapped_info = {}
+        for (side, idx), info in slot_info.items():
+            new_side = 'ally' if side == 'enemy' else 'enemy'
+            new_info = dict(info)
+            if 'is_friendly' in new_info:
+                new_info['is_friendly'] = not new_info['is_friendly']
+            swapped_info[(new_side, idx)] = new_info
+        return swapped_info
+
     def poll_queue():
         try:
             while True:
@@ -564,18 +574,15 @@ def manage_gui(send_queue: queue.Queue, recv_queue: queue.Queue, theme_dict, too
                                 _pending_view_side[0] = None
                             _last_stat_response[0] = value
                             _update_damage_readout()
+                        elif tag == 'stat_viewer_changes':
+                            # Only the lines that changed since the last full list, by key
+                            _last_stat_response[0] = [value.get(entry.get('key'), entry) for entry in _last_stat_response[0]]
+                            _update_damage_readout()
                         elif tag == 'slot_info':
-                            if _swapped[0]:
-                                swapped_info = {}
-                                for (side, idx), info in value.items():
-                                    new_side = 'ally' if side == 'enemy' else 'enemy'
-                                    new_info = dict(info)
-                                    if 'is_friendly' in new_info:
-                                        new_info['is_friendly'] = not new_info['is_friendly']
-                                    swapped_info[(new_side, idx)] = new_info
-                                duel_circle.set_slot_info(swapped_info)
-                            else:
-                                duel_circle.set_slot_info(value)
+                            duel_circle.set_slot_info(_swap_slot_info(value) if _swapped[0] else value)
+                        elif tag == 'slot_info_changes':
+                            # Only the slots that changed since the last full slot info
+                            duel_circle.update_slot_info(_swap_slot_info(value) if _swapped[0] else value)
                         elif tag == 'FlythroughStatus':
                             flythrough_exports.get('set_running', lambda v: None)(value == 'Enabled')
                         elif tag == 'BotStatus':
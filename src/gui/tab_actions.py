@@ -1,12 +1,37 @@
 """Flythrough, Bot, and Combat tabs — all share the editor+import/export/execute/kill pattern."""
 
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QFileDialog, QPushButton
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QFileDialog, QPushButton, QLabel
+from PyQt6.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from src.deimoslang.incremental import compile_incremental
 
 from src.gui.commands import GUICommand, GUICommandType
 from src.gui.helpers import centered_label, repo_icon_btn, add_recent, show_recent_menu
 
 
+class _CheckSignals(QObject):
+    """Carries a finished compile back to the UI thread."""
+    finished = pyqtSignal(object)
+
+
+class _CheckScript(QRunnable):
+    """Compiles a script on the thread pool so typing never waits on the compiler."""
+
+    def __init__(self, signals, previous, text):
+        super().__init__()
+        self.signals = signals
+        self.previous = previous
+        self.text = text
+
+    def run(self):
+        state = compile_incremental(self.previous, self.text)
+        try:
+            self.signals.finished.emit(state)
+        except RuntimeError:
+            # the tab was closed while compiling
+            pass
+
+
 def _make_toggle_btn(ctx, play_tooltip, kill_tooltip, execute_cb, kill_cb, action_id):
     """Create a single play/kill toggle button."""
     _running = [False]
@@ -111,6 +136,50 @@ def build_bot_tab(ctx):
     ctx.widget_tags['bot_creator'] = editor
     layout.addWidget(editor, 1)
 
+    error_label = QLabel()
+    error_label.setStyleSheet("color: orange; font-style: italic;")
+    error_label.setWordWrap(True)
+    error_label.hide()
+    layout.addWidget(error_label)
+
+    # Expert mode scripts are checked shortly after typing stops, reusing the previous compile for unchanged parts.
+    # The compile runs on the thread pool, one at a time since each builds on the last; edits made meanwhile are checked
+    # once it is done.
+    _compile_state = [None]
+    _checking = [False]
+    _check_again = [False]
+    check_signals = _CheckSignals(editor)
+    check_timer = QTimer(editor)
+    check_timer.setSingleShot(True)
+    check_timer.setInterval(400)
+
+    def check_script():
+        if _checking[0]:
+            _check_again[0] = True
+            return
+        text = editor.toPlainText()
+        if not text.startswith("###deimos_expertmode"):
+            _compile_state[0] = None
+            error_label.hide()
+            return
+        _checking[0] = True
+        QThreadPool.globalInstance().start(_CheckScript(check_signals, _compile_state[0], text))
+
+    def script_checked(state):
+        _checking[0] = False
+        _compile_state[0] = state
+        if _check_again[0]:
+            # the result is already stale, don't show it
+            _check_again[0] = False
+            check_script()
+            return
+        error_label.setText(str(state.error))
+        error_label.setVisible(not state.ok)
+
+    check_signals.finished.connect(script_checked)
+    check_timer.timeout.connect(check_script)
+    editor.textChanged.connect(check_timer.start)
+
     btn_row = QHBoxLayout()
 
     def bot_import():
@@ -667,6 +667,10 @@ class DuelCircleWidget(QWidget):
         self._slot_stunned = {k: v.get('is_stunned', False) for k, v in info.items()}
         self.update()
 
+    def update_slot_info(self, changes):
+        # Merges the slots that changed into the current slot info
+        self.set_slot_info({**self._slot_info, **changes})
+
     def swap_sides(self):
         if self._anim_timer.isActive():
             self._anim_timer.stop()
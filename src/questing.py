@@ -8,6 +8,7 @@ from loguru import logger
 import re
 from src.auto_pet import auto_pet
 from src.teleport_math import *
+from src.tour_math import plan_tour
 from wizwalker import XYZ, Keycode, MemoryReadError, Client, Rectangle, HookAlreadyActivated, HookNotActive
 from wizwalker.file_readers.wad import Wad
 from wizwalker.memory import DynamicClientObject
@@ -71,12 +72,11 @@ class Quester():
 
         return True
 
-    async def get_zone_chunks(self) -> list[XYZ]:
+    async def get_zone_chunks(self, coverage_radius: float = None) -> list[XYZ]:
         wad = await self.load_wad(await self.client.zone_name())
-        nav_data = await wad.get_file("zone.nav")
-        vertices, _ = parse_nav_data(nav_data)
+        vertices, _ = await read_nav(wad)
 
-        full = calc_chunks(vertices)
+        full = calc_chunks(vertices, coverage_radius=coverage_radius)
         return full
 
     async def get_collect_quest_object_name(self) -> str:
@@ -653,6 +653,8 @@ class Quester():
         entities_to_skip = ['Basic Positional', 'WispHealth', 'WispMana', 'KT_WispHealth', 'KT_WispMana', 'WispGold', 'DuelCircle', 'Player Object', 'SkeletonKeySigilArt', 'Basic Ambient', 'TeleportPad']
 
         chunk_cords = await self.get_zone_chunks()  # list of cords that load in chunk
+        visit_order, _ = plan_tour(await client.body.position(), chunk_cords)  # shortest order to visit the chunks from where we are
+        chunk_cords = [chunk_cords[i] for i in visit_order]
         for points in chunk_cords:  # loops through the points
             points = XYZ(points.x, points.y, points.z - 550)  # sets cord to underground to avoid pull / detection
             await client.teleport(points)  # teleports under the area
@@ -41,6 +41,8 @@ DEFAULT_SETTINGS = {
     "kill_minions_first": False,
     "automatic_team_based_combat": False,
     "discard_duplicate_cards": True,
+    # seconds the combat planner may think per round, 0 leaves every round to the combat config
+    "combat_planner_budget": 0.0,
     # [launcher]
     "remember_chosen_clients": False,
 }
@@ -73,6 +75,7 @@ _INI_SETTINGS_MAP = {
     ("combat", "kill_minions_first"): ("kill_minions_first", bool),
     ("combat", "automatic_team_based_combat"): ("automatic_team_based_combat", bool),
     ("combat", "discard_duplicate_cards"): ("discard_duplicate_cards", bool),
+    ("combat", "combat_planner_budget"): ("combat_planner_budget", float),
 }
 
 
@@ -0,0 +1,165 @@
+import argparse
+import json
+import time
+from copy import deepcopy
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from wizwalker.memory.memory_objects.enums import SpellEffects, MagicSchool
+
+from src.combat_cache import Cache, cache_get, compile_path
+from src.combat_planner import team_id_path
+from src.combat_planner_bench import load_snapshot
+from src.effect_simulation import sim_damage
+from src.batch_simulation import batch_damage, encode_members, encode_effects
+
+
+# Times sim_damage per hit, the batched version per (effect, target) pair, and a stat read through cache_get next to the
+# same read through its compiled path.
+#   python -m src.sim_damage_bench fight.yaml --calls 2000 --repeat 5
+# Every damage effect in the recorded hands is cast at every enemy. Without files it runs on two built-in casters, one
+# with nothing hanging and one with a blade and trap stack on both sides.
+# sim_damage uses up the effects it applies, so every call gets its own copies, made before the clock starts.
+
+damage_effect_types = (SpellEffects.damage.value, SpellEffects.damage_no_crit.value)
+stat_path = "get_stats.dmg_bonus_percent"
+
+
+def _stats(damage: float, resist: float, crit: float, block: float) -> Cache:
+    schools = 16
+    return {
+        "dmg_bonus_percent": [damage] * schools, "dmg_bonus_percent_all": 0.0,
+        "dmg_bonus_flat": [0.0] * schools, "dmg_bonus_flat_all": 0.0,
+        "dmg_reduce_percent": [resist] * schools, "dmg_reduce_percent_all": 0.0,
+        "dmg_reduce_flat": [0.0] * schools, "dmg_reduce_flat_all": 0.0,
+        "ap_bonus_percent": [0.1] * schools, "ap_bonus_percent_all": 0.0,
+        "critical_hit_rating_by_school": [crit] * schools, "critical_hit_rating_all": 0.0,
+        "block_rating_by_school": [block] * schools, "block_rating_all": 0.0,
+        "heal_bonus_percent": [0.0] * schools, "heal_bonus_percent_all": 0.0,
+        "heal_inc_bonus_percent": [0.0] * schools, "heal_inc_bonus_percent_all": 0.0,
+        "power_pip_base": 0.0, "power_pip_bonus_percent_all": 0.0,
+    }
+
+
+def _effect(effect_type: SpellEffects, param: int, school: MagicSchool = MagicSchool.fire) -> Cache:
+    return {
+        "effect_type": effect_type.value, "effect_param": param, "disposition": 0, "damage_type": school.value,
+        "heal_modifier": 0.0, "pip_num": 0, "effect_target": 8, "spell_template_id": 0, "enchantment_spell_template_id": 0,
+        "maybe_effect_list": None,
+    }
+
+
+def _member(owner_id: int, team_id: int, player: bool, member_stats: Cache, hanging: List[Cache]) -> Cache:
+    return {
+        "is_client": player, "is_player": player, "owner_id": owner_id, "health": 5000, "max_health": 5000, "level": 150,
+        "get_stats": member_stats,
+        "get_participant": {
+            "team_id": team_id, "hanging_effects": hanging, "public_hanging_effects": [], "aura_effects": [],
+            "shadow_spell_effects": [], "death_activated_effects": [], "delay_cast_effects": [],
+        },
+    }
+
+
+def built_in(stacked: bool) -> Tuple[Cache, Cache, List[Cache], List[Cache]]:
+    blades = [_effect(SpellEffects.modify_outgoing_damage, 35), _effect(SpellEffects.modify_outgoing_damage, 20)] if stacked else []
+    traps = [_effect(SpellEffects.modify_incoming_damage, 25), _effect(SpellEffects.modify_incoming_damage, -40)] if stacked else []
+    duel = {"pvp": False, "raid": False, "damage_limit": 2.0, "d_k0": 1.5, "d_n0": 50.0, "resist_limit": 0.9, "r_k0": 0.5, "r_n0": 30.0}
+    caster = _member(1, 1, True, _stats(1.2, 0.4, 650.0, 300.0), blades)
+    targets = [_member(10 + i, 2, False, _stats(0.3, 0.25, 100.0, 150.0), deepcopy(traps)) for i in range(3)]
+    effects = [_effect(SpellEffects.damage, 700), _effect(SpellEffects.damage, 420, MagicSchool.storm)]
+    return duel, caster, targets, effects
+
+
+def from_snapshot(data: Cache) -> Tuple[Cache, Cache, List[Cache], List[Cache]]:
+    members = data["members"]
+    caster = next(member for member in members if member["owner_id"] in data["hands"])
+    targets = [member for member in members if team_id_path.get(member) != team_id_path.get(caster)]
+    effects = [
+        effect
+        for card in data["hands"][caster["owner_id"]]
+        for effect in card["get_graphical_spell"]["spell_effects"]
+        if effect["effect_type"] in damage_effect_types
+    ]
+    return data["duel"], caster, targets, effects
+
+
+def _time_sim_damage(duel: Cache, caster: Cache, targets: List[Cache], effects: List[Cache], calls: int) -> float:
+    pairs = [(effect, target) for effect in effects for target in targets]
+    copies = [deepcopy((caster, target, effect)) for _ in range(calls // len(pairs) + 1) for effect, target in pairs][:calls]
+    started = time.perf_counter()
+    for caster_copy, target_copy, effect_copy in copies:
+        sim_damage(duel, caster_copy, target_copy, effect_copy)
+    return (time.perf_counter() - started) / calls
+
+
+def _time_batch_damage(duel: Cache, caster: Cache, targets: List[Cache], effects: List[Cache], calls: int) -> float:
+    # Encoding happens once per round in the planner, so it is left out like it is there
+    caster_batch, target_batch, effect_batch = encode_members([caster]), encode_members(targets), encode_effects(effects)
+    rounds = max(1, calls // (len(effects) * len(targets)))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        batch_damage(duel, caster_batch, target_batch, effect_batch)
+    return (time.perf_counter() - started) / (rounds * len(effects) * len(targets))
+
+
+def _time_reads(caster: Cache, calls: int) -> Tuple[float, float]:
+    path = compile_path(stat_path)
+    started = time.perf_counter()
+    for _ in range(calls):
+        cache_get(caster, stat_path)
+    string_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        path.get(caster)
+    return string_seconds / calls, (time.perf_counter() - started) / calls
+
+
+def bench(duel: Cache, caster: Cache, targets: List[Cache], effects: List[Cache], calls: int, repeat: int) -> dict:
+    if not effects or not targets:
+        return {"pairs": 0}
+
+    reads = [_time_reads(caster, calls) for _ in range(repeat)]
+    return {
+        "pairs": len(effects) * len(targets),
+        "sim_damage_seconds": min(_time_sim_damage(duel, caster, targets, effects, calls) for _ in range(repeat)),
+        "batch_damage_seconds": min(_time_batch_damage(duel, caster, targets, effects, calls) for _ in range(repeat)),
+        "cache_get_seconds": min(string for string, _ in reads),
+        "compiled_get_seconds": min(compiled for _, compiled in reads),
+    }
+
+
+def report(name: str, data: dict) -> str:
+    if not data["pairs"]:
+        return f"{name}: no damage effects or no enemies"
+
+    return "\n".join([
+        f"{name}: {data['pairs']} (effect, target) pairs",
+        f"    sim_damage: {data['sim_damage_seconds'] * 1e6:.1f}us per hit, batch_damage: {data['batch_damage_seconds'] * 1e6:.2f}us per pair",
+        f"    {stat_path}: cache_get {data['cache_get_seconds'] * 1e6:.2f}us, compiled {data['compiled_get_seconds'] * 1e6:.2f}us",
+    ])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark damage simulation")
+    arg_parser.add_argument("snapshots", type=Path, nargs="*", help="recorded fights (Fighter.record_snapshot)")
+    arg_parser.add_argument("--calls", type=int, default=2000, help="hits per timed run")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="timed runs, the fastest is reported")
+    arg_parser.add_argument("--json", type=Path, help="also write the results as json")
+    args = arg_parser.parse_args()
+
+    inputs: Dict[str, Tuple[Cache, Cache, List[Cache], List[Cache]]] = {str(path): from_snapshot(load_snapshot(path)) for path in args.snapshots}
+    if not inputs:
+        inputs = {"nothing hanging": built_in(False), "blades and traps": built_in(True)}
+
+    results = {}
+    for name, (duel, caster, targets, effects) in inputs.items():
+        results[name] = bench(duel, caster, targets, effects, args.calls, args.repeat)
+        print(report(name, results[name]))
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
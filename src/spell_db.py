@@ -0,0 +1,157 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+from wizwalker import utils
+from wizwalker.combat import CombatCard
+
+from src.combat_cache import Cache
+from src.combat_snapshot import bulk_snapshot, COMBAT_CARD_SCHEMA, GRAPHICAL_SPELL_SCHEMA
+
+
+# School, pip cost, accuracy and effects of a spell never change, but every snapshot reads them from memory again for every
+# card, walking the effect lists each time. src.spell_db_extract pulls them out of the spell templates in Root.wad once,
+# and this module keeps them indexed by template id: a lookup is a dict hit. Spells the store doesn't know (it wasn't built,
+# or a patch added them) are read from memory and remembered for the rest of the session.
+# Records have the shape of a GRAPHICAL_SPELL_SCHEMA snapshot (plus name, display_name and type_name) and are shared,
+# so they must be treated as read only.
+
+# bumped whenever the record shape changes, stores written by older versions are ignored
+SPELL_DB_VERSION = 1
+
+SPELL_DB_FILE = "spell_db.json"
+
+# the card fields that change during a fight, everything under get_graphical_spell comes from the store when it can
+_CARD_STATE_SCHEMA = {name: field for name, field in COMBAT_CARD_SCHEMA.items() if name != "get_graphical_spell"}
+_CARD_STATE_SCHEMA["template_id"] = None
+
+
+def spell_db_path() -> Path:
+    return utils.get_cache_folder() / SPELL_DB_FILE
+
+
+def root_wad_size() -> Optional[int]:
+    try:
+        return (utils.get_wiz_install() / "Data" / "GameData" / "Root.wad").stat().st_size
+    except Exception:  # get_wiz_install raises a bare Exception without an install
+        return None
+
+
+class SpellDB:
+    def __init__(self, spells: Optional[Dict[int, Cache]] = None, root_size: Optional[int] = None):
+        self.spells: Dict[int, Cache] = spells if spells is not None else {}
+        self.root_size = root_size
+        self._by_name: Dict[str, int] = {spell["name"]: template_id for template_id, spell in self.spells.items() if spell.get("name")}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.spells)
+
+    def __contains__(self, template_id: int) -> bool:
+        return template_id in self.spells
+
+    def get(self, template_id: int) -> Optional[Cache]:
+        '''The record of a spell template, None if the store doesn't have it.'''
+        return self.spells.get(template_id)
+
+    def find(self, name: str) -> Optional[Cache]:
+        '''The record of the spell template with this name, the one CombatCard.name returns.'''
+        template_id = self._by_name.get(name)
+        return self.spells.get(template_id) if template_id is not None else None
+
+    def add(self, template_id: int, spell: Cache):
+        self.spells[template_id] = spell
+        if spell.get("name"):
+            self._by_name[spell["name"]] = template_id
+
+    async def card_spell(self, card: CombatCard) -> Cache:
+        '''The graphical spell snapshot of a card, from the store unless the card is enchanted or unknown.'''
+        is_enchanted = await card.is_enchanted()
+        if not is_enchanted:
+            spell = self.get(await card.template_id())
+            if spell is not None:
+                self.hits += 1
+                return spell
+
+        return (await self._read_spells([card], [is_enchanted]))[0]
+
+    async def _read_spells(self, cards: List[CombatCard], enchanted: List[Optional[bool]]) -> List[Cache]:
+        self.misses += len(cards)
+        graphical_spells = await asyncio.gather(*(card.get_graphical_spell() for card in cards))
+        spells = await bulk_snapshot(graphical_spells, GRAPHICAL_SPELL_SCHEMA)
+        for spell, is_enchanted in zip(spells, enchanted):
+            # an enchant changes the card's effects and accuracy, only the plain spell is the template's
+            if is_enchanted is False and spell["template_id"] is not None:
+                self.add(spell["template_id"], spell)
+        return spells
+
+    async def snapshot_cards(self, cards: List[CombatCard]) -> List[Cache]:
+        '''bulk_snapshot(cards, COMBAT_CARD_SCHEMA), with the graphical spells the store knows taken from it.'''
+        caches = await bulk_snapshot(cards, _CARD_STATE_SCHEMA)
+        missing = []
+        for card, cache in zip(cards, caches):
+            # None if reading it failed, the card might be enchanted then
+            spell = self.get(cache["template_id"]) if cache["is_enchanted"] is False else None
+            if spell is None:
+                missing.append((card, cache))
+            else:
+                self.hits += 1
+                cache["get_graphical_spell"] = spell
+
+        if missing:
+            spells = await self._read_spells([card for card, _ in missing], [cache["is_enchanted"] for _, cache in missing])
+            for (_, cache), spell in zip(missing, spells):
+                cache["get_graphical_spell"] = spell
+
+        for cache in caches:
+            del cache["template_id"]
+        return caches
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "SpellDB":
+        '''Loads the store src.spell_db_extract wrote, an empty one if there is none or it doesn't match the game anymore.'''
+        path = path if path is not None else spell_db_path()
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.debug(f"No spell store loaded from {path}: {e}")
+            return cls()
+
+        if data.get("version") != SPELL_DB_VERSION:
+            logger.info(f"Spell store {path} is from an older version, run src.spell_db_extract again to rebuild it")
+            return cls()
+
+        current_size = root_wad_size()
+        if current_size is not None and data.get("root_size") != current_size:
+            logger.info("Root.wad changed since the spell store was built, run src.spell_db_extract again to rebuild it")
+            return cls()
+
+        # json turns the template id keys into strings
+        spells = {int(template_id): spell for template_id, spell in data["spells"].items()}
+        return cls(spells, data.get("root_size"))
+
+    def save(self, path: Optional[Path] = None):
+        path = path if path is not None else spell_db_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so clients loading the store meanwhile never read a half written file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as file:
+            json.dump({"version": SPELL_DB_VERSION, "root_size": self.root_size, "spells": self.spells}, file)
+        os.replace(tmp_path, path)
+
+
+_spell_db: Optional[SpellDB] = None
+
+
+def get_spell_db() -> SpellDB:
+    '''The process wide spell store, loaded on first use.'''
+    global _spell_db
+    if _spell_db is None:
+        _spell_db = SpellDB.load()
+        logger.debug(f"Loaded {len(_spell_db)} spell templates")
+    return _spell_db
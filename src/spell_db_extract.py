@@ -0,0 +1,151 @@
+import argparse
+import re
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Optional, Type
+
+from wizwalker import utils
+from wizwalker.memory.memory_objects.enums import SpellEffects, HangingDisposition, EffectTarget
+
+from src.combat_cache import Cache
+from src.spell_db import SpellDB, spell_db_path
+
+# Optional, only needed to build the store: katsuba reads the wad and deserializes the templates
+try:
+    from katsuba import wad as katsuba_wad
+    from katsuba.op import TypeList, SerializerOptions, Serializer, STATEFUL_FLAGS
+    HAS_KATSUBA = True
+except ImportError:
+    HAS_KATSUBA = False
+
+
+# Builds the spell store src.spell_db loads, from the spell templates in Root.wad.
+#   python -m src.spell_db_extract "C:/ProgramData/KingsIsle Entertainment/Wizard101/Data/GameData/Root.wad" types.json
+# types.json comes from wiztype (https://github.com/wizspoil/wiztype) while the game runs: wiztype --version 2
+# Run it again after a game patch, the store is ignored once Root.wad changed.
+
+# record field -> template property, in the shape of the snapshot schemas
+SPELL_RANK_PROPERTIES = {
+    "spell_rank": "m_spellRank",
+    "shadow_pips": "m_shadowPips",
+    "balance_pips": "m_balancePips",
+    "death_pips": "m_deathPips",
+    "fire_pips": "m_firePips",
+    "ice_pips": "m_icePips",
+    "life_pips": "m_lifePips",
+    "myth_pips": "m_mythPips",
+    "storm_pips": "m_stormPips",
+    "is_xpip_spell": "m_xPipSpell",
+}
+SPELL_EFFECT_PROPERTIES = {
+    "effect_param": "m_effectParam",
+    "heal_modifier": "m_healModifier",
+    "pip_num": "m_pipNum",
+    "num_rounds": "m_numRounds",
+    "spell_template_id": "m_spellTemplateID",
+    "enchantment_spell_template_id": "m_enchantmentSpellTemplateID",
+}
+SPELL_EFFECT_ENUMS: Dict[str, tuple[str, Type[Enum]]] = {
+    "effect_type": ("m_effectType", SpellEffects),
+    "disposition": ("m_disposition", HangingDisposition),
+    "effect_target": ("m_effectTarget", EffectTarget),
+}
+
+
+def _decode(value) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value) if value is not None else None
+
+
+def _enum_value(value, enum: Type[Enum]) -> Optional[int]:
+    # Enums come as their number, or as their name ("kDamage") when the file was written with readable enums
+    if value is None or isinstance(value, int):
+        return value
+    name = _decode(value).split("::")[-1]
+    name = re.sub(r"^k(?=[A-Z])", "", name)
+    name = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+    try:
+        return enum[name].value
+    except KeyError:
+        return None
+
+
+def _school_id(school_name: Optional[str]) -> Optional[int]:
+    # school ids are the string id of the school name, MagicSchool.fire == make_string_id("Fire")
+    return utils.make_string_id(school_name) if school_name else None
+
+
+def effect_record(effect) -> Cache:
+    record: Cache = {name: effect.get(prop) for name, prop in SPELL_EFFECT_PROPERTIES.items()}
+    for name, (prop, enum) in SPELL_EFFECT_ENUMS.items():
+        record[name] = _enum_value(effect.get(prop), enum)
+    # templates name the school, memory holds its id
+    record["damage_type"] = _school_id(_decode(effect.get("m_sDamageType"))) or effect.get("m_damageType")
+    # compound effects (random, variable, conditional...) hold their effects in a list, the others don't have one
+    effects = effect.get("m_effectList")
+    record["maybe_effect_list"] = [effect_record(e) for e in effects] if effects is not None else None
+    return record
+
+
+def spell_record(template_id: int, template) -> Cache:
+    rank = template.get("m_spellRank")
+    effects = template.get("m_effects") or []
+    return {
+        "template_id": template_id,
+        "name": _decode(template.get("m_name")),
+        "display_name": _decode(template.get("m_displayName")),
+        "type_name": _decode(template.get("m_sTypeName")),
+        "magic_school_id": _school_id(_decode(template.get("m_sMagicSchoolName"))),
+        "accuracy": template.get("m_accuracy"),
+        "pip_cost": {name: rank.get(prop) for name, prop in SPELL_RANK_PROPERTIES.items()} if rank is not None else None,
+        "spell_effects": [effect_record(effect) for effect in effects],
+    }
+
+
+def extract_spells(wad_path: Path, types_path: Path) -> SpellDB:
+    '''Reads every spell template the template manifest lists from Root.wad.'''
+    if not HAS_KATSUBA:
+        raise RuntimeError("Building the spell store needs katsuba (pip install katsuba)")
+
+    archive = katsuba_wad.Archive.mmap(str(wad_path))
+    options = SerializerOptions()
+    options.flags = STATEFUL_FLAGS
+    options.shallow = False
+    options.skip_unknown_types = True
+    serializer = Serializer(options, TypeList.open(str(types_path)))
+
+    template_paths = utils.pharse_template_id_file(bytes(archive["TemplateManifest.xml"]))
+    db = SpellDB(root_size=wad_path.stat().st_size)
+    failed = 0
+    for template_id, path in template_paths.items():
+        if not path.startswith("Spells/"):
+            continue
+        try:
+            data = archive[path]
+            if data.startswith(b"BINd"):
+                data = data[4:]
+            db.add(template_id, spell_record(template_id, serializer.deserialize(data)))
+        except Exception as e:  # One broken template shouldn't lose the rest of the store
+            failed += 1
+            print(f"Skipping {path}: {e}")
+
+    print(f"Extracted {len(db)} spell templates, skipped {failed}")
+    return db
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Build the spell store from the spell templates in Root.wad")
+    arg_parser.add_argument("wad", type=Path, help="path to Root.wad")
+    arg_parser.add_argument("types", type=Path, help="types.json dumped by wiztype")
+    arg_parser.add_argument("--output", type=Path, help="where to write the store, the wizwalker cache folder by default")
+    args = arg_parser.parse_args()
+
+    db = extract_spells(args.wad, args.types)
+    output = args.output if args.output is not None else spell_db_path()
+    db.save(output)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 import asyncio
-from typing import Dict, List, Tuple
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
 from wizwalker import Client
 from wizwalker.errors import MemoryInvalidated
 from wizwalker.combat import CombatHandler
-from src.combat_objects import school_to_str
-from src.combat_utils import get_str_masteries, enemy_type_str, add_universal_stat, to_seperated_str_stats, to_percent
-from src.combat_math import base_damage_calculation_from_id
+from src.combat_objects import CombatIndex, school_to_str
+from src.combat_utils import enemy_type_str, mastery_names, read_masteries, to_seperated_str_stats, to_percent
+from src.combat_math import DuelCurves, EffectAttributes, MemberDamageStats, calculate_damage, read_effect_attributes
 
 # UNFINISHED - slack
 
@@ -50,7 +51,7 @@ def _update_tracking(tracked, alive_map, alive_order):
 	"""Update tracked list with alive members, placing replacements in dead slots.
 
 	tracked: list of (owner_id, name) in duel circle position order
-	alive_map: {owner_id: (member, name)} for currently alive members
+	alive_map: {owner_id: (owner_id, name)} for currently alive members
 	alive_order: [owner_id, ...] in duel circle order from get_members()
 	"""
 	tracked_ids = {oid for oid, _ in tracked}
@@ -99,7 +100,7 @@ def _update_tracking(tracked, alive_map, alive_order):
 
 
 def _find_alive_index(tracked, alive_map, preferred_idx):
-	"""Get alive member at preferred tracked index (0-based), or nearest alive."""
+	"""Get alive member's owner_id at preferred tracked index (0-based), or nearest alive."""
 	if preferred_idx < len(tracked):
 		oid = tracked[preferred_idx][0]
 		if oid in alive_map:
@@ -111,45 +112,151 @@ def _find_alive_index(tracked, alive_map, preferred_idx):
 	return None, preferred_idx
 
 
+@dataclass
+class MemberSnapshot:
+	"""What the stat viewer reads of a member that holds for the whole round"""
+	name: str
+	type_name: str
+	school_id: int
+	original_team: int
+	template_id: int
+	template_name: str
+	masteries: List[str]
+	# without effects, those are in MemberState
+	damage_stats: MemberDamageStats
+
+
+@dataclass
+class MemberState:
+	"""What the stat viewer reads of a member on every refresh"""
+	team_id: int
+	health: int
+	max_health: int
+	power_pips: int
+	pips: int
+	shadow_pips: int
+	is_stunned: bool
+	effects: List[EffectAttributes]
+
+
+class StatViewerCache:
+	'''Member snapshots and duel curves, read once per round. A new round or fight reads them again.'''
+	def __init__(self):
+		self.round: Optional[Tuple[int, int]] = None
+		self.snapshots: Dict[int, MemberSnapshot] = {}
+		self.curves: Optional[DuelCurves] = None
+		self.hits = 0
+		self.misses = 0
+
+	async def start_round(self, client: Client):
+		duel = client.duel
+		current_round = tuple(await asyncio.gather(duel.duel_id_full(), duel.round_num()))
+		if current_round != self.round:
+			self.round = current_round
+			self.snapshots.clear()
+			self.curves = None
+
+	async def duel_curves(self, client: Client) -> DuelCurves:
+		if self.curves is None:
+			self.curves = await DuelCurves.from_client(client)
+		return self.curves
+
+	async def member_snapshots(self, index: CombatIndex) -> Dict[int, MemberSnapshot]:
+		missing = [member_id for member_id in index.members if member_id not in self.snapshots]
+		self.hits += len(index.members) - len(missing)
+		self.misses += len(missing)
+		snapshots = await asyncio.gather(*(_read_snapshot(member_id, index) for member_id in missing))
+		self.snapshots.update(zip(missing, snapshots))
+		return {member_id: self.snapshots[member_id] for member_id in index.members}
+
+
+async def _read_snapshot(member_id: int, index: CombatIndex) -> MemberSnapshot:
+	member = index.members[member_id]
+	participant = index.participants[member_id]
+	name, type_name, school_id, original_team, template_id, npc_template, mastery_values, damage_stats = await asyncio.gather(
+		member.name(),
+		enemy_type_str(member),
+		participant.primary_magic_school_id(),
+		participant.original_team(),
+		participant.template_id_full(),
+		participant.fetch_npc_behavior_template(),
+		read_masteries(index.game_stats[member_id]),
+		MemberDamageStats.from_id(member_id, index, with_effects=False),
+	)
+	template_name = await npc_template.behavior_name() if npc_template else 'N/A'
+	masteries = [mastery_name for mastery_name, mastery in zip(mastery_names, mastery_values) if mastery]
+	return MemberSnapshot(name, type_name, school_id, original_team, template_id, template_name, masteries, damage_stats)
+
+
+async def _read_state(member_id: int, index: CombatIndex) -> MemberState:
+	# Straight from the participant, the CombatMember getters read it again for every value
+	participant = index.participants[member_id]
+	team_id, health, max_health, power_pips, pips, shadow_pips, stunned, effects = await asyncio.gather(
+		participant.team_id(),
+		participant.player_health(),
+		index.game_stats[member_id].max_hitpoints(),
+		participant.num_power_pips(),
+		participant.num_pips(),
+		participant.num_shadow_pips(),
+		participant.stunned(),
+		read_effect_attributes(member_id, index),
+	)
+	return MemberState(team_id, health, max_health, power_pips, pips, shadow_pips, stunned != 0, effects)
+
+
+_round_cache = StatViewerCache()
+
+
+def _damage_stats(snapshot: MemberSnapshot, state: MemberState) -> MemberDamageStats:
+	return replace(snapshot.damage_stats, effects=state.effects)
+
+
 async def total_stats(client: Client, ally_index: int, enemy_index: int, base_damage: int = None, school_id: int = None, force_crit: bool = None, force_school: bool = False, swapped: bool = False, view_target: bool = False):
 	global _tracked_allies, _tracked_enemies
 	# Gets the readable relevant stats, splitting members by team
 	combat = CombatHandler(client)
 	try:
 		members = await combat.get_members()
+		# ids, participants and stats are read once here, everything below works off of them
+		index = await CombatIndex.build(members)
 
 		# Split members by team using team_id
 		client_member = await combat.get_client_member()
 		if client_member is None:
 			return None
 		client_participant = await client_member.get_participant()
-		client_original_team = await client_participant.original_team()
-		client_current_team = await client_participant.team_id()
+		client_original_team, client_current_team = await asyncio.gather(client_participant.original_team(), client_participant.team_id())
+
+		# Every member at once: what holds for the round comes from the cache, the rest is read fresh
+		await _round_cache.start_round(client)
+		snapshots, states, curves = await asyncio.gather(
+			_round_cache.member_snapshots(index),
+			asyncio.gather(*(_read_state(member_id, index) for member_id in index.members)),
+			_round_cache.duel_curves(client),
+		)
+		states = dict(zip(index.members, states))
 
 		allies = []
 		enemies = []
-		for m in members:
-			p = await m.get_participant()
-			if await p.original_team() == client_original_team:
-				allies.append(m)
+		for oid in index.members:
+			if snapshots[oid].original_team == client_original_team:
+				allies.append(oid)
 			else:
-				enemies.append(m)
+				enemies.append(oid)
 
 		if not allies or not enemies:
 			return None
 
-		# Build owner_id -> (member, name) maps for alive members (preserving order)
+		# Build owner_id -> (owner_id, name) maps for alive members (preserving order)
 		alive_ally_map = {}
 		alive_ally_order = []
-		for m in allies:
-			oid = await m.owner_id()
-			alive_ally_map[oid] = (m, await m.name())
+		for oid in allies:
+			alive_ally_map[oid] = (oid, snapshots[oid].name)
 			alive_ally_order.append(oid)
 		alive_enemy_map = {}
 		alive_enemy_order = []
-		for m in enemies:
-			oid = await m.owner_id()
-			alive_enemy_map[oid] = (m, await m.name())
+		for oid in enemies:
+			alive_enemy_map[oid] = (oid, snapshots[oid].name)
 			alive_enemy_order.append(oid)
 
 		# Update tracking (preserves dead member positions, replaces dead slots)
@@ -166,22 +273,20 @@ async def total_stats(client: Client, ally_index: int, enemy_index: int, base_da
 
 		# Resolve alive members for the selected indices (fall back if dead)
 		if not swapped:
-			member, ally_index = _find_alive_index(_tracked_allies, alive_ally_map, ally_index)
-			target, enemy_index = _find_alive_index(_tracked_enemies, alive_enemy_map, enemy_index)
+			member_id, ally_index = _find_alive_index(_tracked_allies, alive_ally_map, ally_index)
+			target_id, enemy_index = _find_alive_index(_tracked_enemies, alive_enemy_map, enemy_index)
 		else:
-			member, enemy_index = _find_alive_index(_tracked_enemies, alive_enemy_map, enemy_index)
-			target, ally_index = _find_alive_index(_tracked_allies, alive_ally_map, ally_index)
+			member_id, enemy_index = _find_alive_index(_tracked_enemies, alive_enemy_map, enemy_index)
+			target_id, ally_index = _find_alive_index(_tracked_allies, alive_ally_map, ally_index)
 
-		if not member or not target:
+		if member_id is None or target_id is None:
 			return None
 
 		if view_target:
-			member, target = target, member
+			member_id, target_id = target_id, member_id
 
-		member_id = await member.owner_id()
-		target_id = await target.owner_id()
-		participant = await member.get_participant()
-		stats = await member.get_stats()
+		member_snapshot, member_state = snapshots[member_id], states[member_id]
+		target_snapshot, target_state = snapshots[target_id], states[target_id]
 
 		# Full name lists preserving dead positions
 		ally_names = [name for _, name in _tracked_allies]
@@ -191,53 +296,34 @@ async def total_stats(client: Client, ally_index: int, enemy_index: int, base_da
 			ally_index = min(ally_index, len(ally_names) - 1)
 		if enemy_names:
 			enemy_index = min(enemy_index, len(enemy_names) - 1)
-		member_name = await member.name()
-		member_type = await enemy_type_str(member)
-		template_id = await participant.template_id_full()
-		npc_template = await participant.fetch_npc_behavior_template()
-		template_name = await npc_template.behavior_name() if npc_template else 'N/A'
 		user_base_damage = base_damage
 		user_school_id = school_id
 		if school_id == 'target':
-			target_participant = await target.get_participant()
-			school_id = await target_participant.primary_magic_school_id()
+			school_id = target_snapshot.school_id
 		elif not school_id or not force_school:
-			school_id = await participant.primary_magic_school_id()
+			school_id = member_snapshot.school_id
 
-		real_school_id = await participant.primary_magic_school_id()
+		real_school_id = member_snapshot.school_id
 
 		school_name = school_to_str[real_school_id]
 		temp_school_name = school_to_str[school_id]
 
-		power_pips = await member.power_pips()
-		pips = await member.normal_pips()
-		shadow_pips = await member.shadow_pips()
-
-		health = await member.health()
-		max_health = await member.max_health()
-
-		raw_resistances = await stats.dmg_reduce_percent()
-		uni_resist = await stats.dmg_reduce_percent_all()
-		real_resistances = to_percent(add_universal_stat(raw_resistances, uni_resist))
-
-		raw_damages = await stats.dmg_bonus_percent()
-		uni_damage = await stats.dmg_bonus_percent_all()
-		real_damages = to_percent(add_universal_stat(raw_damages, uni_damage))
-
-		raw_pierces = await stats.ap_bonus_percent()
-		uni_pierce = await stats.ap_bonus_percent_all()
-		real_pierces = to_percent(add_universal_stat(raw_pierces, uni_pierce))
+		power_pips = member_state.power_pips
+		pips = member_state.pips
+		shadow_pips = member_state.shadow_pips
 
-		raw_crits = await stats.critical_hit_rating_by_school()
-		uni_crit = await stats.critical_hit_rating_all()
-		real_crits = add_universal_stat(raw_crits, uni_crit)
+		health = member_state.health
+		max_health = member_state.max_health
 
-		raw_blocks = await stats.block_rating_by_school()
-		uni_block = await stats.block_rating_all()
-		real_blocks = add_universal_stat(raw_blocks, uni_block)
+		# The damage stats already have the universal stat added
+		member_stats = member_snapshot.damage_stats
+		real_resistances = to_percent(member_stats.resistances)
+		real_damages = to_percent(member_stats.damages)
+		real_pierces = to_percent(member_stats.pierces)
+		real_crits = member_stats.crits
+		real_blocks = member_stats.blocks
 
-		masteries = await get_str_masteries(member)
-		masteries_str = ', '.join(masteries)
+		masteries_str = ', '.join(member_snapshot.masteries)
 
 		total_pips = (power_pips * 2) + (shadow_pips * 3.6) + pips
 
@@ -254,8 +340,9 @@ async def total_stats(client: Client, ally_index: int, enemy_index: int, base_da
 		combat_resolver = await client.duel.combat_resolver()
 		if combat_resolver:
 			global_effect = await combat_resolver.global_effect()
+		global_effect = await EffectAttributes.from_spell_effect(global_effect) if global_effect else None
 
-		estimated_damage = await base_damage_calculation_from_id(client, members, member_id, target_id, base_damage, school_id, global_effect, force_crit=force_crit)
+		estimated_damage = calculate_damage(_damage_stats(member_snapshot, member_state), _damage_stats(target_snapshot, target_state), curves, base_damage, school_id, global_effect, force_crit=force_crit)
 
 		resistances, raw_boosts = to_seperated_str_stats(real_resistances)
 
@@ -264,15 +351,15 @@ async def total_stats(client: Client, ally_index: int, enemy_index: int, base_da
 		crits, _ = to_seperated_str_stats(real_crits)
 		blocks, _ = to_seperated_str_stats(real_blocks)
 
-		if await member.is_player() and await target.is_player():
+		if member_stats.is_player and target_snapshot.damage_stats.is_player:
 			stat_lines = [{'key': 'pvp', 'label': 'Notice', 'value': 'The stat viewer is not supported in PvP.'}]
 
 		else:
 			stat_lines = [
-				{'key': 'est_dmg',     'label': 'Est. Max Dmg',  'value': f'{int(estimated_damage)} vs {await target.name()}'},
-				{'key': 'name',        'label': 'Name',          'value': f'{member_name} - {member_type} - {school_name}'},
-				{'key': 'template_id', 'label': 'Template ID',   'value': str(template_id)},
-				{'key': 'template_name','label': 'Template Name', 'value': template_name},
+				{'key': 'est_dmg',     'label': 'Est. Max Dmg',  'value': f'{int(estimated_damage)} vs {target_snapshot.name}'},
+				{'key': 'name',        'label': 'Name',          'value': f'{member_snapshot.name} - {member_snapshot.type_name} - {school_name}'},
+				{'key': 'template_id', 'label': 'Template ID',   'value': str(member_snapshot.template_id)},
+				{'key': 'template_name','label': 'Template Name', 'value': member_snapshot.template_name},
 				{'key': 'power_pips',  'label': 'Power Pips',    'value': str(power_pips)},
 				{'key': 'pips',        'label': 'Pips',          'value': str(pips)},
 				{'key': 'shadow_pips', 'label': 'Shadow Pips',   'value': str(shadow_pips)},
@@ -301,25 +388,19 @@ async def total_stats(client: Client, ally_index: int, enemy_index: int, base_da
 					# Dead member — preserve position
 					slot_info[(side, i + 1)] = {'name': tracked_name, 'max_dmg': 0, 'sim_dmg': 0, 'is_friendly': (side == 'ally'), 'is_dead': True, 'is_stunned': False}
 					continue
-				m = entry[0]
 				try:
-					p = await m.get_participant()
-					sid = await p.primary_magic_school_id()
-					pp = await m.power_pips()
-					np = await m.normal_pips()
-					sp = await m.shadow_pips()
-					base = shadow_damage_per_pip.get(sid, 100) * ((pp * 2) + (sp * 3.6) + np)
-					mid = await m.owner_id()
-					name = await m.name()
-					current_tid = await p.team_id()
-					is_friendly = (current_tid == client_current_team)
-					max_dmg = await base_damage_calculation_from_id(client, members, mid, tid, base, sid, global_effect, force_crit=True)
+					snapshot, state = snapshots[oid], states[oid]
+					sid = snapshot.school_id
+					base = shadow_damage_per_pip.get(sid, 100) * ((state.power_pips * 2) + (state.shadow_pips * 3.6) + state.pips)
+					is_friendly = (state.team_id == client_current_team)
+					caster_stats = _damage_stats(snapshot, state)
+					target_stats = _damage_stats(snapshots[tid], states[tid])
+					max_dmg = calculate_damage(caster_stats, target_stats, curves, base, sid, global_effect, force_crit=True)
 					if user_base_damage and user_school_id:
-						sim_dmg = await base_damage_calculation_from_id(client, members, mid, tid, user_base_damage, user_school_id, global_effect, force_crit=force_crit)
+						sim_dmg = calculate_damage(caster_stats, target_stats, curves, user_base_damage, user_school_id, global_effect, force_crit=force_crit)
 					else:
 						sim_dmg = max_dmg
-					stunned = await m.is_stunned()
-					slot_info[(side, i + 1)] = {'name': name, 'max_dmg': int(max_dmg), 'sim_dmg': int(sim_dmg), 'is_friendly': is_friendly, 'is_dead': False, 'is_stunned': stunned}
+					slot_info[(side, i + 1)] = {'name': snapshot.name, 'max_dmg': int(max_dmg), 'sim_dmg': int(sim_dmg), 'is_friendly': is_friendly, 'is_dead': False, 'is_stunned': state.is_stunned}
 				except Exception:
 					slot_info[(side, i + 1)] = {'name': tracked_name, 'max_dmg': 0, 'sim_dmg': 0, 'is_friendly': (side == 'ally'), 'is_dead': False, 'is_stunned': False}
 
@@ -330,6 +411,68 @@ async def total_stats(client: Client, ally_index: int, enemy_index: int, base_da
 		return await total_stats(client, ally_index + 1, enemy_index + 1, base_damage, swapped=swapped, view_target=view_target)
 
 
+class StatViewerUpdates:
+	'''What was last sent to the stats tab, so a refresh only sends what changed. reset() whenever the tab was cleared.'''
+	def __init__(self):
+		self.sent: Dict[str, Any] = {}
+
+	def reset(self):
+		self.sent.clear()
+
+	def changed(self, tag: str, value: Any) -> bool:
+		if tag in self.sent and self.sent[tag] == value:
+			return False
+		self.sent[tag] = value
+		return True
+
+	def changed_items(self, tag: str, items: Dict[Any, Any]) -> Optional[Dict[Any, Any]]:
+		# The items that changed, or None if all of them have to be sent (nothing was sent yet, or items came or went)
+		sent = self.sent.get(tag)
+		self.sent[tag] = items
+		if sent is None or sent.keys() != items.keys():
+			return None
+		return {key: value for key, value in items.items() if sent[key] != value}
+
+	def changes(self, result: tuple, swapped: bool, full: bool = False) -> List[Tuple[bool, str, Any]]:
+		'''The GUI updates a total_stats result needs: (whether it updates the window values, tag, value).
+		full sends every stat line again, the stats popup is only filled from a full list.'''
+		stat_lines, ally_names, enemy_names, ally_i, enemy_i, school_name, slot_info = result
+		if self.changed('swapped', swapped):
+			# the GUI mirrors what it gets by the side it shows, everything has to be sent again
+			self.reset()
+			self.changed('swapped', swapped)
+
+		updates = []
+		stat_changes = self.changed_items('stat_viewer', {line['key']: line for line in stat_lines})
+		if stat_changes is None or full:
+			updates.append((False, 'stat_viewer', stat_lines))
+		elif stat_changes:
+			updates.append((False, 'stat_viewer_changes', stat_changes))
+
+		names_changed = self.changed('EnemyInput.values', enemy_names) | self.changed('AllyInput.values', ally_names)
+		if names_changed:
+			updates.append((True, 'EnemyInput', enemy_names))
+			updates.append((True, 'AllyInput', ally_names))
+		# the counts sent above can move the selection, the names are sent again with them
+		enemy_name = enemy_names[enemy_i] if enemy_i < len(enemy_names) else None
+		if (self.changed('EnemyInput', enemy_name) or names_changed) and enemy_name is not None:
+			updates.append((False, 'EnemyInput', enemy_name))
+		ally_name = ally_names[ally_i] if ally_i < len(ally_names) else None
+		if (self.changed('AllyInput', ally_name) or names_changed) and ally_name is not None:
+			updates.append((False, 'AllyInput', ally_name))
+
+		if self.changed('calc_school', school_name):
+			updates.append((False, 'calc_school', school_name))
+
+		slot_changes = self.changed_items('slot_info', slot_info)
+		if slot_changes is None:
+			updates.append((False, 'slot_info', slot_info))
+		elif slot_changes:
+			updates.append((False, 'slot_info_changes', slot_changes))
+
+		return updates
+
+
 def dict_to_str(input_dict: Dict[str, float], seperator_1: str = ': ', seperator_2: str = ', ', take_abs: bool = False, key_blacklist: List[str] = ['WhirlyBurly', 'Gardening', 'CastleMagic', 'Cantrips', 'Fishing']) -> str:
     # Converts a str stats dict to a GUI readable list of stats
     output_str = ''
@@ -1,12 +1,16 @@
 import asyncio
+from loguru import logger
 from wizwalker import XYZ, Orient, Client, Keycode
 from wizwalker.file_readers.wad import Wad
+from wizwalker.file_readers.nav import parse_nav, read_nav
 import math
 import struct
+import heapq
+from array import array
 from io import BytesIO
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
+import numpy as np
 from src.utils import is_free
-from copy import copy
 
 type_format_dict = {
 "char": "<c",
@@ -40,60 +44,11 @@ class TypedBytes(BytesIO):
 
 
 
-# implemented from https://github.com/PeechezNCreem/navwiz/
-# this licence covers the below function
-# Boost Software License - Version 1.0 - August 17th, 2003
-#
-# Permission is hereby granted, free of charge, to any person or organization
-# obtaining a copy of the software and accompanying documentation covered by
-# this license (the "Software") to use, reproduce, display, distribute,
-# execute, and transmit the Software, and to prepare derivative works of the
-# Software, and to permit third-parties to whom the Software is furnished to
-# do so, all subject to the following:
-#
-# The copyright notices in the Software and this entire statement, including
-# the above license grant, this restriction and the following disclaimer,
-# must be included in all copies of the Software, in whole or in part, and
-# all derivative works of the Software, unless such copies or derivative
-# works are solely in the form of machine-executable object code generated by
-# a source language processor.
-#
-# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
-# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
-# FITNESS FOR A PARTICULAR PURPOSE, TITLE AND NON-INFRINGEMENT. IN NO EVENT
-# SHALL THE COPYRIGHT HOLDERS OR ANYONE DISTRIBUTING THE SOFTWARE BE LIABLE
-# FOR ANY DAMAGES OR OTHER LIABILITY, WHETHER IN CONTRACT, TORT OR OTHERWISE,
-# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
-# DEALINGS IN THE SOFTWARE.
-
 def parse_nav_data(file_data: Union[bytes, TypedBytes]):
     # ty starrfox for remaking this
-    if isinstance(file_data, bytes):
-        file_data = TypedBytes(file_data)
-    vertex_count = file_data.read_typed("short")
-    vertex_max = file_data.read_typed("short")
-    # unknown bytes
-    file_data.read_typed("short")
-    vertices = []
-    idx = 0
-    while idx <= vertex_max - 1:
-        x = file_data.read_typed("float")
-        y = file_data.read_typed("float")
-        z = file_data.read_typed("float")
-        vertices.append(XYZ(x, y, z))
-        vertex_index = file_data.read_typed("short")
-        if vertex_index != idx:
-            vertices.pop()
-            vertex_max -= 1
-        else:
-            idx += 1
-    edge_count = file_data.read_typed("int")
-    edges = []
-    for idx in range(edge_count):
-        start = file_data.read_typed("short")
-        stop = file_data.read_typed("short")
-        edges.append((start, stop))
-    return vertices, edges
+    if isinstance(file_data, TypedBytes):
+        file_data = file_data.getvalue()
+    return parse_nav(file_data)
 
 def get_neighbors(vertex: XYZ, vertices: list[XYZ], edges: list[(int, int)]):
     vert_idx = -1
@@ -112,6 +67,198 @@ def get_neighbors(vertex: XYZ, vertices: list[XYZ], edges: list[(int, int)]):
     return result
 
 
+class NavGraph:
+    # Zone nav mesh graph. Adjacency is stored CSR style: the neighbors of vertex i are targets[offsets[i]:offsets[i + 1]],
+    # with the matching edge lengths in weights. A static KD-tree over the vertices handles nearest node lookups.
+    def __init__(self, vertices: list[XYZ], edges: list[Tuple[int, int]]):
+        self.vertices = vertices
+        vertex_count = len(vertices)
+
+        # counting sort of the edges by their start vertex, dropping any that point outside the vertex table
+        degrees = [0] * (vertex_count + 1)
+        valid_edges = []
+        for start, stop in edges:
+            if 0 <= start < vertex_count and 0 <= stop < vertex_count and start != stop:
+                valid_edges.append((start, stop))
+                degrees[start + 1] += 1
+        for i in range(vertex_count):
+            degrees[i + 1] += degrees[i]
+
+        self.offsets = array("i", degrees)
+        self.targets = array("i", bytes(4 * len(valid_edges)))
+        self.weights = array("d", bytes(8 * len(valid_edges)))
+        fill = list(degrees[:-1])
+        for start, stop in valid_edges:
+            slot = fill[start]
+            fill[start] += 1
+            self.targets[slot] = stop
+            self.weights[slot] = calc_Distance(vertices[start], vertices[stop])
+
+        # implicit KD-tree: every [lo, hi) range of _kd_order is split on its median at (lo + hi) // 2, cycling through x, y, z by depth
+        self._kd_order = list(range(vertex_count))
+        self._kd_build(0, vertex_count, 0)
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def _kd_build(self, lo: int, hi: int, depth: int):
+        if hi - lo <= 1:
+            return
+        axis = depth % 3
+        vertices = self.vertices
+        self._kd_order[lo:hi] = sorted(self._kd_order[lo:hi], key=lambda i: tuple(vertices[i])[axis])
+        mid = (lo + hi) // 2
+        self._kd_build(lo, mid, depth + 1)
+        self._kd_build(mid + 1, hi, depth + 1)
+
+    def neighbors(self, index: int) -> array:
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def nearest(self, xyz: XYZ) -> int:
+        # Returns the index of the vertex closest to xyz, or -1 for an empty graph.
+        point = (xyz.x, xyz.y, xyz.z)
+        best = [-1, math.inf]
+        order = self._kd_order
+        vertices = self.vertices
+
+        def search(lo: int, hi: int, depth: int):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            index = order[mid]
+            vertex = tuple(vertices[index])
+            dist = (vertex[0] - point[0]) ** 2 + (vertex[1] - point[1]) ** 2 + (vertex[2] - point[2]) ** 2
+            if dist < best[1]:
+                best[0] = index
+                best[1] = dist
+
+            axis = depth % 3
+            diff = point[axis] - vertex[axis]
+            if diff < 0:
+                near, far = (lo, mid), (mid + 1, hi)
+            else:
+                near, far = (mid + 1, hi), (lo, mid)
+            search(*near, depth + 1)
+            # only cross the splitting plane if it is closer than the best match so far
+            if diff * diff < best[1]:
+                search(*far, depth + 1)
+
+        search(0, len(order), 0)
+        return best[0]
+
+    def neighborhood(self, index: int, max_depth: int = 3) -> list[int]:
+        # All vertices reachable from index in fewer than max_depth vertices along the path, including index itself.
+        seen = {index}
+        frontier = [index]
+        for _ in range(max_depth - 1):
+            next_frontier = []
+            for v in frontier:
+                for n in self.neighbors(v):
+                    if n not in seen:
+                        seen.add(n)
+                        next_frontier.append(n)
+            frontier = next_frontier
+        return list(seen)
+
+    def find_path(self, start: int, goal: int) -> list[int]:
+        # A* from start to goal using straight line distance as the heuristic. Returns vertex indices, empty if goal is unreachable.
+        if start == goal:
+            return [start]
+
+        vertices = self.vertices
+        goal_xyz = vertices[goal]
+        offsets = self.offsets
+        targets = self.targets
+        weights = self.weights
+
+        g_score = {start: 0.0}
+        came_from = {}
+        closed = set()
+        open_heap = [(calc_Distance(vertices[start], goal_xyz), start)]
+        while open_heap:
+            _, current = heapq.heappop(open_heap)
+            if current == goal:
+                path = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    path.append(current)
+                path.reverse()
+                return path
+            if current in closed:
+                continue
+            closed.add(current)
+
+            current_g = g_score[current]
+            for slot in range(offsets[current], offsets[current + 1]):
+                n = targets[slot]
+                if n in closed:
+                    continue
+                tentative = current_g + weights[slot]
+                if tentative < g_score.get(n, math.inf):
+                    g_score[n] = tentative
+                    came_from[n] = current
+                    heapq.heappush(open_heap, (tentative + calc_Distance(vertices[n], goal_xyz), n))
+
+        return []
+
+    def smooth_path(self, path: list[int], tolerance: float = 50.0) -> list[XYZ]:
+        # Ramer-Douglas-Peucker simplification, drops waypoints that sit within tolerance of the line between their neighbours.
+        points = [self.vertices[i] for i in path]
+        if len(points) <= 2:
+            return points
+
+        keep = [False] * len(points)
+        keep[0] = keep[-1] = True
+        stack = [(0, len(points) - 1)]
+        while stack:
+            first, last = stack.pop()
+            a = points[first]
+            b = points[last]
+            ab = (b.x - a.x, b.y - a.y, b.z - a.z)
+            ab_len_sq = ab[0] ** 2 + ab[1] ** 2 + ab[2] ** 2
+
+            worst_index = -1
+            worst_dist = tolerance * tolerance
+            for i in range(first + 1, last):
+                p = points[i]
+                ap = (p.x - a.x, p.y - a.y, p.z - a.z)
+                if ab_len_sq == 0:
+                    dist = ap[0] ** 2 + ap[1] ** 2 + ap[2] ** 2
+                else:
+                    t = max(0.0, min(1.0, (ap[0] * ab[0] + ap[1] * ab[1] + ap[2] * ab[2]) / ab_len_sq))
+                    dist = (ap[0] - t * ab[0]) ** 2 + (ap[1] - t * ab[1]) ** 2 + (ap[2] - t * ab[2]) ** 2
+                if dist > worst_dist:
+                    worst_index = i
+                    worst_dist = dist
+
+            if worst_index != -1:
+                keep[worst_index] = True
+                stack.append((first, worst_index))
+                stack.append((worst_index, last))
+
+        return [p for p, k in zip(points, keep) if k]
+
+    def route(self, start_xyz: XYZ, target_xyz: XYZ, tolerance: float = 50.0) -> list[XYZ]:
+        # Smoothed list of nav points leading from the node nearest start_xyz to the node nearest target_xyz.
+        start = self.nearest(start_xyz)
+        goal = self.nearest(target_xyz)
+        if start == -1 or goal == -1:
+            return []
+        return self.smooth_path(self.find_path(start, goal), tolerance)
+
+
+_nav_graph_cache: dict[str, NavGraph] = {}
+
+
+async def get_nav_graph(zone_name: str) -> NavGraph:
+    # Builds the nav graph of a zone once, later calls are served from memory.
+    if zone_name not in _nav_graph_cache:
+        wad = await load_wad(zone_name)
+        vertices, edges = await read_nav(wad)
+        _nav_graph_cache[zone_name] = NavGraph(vertices, edges)
+    return _nav_graph_cache[zone_name]
+
+
 def calc_PointOn3DLine(xyz_1 : XYZ, xyz_2 : XYZ, additional_distance):
     # extends a point on the line created by 2 XYZs by additional_distance. xyz_1 is the origin.
     distance = calc_Distance(xyz_1, xyz_2)
@@ -269,37 +416,17 @@ async def navmap_tp(client: Client, xyz: XYZ = None, leader_client: Client = Non
 
     try:
         # attempt to use the nav data
-        wad = await load_wad(starting_zone)
-        nav_file = await wad.get_file("zone.nav")
-        vertices, edges = parse_nav_data(nav_file)
+        graph = await get_nav_graph(starting_zone)
+        if len(graph) == 0:
+            raise ValueError("zone.nav has no vertices")
     except:
         # Unable to load nav data. Fall back to primitive spiral pattern
         await fallback_spiral_tp(client, target_xyz)
         return
 
     # continuation of nav data tp, don't want to swallow potential exceptions in this section
-    closest_vertex = vertices[0]
-    lowest_distance = calc_Distance(closest_vertex, target_xyz)
-    for i in range(1, len(vertices)):
-        vertex = vertices[i]
-        vert_dist = calc_Distance(vertex, target_xyz)
-        if vert_dist < lowest_distance:
-            closest_vertex = vertex
-            lowest_distance = vert_dist
-
-    max_depth = 3
-    queue = [[closest_vertex]]
-    relevant = set()
-    while len(queue) > 0:
-        path = queue.pop()
-        v = path[-1]
-        relevant.add(v)
-        for neighbor in get_neighbors(v, vertices, edges):
-            if neighbor in relevant or len(path) + 1 > max_depth:
-                continue
-            new_path = list(path)
-            new_path.append(neighbor)
-            queue.append(new_path)
+    closest_vertex = graph.nearest(target_xyz)
+    relevant = [graph.vertices[i] for i in graph.neighborhood(closest_vertex, max_depth=3)]
 
     # average position of the vertices
     avg_xyz = XYZ(0, 0, 0)
@@ -322,72 +449,146 @@ async def navmap_tp(client: Client, xyz: XYZ = None, leader_client: Client = Non
         if await is_free(client) and await client.zone_name() == starting_zone:
             await client.goto(target_xyz.x, target_xyz.y)
         return
+
+    # walk the nav path backwards from the target until one of its points accepts the teleport, then walk the rest
+    route = graph.route(starting_xyz, target_xyz)
+    for i in range(len(route) - 1, 0, -1):
+        if not await is_free(client) or await client.zone_name() != starting_zone:
+            return
+        await client.teleport(route[i])
+        if await check_success():
+            for waypoint in route[i + 1:] + [target_xyz]:
+                if not await is_free(client) or await client.zone_name() != starting_zone:
+                    return
+                await client.goto(waypoint.x, waypoint.y)
+            return
     await fallback_spiral_tp(client, target_xyz)
 
 
-def calc_chunks(points: list[XYZ], entity_distance: float = 3147.0) -> list[XYZ]:
+def calc_chunks(points: list[XYZ], entity_distance: float = 3147.0, coverage_radius: Optional[float] = None) -> list[XYZ]:
     # Returns a list of center points of "chunks" of the map, as defined by the input points.
-    min_pos = XYZ(0, 0, 0)
-    max_pos = XYZ(0, 0, 0)
-
-    # find the extremes, they act as corners
-    for point in points:
-        if point.x < min_pos.x:
-            min_pos.x = point.x
-        if point.y < min_pos.y:
-            min_pos.y = point.x
+    # Points are bucketed into a square grid in one pass and each non empty cell yields the centroid of its points.
+    # With coverage_radius set, a greedy cover picks input points instead so every point lies within coverage_radius of a chunk.
+    if not points:
+        return []
+    if coverage_radius is not None:
+        chunk_points = _calc_coverage_chunks(points, coverage_radius)
+        logger.debug(f'chunks:{len(chunk_points)}')
+        return chunk_points
 
-        if point.x > max_pos.x:
-            max_pos.x = point.x
-        if point.y > max_pos.y:
-            max_pos.y = point.y
+    coords = np.fromiter((c for p in points for c in (p.x, p.y, p.z)), np.float64, count=3 * len(points)).reshape(-1, 3)
+    xy = coords[:, :2]
 
     # we use an inscribed square for chunking so corners are correctly included, using circles makes dealing with them way more annnoying
     side_length = math.sqrt(2) * entity_distance
-    half_side_length = side_length / 2
 
-    # start half a side length into the base square
-    min_pos.x += half_side_length
-    min_pos.y += half_side_length
-    max_pos.x -= half_side_length
-    max_pos.y -= half_side_length
+    # every point's cell as row * columns + column, a point can only land in one cell
+    column, row = ((xy - xy.min(axis=0)) // side_length).astype(np.int64).T
+    cells = row * (column.max() + 1) + column
+    # sorted row by row, same visiting order as the grid scan this replaced
+    _, cell_of_point, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    centroids = np.column_stack([np.bincount(cell_of_point, weights=coords[:, i]) for i in range(3)]) / counts[:, None]
+
+    chunk_points = [XYZ(x, y, z) for x, y, z in centroids.tolist()]
+
+    logger.debug(f'chunks:{len(chunk_points)}')
+    return chunk_points
 
-    def point_in_rect(top_left: XYZ, bottom_right: XYZ, point: XYZ) -> bool:
-        return point.x >= top_left.x and point.x < bottom_right.x and point.y >= top_left.y and point.y < bottom_right.y
 
-    # place the first square outside the area, it is adjusted at the start of the loop anyways
-    current_point = XYZ(min_pos.x - side_length, min_pos.y, 0)
+def _calc_coverage_chunks(points: list[XYZ], radius: float) -> list[XYZ]:
+    # Covers every point with a circle of the given radius. A greedy cover does best on sparse corridor-like meshes while a
+    # hexagonal lattice does best on dense open areas, so both are computed and the one needing fewer teleports wins.
+    greedy = _calc_greedy_cover(points, radius)
+    lattice = _calc_hex_cover(points, radius)
+    return greedy if len(greedy) <= len(lattice) else lattice
+
+
+def _calc_greedy_cover(points: list[XYZ], radius: float) -> list[XYZ]:
+    # Candidates are the centroids of half radius cells, repeatedly take the one covering the most still uncovered points.
+    radius_sq = radius * radius
+    candidate_cells: dict[Tuple[int, int], list[float]] = {}
+    grid: dict[Tuple[int, int], list[int]] = {}
+    for i, p in enumerate(points):
+        # spatial hash with radius sized cells, so only the 3x3 block around a candidate has to be checked
+        grid.setdefault((math.floor(p.x / radius), math.floor(p.y / radius)), []).append(i)
+        acc = candidate_cells.setdefault((math.floor(2 * p.x / radius), math.floor(2 * p.y / radius)), [0.0, 0.0, 0.0, 0])
+        acc[0] += p.x
+        acc[1] += p.y
+        acc[2] += p.z
+        acc[3] += 1
+
+    candidates = [XYZ(x / count, y / count, z / count) for x, y, z, count in candidate_cells.values()]
+    covers = []
+    for c in candidates:
+        cx = math.floor(c.x / radius)
+        cy = math.floor(c.y / radius)
+        covered = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in grid.get((cx + dx, cy + dy), ()):
+                    q = points[j]
+                    if (c.x - q.x) ** 2 + (c.y - q.y) ** 2 <= radius_sq:
+                        covered.append(j)
+        covers.append(covered)
+
+    # lazy greedy, a heap entry is only trusted once its count has been recomputed and still beats the next best
+    uncovered = [True] * len(points)
+    remaining = len(points)
+    heap = [(-len(c), i) for i, c in enumerate(covers)]
+    heapq.heapify(heap)
     chunk_points = []
-    leftover_points = set(points)
-    # Turning the given points into a grid would be more efficient than this algorithm
-    while True:
-        # move the center of the rectangle to next rectangle
-        current_point.x += side_length
-        if current_point.x - half_side_length > max_pos.x:
-            # next row
-            current_point.x = min_pos.x
-            current_point.y += side_length
-            if current_point.y - half_side_length > max_pos.y:
-                # scanned until the end
-                break
-
-        # filter squares that do not contain any points
-        square_top_left = XYZ(current_point.x - half_side_length, current_point.y - half_side_length, 0)
-        square_bottom_right = XYZ(current_point.x + half_side_length, current_point.y + half_side_length, 0)
-        contained_points = set([])
-        for p in leftover_points:
-            if point_in_rect(square_top_left, square_bottom_right, p):
-                contained_points.add(p)
-        # a point cannot be in multiple squares at once
-        leftover_points = leftover_points - contained_points
-
-        if len(contained_points) > 0:
-            chunk_points.append(copy(current_point))
-
-    print(f'chunks:{len(chunk_points)}')
+    while remaining > 0 and heap:
+        _, i = heapq.heappop(heap)
+        gain = sum(1 for j in covers[i] if uncovered[j])
+        if gain == 0:
+            continue
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, i))
+            continue
+
+        for j in covers[i]:
+            if uncovered[j]:
+                uncovered[j] = False
+                remaining -= 1
+        chunk_points.append(candidates[i])
+
     return chunk_points
 
 
+def _calc_hex_cover(points: list[XYZ], radius: float) -> list[XYZ]:
+    # Buckets points into pointy top hexagons with a circumradius of radius, every point is then within radius of its hexagon's center.
+    sqrt3 = math.sqrt(3)
+    cells: dict[Tuple[int, int], list[float]] = {}
+    for p in points:
+        # axial coordinates, rounded through cube coordinates to the containing hexagon
+        q = (sqrt3 / 3 * p.x - p.y / 3) / radius
+        r = (2 / 3 * p.y) / radius
+        s = -q - r
+        rq = round(q)
+        rr = round(r)
+        rs = round(s)
+        q_diff = abs(rq - q)
+        r_diff = abs(rr - r)
+        s_diff = abs(rs - s)
+        if q_diff > r_diff and q_diff > s_diff:
+            rq = -rr - rs
+        elif r_diff > s_diff:
+            rr = -rq - rs
+
+        acc = cells.get((rq, rr))
+        if acc is None:
+            cells[(rq, rr)] = [p.z, 1]
+        else:
+            acc[0] += p.z
+            acc[1] += 1
+
+    # the z isn't part of the lattice, use the average height of the covered points
+    return [
+        XYZ(radius * (sqrt3 * q + sqrt3 / 2 * r), radius * 1.5 * r, sum_z / count)
+        for (q, r), (sum_z, count) in sorted(cells.items(), key=lambda item: (item[0][1], item[0][0]))
+    ]
+
+
 def calculate_yaw(xyz_1: XYZ, xyz_2: XYZ) -> float:
     # Calculates the yaw between 2 points.
     dx = xyz_1.x - xyz_2.x
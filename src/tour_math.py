@@ -0,0 +1,114 @@
+from time import perf_counter
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+# Visiting order for a set of points starting at a fixed position, ie. the zone chunks an auto collect run teleports through.
+# The tour is an open path (it doesn't return to the start). Points only need to be iterable as (x, y, z) so XYZs and tuples both work.
+# Paths are arrays of indexes into the distance matrix, every move is scored against all of its candidates at once.
+
+
+def _distance_matrix(start: Iterable[float], points: Sequence[Iterable[float]]) -> np.ndarray:
+    # index 0 is the start position, index i + 1 is points[i]
+    coords = np.array([tuple(start)] + [tuple(p) for p in points], dtype=np.float64)
+    return np.linalg.norm(coords[:, None, :] - coords[None, :, :], axis=-1)
+
+
+def _path_length(dist: np.ndarray, path: np.ndarray) -> float:
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def _nearest_neighbour(dist: np.ndarray) -> np.ndarray:
+    n = len(dist)
+    path = np.zeros(n, dtype=np.intp)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    for step in range(1, n):
+        closest = int(np.where(visited, np.inf, dist[path[step - 1]]).argmin())
+        visited[closest] = True
+        path[step] = closest
+    return path
+
+
+def _two_opt(dist: np.ndarray, path: np.ndarray, deadline: float) -> bool:
+    # Reverses path[i:j + 1] for the j that shortens the tour the most. The start (index 0) never moves and the last stop has no successor.
+    improved = False
+    n = len(path)
+    for i in range(1, n - 1):
+        a = path[i - 1]
+        b = path[i]
+        c = path[i + 1:]
+        d = path[i + 2:]
+        # j runs over i + 1 .. n - 1, only the ones before the last stop have a successor d
+        delta = dist[a, c] - dist[a, b]
+        delta[:-1] += dist[b, d] - dist[c[:-1], d]
+        j = int(delta.argmin())
+        if delta[j] < -1e-9:
+            path[i:i + j + 2] = path[i:i + j + 2][::-1]
+            improved = True
+        if perf_counter() > deadline:
+            break
+    return improved
+
+
+def _or_opt(dist: np.ndarray, path: np.ndarray, deadline: float) -> bool:
+    # Moves runs of 1 to 3 stops to a better spot in the tour, trying both orientations of the run.
+    improved = False
+    for length in (1, 2, 3):
+        i = 1
+        while i + length <= len(path):
+            n = len(path)
+            run = path[i:i + length]
+            prev = path[i - 1]
+            after = path[i + length] if i + length < n else None
+
+            # gain from cutting the run out and joining its neighbours
+            gain = dist[prev, run[0]]
+            if after is not None:
+                gain += dist[run[-1], after] - dist[prev, after]
+
+            # inserting after rest[k], the last k has no right neighbour and k == i - 1 puts the run back where it was
+            rest = np.concatenate((path[:i], path[i + length:]))
+            left = rest
+            right = rest[1:]
+            best_delta = 0.0
+            best_move = None
+            for segment in (run, run[::-1]):
+                delta = dist[left, segment[0]] - gain
+                delta[:-1] += dist[segment[-1], right] - dist[left[:-1], right]
+                delta[i - 1] = np.inf
+                k = int(delta.argmin())
+                if delta[k] < best_delta - 1e-9:
+                    best_delta = delta[k]
+                    best_move = (k, segment)
+
+            if best_move is not None:
+                k, segment = best_move
+                path[:] = np.concatenate((rest[:k + 1], segment, rest[k + 1:]))
+                improved = True
+            else:
+                i += 1
+
+            if perf_counter() > deadline:
+                return improved
+    return improved
+
+
+def plan_tour(start: Iterable[float], points: Sequence[Iterable[float]], time_budget: float = 0.05) -> tuple[list[int], float]:
+    # Orders points for visiting from start: nearest neighbour construction, then 2-opt and Or-opt until neither helps or time_budget (seconds) runs out.
+    # Returns the visiting order as indexes into points and the total travel distance of that order.
+    if not points:
+        return [], 0.0
+
+    deadline = perf_counter() + time_budget
+    dist = _distance_matrix(start, points)
+    path = _nearest_neighbour(dist)
+
+    while perf_counter() < deadline:
+        improved = _two_opt(dist, path, deadline)
+        improved = _or_opt(dist, path, deadline) or improved
+        if not improved:
+            break
+
+    return (path[1:] - 1).tolist(), _path_length(dist, path)
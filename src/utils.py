@@ -19,6 +19,7 @@ from loguru import logger
 
 from src.dance_game_hook import attempt_deactivate_dance_hook
 from src.paths import *
+from src.window_utils import get_window_from_path, is_visible_by_path, click_window_by_path, is_free, get_quest_name
 from src.sprinty_client import SprintyClient
 import typing
 from typing import List, Optional, Coroutine, Union, get_type_hints, Any, Iterable
@@ -53,35 +54,6 @@ def get_entity_text(file_path):
     except Exception as e:
         return f"Error reading entity file: {str(e)}"
 
-async def get_window_from_path(root_window: Window, name_path: list[str]) -> Window:
-    # FULL CREDIT TO SIROLAF FOR THIS FUNCTION
-    async def _recurse_follow_path(window, path):
-        if len(path) == 0:
-            return window
-        for child in await window.children():
-            if await child.name() == path[0]:
-                found_window = await _recurse_follow_path(child, path[1:])
-                if not found_window is False:
-                    return found_window
-
-        return False
-
-    return await _recurse_follow_path(root_window, name_path)
-
-
-async def is_visible_by_path(client: Client, path: list[str]):
-    # FULL CREDIT TO SIROLAF FOR THIS FUNCTION
-    # checks visibility of a window from the path
-    root = client.root_window
-    windows = await get_window_from_path(root, path)
-    if windows == False:
-        return False
-    elif await windows.is_visible():
-        return True
-    else:
-        return False
-
-
 async def read_control_checkbox_text(checkbox: Window) -> str:
     return await checkbox.read_wide_string_from_offset(616)
 
@@ -292,17 +264,6 @@ async def safe_click_window(client: Client, path):
 
 
 
-async def click_window_by_path(client: Client, path: list[str], hooks: bool = False):
-    # FULL CREDIT TO SIROLAF FOR THIS FUNCTION, notfaj was here :3
-    # clicks window from path, must actually exist in the UI tree
-    root = client.root_window
-    windows = await get_window_from_path(root, path)
-    if windows:
-        async with client.mouse_handler:
-            await client.mouse_handler.click_window(windows)
-
-
-
 async def text_from_path(client: Client, path: list[str]) -> str:
     # Returns text from a window via the window path
     window = await get_window_from_path(client.root_window, path)
@@ -773,23 +734,6 @@ async def logout_and_in(client: Client):
         await wait_for_loading_screen(client)
 
 
-async def is_free(client: Client):
-    # Returns True if not in combat, loading screen, or in dialogue.
-    return not any([await client.is_loading(), await client.in_battle(), await is_visible_by_path(client, advance_dialog_path)])
-
-
-async def get_quest_name(client: Client):
-    while not await is_free(client):
-        await asyncio.sleep(0.1)
-    quest_name_window = await get_window_from_path(client.root_window, quest_name_path)
-    while not await is_visible_by_path(client, quest_name_path):
-        await asyncio.sleep(0.1)
-    quest_objective = await quest_name_window.maybe_text()
-    quest_objective = quest_objective.replace('<center>', '')
-    quest_objective = quest_objective.replace('</center>', '')
-    return quest_objective
-
-
 # quest_number - 0-3
 # opens book, selects quest, and then closes book
 async def select_quest_from_questbook(client: Client, quest_book_sort: list[str], quest_number: int):
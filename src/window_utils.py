@@ -0,0 +1,68 @@
+import asyncio
+from typing import TYPE_CHECKING
+
+from src.paths import advance_dialog_path, quest_name_path
+
+if TYPE_CHECKING:
+    from wizwalker import Client
+    from wizwalker.memory import Window
+
+
+# Window path helpers that only go through the client and window methods, no wizwalker import needed.
+# src.utils re-exports them, the deimoslang VM takes them from here so it also runs on fake clients off Windows.
+
+
+async def get_window_from_path(root_window: "Window", name_path: list[str]) -> "Window":
+    # FULL CREDIT TO SIROLAF FOR THIS FUNCTION
+    async def _recurse_follow_path(window, path):
+        if len(path) == 0:
+            return window
+        for child in await window.children():
+            if await child.name() == path[0]:
+                found_window = await _recurse_follow_path(child, path[1:])
+                if not found_window is False:
+                    return found_window
+
+        return False
+
+    return await _recurse_follow_path(root_window, name_path)
+
+
+async def is_visible_by_path(client: "Client", path: list[str]):
+    # FULL CREDIT TO SIROLAF FOR THIS FUNCTION
+    # checks visibility of a window from the path
+    root = client.root_window
+    windows = await get_window_from_path(root, path)
+    if windows == False:
+        return False
+    elif await windows.is_visible():
+        return True
+    else:
+        return False
+
+
+async def click_window_by_path(client: "Client", path: list[str], hooks: bool = False):
+    # FULL CREDIT TO SIROLAF FOR THIS FUNCTION, notfaj was here :3
+    # clicks window from path, must actually exist in the UI tree
+    root = client.root_window
+    windows = await get_window_from_path(root, path)
+    if windows:
+        async with client.mouse_handler:
+            await client.mouse_handler.click_window(windows)
+
+
+async def is_free(client: "Client"):
+    # Returns True if not in combat, loading screen, or in dialogue.
+    return not any([await client.is_loading(), await client.in_battle(), await is_visible_by_path(client, advance_dialog_path)])
+
+
+async def get_quest_name(client: "Client"):
+    while not await is_free(client):
+        await asyncio.sleep(0.1)
+    quest_name_window = await get_window_from_path(client.root_window, quest_name_path)
+    while not await is_visible_by_path(client, quest_name_path):
+        await asyncio.sleep(0.1)
+    quest_objective = await quest_name_window.maybe_text()
+    quest_objective = quest_objective.replace('<center>', '')
+    quest_objective = quest_objective.replace('</center>', '')
+    return quest_objective
@@ -0,0 +1,99 @@
+from typing import List, Optional
+
+# Member, card and duel caches shaped like Fighter.record_snapshot output, for the tests that simulate combat.
+# Plain ids instead of wizwalker's enums so this imports anywhere.
+
+FIRE = 2343174 # MagicSchool.fire
+ICE = 72777 # MagicSchool.ice
+SCHOOLS = 16 # length of the per school stat lists
+
+DAMAGE = 1 # SpellEffects.damage
+ENEMY_SINGLE = 8 # EffectTarget.enemy_single
+ENEMY_TEAM = 4 # EffectTarget.enemy_team
+
+
+def duel(pvp: bool = False) -> dict:
+    return {"pvp": pvp, "raid": False, "damage_limit": 2.0, "d_k0": 1.5, "d_n0": 50.0, "resist_limit": 0.9, "r_k0": 0.5, "r_n0": 30.0}
+
+
+def stats(damage: float = 0.0, resist: float = 0.0, pierce: float = 0.0, crit: float = 0.0, block: float = 0.0) -> dict:
+    '''Stats of a member, the same for every school. Damage, resist and pierce are fractions (0.25 is 25%).'''
+    return {
+        "dmg_bonus_percent": [damage] * SCHOOLS,
+        "dmg_bonus_percent_all": 0.0,
+        "dmg_bonus_flat": [0.0] * SCHOOLS,
+        "dmg_bonus_flat_all": 0.0,
+        "dmg_reduce_percent": [resist] * SCHOOLS,
+        "dmg_reduce_percent_all": 0.0,
+        "dmg_reduce_flat": [0.0] * SCHOOLS,
+        "dmg_reduce_flat_all": 0.0,
+        "ap_bonus_percent": [pierce] * SCHOOLS,
+        "ap_bonus_percent_all": 0.0,
+        "critical_hit_rating_by_school": [crit] * SCHOOLS,
+        "critical_hit_rating_all": 0.0,
+        "block_rating_by_school": [block] * SCHOOLS,
+        "block_rating_all": 0.0,
+        "heal_bonus_percent": [0.0] * SCHOOLS,
+        "heal_bonus_percent_all": 0.0,
+        "heal_inc_bonus_percent": [0.0] * SCHOOLS,
+        "heal_inc_bonus_percent_all": 0.0,
+        "power_pip_base": 0.0,
+        "power_pip_bonus_percent_all": 0.0,
+    }
+
+
+def member(
+    owner_id: int, team_id: int, health: int, name: str, player: bool = False, member_stats: Optional[dict] = None, pips: int = 3,
+    power_pips: int = 0, school: int = FIRE,
+) -> dict:
+    return {
+        "is_client": player,
+        "is_player": player,
+        "owner_id": owner_id,
+        "health": health,
+        "max_health": health,
+        "level": 100,
+        "name": name,
+        "is_boss": False,
+        "get_stats": member_stats if member_stats is not None else stats(),
+        "get_participant": {
+            "team_id": team_id,
+            "primary_magic_school_id": school,
+            "pip_count": {
+                "generic_pips": pips, "power_pips": power_pips, "shadow_pips": 0, "balance_pips": 0, "death_pips": 0,
+                "fire_pips": 0, "ice_pips": 0, "life_pips": 0, "myth_pips": 0, "storm_pips": 0,
+            },
+            "hanging_effects": [],
+            "public_hanging_effects": [],
+            "aura_effects": [],
+            "shadow_spell_effects": [],
+            "death_activated_effects": [],
+            "delay_cast_effects": [],
+        },
+    }
+
+
+def effect(effect_type: int, param: int, school: int = FIRE, target: int = ENEMY_SINGLE) -> dict:
+    return {
+        "effect_type": effect_type, "effect_param": param, "disposition": 0, "damage_type": school, "heal_modifier": 0.0,
+        "pip_num": 0, "effect_target": target, "spell_template_id": 0, "enchantment_spell_template_id": 0, "maybe_effect_list": None,
+    }
+
+
+def card(name: str, effects: List[dict], school: int = FIRE, rank: int = 0) -> dict:
+    return {
+        "name": name,
+        "spell_id": 0,
+        "is_castable": True,
+        "is_enchanted": False,
+        "get_graphical_spell": {
+            "template_id": 0,
+            "magic_school_id": school,
+            "accuracy": 100,
+            "pip_cost": {
+                "spell_rank": rank, "shadow_pips": 0, "balance_pips": 0, "death_pips": 0, "fire_pips": 0, "ice_pips": 0,
+                "life_pips": 0, "myth_pips": 0, "storm_pips": 0, "is_xpip_spell": False,
+            },
+            "spell_effects": effects,
+        },
+    }
@@ -0,0 +1,213 @@
+# VM.eval as it was before expressions were compiled into closures (src/deimoslang/evaluator.py), with self turned into
+# a vm argument. Kept unchanged otherwise as the reference test_evaluator.py compares the compiled closures against.
+
+from src.deimoslang.game import Client, XYZ, Keycode
+from src.deimoslang.tokenizer import TokenKind
+from src.deimoslang.parser import *
+from src.deimoslang.vm import VM, VMError
+
+
+async def legacy_eval(vm: VM, expression: Expression, client: Client | None = None):
+    match expression:
+        case IdentExpression():
+            return expression.ident
+        case ConstantReferenceExpression():
+            if expression.name in vm._constants:
+                return vm._constants[expression.name]
+            raise VMError(f"Unknown constant: ${expression.name}")
+        case ConstantCheckExpression():
+            constant_name = expression.name
+
+            if expression.value is None:
+                if constant_name in vm._constants:
+                    return vm._constants[constant_name]
+                raise VMError(f"Unknown constant: {constant_name}")
+
+            expected_value = await legacy_eval(vm, expression.value)
+
+            if constant_name in vm._constants:
+                actual_value = vm._constants[constant_name]
+                if isinstance(expected_value, bool) and isinstance(actual_value, str):
+                    if actual_value.lower() == "true":
+                        actual_value = True
+                    elif actual_value.lower() == "false":
+                        actual_value = False
+
+                return actual_value == expected_value
+            return False
+        case RangeMinExpression():
+            range_value = await legacy_eval(vm, expression.range_expr, client)
+            if isinstance(range_value, str):
+                try:
+                    min_val, _ = map(float, range_value.split('-'))
+                    return min_val
+                except ValueError:
+                    raise VMError(f"Invalid range format: {range_value}. Expected format like '1-100'")
+            else:
+                raise VMError(f"Range expression must evaluate to a string, got {range_value}")
+
+        case RangeMaxExpression():
+            range_value = await legacy_eval(vm, expression.range_expr, client)
+            if isinstance(range_value, str):
+                try:
+                    _, max_val = map(float, range_value.split('-'))
+                    return max_val
+                except ValueError:
+                    raise VMError(f"Invalid range format: {range_value}. Expected format like '1-100'")
+            else:
+                raise VMError(f"Range expression must evaluate to a string, got {range_value}")
+        case IndexAccessExpression():
+            container = await legacy_eval(vm, expression.expr, client)
+            index = await legacy_eval(vm, expression.index, client)
+
+            if isinstance(container, list) and isinstance(index, (int, float)):
+                index_int = int(index)
+                if 0 <= index_int < len(container):
+                    return container[index_int]
+                else:
+                    # Return 0 for out of bounds index
+                    return 0.0
+            else:
+                # If not a list or index is not a number, return 0
+                return 0.0
+        case AndExpression():
+            for expr in expression.expressions:
+                if not await legacy_eval(vm, expr, client):
+                    return False
+            return True
+        case OrExpression():
+            for expr in expression.expressions:
+                if await legacy_eval(vm, expr, client):
+                    return True
+            return False
+        case CommandExpression():
+            return await vm._eval_command_expression(expression)
+        case NumberExpression():
+            return expression.number
+        case XYZExpression():
+            return XYZ(
+                await legacy_eval(vm, expression.x, client), # type: ignore
+                await legacy_eval(vm, expression.y, client), # type: ignore
+                await legacy_eval(vm, expression.z, client), # type: ignore
+            )
+        case UnaryExpression():
+            match expression.operator.kind:
+                case TokenKind.minus:
+                    result = await legacy_eval(vm, expression.expr, client)
+                    return -result # type: ignore
+                case TokenKind.keyword_not:
+                    # First evaluate the expression to populate _any_player_client
+                    expr_result = await legacy_eval(vm, expression.expr, client)
+
+                    if (isinstance(expression.expr, CommandExpression) and 
+                        expression.expr.command.player_selector.any_player):
+                        # Invert the selection - clients that didn't match become the new matches
+                        current_matches = vm._any_player_client.copy()
+                        vm._any_player_client = [c for c in vm._clients if c not in current_matches]
+
+                    # Return negated result
+                    return not expr_result
+                case _:
+                    raise VMError(f"Unimplemented unary expression: {expression}")
+        case StringExpression():
+            return expression.string
+        case StrFormatExpression():
+            format_str = expression.format_str
+            values = []
+            for eval in expression.values:
+                result = await legacy_eval(vm, eval, client)
+                values.append(result)
+            return format_str % tuple(values)
+        case KeyExpression():
+            key = expression.key
+            if key not in Keycode.__members__:
+                raise VMError(f"Unknown key code: {key}")
+            return Keycode[expression.key]
+        case EquivalentExpression():
+            left = await legacy_eval(vm, expression.lhs, client)
+            right = await legacy_eval(vm, expression.rhs, client)
+
+            if isinstance(left, list) and len(left) > 0:
+                left = left[0]
+            if isinstance(right, list) and len(right) > 0:
+                right = right[0]
+
+            return left == right
+        case DivideExpression():
+            left = await legacy_eval(vm, expression.lhs, client)
+            right = await legacy_eval(vm, expression.rhs, client)
+            return (left / right) # type: ignore
+        case GreaterExpression():
+            left = await legacy_eval(vm, expression.lhs, client)
+            right = await legacy_eval(vm, expression.rhs, client)
+            if isinstance(left, list) and len(left) > 0:
+                left = left[0] 
+            if isinstance(right, list) and len(right) > 0:
+                right = right[0] 
+            return (left > right)
+        case Eval():
+            return await vm._eval_expression(expression, client) #type: ignore
+        case SelectorGroup():
+            players = vm._select_players(expression.players)
+            expr = expression.expr
+            if expression.players.any_player:
+                vm._any_player_client = []
+                found_any = False
+                for anyplayer in vm._clients:
+                    result = await legacy_eval(vm, expr, anyplayer)
+                    if result:
+                        vm._any_player_client.append(anyplayer)
+                        found_any = True
+
+                return found_any
+            else:
+                for player in players:
+                    if not await legacy_eval(vm, expr, player):
+                        return False
+                return True
+        case ReadVarExpr():
+            loc = await legacy_eval(vm, expression.loc)
+            assert(loc != None and type(loc) == int)
+            test = vm.current_task.stack[loc]
+            return test
+        case StackLocExpression():
+            return expression.offset
+        case SubExpression():
+            lhs = await legacy_eval(vm, expression.lhs, client)
+            rhs = await legacy_eval(vm, expression.rhs, client)
+            assert(isinstance(lhs, (int, float)))
+            assert(isinstance(rhs, (int, float)))
+            return lhs - rhs
+
+        case ListExpression():
+            result = []
+
+            if hasattr(expression, 'items') and isinstance(expression.items, list):
+                for item in expression.items:
+                    evaluated_item = await legacy_eval(vm, item, client)
+                    if isinstance(evaluated_item, list):
+                        result.extend(evaluated_item)
+                    else:
+                        result.append(evaluated_item)
+            elif hasattr(expression, 'items') and isinstance(expression.items, ListExpression):
+                inner_result = await legacy_eval(vm, expression.items, client)
+                result = inner_result if isinstance(inner_result, list) else [inner_result]
+            elif hasattr(expression, 'expr') and isinstance(expression.expr, ListExpression):
+                inner_result = await legacy_eval(vm, expression.expr, client)
+                result = inner_result if isinstance(inner_result, list) else [inner_result]
+            elif hasattr(expression, 'expr'):
+                single_result = await legacy_eval(vm, expression.expr, client)
+                result = [single_result]
+
+            return result
+        case ContainsStringExpression():
+            lhs = await legacy_eval(vm, expression.lhs, client)
+            rhs = await legacy_eval(vm, expression.rhs, client)
+
+            if isinstance(rhs, list):
+                return any(item in lhs for item in rhs)
+
+            # Original behavior for single string
+            return (rhs in lhs) #type: ignore
+        case _:
+            raise VMError(f"Unimplemented expression type: {expression}")
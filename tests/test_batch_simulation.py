@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+try:
+    from src.batch_simulation import check_against_scalar
+except (ImportError, AttributeError, OSError):
+    pytest.skip("wizwalker only imports on Windows", allow_module_level=True)
+
+from combat_helpers import DAMAGE, FIRE, ICE, duel, effect, member, stats
+
+STORM = 83375795
+UNIVERSAL = 80289
+HEAL = 3
+DAMAGE_NO_CRIT = 2
+
+# effect type -> param range, for hanging effects on the caster and the targets
+HANGING_EFFECTS = {
+    28: (-50, 100), # modify_outgoing_damage, blades and weaknesses
+    122: (0, 150), # modify_outgoing_damage_flat
+    31: (5, 20), # modify_outgoing_armor_piercing
+    23: (-70, 100), # modify_incoming_damage, traps and shields
+    120: (-100, 100), # modify_incoming_damage_flat
+    38: (50, 400), # absorb_damage
+    27: (-20, -5), # modify_incoming_armor_piercing
+    29: (-50, 65), # modify_outgoing_heal
+    25: (-50, 65), # modify_incoming_heal
+    39: (50, 400), # absorb_heal
+}
+
+# Batch and scalar do the same arithmetic in a different order, so they differ in the last bits only
+TOLERANCE = 1e-12
+
+
+def _hanging(rng: random.Random) -> list:
+    effects = []
+    for _ in range(rng.randint(0, 6)):
+        effect_type = rng.choice(list(HANGING_EFFECTS))
+        effects.append(effect(effect_type, rng.randint(*HANGING_EFFECTS[effect_type]), rng.choice((FIRE, ICE, UNIVERSAL))))
+
+    if rng.random() < 0.2:
+        effects.append(effect(30, STORM, FIRE)) # modify_outgoing_damage_type, fire hits turn into storm
+    return effects
+
+
+def _member(rng: random.Random, owner_id: int, team_id: int, player: bool) -> dict:
+    member_stats = stats(
+        damage=rng.uniform(0, 2.5),
+        resist=rng.uniform(0, 0.6),
+        pierce=rng.uniform(0, 0.4),
+        crit=rng.choice((0.0, rng.uniform(0, 900))),
+        block=rng.choice((0.0, rng.uniform(0, 600))),
+    )
+    member_stats["dmg_bonus_flat"] = [rng.uniform(0, 20) for _ in member_stats["dmg_bonus_flat"]]
+    member_stats["heal_bonus_percent"] = [rng.uniform(0, 0.4) for _ in member_stats["heal_bonus_percent"]]
+    member_stats["heal_inc_bonus_percent"] = [rng.uniform(0, 0.4) for _ in member_stats["heal_inc_bonus_percent"]]
+    result = member(owner_id, team_id, 5000, f"member {owner_id}", player=player, member_stats=member_stats)
+    result["get_participant"]["hanging_effects"] = _hanging(rng)
+    result["level"] = rng.randint(1, 170)
+    return result
+
+
+def _effects(rng: random.Random, effect_types: tuple) -> list:
+    return [effect(rng.choice(effect_types), rng.randint(50, 1200), rng.choice((FIRE, ICE, STORM))) for _ in range(rng.randint(1, 5))]
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("crit_threshold", [0.8, 0.0])
+def test_batch_damage_matches_scalar(seed: int, crit_threshold: float):
+    rng = random.Random(seed)
+    caster = _member(rng, 1, 1, player=True)
+    targets = [_member(rng, 10 + i, 2, player=rng.random() < 0.5) for i in range(rng.randint(1, 4))]
+    effects = _effects(rng, (DAMAGE, DAMAGE_NO_CRIT))
+    assert check_against_scalar(duel(pvp=seed % 4 == 0), caster, targets, effects, crit_threshold=crit_threshold) < TOLERANCE
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("crit_threshold", [0.8, 0.0])
+def test_batch_heal_matches_scalar(seed: int, crit_threshold: float):
+    rng = random.Random(seed)
+    caster = _member(rng, 1, 1, player=True)
+    # the caster heals itself and its allies
+    targets = [caster] + [_member(rng, 2 + i, 1, player=True) for i in range(rng.randint(0, 3))]
+    effects = _effects(rng, (HEAL,))
+    assert check_against_scalar(duel(pvp=seed % 4 == 0), caster, targets, effects, heal=True, crit_threshold=crit_threshold) < TOLERANCE
+
+
+def test_batch_damage_without_crit_or_block():
+    caster = member(1, 1, 5000, "caster", player=True)
+    target = member(10, 2, 5000, "target")
+    assert check_against_scalar(duel(), caster, [target], [effect(DAMAGE, 500)]) < TOLERANCE
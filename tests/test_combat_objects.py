@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+try:
+    from src import combat_objects
+    from src.spell_db import SpellDB
+except (ImportError, AttributeError, OSError):
+    pytest.skip("wizwalker only imports on Windows", allow_module_level=True)
+
+from combat_helpers import FIRE, ICE, card, effect
+
+
+class FakeGraphicalSpell:
+    def __init__(self, spell: dict):
+        self.spell = spell
+        self.reads = 0
+
+    async def magic_school_id(self) -> int:
+        self.reads += 1
+        return self.spell["magic_school_id"]
+
+
+class FakeCard:
+    def __init__(self, spell_id: int, template_id: int, spell: dict, enchanted: bool = False):
+        self._spell_id = spell_id
+        self._template_id = template_id
+        self._enchanted = enchanted
+        self.graphical_spell = FakeGraphicalSpell(spell)
+
+    async def spell_id(self) -> int:
+        return self._spell_id
+
+    async def template_id(self) -> int:
+        return self._template_id
+
+    async def is_enchanted(self) -> bool:
+        return self._enchanted
+
+    async def get_graphical_spell(self) -> FakeGraphicalSpell:
+        return self.graphical_spell
+
+
+@pytest.fixture
+def spell_db(monkeypatch) -> SpellDB:
+    db = SpellDB({7: card("Frost Beetle", [effect(0, 100, ICE)], school=ICE)["get_graphical_spell"]})
+    monkeypatch.setattr(combat_objects, "get_spell_db", lambda: db)
+    return db
+
+
+def test_school_comes_from_the_store(spell_db: SpellDB):
+    # memory says fire, the store says ice: a stored template never reads the card's spell
+    plain = FakeCard(1, 7, card("Fire Cat", [], school=FIRE)["get_graphical_spell"])
+    assert asyncio.run(combat_objects.spell_id_school(1, [plain])) == ICE
+    assert plain.graphical_spell.reads == 0
+
+
+def test_school_of_enchanted_or_unknown_cards_is_read(spell_db: SpellDB):
+    enchanted = FakeCard(1, 7, card("Fire Cat", [], school=FIRE)["get_graphical_spell"], enchanted=True)
+    unknown = FakeCard(2, 8, card("Fire Cat", [], school=FIRE)["get_graphical_spell"])
+    assert asyncio.run(combat_objects.spell_id_school(1, [enchanted, unknown])) == FIRE
+    assert asyncio.run(combat_objects.spell_id_school(2, [enchanted, unknown])) == FIRE
+    assert enchanted.graphical_spell.reads == unknown.graphical_spell.reads == 1
+
+
+def test_effects_come_from_the_store(spell_db: SpellDB):
+    plain = FakeCard(1, 7, card("Fire Cat", [], school=FIRE)["get_graphical_spell"])
+    assert asyncio.run(combat_objects.spell_id_to_effects(1, [plain])) is spell_db.get(7)["spell_effects"]
+    assert spell_db.hits == 1
@@ -0,0 +1,51 @@
+import pytest
+
+try:
+    from src.combat_planner import affordable, play_from_card, simulate_cast, _play_rank, _power_value
+except (ImportError, AttributeError, OSError):
+    pytest.skip("wizwalker only imports on Windows", allow_module_level=True)
+
+from combat_helpers import DAMAGE, FIRE, ICE, card, duel, effect, member
+
+
+# A power pip is worth two pips for spells of the caster's school and one for any other school
+
+
+def _caster(power_pips: int, pips: int = 0) -> dict:
+    return member(1, 1, 3000, "Alice", player=True, pips=pips, power_pips=power_pips, school=FIRE)
+
+
+def _play(school: int, rank: int, xpip: bool = False):
+    spell = card("Spell", [effect(DAMAGE, 100, school)], school=school, rank=rank)
+    spell["get_graphical_spell"]["pip_cost"]["is_xpip_spell"] = xpip
+    return play_from_card(spell, 1, 0)
+
+
+def test_power_pips_count_double_in_school():
+    assert affordable(_caster(power_pips=2), _play(FIRE, 4))
+
+
+def test_off_school_rank_4_with_2_power_pips_is_rejected():
+    caster = _caster(power_pips=2)
+    play = _play(ICE, 4)
+    assert not affordable(caster, play)
+
+    members = {1: caster, 10: member(10, 2, 600, "Rat")}
+    assert not simulate_cast(duel(), members, 1, play, 10, 1)
+    assert members[1]["get_participant"]["pip_count"]["power_pips"] == 2
+    assert members[10]["health"] == 600
+
+
+def test_off_school_spell_spends_a_power_pip_per_pip():
+    members = {1: _caster(power_pips=3, pips=1), 10: member(10, 2, 600, "Rat")}
+    assert simulate_cast(duel(), members, 1, _play(ICE, 4), 10, 1)
+    pip_count = members[1]["get_participant"]["pip_count"]
+    assert (pip_count["power_pips"], pip_count["generic_pips"]) == (0, 0)
+
+
+@pytest.mark.parametrize("school, rank", [(FIRE, 5), (ICE, 3)])
+def test_x_pip_rank_follows_the_power_value(school: int, rank: int):
+    # 2 power pips and a pip
+    caster = _caster(power_pips=2, pips=1)
+    play = _play(school, 0, xpip=True)
+    assert _play_rank(caster["get_participant"]["pip_count"], play, _power_value(caster, play)) == rank
@@ -0,0 +1,43 @@
+import pytest
+
+try:
+    from src.fight_simulation import simulate_fights
+    from src.effect_simulation import calc_crit
+except (ImportError, AttributeError, OSError):
+    pytest.skip("wizwalker only imports on Windows", allow_module_level=True)
+
+from combat_helpers import DAMAGE, card, duel, effect, member, stats
+
+
+def _scenario(caster_stats: dict, enemy_stats: dict) -> dict:
+    fireball = card("Fireball", [effect(DAMAGE, 250)])
+    return {
+        "duel": duel(),
+        "members": [
+            member(1, 1, 3000, "Alice", player=True, member_stats=caster_stats),
+            member(10, 2, 600, "Rat", member_stats=enemy_stats),
+        ],
+        "hands": {1: [fireball] * 7},
+    }
+
+
+@pytest.mark.parametrize("is_pvp", [False, True])
+def test_calc_crit_without_crit_or_block(is_pvp: bool):
+    crit_multiplier, crit_chance, block_chance = calc_crit(0.0, 0.0, 100, 100, is_pvp)
+    assert crit_multiplier == 2
+    assert crit_chance == 0
+    assert block_chance == 0
+
+
+def test_trials_without_crit_or_block():
+    # Used to die with a ZeroDivisionError in calc_crit on the first hit
+    result = simulate_fights(_scenario(stats(), stats()), ["Fireball @ enemy | pass"], trials=20, seed=3)
+    assert result.trials == 20
+    assert result.as_dict()["wins"] == 20
+    assert result.fizzles["Fireball"] == 0
+
+
+def test_trials_with_block_only():
+    result = simulate_fights(_scenario(stats(), stats(block=300.0)), ["Fireball @ enemy | pass"], trials=20, seed=3)
+    assert result.trials == 20
+    assert result.as_dict()["wins"] == 20
@@ -0,0 +1,402 @@
+import hashlib
+import random
+
+import pytest
+
+from src.deimoslang.consteval import fold, NOT_CONSTANT
+from src.deimoslang.ir import Compiler, Instruction, InstructionKind
+from src.deimoslang.optimizer import OPTIMIZATION_PASSES, optimize
+from src.deimoslang.parser import Expression, IdentExpression
+
+
+# Every pass is checked on the IR it should rewrite, and optimised programs have to behave like unoptimised ones.
+# Behaviour is compared with a small interpreter that records what a program does (commands, stack writes, until exits,
+# how it ends). Conditions that don't fold get their results from a hash of the condition and how often it was
+# evaluated, so a program evaluating a condition a different number of times than before is caught too.
+
+CONDITIONS = [
+    "mass healthabove 5", "p1 inzone A/B", "not mass incombat", "True", "False", "mass manabelow 3 and not loading",
+    "any goldabove 5", "p2 incombat", "not True",
+]
+
+
+class _ConditionError(Exception):
+    pass
+
+
+def _condition(expression, count: int, seed: int) -> bool:
+    value = fold(expression)
+    if value is not NOT_CONSTANT:
+        return bool(value)
+    roll = int(hashlib.md5(f"{seed}:{expression!r}:{count}".encode()).hexdigest(), 16) % 7
+    if roll == 0:
+        # reads fail sometimes, VM.step treats that as a failed condition
+        raise _ConditionError()
+    return roll % 2 == 1
+
+
+def trace(program: list[Instruction], seed: int = 0, max_events: int = 150, max_steps: int = 3000) -> tuple[list, str]:
+    ip = 0
+    stack = []
+    untils = []
+    events = []
+    evaluations = {}
+
+    def condition(expression) -> bool:
+        key = repr(expression)
+        evaluations[key] = evaluations.get(key, 0) + 1
+        return _condition(expression, evaluations[key], seed)
+
+    for _ in range(max_steps):
+        if ip >= len(program):
+            return events, "end"
+        if len(events) >= max_events:
+            return events, "limit"
+
+        # an until's condition comes true after a number of events that depends on the until
+        for i in range(len(untils) - 1, -1, -1):
+            expression, until_id, exit_point, _ = untils[i]
+            delay = int(hashlib.md5(f"{seed}:{expression!r}:{until_id}".encode()).hexdigest(), 16) % 40
+            if events and (len(events) + delay) % 40 == 0 and events[-1] != ("until", until_id, len(events)):
+                events.append(("until", until_id, len(events)))
+                ip = exit_point
+                break
+
+        instruction = program[ip]
+        kind = instruction.kind
+        match kind:
+            case InstructionKind.jump:
+                ip += instruction.data
+            case InstructionKind.jump_if | InstructionKind.jump_ifn:
+                try:
+                    taken = condition(instruction.data[0]) == (kind == InstructionKind.jump_if)
+                    ip += instruction.data[1] if taken else 1
+                except _ConditionError:
+                    # a failing jump_if still takes forward jumps, see VM.step
+                    ip += instruction.data[1] if kind == InstructionKind.jump_if and instruction.data[1] > 1 else 1
+            case InstructionKind.call:
+                stack.append(ip + 1)
+                ip += instruction.data
+            case InstructionKind.ret:
+                ip = stack.pop()
+            case InstructionKind.enter_until:
+                untils.append((instruction.data[0], instruction.data[1], ip + instruction.data[2], len(stack)))
+                ip += 1
+            case InstructionKind.exit_until:
+                for i in range(len(untils) - 1, -1, -1):
+                    if untils[i][1] == instruction.data:
+                        stack = stack[:untils[i][3]]
+                        untils = untils[:i]
+                        break
+                ip += 1
+            case InstructionKind.kill:
+                events.append("kill")
+                return events, "kill"
+            case InstructionKind.push_stack:
+                stack.append(None)
+                ip += 1
+            case InstructionKind.pop_stack:
+                stack.pop()
+                ip += 1
+            case InstructionKind.write_stack:
+                stack[instruction.data[0]] = instruction.data[1]
+                value = fold(instruction.data[1])
+                events.append(("write", "dynamic" if value is NOT_CONSTANT else value))
+                ip += 1
+            case InstructionKind.nop | InstructionKind.label:
+                ip += 1
+            case _:
+                events.append((kind.name, _value(instruction.data)))
+                ip += 1
+    return events, "steps"
+
+
+def _value(data):
+    # operands as what they evaluate to, folding may have replaced them
+    if isinstance(data, list):
+        return [_value(item) for item in data]
+    value = fold(data) if isinstance(data, Expression) else NOT_CONSTANT
+    return repr(data) if value is NOT_CONSTANT else value
+
+
+def assert_same_behaviour(before: list[Instruction], after: list[Instruction], seeds=range(5)):
+    for seed in seeds:
+        events_before, ending_before = trace(before, seed)
+        events_after, ending_after = trace(after, seed)
+        # an optimised loop can get through more events before the step limit, compare up to the shorter trace
+        shared = min(len(events_before), len(events_after))
+        assert events_before[:shared] == events_after[:shared]
+        if "steps" not in (ending_before, ending_after) and "limit" not in (ending_before, ending_after):
+            assert ending_before == ending_after
+
+
+def compile_script(code: str, passes=()) -> list[Instruction]:
+    return Compiler.from_text(code, passes=passes).compile()
+
+
+def kinds(program: list[Instruction]) -> list[InstructionKind]:
+    return [instruction.kind for instruction in program]
+
+
+def _condition_expression():
+    return IdentExpression("cond")
+
+
+def test_fold_makes_constant_conditions_unconditional():
+    before = compile_script('if True {\n    log "a"\n} else {\n    log "b"\n}\nwhile not True {\n    log "c"\n}\n')
+    after = optimize(before, ["fold"])
+    assert {InstructionKind.jump_if, InstructionKind.jump_ifn} <= set(kinds(before))
+    assert not {InstructionKind.jump_if, InstructionKind.jump_ifn} & set(kinds(after))
+    assert len(after) < len(before)
+    assert_same_behaviour(before, after)
+
+
+def test_fold_replaces_constant_operands():
+    before = compile_script("sleep -1\ncon x = -5\n")
+    after = optimize(before, ["fold"])
+    sleep = next(instruction for instruction in after if instruction.kind == InstructionKind.sleep)
+    constant = next(instruction for instruction in after if instruction.kind == InstructionKind.declare_constant)
+    assert repr(sleep.data) == "Number(-1.0)"
+    assert repr(constant.data[1]) == "Number(-5.0)"
+    # the parsed expressions are shared with the editor, they are replaced rather than changed
+    assert repr(before[-2].data) == "Unary(TokenKind.minus, Number(1.0))"
+    assert_same_behaviour(before, after)
+
+
+def test_fold_keeps_conditions_that_dont_fold():
+    before = compile_script('if p1 incombat {\n    log "a"\n}\nlog "b"\n')
+    after = optimize(before, ["fold"])
+    assert kinds(after) == kinds(before)
+    assert_same_behaviour(before, after)
+
+
+def test_dce_drops_code_after_kill_and_uncalled_blocks():
+    before = compile_script('block unused {\n    log "x"\n}\nlog "a"\nkill\nlog "b"\n')
+    after = optimize(before, ["dce"])
+    logged = [instruction.data for instruction in after if instruction.kind == InstructionKind.log_single]
+    assert [repr(data) for data in logged] == ["String(a )"]
+    assert InstructionKind.ret not in kinds(after)
+    assert_same_behaviour(before, after)
+
+
+def test_dce_keeps_called_blocks():
+    before = compile_script('block used {\n    log "x"\n}\ncall used\nkill\n')
+    after = optimize(before, ["dce"])
+    assert InstructionKind.ret in kinds(after)
+    assert_same_behaviour(before, after)
+
+
+def test_thread_follows_jump_chains():
+    condition = _condition_expression()
+    before = [
+        Instruction(InstructionKind.jump_ifn, [condition, 3]),
+        Instruction(InstructionKind.log_single, "a"),
+        Instruction(InstructionKind.kill),
+        Instruction(InstructionKind.jump, 2),
+        Instruction(InstructionKind.kill),
+        Instruction(InstructionKind.log_single, "b"),
+        Instruction(InstructionKind.jump, -5),
+    ]
+    after = optimize(before, ["thread"])
+    # jump_ifn -> jump -> log "b" goes to log "b" directly, the jump only reached through it is left for dce
+    assert after[0].kind == InstructionKind.jump_ifn
+    assert after[after[0].data[1]].data == "b"
+    assert_same_behaviour(before, after)
+
+
+def test_thread_turns_jumps_to_ret_into_ret():
+    before = [
+        Instruction(InstructionKind.call, 2),
+        Instruction(InstructionKind.kill),
+        Instruction(InstructionKind.log_single, "a"),
+        Instruction(InstructionKind.jump, 2),
+        Instruction(InstructionKind.log_single, "b"),
+        Instruction(InstructionKind.ret),
+    ]
+    after = optimize(before, ["thread"])
+    assert kinds(after)[3] == InstructionKind.ret
+    assert_same_behaviour(before, after)
+
+
+def test_thread_drops_jumps_to_the_next_instruction():
+    before = compile_script('log "a"\n')
+    assert kinds(before)[0] == InstructionKind.jump
+    after = optimize(before, ["thread"])
+    assert kinds(after) == [InstructionKind.log_single]
+    assert_same_behaviour(before, after)
+
+
+def test_thread_keeps_the_direction_of_failing_jump_ifs():
+    # a jump_if whose condition fails jumps forward but falls through backwards, threading it across would change that
+    condition = _condition_expression()
+    before = [
+        Instruction(InstructionKind.log_single, "start"),
+        Instruction(InstructionKind.jump_if, [condition, 2]),
+        Instruction(InstructionKind.kill),
+        Instruction(InstructionKind.jump, -3),
+    ]
+    after = optimize(before, ["thread"])
+    assert after[1].data[1] == 2
+    assert_same_behaviour(before, after, seeds=range(20))
+
+
+def test_peephole_removes_push_pop_pairs():
+    before = [
+        Instruction(InstructionKind.log_single, "a"),
+        Instruction(InstructionKind.push_stack),
+        Instruction(InstructionKind.pop_stack),
+        Instruction(InstructionKind.log_single, "b"),
+    ]
+    after = optimize(before, ["peephole"])
+    assert kinds(after) == [InstructionKind.log_single, InstructionKind.log_single]
+    assert_same_behaviour(before, after)
+
+
+def test_peephole_inverts_jump_over_jump():
+    before = compile_script('if p1 incombat {\n    log "a"\n}\nlog "b"\n')
+    after = optimize(before, ["peephole"])
+    assert InstructionKind.jump_if in kinds(before)
+    assert kinds(after).count(InstructionKind.jump_ifn) == 1
+    assert InstructionKind.jump_if not in kinds(after)
+    assert len(after) == len(before) - 1
+    assert_same_behaviour(before, after, seeds=range(20))
+
+
+def test_peephole_keeps_the_direction_of_failing_jump_ifs():
+    # inverting into a backward jump_if would fall through where the failing jump_ifn went on to the jump
+    condition = _condition_expression()
+    before = [
+        Instruction(InstructionKind.log_single, "start"),
+        Instruction(InstructionKind.jump_ifn, [condition, 2]),
+        Instruction(InstructionKind.jump, -2),
+        Instruction(InstructionKind.log_single, "end"),
+    ]
+    after = optimize(before, ["peephole"])
+    assert kinds(after) == kinds(before)
+    assert_same_behaviour(before, after, seeds=range(20))
+
+
+def test_peephole_leaves_jump_targets_alone():
+    condition = _condition_expression()
+    before = [
+        Instruction(InstructionKind.push_stack),
+        Instruction(InstructionKind.pop_stack),
+        Instruction(InstructionKind.log_single, "a"),
+        Instruction(InstructionKind.jump_if, [condition, -2]),
+    ]
+    after = optimize(before, ["peephole"])
+    assert kinds(after) == kinds(before)
+
+
+def test_compact_drops_nops_and_labels():
+    condition = _condition_expression()
+    before = [
+        Instruction(InstructionKind.jump_if, [condition, 3]),
+        Instruction(InstructionKind.log_single, "a"),
+        Instruction(InstructionKind.nop),
+        Instruction(InstructionKind.label, "x"),
+        Instruction(InstructionKind.log_single, "b"),
+    ]
+    after = optimize(before, ["compact"])
+    assert kinds(after) == [InstructionKind.jump_if, InstructionKind.log_single, InstructionKind.log_single]
+    # the jump to the nop lands on what followed it
+    assert after[0].data[1] == 2
+    assert_same_behaviour(before, after, seeds=range(20))
+
+
+def test_compact_keeps_an_end_for_jumps_past_the_program():
+    condition = _condition_expression()
+    before = [
+        Instruction(InstructionKind.enter_until, [condition, 1, 3]),
+        Instruction(InstructionKind.log_single, "a"),
+        Instruction(InstructionKind.jump, -1),
+        Instruction(InstructionKind.nop),
+    ]
+    after = optimize(before, ["compact"])
+    assert kinds(after)[-1] == InstructionKind.nop
+    assert after[0].data[2] == len(after) - 1
+
+
+def _block(rng: random.Random, depth: int, context: dict, count: int | None = None) -> list[str]:
+    lines = []
+    for _ in range(count if count is not None else rng.randint(0, 4)):
+        lines.extend(_statement(rng, depth, context))
+    return lines
+
+
+def _indent(lines: list[str]) -> list[str]:
+    return ["    " + line for line in lines]
+
+
+def _statement(rng: random.Random, depth: int, context: dict) -> list[str]:
+    options = ["log", "log", "sleep", "command"]
+    if depth < 4:
+        options += ["if", "if", "while", "loop", "until", "times"]
+    if context.get("loop"):
+        options.append("break")
+    if context.get("block"):
+        options.append("return")
+    if context["blocks"]:
+        options.append("call")
+    if rng.random() < 0.2:
+        options.append("kill")
+
+    kind = rng.choice(options)
+    condition = lambda: rng.choice(CONDITIONS)
+    match kind:
+        case "log":
+            return [f'log "e{rng.randint(0, 99)}"']
+        case "sleep":
+            return [f"sleep {rng.choice(['0', '0.1', '-1'])}"]
+        case "command":
+            return [rng.choice(["sendkey W, 0.1", "p1 tp xyz(1, 2, 3)", "usepotion", "mass sendkey D"])]
+        case "break" | "return" | "kill":
+            return [kind]
+        case "call":
+            return [f"call {rng.choice(context['blocks'])}"]
+        case "if":
+            lines = [f"if {condition()} {{"] + _indent(_block(rng, depth + 1, context))
+            for _ in range(rng.randint(0, 2)):
+                lines += [f"}} elif {condition()} {{"] + _indent(_block(rng, depth + 1, context))
+            if rng.random() < 0.5:
+                lines += ["} else {"] + _indent(_block(rng, depth + 1, context))
+            return lines + ["}"]
+
+    loop_context = dict(context, loop=True)
+    body = _indent(_block(rng, depth + 1, loop_context))
+    match kind:
+        case "while":
+            return [f"while {condition()} {{"] + body + ["}"]
+        case "loop":
+            return ["loop {"] + body + ["}"]
+        case "until":
+            return [f"until {condition()} {{"] + body + ["}"]
+    return [f"times {rng.randint(1, 3)} {{"] + body + ["}"]
+
+
+def random_script(rng: random.Random) -> str:
+    lines = []
+    blocks = []
+    for i in range(rng.randint(0, 3)):
+        name = f"b{i}"
+        lines += [f"block {name} {{"] + _indent(_block(rng, 1, {"blocks": list(blocks), "block": True}, rng.randint(1, 4))) + ["}"]
+        blocks.append(name)
+    lines += _block(rng, 0, {"blocks": blocks}, rng.randint(1, 6))
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_random_scripts_behave_the_same(seed: int):
+    rng = random.Random(seed)
+    for _ in range(60):
+        code = random_script(rng)
+        try:
+            before = compile_script(code)
+        except Exception:
+            # break/return in places the compiler rejects
+            continue
+
+        passes = [name for name in OPTIMIZATION_PASSES if rng.random() < 0.5] if rng.random() < 0.5 else OPTIMIZATION_PASSES
+        after = compile_script(code, passes)
+        assert len(after) <= len(before)
+        assert_same_behaviour(before, after, seeds=[rng.randint(0, 1000)])
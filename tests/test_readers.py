@@ -0,0 +1,88 @@
+import random
+import struct
+
+import pytest
+
+try:
+    from wizwalker.file_readers.nav import parse_nav, _decode_nav, _dump_compiled, _load_compiled
+    from src.collision import CollisionWorld, ProxyMesh
+except (ImportError, AttributeError, OSError):
+    pytest.skip("wizwalker only imports on Windows", allow_module_level=True)
+
+
+# The nav and collision readers decode their tables with numpy, these files are packed record by record with struct.
+
+
+def _nav(vertices: list[tuple[float, float, float, int]], edges: list[tuple[int, int]]) -> bytes:
+    data = struct.pack("<hhh", len(vertices), len(vertices), 0)
+    data += b"".join(struct.pack("<fffh", *vertex) for vertex in vertices)
+    data += struct.pack("<i", len(edges))
+    return data + b"".join(struct.pack("<hh", *edge) for edge in edges)
+
+
+def _f32(value: float) -> float:
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def _positions(vertices) -> list[tuple[float, float, float]]:
+    return [(vertex.x, vertex.y, vertex.z) for vertex in vertices]
+
+
+def test_nav_tables():
+    rng = random.Random(0)
+    positions = [tuple(_f32(rng.uniform(-1e4, 1e4)) for _ in range(3)) for _ in range(50)]
+    edges = [(rng.randint(0, 49), rng.randint(0, 49)) for _ in range(80)]
+    vertices, nav_edges = parse_nav(_nav([(*position, i) for i, position in enumerate(positions)], edges))
+    assert _positions(vertices) == positions
+    assert nav_edges == edges
+    assert all(type(start) is int for start, _ in nav_edges)
+
+
+def test_nav_drops_out_of_sequence_vertices():
+    data = _nav([(1, 1, 1, 0), (2, 2, 2, 5), (3, 3, 3, 1), (4, 4, 4, 1), (5, 5, 5, 2)], [(0, 1)])
+    vertices, _ = parse_nav(data)
+    assert _positions(vertices) == [(1, 1, 1), (3, 3, 3), (5, 5, 5)]
+    with pytest.raises(RuntimeError, match="expected: 1 got: 5"):
+        parse_nav(data, strict=True)
+
+
+def test_nav_truncated():
+    data = _nav([(1, 1, 1, 0), (2, 2, 2, 1)], [(0, 1), (1, 0)])
+    for end in (4, 20, len(data) - 1):
+        with pytest.raises(ValueError, match="too short|truncated"):
+            parse_nav(data[:end])
+
+
+def test_nav_cache_round_trip():
+    data = _nav([(1.5, -2, 3, 0), (4, 5, 6.25, 1)], [(0, 1), (1, 0), (-1, 3)])
+    dumped = _dump_compiled(*_decode_nav(data), 1234)
+    assert _load_compiled(dumped, 99) is None
+    vertices, edges = _load_compiled(dumped, 1234)
+    expected_vertices, expected_edges = parse_nav(data)
+    assert _positions(vertices) == _positions(expected_vertices)
+    assert edges == expected_edges
+
+
+def _string(value: str) -> bytes:
+    return struct.pack("<i", len(value)) + value.encode()
+
+
+def test_collision_mesh_tables():
+    rng = random.Random(1)
+    vertices = [tuple(_f32(rng.uniform(-1e5, 1e5)) for _ in range(3)) for _ in range(20)]
+    faces = [tuple(rng.randint(0, 19) for _ in range(3)) for _ in range(30)]
+    normals = [tuple(_f32(rng.uniform(-1, 1)) for _ in range(3)) for _ in range(30)]
+
+    data = struct.pack("<i", 1) + struct.pack("<iII", 6, 2, 1) + struct.pack("<ii", len(vertices), len(faces))
+    data += b"".join(struct.pack("<fff", *vertex) for vertex in vertices)
+    data += b"".join(struct.pack("<iiifff", *face, *normal) for face, normal in zip(faces, normals))
+    # name, rotation, location, scale, material and proxy type follow the tables
+    data += _string("rock") + struct.pack("<9f", *range(9)) + struct.pack("<fff", 1, 2, 3) + struct.pack("<f", 1.5)
+    data += _string("stone") + struct.pack("<i", 6)
+
+    world = CollisionWorld()
+    world.load(data)
+    mesh = world.objects[0]
+    assert isinstance(mesh, ProxyMesh)
+    assert (mesh.vertices, mesh.faces, mesh.normals) == (vertices, faces, normals)
+    assert (mesh.name, mesh.location, mesh.material) == ("rock", (1, 2, 3), "stone")
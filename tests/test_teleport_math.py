@@ -0,0 +1,44 @@
+import math
+import random
+
+import pytest
+
+try:
+    from wizwalker import XYZ
+    from src.teleport_math import calc_chunks
+except (ImportError, AttributeError, OSError):
+    pytest.skip("wizwalker only imports on Windows", allow_module_level=True)
+
+
+def _reference_chunks(points: list, entity_distance: float) -> list[tuple[float, float, float]]:
+    # point by point, the way calc_chunks bucketed them before it used numpy
+    side_length = math.sqrt(2) * entity_distance
+    min_x = min(p.x for p in points)
+    min_y = min(p.y for p in points)
+    cells = {}
+    for p in points:
+        cells.setdefault((int((p.y - min_y) // side_length), int((p.x - min_x) // side_length)), []).append(p)
+    return [
+        tuple(sum(getattr(p, axis) for p in cells[cell]) / len(cells[cell]) for axis in "xyz")
+        for cell in sorted(cells)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_calc_chunks_matches_reference(seed: int):
+    rng = random.Random(seed)
+    for _ in range(50):
+        scale = rng.choice([10.0, 5000.0, 1e5])
+        points = [XYZ(rng.uniform(-scale, scale), rng.uniform(-scale, scale), rng.uniform(-50, 50)) for _ in range(rng.randint(1, 300))]
+        entity_distance = rng.choice([3147.0, 500.0])
+        chunks = [(c.x, c.y, c.z) for c in calc_chunks(points, entity_distance)]
+        assert chunks == [pytest.approx(chunk) for chunk in _reference_chunks(points, entity_distance)]
+
+
+def test_calc_chunks_grid_order():
+    side = math.sqrt(2) * 100
+    points = [XYZ(side * 1.5, 0, 0), XYZ(0, side * 1.5, 3), XYZ(0, 0, 1), XYZ(side * 0.5, 0, 5)]
+    chunks = calc_chunks(points, 100)
+    # row by row: the two points of the first cell, the second column, then the next row
+    assert [(c.x, c.y, c.z) for c in chunks] == [(side * 0.25, 0, 3), (side * 1.5, 0, 0), (0, side * 1.5, 3)]
+    assert calc_chunks([], 100) == []
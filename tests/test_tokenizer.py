@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from src.deimoslang import tokenizer
+import legacy_tokenizer
+
+
+SAMPLE = """\
+# sample bot
+con Target = "WizardCity/WC_Hub"
+con Limit = 5
+block heal {
+    if healthbelow 50% {
+        usepotion
+    } else {
+        log "fine"
+    }
+}
+block main_loop {
+    loop {
+        call heal
+        if p1 inzone WizardCity/WC_Ravenwood {
+            tp xyz(1, 2, 3)
+            sleep 0.5
+        } elif mass incombat {
+            waitforcombat completion
+        } else {
+            break
+        }
+    }
+}
+times 3 {
+    sendkey W, 0.2
+    p1:p2 goto xyz(100, -5.5, 3)
+}
+until goldabove 1000 {
+    call main_loop
+    while not windowvisible ["WorldView", "btnOk"] {
+        clickwindow ["WorldView", "btnOk"]
+        sleep 1
+    }
+}
+log health
+log `multi
+line string`
+settimer t1
+endtimer t1
+p1 tozone WizardCity/WC_Hub
+if any healthabove 10 and manabelow 5 or not loading && True {
+    sameany sendkey D
+}
+kill
+"""
+
+# Characters and fragments the fuzzed scripts are made of, weighted towards the edge cases of the lexer
+ALPHABET = list("abcpeE019 .-%/_$=*:,+><()[]{}\"'`#\t") + [
+    "\n", "  ", "block", "p1", "tp", "xyz", "5%", "1e3", "True", "log", "`", "½", " ", "kill_bot", "Zone/Sub", "&&", "a&b",
+]
+
+
+def _lex(module, text: str):
+    try:
+        tokens = module.Tokenizer().tokenize(text, filename="script")
+    except Exception as e:
+        return ("error", type(e).__name__, str(e))
+
+    return [
+        (
+            token.kind.name, token.literal, repr(token.value), type(token.value).__name__,
+            token.line_info.line, token.line_info.column, token.line_info.last_column, token.line_info.last_line, token.line_info.filename,
+        )
+        for token in tokens
+    ]
+
+
+def _check(text: str):
+    result = _lex(tokenizer, text)
+    if isinstance(result, tuple) and result[2].startswith("Unexpected character: &"):
+        # the old tokenizer never got past a lone '&', it looped on it forever
+        return
+
+    assert result == _lex(legacy_tokenizer, text), text
+
+
+def test_sample_matches_legacy():
+    _check(SAMPLE)
+
+
+def test_lone_ampersand_raises():
+    with pytest.raises(tokenizer.TokenizerError):
+        tokenizer.Tokenizer().tokenize("if a & b {")
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fuzzed_scripts_match_legacy(seed: int):
+    rng = random.Random(seed)
+    for _ in range(1000):
+        _check("".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40))))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_fuzzed_lines_of_sample_match_legacy(seed: int):
+    # real statements shuffled and cut at random points
+    rng = random.Random(seed)
+    lines = SAMPLE.splitlines(keepends=True)
+    for _ in range(300):
+        text = "".join(rng.choice(lines) for _ in range(rng.randint(1, 12)))
+        _check(text[:rng.randint(0, len(text))])
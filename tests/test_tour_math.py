@@ -0,0 +1,47 @@
+import itertools
+import math
+import random
+
+import pytest
+
+from src.tour_math import plan_tour
+
+
+def _length(start, points, order) -> float:
+    stops = [start] + [points[i] for i in order]
+    return sum(math.dist(a, b) for a, b in zip(stops, stops[1:]))
+
+
+def test_empty_and_single():
+    assert plan_tour((0, 0, 0), []) == ([], 0.0)
+    assert plan_tour((0, 0, 0), [(3, 4, 0)]) == ([0], 5.0)
+
+
+def test_points_on_a_line_are_visited_in_order():
+    points = [(x, 0, 0) for x in (7, 2, 9, 1, 5, 3)]
+    order, total = plan_tour((0, 0, 0), points, time_budget=1)
+    assert [points[i][0] for i in order] == [1, 2, 3, 5, 7, 9]
+    assert total == 9
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tour_is_a_permutation_with_its_length(seed: int):
+    rng = random.Random(seed)
+    points = [(rng.uniform(0, 1e4), rng.uniform(0, 1e4), rng.uniform(-50, 50)) for _ in range(rng.randint(2, 120))]
+    start = (rng.uniform(0, 1e4), rng.uniform(0, 1e4), 0)
+    order, total = plan_tour(start, points, time_budget=1)
+    assert sorted(order) == list(range(len(points)))
+    assert all(type(i) is int for i in order)
+    assert total == pytest.approx(_length(start, points, order))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_small_tours_are_close_to_optimal(seed: int):
+    rng = random.Random(seed)
+    for _ in range(30):
+        points = [(rng.uniform(0, 100), rng.uniform(0, 100), 0) for _ in range(rng.randint(2, 7))]
+        start = (50, 50, 0)
+        _, total = plan_tour(start, points, time_budget=1)
+        best = min(_length(start, points, order) for order in itertools.permutations(range(len(points))))
+        # 2-opt and Or-opt are local searches, they don't always find the best tour
+        assert total <= best * 1.15
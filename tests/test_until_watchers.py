@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+from src.deimoslang import cache
+from src.deimoslang.fakeclient import FakeWorld
+from src.deimoslang.game import Keycode
+from src.deimoslang.vm import VM
+
+
+# Untils whose condition touches VM state (here the any player matches) are only marked due by their watcher, the VM
+# evaluates them between two instructions.
+
+
+@pytest.fixture(autouse=True)
+def _compiled_in_tmp_path(monkeypatch, tmp_path):
+    # load_from_text caches the compiled program on disk
+    monkeypatch.setattr(cache, "_cache_dir", lambda: tmp_path)
+
+
+def _vm(code: str) -> tuple[FakeWorld, VM]:
+    world = FakeWorld()
+    for zone in ("A", "A"):
+        world.add_client(zone=zone)
+    vm = VM(world.clients)
+    vm.until_poll_interval = 0.02
+    vm.load_from_text(code)
+    return world, vm
+
+
+def test_watcher_leaves_any_player_matches_alone():
+    async def run():
+        world, vm = _vm("until any inzone B {\n    sleep 10\n}\n")
+        vm.running = True
+        while not vm._until_infos:
+            await vm.step()  # up to enter_until, which checks the condition once
+        matches = [world.clients[0]]
+        vm._any_player_client = matches
+        world.clients[1].zone = "B"
+
+        await asyncio.sleep(0.1)
+        # the watcher ran a few times, but only the VM's next step may evaluate the condition
+        assert vm._any_player_client is matches
+        assert vm._until_infos[0].due and not vm._until_infos[0].fired
+
+        await vm.step()
+        assert vm._any_player_client == [world.clients[1]]
+        # fired and left in the same step
+        assert not vm._until_infos
+        vm.stop()
+
+    asyncio.run(run())
+
+
+def test_due_checks_dont_wake_parked_tasks():
+    async def run():
+        world, vm = _vm("until any inzone B {\n    sleep 1\n    sendkey W\n}\n")
+        pressed = []
+        world.on_key(Keycode.W, lambda client: pressed.append(time.perf_counter()))
+        world.schedule(0.3, lambda: setattr(world.clients[1], "zone", "B"))
+
+        started = time.perf_counter()
+        await asyncio.wait_for(vm.run(), 2)
+        # the sleep is cut short by the until firing, not by the checks before it
+        assert 0.25 < time.perf_counter() - started < 0.8
+        assert pressed == []
+        assert vm._any_player_client == [world.clients[1]]
+        world.close()
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+try:
+    from wizwalker.extensions.wizsprinter.zone_graph import ZoneEdgeKind, ZoneGraph, world_of
+except (ImportError, AttributeError, OSError):
+    pytest.skip("wizwalker only imports on Windows", allow_module_level=True)
+
+
+@pytest.fixture(scope="module")
+def graph() -> ZoneGraph:
+    graph = ZoneGraph.from_traversal_data()
+    graph.build_next_hops()
+    return graph
+
+
+def _cost(path) -> float:
+    return sum(edge.cost for edge in path)
+
+
+def test_recall_lands_on_the_zone_map_root(graph: ZoneGraph):
+    targets = {}
+    for edge in graph.edges:
+        if edge.kind == ZoneEdgeKind.recall:
+            targets.setdefault(world_of(edge.source), set()).add(edge.destination)
+    assert targets["WizardCity"] == {"WizardCity/WC_Ravenwood_Teleporter"}
+    assert targets["Marleybone"] == {"Marleybone/Interiors/MB_WolfminsterAbbey"}
+    assert all(len(hubs) == 1 for hubs in targets.values())
+
+
+def test_zones_only_in_the_zone_map_can_recall_out(graph: ZoneGraph):
+    # the zone map links the golem tower to its first floor, gates_list.txt has no gate for it
+    route = graph.route("WizardCity/WC_Streets/WC_Golem_Tower/WC_Golem_Tower_1", "WizardCity/WC_Hub")
+    assert [edge.kind for edge in route] == [ZoneEdgeKind.recall, ZoneEdgeKind.gate, ZoneEdgeKind.gate]
+    assert route[-1].destination == "WizardCity/WC_Hub"
+
+
+def test_mark_is_taken_when_cheaper(graph: ZoneGraph):
+    route = graph.route("Krokotopia/KT_Hub", "WizardCity/WC_Hub", mark="WizardCity/WC_Ravenwood")
+    assert [(edge.kind, edge.destination) for edge in route] == [
+        (ZoneEdgeKind.mark, "WizardCity/WC_Ravenwood"),
+        (ZoneEdgeKind.gate, "WizardCity/WC_Hub"),
+    ]
+    assert graph.route("Krokotopia/KT_Hub", "WizardCity/WC_Ravenwood", mark="WizardCity/WC_Ravenwood")[0].kind == ZoneEdgeKind.mark
+
+    # one gate away, recalling to the mark first would be longer
+    without_mark = graph.route("WizardCity/WC_Ravenwood", "WizardCity/WC_Hub")
+    assert graph.route("WizardCity/WC_Ravenwood", "WizardCity/WC_Hub", mark="Krokotopia/KT_Hub") == without_mark
+    assert graph.route("WizardCity/WC_Hub", "WizardCity/WC_Ravenwood", mark="WizardCity/WC_Hub") == graph.route("WizardCity/WC_Hub", "WizardCity/WC_Ravenwood")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_route_matches_shortest_path(graph: ZoneGraph, seed: int):
+    rng = random.Random(seed)
+    zones = sorted(graph.zones)
+    for _ in range(30):
+        source, destination = rng.choice(zones), rng.choice(zones)
+        route = graph.route(source, destination)
+        shortest = graph.shortest_path(source, destination)
+        assert (route is None) == (shortest is None)
+        if route is not None:
+            assert _cost(route) == pytest.approx(_cost(shortest))
+            assert all(a.destination == b.source for a, b in zip(route, route[1:]))